@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Analytics Scaling Benchmark
+Seeds growing numbers of TimeEntry documents into a local MongoDB and measures
+how the /api/analytics endpoints scale: latency, server RSS and response size
+for every period at every dataset size. Seeded entries bypass the API, so the
+hourly TimeRollup rows analytics read from are updated alongside them.
+
+Streaming CSV/NDJSON exports of reports/custom are consumed row by row and
+their row count and summed duration checked against the JSON report totals.
+
+Usage:
+    python analytics_benchmark.py --mongo-url mongodb://localhost:27017/hubstaff_clone \
+        --server-pid $(pgrep -f "node server.js") --sizes 10000,100000,1000000,5000000
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import requests
+from pymongo import MongoClient, UpdateOne
+
+from hubstaff_client import resolve_api_url
+from load_test import percentile
+
+try:
+    import psutil
+except ImportError:  # RSS sampling falls back to /proc
+    psutil = None
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+PERIODS = ["day", "week", "month", "year"]
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+SEED_BATCH_SIZE = 10_000
+HISTORY_DAYS = 400
+
+
+def read_rss_bytes(pid):
+    """Resident set size of the backend process, or None when unavailable"""
+    if not pid:
+        return None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler:
+    """Polls the server RSS in a background thread and keeps the peak"""
+
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = read_rss_bytes(self.pid)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if self.pid:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+class EntryGenerator:
+    """Builds TimeEntry documents with realistic user/project/day distributions"""
+
+    def __init__(self, organization_id, focus_user_id, project_ids, user_count, seed):
+        self.rng = random.Random(seed)
+        self.organization_id = organization_id
+        self.project_ids = project_ids
+        # The benchmark user is always part of the team so per-user endpoints
+        # (dashboard, productivity) see a realistic share of the data
+        self.user_ids = [focus_user_id] + [str(uuid.uuid4()) for _ in range(user_count - 1)]
+        # Zipf-like activity: a few heavy trackers, a long tail of light ones
+        weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(self.user_ids))]
+        self.cum_weights = list(accumulate(weights))
+        # Each user mostly works on a handful of projects
+        self.user_projects = {
+            user_id: self.rng.sample(project_ids, k=min(len(project_ids), self.rng.randint(1, 4)))
+            for user_id in self.user_ids
+        }
+        self.now = datetime.utcnow()
+
+    def _start_time(self):
+        while True:
+            day = self.now - timedelta(days=self.rng.expovariate(1 / 120.0))
+            if (self.now - day).days >= HISTORY_DAYS:
+                continue
+            # Weekends are much quieter than weekdays
+            if day.weekday() >= 5 and self.rng.random() > 0.15:
+                continue
+            hour = min(max(int(self.rng.gauss(13, 2.5)), 0), 23)
+            return day.replace(
+                hour=hour,
+                minute=self.rng.randint(0, 59),
+                second=self.rng.randint(0, 59),
+                microsecond=0,
+            )
+
+    def entry(self):
+        user_id = self.rng.choices(self.user_ids, cum_weights=self.cum_weights)[0]
+        start = self._start_time()
+        duration = int(min(max(self.rng.lognormvariate(math.log(2700), 0.7), 60), 8 * 3600))
+        end = start + timedelta(seconds=duration)
+        if end >= self.now:
+            start = self.now - timedelta(seconds=duration + 60)
+            end = start + timedelta(seconds=duration)
+        hourly_rate = self.rng.choice([0, 25, 40, 60])
+        billable = self.rng.random() < 0.8
+        return {
+            "id": str(uuid.uuid4()),
+            "organizationId": self.organization_id,
+            "user_id": user_id,
+            "project_id": self.rng.choice(self.user_projects[user_id]),
+            "task_id": None,
+            "description": "Benchmark entry",
+            "start_time": start,
+            "end_time": end,
+            "duration": duration,
+            "billable": billable,
+            "hourly_rate": hourly_rate,
+            "total_amount": duration / 3600 * hourly_rate if billable else 0,
+            "currency": "USD",
+            "is_manual": self.rng.random() < 0.1,
+            "is_approved": False,
+            "approved_by": None,
+            "approved_at": None,
+            "activity_level": min(max(int(self.rng.gauss(62, 15)), 0), 100),
+            "screenshots": [],
+            "notes": "",
+            "tags": [],
+            "breaks": [],
+            "createdAt": end,
+            "updatedAt": end,
+            "__v": 0,
+        }
+
+
+class AnalyticsBenchmark:
+    def __init__(self, api_url, mongo_url, db_name, server_pid, repeats, users, projects, seed):
+        self.api_url = api_url
+        self.server_pid = server_pid
+        self.repeats = repeats
+        self.user_count = users
+        self.project_count = projects
+        self.seed = seed
+        self.session = requests.Session()
+        self.mongo = MongoClient(mongo_url)
+        self.db = self.mongo[db_name] if db_name else self.mongo.get_default_database()
+        self.entries = self.db["timeentries"]
+        self.rollups = self.db["timerollups"]
+        self.token = None
+        self.organization_id = None
+        self.generator = None
+        self.seeded = 0
+        self.results = []
+        self.export_mismatches = 0
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def setup_organization(self):
+        """Register a benchmark admin and create the projects entries point at"""
+        print("\n🔧 Registering benchmark organization...")
+        response = self.session.post(
+            f"{self.api_url}/auth/register",
+            json={
+                "name": "Benchmark Admin",
+                "email": f"bench_admin_{uuid.uuid4()}@example.com",
+                "password": "Benchmark@123456",
+                "organizationName": f"Analytics Benchmark {uuid.uuid4().hex[:8]}",
+            },
+        )
+        if response.status_code != 201:
+            raise Exception(f"Failed to register admin: {response.text}")
+        data = response.json()
+        self.token = data["token"]
+        self.organization_id = data["user"]["organizationId"]
+        user_id = data["user"]["id"]
+
+        project_ids = []
+        for index in range(self.project_count):
+            response = self.session.post(
+                f"{self.api_url}/projects/",
+                json={
+                    "name": f"Benchmark Project {index}",
+                    "client": "Benchmark Client",
+                    "startDate": (datetime.utcnow() - timedelta(days=HISTORY_DAYS)).isoformat(),
+                },
+                headers=self.headers(),
+            )
+            if response.status_code != 201:
+                raise Exception(f"Failed to create project: {response.text}")
+            project_ids.append(response.json()["project"]["id"])
+
+        self.generator = EntryGenerator(
+            self.organization_id, user_id, project_ids, self.user_count, self.seed
+        )
+        print(f"✅ Organization {self.organization_id} with {len(project_ids)} projects")
+
+    def seed_to(self, size):
+        """Insert entries until the organization holds `size` documents"""
+        started = time.perf_counter()
+        while self.seeded < size:
+            batch = min(SEED_BATCH_SIZE, size - self.seeded)
+            documents = [self.generator.entry() for _ in range(batch)]
+            self.entries.insert_many(documents, ordered=False)
+            self.rollup(documents)
+            self.seeded += batch
+            print(f"\r   Seeded {self.seeded:,}/{size:,} entries", end="", flush=True)
+        print(f"\n✅ Seeding finished in {time.perf_counter() - started:.1f}s")
+
+    def rollup(self, documents):
+        """Apply seeded entries to TimeRollup the way services/timeRollup.js does"""
+        buckets = defaultdict(lambda: [0, 0, 0, 0.0])
+        for doc in documents:
+            hour = doc["start_time"].replace(minute=0, second=0, microsecond=0)
+            totals = buckets[(doc["user_id"], doc["project_id"], hour)]
+            totals[0] += doc["duration"]
+            totals[1] += 1
+            totals[2] += doc["activity_level"]
+            totals[3] += doc["total_amount"] if doc["billable"] else 0
+
+        now = datetime.utcnow()
+        self.rollups.bulk_write(
+            [
+                UpdateOne(
+                    {
+                        "organizationId": self.organization_id,
+                        "user_id": user_id,
+                        "project_id": project_id,
+                        "hour": hour,
+                    },
+                    {
+                        "$inc": {
+                            "duration": duration,
+                            "entries": entries,
+                            "activity_sum": activity,
+                            "billable_amount": amount,
+                        },
+                        "$set": {"updatedAt": now},
+                        "$setOnInsert": {"day": hour.strftime("%Y-%m-%d")},
+                    },
+                    upsert=True,
+                )
+                for (user_id, project_id, hour), (duration, entries, activity, amount) in buckets.items()
+            ],
+            ordered=False,
+        )
+
+    def request(self, endpoint, period):
+        if endpoint == "reports/custom":
+            start, end = self.report_window(period)
+            return self.session.post(
+                f"{self.api_url}/analytics/reports/custom",
+                json={
+                    "start_date": start,
+                    "end_date": end,
+                    "metrics": ["hours", "activity", "projects"],
+                },
+                headers=self.headers(),
+            )
+        return self.session.get(
+            f"{self.api_url}/analytics/{endpoint}",
+            params={"period": period},
+            headers=self.headers(),
+        )
+
+    def report_window(self, period):
+        end = datetime.utcnow()
+        return (end - timedelta(days=PERIOD_DAYS[period])).isoformat(), end.isoformat()
+
+    def measure_export(self, size, export_format, period, gzip):
+        """Stream one export, count its rows and compare with the report totals"""
+        start, end = self.report_window(period)
+        body = {"start_date": start, "end_date": end}
+        expected = self.session.post(
+            f"{self.api_url}/analytics/reports/custom",
+            json={**body, "metrics": ["hours"]},
+            headers=self.headers(),
+        ).json()
+
+        headers = {**self.headers(), "Accept-Encoding": "gzip" if gzip else "identity"}
+        rows = 0
+        duration = 0
+        first_byte = None
+        rss_before = read_rss_bytes(self.server_pid)
+        with RssSampler(self.server_pid) as sampler:
+            started = time.perf_counter()
+            with self.session.post(
+                f"{self.api_url}/analytics/reports/custom",
+                json={**body, "format": export_format},
+                headers=headers,
+                stream=True,
+            ) as response:
+                if response.status_code != 200:
+                    raise Exception(f"{export_format} export failed: {response.status_code} {response.text}")
+                lines = (line.decode("utf-8") for line in response.iter_lines() if line)
+                if export_format == "csv":
+                    records = csv.DictReader(lines)
+                else:
+                    records = (json.loads(line) for line in lines)
+                for record in records:
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    rows += 1
+                    duration += int(record["duration"] or 0)
+                wire_bytes = response.raw.tell()
+                encoding = response.headers.get("Content-Encoding", "identity")
+            elapsed = time.perf_counter() - started
+
+        verified = rows == expected["entry_count"] and math.isclose(
+            duration / 3600, expected["metrics"]["total_hours"], rel_tol=1e-9, abs_tol=1e-6
+        )
+        result = {
+            "size": size,
+            "endpoint": f"export.{export_format}",
+            "period": period,
+            "p50_ms": round(elapsed * 1000, 2),
+            "p95_ms": round(elapsed * 1000, 2),
+            "mean_ms": round(elapsed * 1000, 2),
+            "response_bytes": wire_bytes,
+            "rss_before_mb": round(rss_before / 2**20, 1) if rss_before else None,
+            "rss_peak_mb": round(sampler.peak / 2**20, 1) if sampler.peak else None,
+            "rows": rows,
+            "expected_rows": expected["entry_count"],
+            "rows_per_sec": round(rows / elapsed) if elapsed else None,
+            "first_row_ms": round(first_byte * 1000, 2) if first_byte is not None else None,
+            "content_encoding": encoding,
+            "verified": verified,
+        }
+        self.results.append(result)
+        print(
+            f"   {result['endpoint']:<16}{period:<7}{result['p50_ms']:>10.1f}{'':>10}"
+            f"{wire_bytes:>12,}{result['rss_peak_mb'] or '-':>10}"
+            f"  {rows:,} rows {'✅' if verified else '❌ expected ' + format(expected['entry_count'], ',')}"
+        )
+        return verified
+
+    def measure(self, size, endpoint, period):
+        latencies = []
+        response_bytes = 0
+        rss_before = read_rss_bytes(self.server_pid)
+        with RssSampler(self.server_pid) as sampler:
+            for _ in range(self.repeats):
+                started = time.perf_counter()
+                response = self.request(endpoint, period)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise Exception(
+                        f"{endpoint}?period={period} failed: {response.status_code} {response.text}"
+                    )
+                response_bytes = len(response.content)
+        latencies.sort()
+        result = {
+            "size": size,
+            "endpoint": endpoint,
+            "period": period,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "response_bytes": response_bytes,
+            "rss_before_mb": round(rss_before / 2**20, 1) if rss_before else None,
+            "rss_peak_mb": round(sampler.peak / 2**20, 1) if sampler.peak else None,
+        }
+        self.results.append(result)
+        print(
+            f"   {endpoint:<16}{period:<7}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+            f"{response_bytes:>12,}{result['rss_peak_mb'] or '-':>10}"
+        )
+
+    def run(self, sizes, endpoints, exports=(), gzip=True):
+        self.setup_organization()
+        mismatches = 0
+        for size in sorted(sizes):
+            print(f"\n📦 Dataset size: {size:,} entries")
+            self.seed_to(size)
+            print(f"   {'endpoint':<16}{'period':<7}{'p50 ms':>10}{'p95 ms':>10}{'bytes':>12}{'rss MB':>10}")
+            for endpoint in endpoints:
+                for period in PERIODS:
+                    self.measure(size, endpoint, period)
+            for export_format in exports:
+                for period in PERIODS:
+                    if not self.measure_export(size, export_format, period, gzip):
+                        mismatches += 1
+        if mismatches:
+            print(f"\n❌ {mismatches} export(s) did not match the report totals")
+        self.export_mismatches = mismatches
+        return self.results
+
+    def cleanup(self):
+        if self.organization_id:
+            print("\n🧹 Removing seeded entries...")
+            self.entries.delete_many({"organizationId": self.organization_id})
+            self.rollups.delete_many({"organizationId": self.organization_id})
+
+
+def write_results(results, path):
+    if path.endswith(".csv"):
+        fieldnames = list(dict.fromkeys(key for result in results for key in result))
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+    print(f"💾 Scaling curves written to {path}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analytics endpoint scaling benchmark")
+    parser.add_argument("--api-url", help="Backend URL (defaults to BACKEND_URL or frontend .env)")
+    parser.add_argument(
+        "--mongo-url",
+        default=os.environ.get("MONGO_URL", "mongodb://localhost:27017/hubstaff_clone"),
+        help="MongoDB the backend is connected to",
+    )
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME"), help="Database name override")
+    parser.add_argument("--server-pid", type=int, help="Backend process id for RSS sampling")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma-separated dataset sizes",
+    )
+    parser.add_argument(
+        "--endpoints",
+        default="dashboard,team,productivity,reports/custom",
+        help="Comma-separated analytics endpoints",
+    )
+    parser.add_argument(
+        "--exports",
+        default="csv,ndjson",
+        help="Comma-separated streaming export formats to verify (empty to skip)",
+    )
+    parser.add_argument(
+        "--no-gzip", action="store_true", help="Request exports uncompressed"
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="Requests per endpoint and period")
+    parser.add_argument("--users", type=int, default=200, help="Distinct users in the seeded org")
+    parser.add_argument("--projects", type=int, default=20, help="Projects in the seeded org")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible data")
+    parser.add_argument("--output", default="analytics_scaling.json", help="JSON or CSV output path")
+    parser.add_argument("--keep-data", action="store_true", help="Keep seeded entries afterwards")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    api_url = resolve_api_url(args.api_url)
+    print(f"Benchmarking Analytics API at: {api_url}")
+    if not args.server_pid:
+        print("ℹ️ No --server-pid given, server RSS will not be recorded")
+
+    benchmark = AnalyticsBenchmark(
+        api_url,
+        args.mongo_url,
+        args.db_name,
+        args.server_pid,
+        repeats=args.repeats,
+        users=args.users,
+        projects=args.projects,
+        seed=args.seed,
+    )
+    try:
+        results = benchmark.run(
+            [int(size) for size in args.sizes.split(",")],
+            [endpoint.strip() for endpoint in args.endpoints.split(",")],
+            [fmt.strip() for fmt in args.exports.split(",") if fmt.strip()],
+            gzip=not args.no_gzip,
+        )
+        write_results(results, args.output)
+    finally:
+        if not args.keep_data:
+            benchmark.cleanup()
+    if benchmark.export_mismatches:
+        sys.exit(1)
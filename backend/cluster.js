@@ -0,0 +1,390 @@
+// backend/cluster.js - Run the API on every CPU core
+// The primary owns PORT and passes each accepted connection to a worker
+// running server.js. Connections that belong to an existing Socket.IO
+// session (the sid in the request line) go back to the worker holding it;
+// everything else is spread round-robin over ready workers. SIGHUP replaces
+// the workers one at a time, waiting for each replacement to be ready before
+// the old worker drains, so the port never stops accepting connections.
+//
+//   CLUSTER_WORKERS=8 node cluster.js      start
+//   kill -HUP <primary pid>                zero-downtime reload
+
+require("dotenv").config();
+
+const cluster = require("cluster");
+const net = require("net");
+const os = require("os");
+const path = require("path");
+const winston = require("winston");
+
+const logger = winston.createLogger({
+  level: "info",
+  format: winston.format.combine(
+    winston.format.colorize(),
+    winston.format.simple()
+  ),
+  transports: [new winston.transports.Console()],
+});
+
+const PORT = process.env.PORT || 8001;
+const WORKERS =
+  parseInt(process.env.CLUSTER_WORKERS) ||
+  (os.availableParallelism ? os.availableParallelism() : os.cpus().length);
+const READY_TIMEOUT_MS = parseInt(process.env.CLUSTER_READY_TIMEOUT_MS) || 60 * 1000;
+// Workers drain for SHUTDOWN_TIMEOUT_MS themselves; this is the hard stop
+const KILL_TIMEOUT_MS = (parseInt(process.env.SHUTDOWN_TIMEOUT_MS) || 30 * 1000) + 5000;
+const REQUEST_TIMEOUT_MS = 5000;
+const ROUTE_TIMEOUT_MS = 10 * 1000;
+const MAX_RESPAWN_DELAY_MS = 30 * 1000;
+// A worker that stayed up this long resets its slot's respawn backoff
+const STABLE_UPTIME_MS = 60 * 1000;
+
+const SID_PATTERN = /[?&]sid=([\w-]+)/;
+const UNAVAILABLE =
+  "HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\nContent-Length: 0\r\n\r\n";
+
+const slots = []; // index -> { worker, respawnDelayMs, restarts }
+const states = new Map(); // worker id -> per-worker state
+const sessions = new Map(); // engine.io sid -> worker id
+const requests = new Map(); // bus request id -> fan-out state
+let nextWorker = 0;
+let restarting = false;
+let shuttingDown = false;
+const startedAt = Date.now();
+
+cluster.setupPrimary({
+  exec: path.join(__dirname, "server.js"),
+  // Socket.IO adapter packets may carry binary attachments
+  serialization: "advanced",
+});
+
+// ---- Worker lifecycle ----------------------------------------------------
+
+const fork = (index) => {
+  const worker = cluster.fork({ CLUSTER_WORKER_INDEX: String(index) });
+  let markReady;
+  const state = {
+    worker,
+    index,
+    ready: false,
+    draining: false,
+    forkedAt: Date.now(),
+    connections: 0,
+    health: null,
+    healthAt: null,
+  };
+  state.readyPromise = new Promise((resolve) => {
+    markReady = resolve;
+  });
+  state.markReady = markReady;
+  states.set(worker.id, state);
+
+  worker.on("message", (message) => onWorkerMessage(state, message));
+  worker.on("exit", (code, signal) => onWorkerExit(state, code, signal));
+  return state;
+};
+
+const waitReady = (state, timeoutMs) =>
+  new Promise((resolve, reject) => {
+    const timer = setTimeout(
+      () => reject(new Error(`worker ${state.worker.id} was not ready after ${timeoutMs}ms`)),
+      timeoutMs
+    );
+    state.readyPromise.then(() => {
+      clearTimeout(timer);
+      resolve(state);
+    });
+    state.worker.once("exit", () => {
+      clearTimeout(timer);
+      reject(new Error(`worker ${state.worker.id} exited before becoming ready`));
+    });
+  });
+
+const waitExit = (state) =>
+  new Promise((resolve) => {
+    if (state.worker.isDead()) return resolve();
+    state.worker.once("exit", resolve);
+  });
+
+// Take a worker out of rotation and let it finish what it is serving
+const retire = (state) => {
+  if (state.draining) return waitExit(state);
+  state.draining = true;
+  if (state.worker.isConnected()) {
+    state.worker.send({ type: "shutdown" });
+  }
+  const killTimer = setTimeout(() => {
+    logger.warn(`Worker ${state.worker.id} did not exit in time, killing it`);
+    state.worker.process.kill("SIGKILL");
+  }, KILL_TIMEOUT_MS);
+  return waitExit(state).then(() => clearTimeout(killTimer));
+};
+
+const onWorkerExit = (state, code, signal) => {
+  states.delete(state.worker.id);
+  for (const [sid, workerId] of sessions) {
+    if (workerId === state.worker.id) sessions.delete(sid);
+  }
+  for (const [id, request] of requests) {
+    if (request.waiting.delete(state.worker.id)) settleIfDone(id);
+  }
+
+  const slot = slots[state.index];
+  const current = slot && slot.worker === state;
+  if (state.draining || shuttingDown || !current) {
+    logger.info(`Worker ${state.worker.id} (slot ${state.index}) exited`);
+    return;
+  }
+
+  // Crashed: respawn with exponential backoff so a boot loop can't spin
+  if (Date.now() - state.forkedAt > STABLE_UPTIME_MS) {
+    slot.respawnDelayMs = 1000;
+  }
+  logger.error(
+    `Worker ${state.worker.id} (slot ${state.index}) died (${signal || code}), ` +
+      `restarting in ${slot.respawnDelayMs}ms`
+  );
+  setTimeout(() => {
+    if (shuttingDown || slot.worker !== state) return;
+    slot.restarts++;
+    slot.worker = fork(state.index);
+  }, slot.respawnDelayMs);
+  slot.respawnDelayMs = Math.min(slot.respawnDelayMs * 2, MAX_RESPAWN_DELAY_MS);
+};
+
+// Replace every worker, one slot at a time
+const rollingRestart = async () => {
+  if (restarting || shuttingDown) return;
+  restarting = true;
+  logger.info(`Rolling restart of ${slots.length} workers`);
+
+  try {
+    for (const slot of slots) {
+      const previous = slot.worker;
+      const replacement = fork(previous.index);
+      slot.worker = replacement;
+      try {
+        await waitReady(replacement, READY_TIMEOUT_MS);
+      } catch (error) {
+        // Keep serving with the old code rather than losing capacity
+        logger.error(`Rolling restart aborted: ${error.message}`);
+        slot.worker = previous;
+        replacement.draining = true;
+        replacement.worker.process.kill("SIGKILL");
+        return;
+      }
+      await retire(previous);
+      slot.restarts++;
+    }
+    logger.info("Rolling restart complete");
+  } finally {
+    restarting = false;
+  }
+};
+
+// ---- Worker messages -----------------------------------------------------
+
+const sendTo = (state, message) => {
+  if (state.worker.isConnected()) {
+    state.worker.send(message, undefined, {}, () => {});
+  }
+};
+
+// Answered by the primary itself instead of the workers
+const primaryResponders = {
+  "cluster:health": () => health(),
+};
+
+const settleIfDone = (id) => {
+  const request = requests.get(id);
+  if (request && request.waiting.size === 0) finishRequest(id);
+};
+
+// Gather requests answer with every reply so far, others with null
+const finishRequest = (id, result) => {
+  const request = requests.get(id);
+  if (!request) return;
+  requests.delete(id);
+  clearTimeout(request.timer);
+  const requester = states.get(request.requesterId);
+  if (requester) {
+    sendTo(requester, {
+      type: "bus:response",
+      id,
+      result: result ?? (request.gather ? request.results : null),
+    });
+  }
+};
+
+const fanOutRequest = (from, message) => {
+  const responder = primaryResponders[message.channel];
+  if (responder) {
+    sendTo(from, { type: "bus:response", id: message.id, result: responder(message.payload) });
+    return;
+  }
+
+  const peers = [...states.values()].filter((state) => state !== from && state.ready);
+  const timer = setTimeout(() => finishRequest(message.id), REQUEST_TIMEOUT_MS);
+  timer.unref();
+  requests.set(message.id, {
+    requesterId: from.worker.id,
+    waiting: new Set(peers.map((state) => state.worker.id)),
+    gather: Boolean(message.gather),
+    results: [],
+    timer,
+  });
+  for (const peer of peers) sendTo(peer, message);
+  settleIfDone(message.id);
+};
+
+const onWorkerMessage = (state, message) => {
+  if (!message || typeof message.type !== "string") return;
+
+  switch (message.type) {
+    case "ready":
+      state.ready = true;
+      state.markReady();
+      break;
+    case "health":
+      state.health = message.health;
+      state.healthAt = Date.now();
+      break;
+    case "sticky:register":
+      sessions.set(message.sid, state.worker.id);
+      break;
+    case "sticky:unregister":
+      if (sessions.get(message.sid) === state.worker.id) sessions.delete(message.sid);
+      break;
+    case "bus:publish":
+      for (const peer of states.values()) {
+        if (peer !== state) sendTo(peer, message);
+      }
+      break;
+    case "bus:request":
+      fanOutRequest(state, message);
+      break;
+    case "bus:reply": {
+      const request = requests.get(message.id);
+      if (!request) break;
+      request.waiting.delete(state.worker.id);
+      const answered = message.result !== null && message.result !== undefined;
+      if (answered && request.gather) {
+        request.results.push(message.result);
+        settleIfDone(message.id);
+      } else if (answered) {
+        finishRequest(message.id, message.result);
+      } else {
+        settleIfDone(message.id);
+      }
+      break;
+    }
+    default:
+      break;
+  }
+};
+
+// ---- Connection routing --------------------------------------------------
+
+const pickWorker = (sid) => {
+  if (sid) {
+    const owner = states.get(sessions.get(sid));
+    if (owner && owner.worker.isConnected()) return owner;
+  }
+
+  const available = [...states.values()].filter((state) => state.ready && !state.draining);
+  if (available.length === 0) return null;
+  nextWorker = (nextWorker + 1) % available.length;
+  return available[nextWorker];
+};
+
+const route = (socket, chunk) => {
+  socket.pause();
+  socket.setTimeout(0);
+  const requestLine = chunk.toString("latin1", 0, Math.min(chunk.length, 2048)).split("\r\n", 1)[0];
+  const match = SID_PATTERN.exec(requestLine);
+  const target = pickWorker(match && match[1]);
+
+  if (!target) {
+    socket.end(UNAVAILABLE);
+    return;
+  }
+
+  target.connections++;
+  target.worker.send(
+    { type: "sticky:connection", data: chunk.toString("base64") },
+    socket,
+    { keepOpen: false },
+    (error) => {
+      if (error) socket.destroy();
+    }
+  );
+};
+
+const balancer = net.createServer((socket) => {
+  // Connections that never send a request line are not worth a worker
+  socket.setTimeout(ROUTE_TIMEOUT_MS, () => socket.destroy());
+  socket.once("data", (chunk) => route(socket, chunk));
+  socket.on("error", () => socket.destroy());
+});
+
+// ---- Health --------------------------------------------------------------
+
+const health = () => ({
+  primary: {
+    pid: process.pid,
+    uptime: Math.round((Date.now() - startedAt) / 1000),
+    workers_configured: WORKERS,
+    rolling_restart: restarting,
+    sessions: sessions.size,
+    restarts: slots.reduce((total, slot) => total + slot.restarts, 0),
+  },
+  workers: [...states.values()]
+    .sort((a, b) => a.index - b.index || a.forkedAt - b.forkedAt)
+    .map((state) => ({
+      id: state.worker.id,
+      index: state.index,
+      pid: state.worker.process.pid,
+      state: state.draining ? "draining" : state.ready ? "ready" : "starting",
+      connections_routed: state.connections,
+      health_age_ms: state.healthAt ? Date.now() - state.healthAt : null,
+      health: state.health,
+    })),
+});
+
+// ---- Startup and shutdown ------------------------------------------------
+
+const shutdown = async (signal) => {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  logger.info(`${signal} received, stopping ${states.size} workers`);
+  balancer.close();
+  await Promise.all([...states.values()].map(retire));
+  logger.info("All workers stopped");
+  process.exit(0);
+};
+
+const start = async () => {
+  logger.info(`Cluster primary ${process.pid} starting ${WORKERS} workers`);
+  for (let index = 0; index < WORKERS; index++) {
+    slots.push({ worker: fork(index), respawnDelayMs: 1000, restarts: 0 });
+  }
+
+  // Listen as soon as one worker can serve; the rest join the rotation when ready
+  try {
+    await Promise.any(slots.map((slot) => waitReady(slot.worker, READY_TIMEOUT_MS)));
+  } catch (error) {
+    logger.error("No worker became ready, exiting");
+    await Promise.all([...states.values()].map(retire));
+    process.exit(1);
+  }
+
+  balancer.listen(PORT, "0.0.0.0", () => {
+    logger.info(`Cluster listening on port ${PORT} (send SIGHUP to ${process.pid} to reload)`);
+  });
+};
+
+process.on("SIGHUP", () => rollingRestart());
+process.on("SIGTERM", () => shutdown("SIGTERM"));
+process.on("SIGINT", () => shutdown("SIGINT"));
+
+start();
@@ -2,6 +2,43 @@
 const jwt = require("jsonwebtoken");
 const User = require("../models/User");
 const Organization = require("../models/Organization");
+const principalCache = require("../services/principalCache");
+const { logger } = require("../services/logger");
+
+// Cached copies are hydrated into fresh documents so requests never share
+// (or mutate) the same instance
+const resolveUser = async (userId, organizationId) => {
+  const cached = principalCache.getUser(organizationId, userId);
+  if (cached) {
+    return User.hydrate(cached);
+  }
+
+  const user = await User.findOne({
+    id: userId,
+    organizationId, // Ensure user belongs to token's organization
+    isActive: true,
+  });
+  if (user) {
+    principalCache.setUser(organizationId, userId, user.toObject());
+  }
+  return user;
+};
+
+const resolveOrganization = async (organizationId) => {
+  const cached = principalCache.getOrganization(organizationId);
+  if (cached) {
+    return Organization.hydrate(cached);
+  }
+
+  const organization = await Organization.findOne({
+    id: organizationId,
+    isActive: true,
+  });
+  if (organization) {
+    principalCache.setOrganization(organizationId, organization.toObject());
+  }
+  return organization;
+};
 
 // FIXED: Enhanced authentication middleware with organization validation
 const authMiddleware = async (req, res, next) => {
@@ -42,12 +79,12 @@ const authMiddleware = async (req, res, next) => {
         });
       }
 
-      // FIXED: Find user with organization validation
-      const user = await User.findOne({
-        id: decoded.id,
-        organizationId: decoded.organizationId, // Ensure user belongs to token's organization
-        isActive: true,
-      });
+      // FIXED: Find user with organization validation and verify the
+      // organization is still active (served from the principal cache when warm)
+      const [user, organization] = await Promise.all([
+        resolveUser(decoded.id, decoded.organizationId),
+        resolveOrganization(decoded.organizationId),
+      ]);
 
       if (!user) {
         return res.status(401).json({
@@ -55,12 +92,6 @@ const authMiddleware = async (req, res, next) => {
         });
       }
 
-      // FIXED: Verify organization is still active
-      const organization = await Organization.findOne({
-        id: decoded.organizationId,
-        isActive: true,
-      });
-
       if (!organization) {
         return res.status(401).json({
           error: "Organization is inactive or not found",
@@ -77,10 +108,6 @@ const authMiddleware = async (req, res, next) => {
       // Add user and organization to request object
       req.user = user;
       req.organization = organization;
-
-      console.log(
-        `Auth success: ${user.email} (${user.role}) in org ${organization.name}`
-      );
       next();
     } catch (jwtError) {
       console.error("JWT verification error:", jwtError.name, jwtError.message);
@@ -101,6 +128,29 @@ const authMiddleware = async (req, res, next) => {
   }
 };
 
+// The active user a JWT belongs to, or null; for Socket.IO handshakes,
+// which cannot go through authMiddleware
+const authenticateToken = async (token) => {
+  if (!token || !process.env.JWT_SECRET) return null;
+
+  let decoded;
+  try {
+    decoded = jwt.verify(token, process.env.JWT_SECRET);
+  } catch (jwtError) {
+    return null;
+  }
+  if (!decoded.organizationId) return null;
+
+  const [user, organization] = await Promise.all([
+    resolveUser(decoded.id, decoded.organizationId),
+    resolveOrganization(decoded.organizationId),
+  ]);
+  if (!user || !organization || user.organizationId !== decoded.organizationId) {
+    return null;
+  }
+  return user;
+};
+
 // FIXED: Enhanced role-based access control with organization context
 const requireRole = (roles) => {
   return (req, res, next) => {
@@ -332,7 +382,7 @@ const logOrganizationActivity = (action) => {
 
     res.send = function (data) {
       // Log organization activity
-      console.log(
+      logger.debug(
         `[ORG:${req.user?.organizationId}] ${action} by ${req.user?.email} - ${res.statusCode}`
       );
 
@@ -398,6 +448,7 @@ const requireValidInvitation = async (req, res, next) => {
 module.exports = {
   // Core authentication
   authMiddleware,
+  authenticateToken,
   requireRole,
   requireAdmin,
   requireManager,
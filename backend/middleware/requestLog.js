@@ -0,0 +1,230 @@
+// backend/middleware/requestLog.js - Sampled, buffered structured request log
+// One JSON line per logged request. Lines collect in memory and are written
+// to LOG_REQUEST_FILE asynchronously once the buffer fills or the flush
+// interval passes, so requests never wait on the disk; a stalled disk drops
+// lines (counted in stats) instead of growing the heap. Each route has a
+// sample rate (LOG_SAMPLE_RATES); server errors and slow requests are always
+// kept, and every line records the rate it was sampled at.
+
+const fs = require("fs");
+const clusterBus = require("../services/clusterBus");
+const clusterWorker = require("../services/clusterWorker");
+
+const options = {
+  file: process.env.LOG_REQUEST_FILE || "requests.log",
+  bufferBytes: parseInt(process.env.LOG_BUFFER_BYTES) || 64 * 1024,
+  maxBufferBytes: parseInt(process.env.LOG_BUFFER_MAX_BYTES) || 8 * 1024 * 1024,
+  flushIntervalMs: parseInt(process.env.LOG_FLUSH_INTERVAL_MS) || 1000,
+  slowMs: parseInt(process.env.LOG_SLOW_MS) || 1000,
+};
+const DEFAULT_SAMPLE_RATES = "GET /api/health*=0,*=1";
+const RATES_CHANNEL = "request-log:sample-rates";
+
+// Appends lines through a write stream, one batch at a time
+class BufferedWriter {
+  constructor({ file, bufferBytes, maxBufferBytes, flushIntervalMs }) {
+    this.file = file;
+    this.bufferBytes = bufferBytes;
+    this.maxBufferBytes = maxBufferBytes;
+    this.stream =
+      file === "-" ? process.stdout : fs.createWriteStream(file, { flags: "a" });
+    this.chunks = [];
+    this.bytes = 0;
+    this.blocked = false;
+    this.lines = 0;
+    this.dropped = 0;
+    this.flushes = 0;
+    this.errors = 0;
+
+    this.stream.on("error", (error) => {
+      this.errors++;
+      console.warn(`Request log write to ${file} failed:`, error.message);
+    });
+    this.timer = setInterval(() => this.flush(), flushIntervalMs);
+    this.timer.unref();
+  }
+
+  write(line) {
+    if (this.bytes + line.length > this.maxBufferBytes) {
+      this.dropped++;
+      return;
+    }
+    this.chunks.push(line);
+    this.bytes += line.length;
+    this.lines++;
+    if (this.bytes >= this.bufferBytes) this.flush();
+  }
+
+  // Hand the buffer to the stream unless it is still draining the last batch
+  flush() {
+    if (this.blocked || this.chunks.length === 0) return;
+    const data = this.chunks.join("");
+    this.chunks = [];
+    this.bytes = 0;
+    this.flushes++;
+
+    if (!this.stream.write(data)) {
+      this.blocked = true;
+      this.stream.once("drain", () => {
+        this.blocked = false;
+        if (this.bytes >= this.bufferBytes) this.flush();
+      });
+    }
+  }
+
+  // Last-chance synchronous write when the process exits without close()
+  flushSync() {
+    if (this.chunks.length === 0) return;
+    const data = this.chunks.join("");
+    this.chunks = [];
+    this.bytes = 0;
+    try {
+      if (this.file === "-") fs.writeSync(1, data);
+      else fs.appendFileSync(this.file, data);
+    } catch (error) {
+      this.errors++;
+    }
+  }
+
+  close() {
+    clearInterval(this.timer);
+    this.blocked = false;
+    this.flush();
+    if (this.stream === process.stdout) return Promise.resolve();
+    return new Promise((resolve) => this.stream.end(resolve));
+  }
+
+  stats() {
+    return {
+      file: this.file,
+      lines: this.lines,
+      dropped: this.dropped,
+      buffered_bytes: this.bytes,
+      flushes: this.flushes,
+      write_errors: this.errors,
+    };
+  }
+}
+
+// "GET /api/time-tracking/active=0.05,GET /api/health*=0,*=1": the first rule
+// whose method and path (a trailing * matches any suffix) match wins
+const parseSampleRates = (spec) =>
+  spec
+    .split(",")
+    .map((rule) => rule.trim())
+    .filter(Boolean)
+    .map((rule) => {
+      const separator = rule.lastIndexOf("=");
+      const rate = Number(rule.slice(separator + 1));
+      const target = rule.slice(0, separator).trim();
+      if (separator < 1 || !(rate >= 0 && rate <= 1)) {
+        const error = new Error(`Invalid sample rate rule "${rule}"`);
+        error.status = 400;
+        throw error;
+      }
+      const [method, path = method] = target.includes(" ") ? target.split(/\s+/) : ["*", target];
+      const prefix = path.endsWith("*");
+      return {
+        method: method.toUpperCase(),
+        path: prefix ? path.slice(0, -1) : path,
+        prefix,
+        rate,
+      };
+    });
+
+let sampleSpec = process.env.LOG_SAMPLE_RATES || DEFAULT_SAMPLE_RATES;
+let rules = parseSampleRates(sampleSpec);
+const routeRates = new Map(); // route key -> rate, only for matched routes
+let sampledOut = 0;
+
+const rateFor = (method, route) => {
+  const key = `${method} ${route}`;
+  const known = routeRates.get(key);
+  if (known !== undefined) return known;
+
+  const rule = rules.find(
+    (candidate) =>
+      (candidate.method === "*" || candidate.method === method) &&
+      (candidate.prefix ? route.startsWith(candidate.path) : route === candidate.path)
+  );
+  return rule ? rule.rate : 1;
+};
+
+const applySampleRates = (spec) => {
+  rules = parseSampleRates(spec);
+  sampleSpec = spec;
+  routeRates.clear();
+};
+
+clusterBus.subscribe(RATES_CHANNEL, applySampleRates);
+
+// Throws a 400-style error for malformed rules
+const setSampleRates = (spec) => {
+  applySampleRates(spec);
+  clusterBus.publish(RATES_CHANNEL, spec);
+};
+
+const writer = new BufferedWriter(options);
+process.on("exit", () => writer.flushSync());
+
+const requestLog = (req, res, next) => {
+  const started = process.hrtime.bigint();
+  let logged = false;
+
+  const log = () => {
+    if (logged) return;
+    logged = true;
+
+    // Templated route ("/stop/:entryId") so rates and analysis group by endpoint
+    const route = req.route
+      ? `${req.baseUrl}${req.route.path}`
+      : req.originalUrl.split("?")[0];
+    const durationMs = Number(process.hrtime.bigint() - started) / 1e6;
+    const status = res.writableFinished ? res.statusCode : 499;
+    const rate = rateFor(req.method, route);
+    if (req.route) routeRates.set(`${req.method} ${route}`, rate);
+
+    const keep = status >= 500 || durationMs >= options.slowMs || Math.random() < rate;
+    if (!keep) {
+      sampledOut++;
+      return;
+    }
+
+    writer.write(
+      `${JSON.stringify({
+        time: new Date().toISOString(),
+        level: status >= 500 ? "error" : status >= 400 ? "warn" : "info",
+        method: req.method,
+        route,
+        status,
+        duration_ms: Math.round(durationMs * 100) / 100,
+        bytes: Number(res.getHeader("content-length")) || null,
+        user_id: req.user?.id ?? null,
+        organization_id: req.user?.organizationId ?? null,
+        ip: req.ip,
+        worker: clusterWorker.index,
+        sample_rate: rate,
+      })}\n`
+    );
+  };
+
+  res.once("finish", log);
+  res.once("close", log);
+  next();
+};
+
+const stats = () => ({
+  sample_rates: sampleSpec,
+  slow_ms: options.slowMs,
+  sampled_out: sampledOut,
+  ...writer.stats(),
+});
+
+module.exports = {
+  requestLog,
+  parseSampleRates,
+  setSampleRates,
+  sampleRates: () => sampleSpec,
+  close: () => writer.close(),
+  stats,
+};
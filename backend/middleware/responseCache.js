@@ -0,0 +1,126 @@
+// backend/middleware/responseCache.js - Versioned cache for read-heavy JSON endpoints
+// Responses are cached by (organization, data version, user when the payload is
+// per-user, path, query) with their identity and gzip bodies. Both bodies share
+// one weak ETag: they are the same JSON in two encodings, and a strong
+// validator must not match two representations.
+// If-None-Match revalidation answers 304, and a repeat load is served straight
+// from memory. Writes bump the organization's version via bumpOnWrite.
+const crypto = require("crypto");
+const zlib = require("zlib");
+const { LRUCache } = require("../services/principalCache");
+const dataVersion = require("../services/dataVersion");
+
+const enabled = process.env.RESPONSE_CACHE_DISABLED !== "true";
+// The TTL bounds staleness for windows that move with the clock ("last 7 days")
+const cache = new LRUCache({
+  ttlMs: parseInt(process.env.RESPONSE_CACHE_TTL_MS) || 60 * 1000,
+  maxEntries: parseInt(process.env.RESPONSE_CACHE_MAX_ENTRIES) || 5000,
+});
+let notModified = 0;
+
+const SAFE_METHODS = new Set(["GET", "HEAD", "OPTIONS"]);
+
+const canonicalQuery = (query) =>
+  Object.keys(query)
+    .sort()
+    .map((key) => `${key}=${JSON.stringify(query[key])}`)
+    .join("&");
+
+// Weak comparison, as If-None-Match requires
+const opaque = (tag) => tag.trim().replace(/^W\//, "");
+
+const etagMatches = (header, etag) =>
+  Boolean(header) &&
+  (header.trim() === "*" ||
+    header.split(",").some((candidate) => opaque(candidate) === opaque(etag)));
+
+const send = (req, res, entry) => {
+  res.setHeader("ETag", entry.etag);
+  res.setHeader("Cache-Control", "private, no-cache");
+  res.vary("Accept-Encoding");
+
+  if (etagMatches(req.headers["if-none-match"], entry.etag)) {
+    notModified++;
+    return res.status(304).end();
+  }
+
+  res.setHeader("Content-Type", "application/json; charset=utf-8");
+  if (entry.gzip && req.acceptsEncodings("gzip") === "gzip") {
+    // Already encoded, so the compression middleware leaves it alone
+    res.setHeader("Content-Encoding", "gzip");
+    res.setHeader("Content-Length", entry.gzip.length);
+    return res.end(entry.gzip);
+  }
+  return res.send(entry.body);
+};
+
+// scope "user" for payloads that depend on req.user.id, "org" when every
+// caller that passes the route's access checks sees the same response
+const cacheResponse = ({ scope = "org" } = {}) => (req, res, next) => {
+  if (!enabled || req.method !== "GET" || !req.user) {
+    return next();
+  }
+
+  const organizationId = req.user.organizationId;
+  const key = [
+    organizationId,
+    dataVersion.get(organizationId),
+    scope === "user" ? req.user.id : "*",
+    req.baseUrl + req.path,
+    canonicalQuery(req.query),
+  ].join("|");
+
+  const entry = cache.get(key);
+  if (entry) {
+    return send(req, res, entry);
+  }
+
+  const json = res.json.bind(res);
+  res.json = (data) => {
+    if (res.statusCode !== 200) {
+      return json(data);
+    }
+
+    const body = Buffer.from(JSON.stringify(data));
+    const etag = `W/"${crypto.createHash("sha1").update(body).digest("base64url")}"`;
+    zlib.gzip(body, (error, gzip) => {
+      // A write that landed meanwhile bumped the version, so this key is
+      // already unreachable and caching it is harmless
+      if (!error) cache.set(key, { etag, body, gzip });
+    });
+    return send(req, res, { etag, body, gzip: null });
+  };
+  next();
+};
+
+// Bump the organization's version for successful writes, just before the
+// response goes out so a follow-up read never sees the old version
+const bumpOnWrite = (req, res, next) => {
+  if (SAFE_METHODS.has(req.method)) {
+    return next();
+  }
+
+  const writeHead = res.writeHead;
+  res.writeHead = function (...args) {
+    const status = typeof args[0] === "number" ? args[0] : res.statusCode;
+    if (status < 400 && req.user) {
+      dataVersion.bump(req.user.organizationId);
+    }
+    return writeHead.apply(this, args);
+  };
+  next();
+};
+
+const stats = () => ({
+  enabled,
+  ttlMs: cache.ttlMs,
+  notModified,
+  ...cache.stats(),
+  versions: dataVersion.stats(),
+});
+
+module.exports = {
+  cacheResponse,
+  bumpOnWrite,
+  stats,
+};
@@ -0,0 +1,42 @@
+// backend/migrations/001-time-entry-query-indexes.js - Indexes for analytics and /entries
+// From the index advisor run over the analytics and time-tracking routes:
+// - reports only read completed entries, so the organization + start_time
+//   index leaves running timers out (queries filter end_time by $type to use it)
+// - /entries filtered by project or task pages on its own index instead of
+//   walking every entry of the user
+// - organizationId + user_id is a prefix of the /entries paging index
+const { ensureIndex, dropIndexIfExists } = require("../services/migrations");
+
+const COMPLETED = { end_time: { $type: "date" } };
+
+module.exports = {
+  version: 1,
+  name: "time-entry-query-indexes",
+
+  async up(db, { log } = {}) {
+    const timeEntries = db.collection("timeentries");
+
+    // Same key as the new partial index, which older servers refuse to
+    // create next to it
+    await dropIndexIfExists(timeEntries, "organizationId_1_start_time_-1", { log });
+    await ensureIndex(
+      timeEntries,
+      { organizationId: 1, start_time: -1 },
+      { name: "organizationId_1_start_time_-1_completed", partialFilterExpression: COMPLETED },
+      { log }
+    );
+    await ensureIndex(
+      timeEntries,
+      { organizationId: 1, user_id: 1, project_id: 1, start_time: -1, id: -1 },
+      { name: "organizationId_1_user_id_1_project_id_1_start_time_-1_id_-1" },
+      { log }
+    );
+    await ensureIndex(
+      timeEntries,
+      { organizationId: 1, user_id: 1, task_id: 1, start_time: -1, id: -1 },
+      { name: "organizationId_1_user_id_1_task_id_1_start_time_-1_id_-1" },
+      { log }
+    );
+    await dropIndexIfExists(timeEntries, "organizationId_1_user_id_1", { log });
+  },
+};
@@ -0,0 +1,22 @@
+// backend/migrations/002-screenshot-references.js - Time entries reference screenshots by id
+// TimeEntry.screenshots used to embed { timestamp, url, activity_level } and
+// now holds Screenshot ids. Embedded arrays written by older clients are kept
+// as legacy_screenshots (outside the schema) so no URL is lost.
+module.exports = {
+  version: 2,
+  name: "screenshot-references",
+
+  async up(db, { log = console.log } = {}) {
+    const timeEntries = db.collection("timeentries");
+    const embedded = { "screenshots.0": { $type: "object" } };
+
+    const renamed = await timeEntries.updateMany(embedded, {
+      $rename: { screenshots: "legacy_screenshots" },
+    });
+    await timeEntries.updateMany(
+      { legacy_screenshots: { $exists: true }, screenshots: { $exists: false } },
+      { $set: { screenshots: [] } }
+    );
+    log(`   moved embedded screenshots of ${renamed.modifiedCount} entries to legacy_screenshots`);
+  },
+};
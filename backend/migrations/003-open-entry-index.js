@@ -0,0 +1,29 @@
+// backend/migrations/003-open-entry-index.js - Index for the active timer registry
+// The registry loads every running timer at boot, across organizations. A
+// partial index holding only open entries keeps that read small; the query
+// filters end_time by $type so it can use the index, which means entries
+// written without an end_time field are given an explicit null first.
+const { ensureIndex } = require("../services/migrations");
+
+const OPEN = { end_time: { $type: "null" } };
+
+module.exports = {
+  version: 3,
+  name: "open-entry-index",
+
+  async up(db, { log = console.log } = {}) {
+    const timeEntries = db.collection("timeentries");
+
+    const filled = await timeEntries.updateMany(
+      { end_time: { $exists: false } },
+      { $set: { end_time: null } }
+    );
+    log(`   set end_time to null on ${filled.modifiedCount} entries without one`);
+    await ensureIndex(
+      timeEntries,
+      { end_time: 1 },
+      { name: "end_time_1_open", partialFilterExpression: OPEN },
+      { log }
+    );
+  },
+};
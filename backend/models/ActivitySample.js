@@ -0,0 +1,56 @@
+// backend/models/ActivitySample.js - Per-minute activity samples from desktop trackers
+const mongoose = require("mongoose");
+const metrics = require("../services/metrics");
+
+const SAMPLE_TTL_DAYS = parseInt(process.env.ACTIVITY_SAMPLE_TTL_DAYS) || 365;
+
+// A MongoDB time-series collection (5.0+): the server groups samples of the
+// same meta (user and entry) into compressed buckets, so a day of minutes
+// costs a few documents instead of growing the time entry. Written in bulk by
+// services/activitySamples; TimeEntry.activity_level is derived from them.
+const activitySampleSchema = new mongoose.Schema(
+  {
+    minute: {
+      type: Date, // Start of the sampled minute
+      required: true,
+    },
+    meta: {
+      organizationId: { type: String, required: true },
+      user_id: { type: String, required: true },
+      entry_id: { type: String, required: true },
+      project_id: { type: String, required: true },
+    },
+    seconds: {
+      type: Number, // Tracked seconds in the minute (less at either end of an entry)
+      min: 1,
+      max: 60,
+      default: 60,
+    },
+    active_seconds: {
+      type: Number, // Seconds with keyboard or mouse input
+      min: 0,
+      max: 60,
+      required: true,
+    },
+    keyboard: {
+      type: Number, // Key presses
+      min: 0,
+      default: 0,
+    },
+    mouse: {
+      type: Number, // Clicks and moves
+      min: 0,
+      default: 0,
+    },
+  },
+  {
+    timeseries: { timeField: "minute", metaField: "meta", granularity: "minutes" },
+    expireAfterSeconds: SAMPLE_TTL_DAYS * 24 * 3600,
+    versionKey: false,
+  }
+);
+
+activitySampleSchema.index({ "meta.organizationId": 1, "meta.user_id": 1, minute: 1 });
+activitySampleSchema.plugin(metrics.mongoosePlugin, { model: "ActivitySample" });
+
+module.exports = mongoose.model("ActivitySample", activitySampleSchema);
@@ -1,6 +1,7 @@
 // backend/models/Invitation.js - Updated with organization support
 const mongoose = require("mongoose");
 const crypto = require("crypto");
+const metrics = require("../services/metrics");
 
 const invitationSchema = new mongoose.Schema({
   id: {
@@ -414,4 +415,6 @@ invitationSchema.methods.toVerificationJSON = function () {
   };
 };
 
+invitationSchema.plugin(metrics.mongoosePlugin, { model: "Invitation" });
+
 module.exports = mongoose.model("Invitation", invitationSchema);
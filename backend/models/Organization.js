@@ -1,5 +1,7 @@
 // backend/models/Organization.js - SIMPLIFIED VERSION without problematic pre-save middleware
 const mongoose = require("mongoose");
+const principalCache = require("../services/principalCache");
+const metrics = require("../services/metrics");
 
 const organizationSchema = new mongoose.Schema({
   id: {
@@ -132,6 +134,14 @@ const organizationSchema = new mongoose.Schema({
     totalTimeTracked: { type: Number, default: 0 }, // in seconds
     lastActivity: { type: Date, default: Date.now },
   },
+  statsReconciledAt: {
+    type: Date,
+    default: null, // Last background recount, see services/organizationStats
+  },
+  syncSequence: {
+    type: Number,
+    default: 0, // Last change number handed out, see services/changeSync
+  },
   isActive: {
     type: Boolean,
     default: true,
@@ -146,12 +156,47 @@ const organizationSchema = new mongoose.Schema({
   },
 });
 
+// Reconciliation picks the organizations that have waited longest
+organizationSchema.index({ isActive: 1, statsReconciledAt: 1 });
+
 // Simple pre-save hook to update the updatedAt field only
 organizationSchema.pre("save", function (next) {
   this.updatedAt = Date.now();
   next();
 });
 
+// Drop cached principals as soon as an organization is deactivated or removed
+organizationSchema.post("save", function (doc) {
+  if (!doc.isActive) {
+    principalCache.invalidateOrganization(doc.id);
+  }
+});
+
+const invalidateQueryTarget = function () {
+  const { id } = this.getFilter();
+  if (typeof id === "string") {
+    principalCache.invalidateOrganization(id);
+  } else {
+    principalCache.clear();
+  }
+};
+
+organizationSchema.post(
+  ["findOneAndUpdate", "updateOne", "updateMany"],
+  function () {
+    const update = this.getUpdate() || {};
+    if ("isActive" in update || "isActive" in (update.$set || {})) {
+      invalidateQueryTarget.call(this);
+    }
+  }
+);
+
+organizationSchema.post(
+  ["findOneAndDelete", "deleteOne", "deleteMany"],
+  { document: false, query: true },
+  invalidateQueryTarget
+);
+
 // Virtual for full organization info
 organizationSchema.virtual("fullInfo").get(function () {
   return {
@@ -179,31 +224,13 @@ organizationSchema.methods.canAddProjects = function (additionalProjects = 1) {
   );
 };
 
-// Instance method to update stats
+// Instance method to recount stats. Writes keep stats current incrementally,
+// so this is only needed to repair drift (the background scheduler does it).
 organizationSchema.methods.updateStats = async function () {
   try {
-    const User = require("./User");
-    const Project = require("./Project");
-    const TimeEntry = require("./TimeEntry");
-
-    const [userCount, activeUserCount, projectCount, totalTime] =
-      await Promise.all([
-        User.countDocuments({ organizationId: this.id }),
-        User.countDocuments({ organizationId: this.id, isActive: true }),
-        Project.countDocuments({ organizationId: this.id }),
-        TimeEntry.aggregate([
-          { $match: { organizationId: this.id } },
-          { $group: { _id: null, total: { $sum: "$duration" } } },
-        ]),
-      ]);
-
-    this.stats.totalUsers = userCount;
-    this.stats.activeUsers = activeUserCount;
-    this.stats.totalProjects = projectCount;
-    this.stats.totalTimeTracked = totalTime[0]?.total || 0;
-    this.stats.lastActivity = new Date();
-
-    await this.save();
+    const organizationStats = require("../services/organizationStats");
+    const { stats } = await organizationStats.reconcile(this.id);
+    Object.assign(this.stats, stats);
     return this.stats;
   } catch (error) {
     console.error("Error updating organization stats:", error);
@@ -244,4 +271,6 @@ organizationSchema.methods.toPublicJSON = function () {
   };
 };
 
+organizationSchema.plugin(metrics.mongoosePlugin, { model: "Organization" });
+
 module.exports = mongoose.model("Organization", organizationSchema);
@@ -1,5 +1,7 @@
 // backend/models/Project.js - Updated with organization support
 const mongoose = require("mongoose");
+const changeSync = require("../services/changeSync");
+const metrics = require("../services/metrics");
 
 const projectSchema = new mongoose.Schema({
   id: {
@@ -271,7 +273,7 @@ projectSchema.methods.updateStats = async function () {
 
     const [taskStats, timeStats] = await Promise.all([
       Task.aggregate([
-        { $match: { project_id: this.id } },
+        { $match: { organizationId: this.organizationId, project_id: this.id } },
         {
           $group: {
             _id: null,
@@ -283,12 +285,12 @@ projectSchema.methods.updateStats = async function () {
         },
       ]),
       TimeEntry.aggregate([
-        { $match: { project_id: this.id } },
+        { $match: { organizationId: this.organizationId, project_id: this.id } },
         {
           $group: {
             _id: null,
             totalTime: { $sum: "$duration" },
-            totalEarnings: { $sum: "$totalAmount" },
+            totalEarnings: { $sum: "$total_amount" },
           },
         },
       ]),
@@ -373,4 +375,9 @@ projectSchema.methods.toPublicJSON = function () {
   };
 };
 
+// Delta sync: stats are derived from entries and tasks, not changes
+projectSchema.plugin(changeSync.plugin, { type: "project", ignore: ["stats"] });
+
+projectSchema.plugin(metrics.mongoosePlugin, { model: "Project" });
+
 module.exports = mongoose.model("Project", projectSchema);
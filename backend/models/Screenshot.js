@@ -0,0 +1,73 @@
+// backend/models/Screenshot.js - Screenshot metadata; the image lives in the screenshot store
+const mongoose = require("mongoose");
+const metrics = require("../services/metrics");
+
+// One document per screenshot a tracker uploaded. The image itself is stored
+// once per distinct content under its SHA-256 (services/screenshotStore), so
+// `hash` is all that points at it; time entries keep only the screenshot ids.
+const screenshotSchema = new mongoose.Schema(
+  {
+    id: {
+      type: String,
+      required: true,
+      unique: true,
+    },
+    organizationId: {
+      type: String,
+      required: true,
+    },
+    user_id: {
+      type: String,
+      required: true,
+    },
+    entry_id: {
+      type: String,
+      required: true,
+    },
+    project_id: {
+      type: String,
+      required: true,
+    },
+    hash: {
+      type: String, // SHA-256 of the image, hex
+      required: true,
+    },
+    size: {
+      type: Number, // Bytes
+      required: true,
+    },
+    mime_type: {
+      type: String,
+      enum: ["image/png", "image/jpeg", "image/webp"],
+      required: true,
+    },
+    width: {
+      type: Number, // Known once the thumbnail is rendered
+      default: null,
+    },
+    height: {
+      type: Number,
+      default: null,
+    },
+    taken_at: {
+      type: Date,
+      required: true,
+    },
+    activity_level: {
+      type: Number,
+      min: 0,
+      max: 100,
+      default: null,
+    },
+  },
+  { timestamps: true }
+);
+
+screenshotSchema.index({ organizationId: 1, entry_id: 1, taken_at: 1 });
+// A retried upload of the same image to the same entry finds the first one
+screenshotSchema.index({ organizationId: 1, entry_id: 1, hash: 1 }, { unique: true });
+// Garbage collection looks images up by hash
+screenshotSchema.index({ hash: 1 });
+screenshotSchema.plugin(metrics.mongoosePlugin, { model: "Screenshot" });
+
+module.exports = mongoose.model("Screenshot", screenshotSchema);
@@ -0,0 +1,45 @@
+// backend/models/SyncTombstone.js - Deleted records for delta sync clients
+const mongoose = require("mongoose");
+
+const TOMBSTONE_TTL_DAYS = parseInt(process.env.SYNC_TOMBSTONE_TTL_DAYS) || 30;
+
+// One document per deleted time entry, project or task, stamped with the
+// organization's change sequence like any other change. Kept for
+// SYNC_TOMBSTONE_TTL_DAYS; clients whose cursor is older must resync in full.
+// Written by services/changeSync.
+const syncTombstoneSchema = new mongoose.Schema({
+  organizationId: {
+    type: String,
+    required: true,
+  },
+  type: {
+    type: String,
+    enum: ["time_entry", "project", "task"],
+    required: true,
+  },
+  record_id: {
+    type: String,
+    required: true,
+  },
+  user_id: {
+    type: String, // Owner for time entries, null for shared records
+    default: null,
+  },
+  seq: {
+    type: Number,
+    required: true,
+  },
+  deleted_at: {
+    type: Date,
+    default: Date.now,
+  },
+});
+
+syncTombstoneSchema.index({ organizationId: 1, seq: 1 });
+syncTombstoneSchema.index(
+  { deleted_at: 1 },
+  { expireAfterSeconds: TOMBSTONE_TTL_DAYS * 24 * 3600 }
+);
+
+module.exports = mongoose.model("SyncTombstone", syncTombstoneSchema);
+module.exports.TOMBSTONE_TTL_DAYS = TOMBSTONE_TTL_DAYS;
@@ -1,5 +1,7 @@
 // backend/models/Task.js - Updated with organization support
 const mongoose = require("mongoose");
+const changeSync = require("../services/changeSync");
+const metrics = require("../services/metrics");
 
 const taskSchema = new mongoose.Schema({
   id: {
@@ -339,7 +341,7 @@ taskSchema.methods.updateTimeTracking = async function () {
     const TimeEntry = require("./TimeEntry");
 
     const timeStats = await TimeEntry.aggregate([
-      { $match: { task_id: this.id } },
+      { $match: { organizationId: this.organizationId, task_id: this.id } },
       {
         $group: {
           _id: null,
@@ -441,4 +443,12 @@ taskSchema.methods.toPublicJSON = function () {
   };
 };
 
+// Delta sync: tracked totals are derived from time entries, not changes
+taskSchema.plugin(changeSync.plugin, {
+  type: "task",
+  ignore: ["actualHours", "billableHours", "totalAmount", "timeTracking.totalTracked"],
+});
+
+taskSchema.plugin(metrics.mongoosePlugin, { model: "Task" });
+
 module.exports = mongoose.model("Task", taskSchema);
@@ -1,5 +1,7 @@
 // backend/models/TimeEntry.js - ENHANCED with proper validation and organization support
 const mongoose = require("mongoose");
+const changeSync = require("../services/changeSync");
+const metrics = require("../services/metrics");
 
 const timeEntrySchema = new mongoose.Schema({
   id: {
@@ -76,6 +78,12 @@ const timeEntrySchema = new mongoose.Schema({
     type: Boolean,
     default: false,
   },
+  client_id: {
+    type: String,
+    trim: true,
+    maxlength: 100,
+    // Set by offline clients so a retried bulk upload never duplicates entries
+  },
   is_approved: {
     type: Boolean,
     default: false,
@@ -94,13 +102,17 @@ const timeEntrySchema = new mongoose.Schema({
     max: 100,
     default: 0,
   },
-  screenshots: [
-    {
-      timestamp: Date,
-      url: String,
-      activity_level: Number,
-    },
-  ],
+  // Totals of the entry's activity samples; activity_level is active / sampled
+  activity_active_seconds: {
+    type: Number,
+    default: 0,
+  },
+  activity_sampled_seconds: {
+    type: Number,
+    default: 0,
+  },
+  // Screenshot ids; images and their metadata are in the screenshots collection
+  screenshots: [String],
   notes: {
     type: String,
     maxlength: 1000,
@@ -143,13 +155,29 @@ const timeEntrySchema = new mongoose.Schema({
   },
 });
 
-// Compound indexes for organization-scoped queries
-timeEntrySchema.index({ organizationId: 1, user_id: 1 });
+// Compound indexes for organization-scoped queries. Changes to these ship as
+// a migration in backend/migrations (npm run migrate) as well.
 timeEntrySchema.index({ organizationId: 1, project_id: 1 });
 timeEntrySchema.index({ organizationId: 1, task_id: 1 });
-timeEntrySchema.index({ organizationId: 1, start_time: -1 });
-timeEntrySchema.index({ organizationId: 1, user_id: 1, start_time: -1 });
+timeEntrySchema.index(
+  { organizationId: 1, start_time: -1 },
+  {
+    name: "organizationId_1_start_time_-1_completed",
+    partialFilterExpression: { end_time: { $type: "date" } },
+  }
+); // Reports: completed entries only, query with end_time: { $type: "date" }
+timeEntrySchema.index({ organizationId: 1, user_id: 1, start_time: -1, id: -1 }); // Keyset paging of /entries
+timeEntrySchema.index({ organizationId: 1, user_id: 1, project_id: 1, start_time: -1, id: -1 }); // /entries?project_id
+timeEntrySchema.index({ organizationId: 1, user_id: 1, task_id: 1, start_time: -1, id: -1 }); // /entries?task_id
 timeEntrySchema.index({ organizationId: 1, user_id: 1, end_time: 1 }); // For active entries
+timeEntrySchema.index(
+  { end_time: 1 },
+  { name: "end_time_1_open", partialFilterExpression: { end_time: { $type: "null" } } }
+); // Active timer registry boot: open entries only, query with end_time: { $type: "null" }
+timeEntrySchema.index(
+  { organizationId: 1, user_id: 1, client_id: 1 },
+  { unique: true, partialFilterExpression: { client_id: { $type: "string" } } }
+); // Idempotent bulk ingest
 
 // Update the updatedAt field before saving
 timeEntrySchema.pre("save", function (next) {
@@ -514,4 +542,9 @@ timeEntrySchema.methods.toReportJSON = function () {
   };
 };
 
+// Delta sync: every save is a change for the entry's owner
+timeEntrySchema.plugin(changeSync.plugin, { type: "time_entry", userField: "user_id" });
+
+timeEntrySchema.plugin(metrics.mongoosePlugin, { model: "TimeEntry" });
+
 module.exports = mongoose.model("TimeEntry", timeEntrySchema);
@@ -0,0 +1,57 @@
+// backend/models/TimeRollup.js - Pre-aggregated time totals for analytics
+const mongoose = require("mongoose");
+
+// One document per (organization, user, project, UTC hour). Completed time
+// entries are counted in the hour their start_time falls in, the same way the
+// analytics endpoints always bucketed them. Maintained by services/timeRollup.
+const timeRollupSchema = new mongoose.Schema({
+  organizationId: {
+    type: String,
+    required: true,
+  },
+  user_id: {
+    type: String,
+    required: true,
+  },
+  project_id: {
+    type: String,
+    required: true,
+  },
+  day: {
+    type: String, // YYYY-MM-DD (UTC)
+    required: true,
+  },
+  hour: {
+    type: Date, // Start of the UTC hour
+    required: true,
+  },
+  duration: {
+    type: Number, // in seconds
+    default: 0,
+  },
+  entries: {
+    type: Number,
+    default: 0,
+  },
+  activity_sum: {
+    type: Number,
+    default: 0,
+  },
+  billable_amount: {
+    type: Number,
+    default: 0,
+  },
+  updatedAt: {
+    type: Date,
+    default: Date.now,
+  },
+});
+
+timeRollupSchema.index(
+  { organizationId: 1, user_id: 1, project_id: 1, hour: 1 },
+  { unique: true }
+);
+timeRollupSchema.index({ organizationId: 1, hour: 1 });
+timeRollupSchema.index({ organizationId: 1, user_id: 1, hour: 1 });
+
+module.exports = mongoose.model("TimeRollup", timeRollupSchema);
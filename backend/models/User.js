@@ -1,5 +1,6 @@
 // backend/models/User.js - Updated with organization support
 const mongoose = require("mongoose");
+const metrics = require("../services/metrics");
 
 const userSchema = new mongoose.Schema({
   id: {
@@ -332,4 +333,6 @@ userSchema.methods.toPublicJSON = function () {
   };
 };
 
+userSchema.plugin(metrics.mongoosePlugin, { model: "User" });
+
 module.exports = mongoose.model("User", userSchema);
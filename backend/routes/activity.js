@@ -0,0 +1,58 @@
+// backend/routes/activity.js - Activity sample ingest for desktop trackers
+const express = require("express");
+const TimeEntry = require("../models/TimeEntry");
+const activeTimers = require("../services/activeTimers");
+const activitySamples = require("../services/activitySamples");
+const { authMiddleware } = require("../middleware/auth");
+
+const router = express.Router();
+
+router.use(authMiddleware);
+
+// The user's entry the samples belong to; the running one comes from the
+// active timer registry so a tracker posting every minute costs no query
+const findEntry = async (user, entryId) => {
+  try {
+    const timer = await activeTimers.get(user.organizationId, user.id);
+    if (timer && timer.id === entryId) {
+      return { ...timer, organizationId: user.organizationId, end_time: null };
+    }
+  } catch (error) {
+    console.warn("Active timer registry lookup failed:", error);
+  }
+  return TimeEntry.findOne({
+    id: entryId,
+    organizationId: user.organizationId,
+    user_id: user.id,
+  })
+    .select("id organizationId user_id project_id start_time end_time")
+    .lean();
+};
+
+// POST /api/activity/samples - Queue a batch of per-minute activity samples
+// Body: { entry_id, samples: [{ timestamp, active_seconds, seconds?, keyboard?, mouse? }] }
+// Accepted samples are written within ACTIVITY_FLUSH_INTERVAL_MS, hence 202;
+// invalid ones are reported by index and the rest of the batch is kept.
+router.post("/samples", async (req, res) => {
+  const { entry_id, samples } = req.body;
+  if (typeof entry_id !== "string" || !entry_id) {
+    return res.status(400).json({ error: "entry_id is required" });
+  }
+
+  try {
+    const entry = await findEntry(req.user, entry_id);
+    if (!entry) {
+      return res.status(404).json({ error: "Time entry not found" });
+    }
+    const result = activitySamples.ingest(entry, samples);
+    res.status(202).json(result);
+  } catch (error) {
+    if (error.status) {
+      return res.status(error.status).json({ error: error.message });
+    }
+    console.error("❌ Activity sample ingest error:", error);
+    res.status(500).json({ error: "Failed to ingest activity samples" });
+  }
+});
+
+module.exports = router;
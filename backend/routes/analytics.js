@@ -1,109 +1,166 @@
 const express = require("express");
-const TimeEntry = require("../models/TimeEntry");
-const Project = require("../models/Project");
+const TimeRollup = require("../models/TimeRollup");
 const Task = require("../models/Task");
 const User = require("../models/User");
 const { authMiddleware, requireManager } = require("../middleware/auth");
+const { cacheResponse } = require("../middleware/responseCache");
+const reportExport = require("../services/reportExport");
+const customReport = require("../services/customReport");
+const activitySamples = require("../services/activitySamples");
+const reportJobs = require("../services/reportJobs");
+const { logger } = require("../services/logger");
 
 const router = express.Router();
 
+// Dashboards re-request these on every page view; see middleware/responseCache
+const cacheForUser = cacheResponse({ scope: "user" });
+const cacheForOrg = cacheResponse();
+
+// Hour buckets follow the server's local time, like Date#getHours did
+const SERVER_TIMEZONE = Intl.DateTimeFormat().resolvedOptions().timeZone;
+
+// Calculate date range based on period
+const getPeriodRange = (period) => {
+  const endDate = new Date();
+  const startDate = new Date();
+
+  switch (period) {
+    case "day":
+      startDate.setDate(endDate.getDate() - 1);
+      break;
+    case "week":
+      startDate.setDate(endDate.getDate() - 7);
+      break;
+    case "month":
+      startDate.setMonth(endDate.getMonth() - 1);
+      break;
+    case "year":
+      startDate.setFullYear(endDate.getFullYear() - 1);
+      break;
+    default:
+      startDate.setDate(endDate.getDate() - 7);
+  }
+
+  return { startDate, endDate };
+};
+
+// Rollup rows covering the period. Rows are hourly, so the window starts at
+// the top of the hour containing startDate. The cost depends on the number of
+// (user, project, hour) buckets, not on how many entries they summarize.
+const rollupMatch = (filter, period) => {
+  const { startDate, endDate } = getPeriodRange(period);
+  startDate.setUTCMinutes(0, 0, 0);
+
+  return {
+    $match: {
+      ...filter,
+      hour: { $gte: startDate, $lte: endDate },
+    },
+  };
+};
+
+const toHours = (field) => ({ $divide: [field, 3600] });
+
+const average = (sum, count) => ({
+  $cond: [{ $gt: [count, 0] }, { $divide: [sum, count] }, 0],
+});
+
+const totalsFacet = [
+  {
+    $group: {
+      _id: null,
+      duration: { $sum: "$duration" },
+      entries: { $sum: "$entries" },
+      activity_sum: { $sum: "$activity_sum" },
+    },
+  },
+];
+
+const summarizeTotals = (rows) => {
+  const totals = rows[0] || { duration: 0, entries: 0, activity_sum: 0 };
+  return {
+    duration: totals.duration,
+    entries: totals.entries,
+    activity: totals.entries > 0 ? totals.activity_sum / totals.entries : 0,
+  };
+};
+
 // Get dashboard analytics - FIXED: Organization-scoped
-router.get("/dashboard", authMiddleware, async (req, res) => {
+router.get("/dashboard", authMiddleware, cacheForUser, async (req, res) => {
   try {
     const { period = "week" } = req.query;
 
-    // Calculate date range based on period
-    const endDate = new Date();
-    let startDate = new Date();
-
-    switch (period) {
-      case "day":
-        startDate.setDate(endDate.getDate() - 1);
-        break;
-      case "week":
-        startDate.setDate(endDate.getDate() - 7);
-        break;
-      case "month":
-        startDate.setMonth(endDate.getMonth() - 1);
-        break;
-      case "year":
-        startDate.setFullYear(endDate.getFullYear() - 1);
-        break;
-      default:
-        startDate.setDate(endDate.getDate() - 7);
-    }
-
-    // FIXED: Get time entries for the period filtered by organization
-    const entries = await TimeEntry.find({
-      user_id: req.user.id,
-      organizationId: req.user.organizationId, // CRITICAL FIX
-      start_time: { $gte: startDate, $lte: endDate },
-      end_time: { $ne: null },
-    });
-
-    // Calculate user stats
-    const totalHours =
-      entries.reduce((sum, entry) => sum + entry.duration, 0) / 3600;
-    const totalEntries = entries.length;
-    const avgActivity =
-      entries.length > 0
-        ? entries.reduce((sum, entry) => sum + entry.activity_level, 0) /
-          entries.length
-        : 0;
-
-    // Project breakdown
-    const projectBreakdown = entries.reduce((acc, entry) => {
-      if (!acc[entry.project_id]) {
-        acc[entry.project_id] = {
-          project_id: entry.project_id,
-          hours: 0,
-          entries: 0,
-        };
-      }
-      acc[entry.project_id].hours += entry.duration / 3600;
-      acc[entry.project_id].entries += 1;
-      return acc;
-    }, {});
-
-    // Productivity trend (daily aggregation)
-    const dailyTrend = {};
-    entries.forEach((entry) => {
-      const date = entry.start_time.toISOString().split("T")[0];
-      if (!dailyTrend[date]) {
-        dailyTrend[date] = {
-          date,
-          hours: 0,
-          activity: 0,
-          entries: 0,
-        };
-      }
-      dailyTrend[date].hours += entry.duration / 3600;
-      dailyTrend[date].activity += entry.activity_level;
-      dailyTrend[date].entries += 1;
-    });
+    // FIXED: Aggregate rollups for the period filtered by organization
+    const [result] = await TimeRollup.aggregate([
+      rollupMatch(
+        {
+          organizationId: req.user.organizationId, // CRITICAL FIX
+          user_id: req.user.id,
+        },
+        period
+      ),
+      {
+        $facet: {
+          totals: totalsFacet,
+          // Project breakdown
+          projects: [
+            {
+              $group: {
+                _id: "$project_id",
+                duration: { $sum: "$duration" },
+                entries: { $sum: "$entries" },
+              },
+            },
+            { $sort: { duration: -1 } },
+            {
+              $project: {
+                _id: 0,
+                project_id: "$_id",
+                hours: toHours("$duration"),
+                entries: 1,
+              },
+            },
+          ],
+          // Productivity trend (daily aggregation)
+          daily: [
+            {
+              $group: {
+                _id: "$day",
+                duration: { $sum: "$duration" },
+                activity_sum: { $sum: "$activity_sum" },
+                entries: { $sum: "$entries" },
+              },
+            },
+            { $sort: { _id: 1 } },
+            {
+              $project: {
+                _id: 0,
+                date: "$_id",
+                hours: toHours("$duration"),
+                activity: average("$activity_sum", "$entries"),
+                entries: 1,
+              },
+            },
+          ],
+        },
+      },
+    ]);
 
-    // Calculate average activity per day
-    Object.values(dailyTrend).forEach((day) => {
-      if (day.entries > 0) {
-        day.activity = day.activity / day.entries;
-      }
-    });
+    const totals = summarizeTotals(result.totals);
 
-    console.log(
+    logger.debug(
       `Dashboard analytics for user ${req.user.email} in organization ${req.user.organizationId}`
     );
 
     res.json({
       user_stats: {
-        total_hours: Math.round(totalHours * 100) / 100,
-        total_entries: totalEntries,
-        avg_activity: Math.round(avgActivity * 100) / 100,
-        productive_days: Object.keys(dailyTrend).length,
+        total_hours: Math.round((totals.duration / 3600) * 100) / 100,
+        total_entries: totals.entries,
+        avg_activity: Math.round(totals.activity * 100) / 100,
+        productive_days: result.daily.length,
       },
-      productivity_trend: Object.values(dailyTrend).sort(
-        (a, b) => new Date(a.date) - new Date(b.date)
-      ),
-      project_breakdown: Object.values(projectBreakdown),
+      productivity_trend: result.daily,
+      project_breakdown: result.projects,
       period,
     });
   } catch (error) {
@@ -113,134 +170,107 @@ router.get("/dashboard", authMiddleware, async (req, res) => {
 });
 
 // Get team analytics (manager/admin only) - FIXED: Organization-scoped
-router.get("/team", authMiddleware, requireManager, async (req, res) => {
+router.get("/team", authMiddleware, requireManager, cacheForOrg, async (req, res) => {
   try {
     const { period = "week" } = req.query;
 
-    // Calculate date range
-    const endDate = new Date();
-    let startDate = new Date();
-
-    switch (period) {
-      case "day":
-        startDate.setDate(endDate.getDate() - 1);
-        break;
-      case "week":
-        startDate.setDate(endDate.getDate() - 7);
-        break;
-      case "month":
-        startDate.setMonth(endDate.getMonth() - 1);
-        break;
-      case "year":
-        startDate.setFullYear(endDate.getFullYear() - 1);
-        break;
-      default:
-        startDate.setDate(endDate.getDate() - 7);
-    }
-
-    // FIXED: Get all time entries for the period filtered by organization
-    const entries = await TimeEntry.find({
-      organizationId: req.user.organizationId, // CRITICAL FIX
-      start_time: { $gte: startDate, $lte: endDate },
-      end_time: { $ne: null },
-    });
-
-    // Team statistics
-    const teamStats = entries.reduce((acc, entry) => {
-      if (!acc[entry.user_id]) {
-        acc[entry.user_id] = {
-          user_id: entry.user_id,
-          total_hours: 0,
-          total_entries: 0,
-          avg_activity: 0,
-          projects: new Set(),
-        };
-      }
-
-      acc[entry.user_id].total_hours += entry.duration / 3600;
-      acc[entry.user_id].total_entries += 1;
-      acc[entry.user_id].avg_activity += entry.activity_level;
-      acc[entry.user_id].projects.add(entry.project_id);
-
-      return acc;
-    }, {});
-
-    // Calculate averages
-    Object.values(teamStats).forEach((user) => {
-      user.avg_activity =
-        user.total_entries > 0 ? user.avg_activity / user.total_entries : 0;
-      user.projects_count = user.projects.size;
-      user.projects = Array.from(user.projects);
-    });
-
-    // Daily productivity
-    const dailyProductivity = {};
-    entries.forEach((entry) => {
-      const date = entry.start_time.toISOString().split("T")[0];
-      if (!dailyProductivity[date]) {
-        dailyProductivity[date] = {
-          date,
-          total_hours: 0,
-          avg_activity: 0,
-          active_users: new Set(),
-        };
-      }
-      dailyProductivity[date].total_hours += entry.duration / 3600;
-      dailyProductivity[date].avg_activity += entry.activity_level;
-      dailyProductivity[date].active_users.add(entry.user_id);
-    });
-
-    // Calculate daily averages
-    Object.values(dailyProductivity).forEach((day) => {
-      const entriesCount = entries.filter(
-        (e) => e.start_time.toISOString().split("T")[0] === day.date
-      ).length;
-      day.avg_activity = entriesCount > 0 ? day.avg_activity / entriesCount : 0;
-      day.active_users = day.active_users.size;
-    });
-
-    // Project statistics - FIXED: Organization-scoped
-    const projectStats = entries.reduce((acc, entry) => {
-      if (!acc[entry.project_id]) {
-        acc[entry.project_id] = {
-          project_id: entry.project_id,
-          total_hours: 0,
-          contributors: new Set(),
-        };
-      }
-      acc[entry.project_id].total_hours += entry.duration / 3600;
-      acc[entry.project_id].contributors.add(entry.user_id);
-      return acc;
-    }, {});
+    // FIXED: Aggregate all rollups for the period filtered by organization
+    const [result] = await TimeRollup.aggregate([
+      rollupMatch(
+        { organizationId: req.user.organizationId }, // CRITICAL FIX
+        period
+      ),
+      {
+        $facet: {
+          totals: totalsFacet,
+          // Team statistics
+          users: [
+            {
+              $group: {
+                _id: "$user_id",
+                duration: { $sum: "$duration" },
+                total_entries: { $sum: "$entries" },
+                activity_sum: { $sum: "$activity_sum" },
+                projects: { $addToSet: "$project_id" },
+              },
+            },
+            { $sort: { duration: -1 } },
+            {
+              $project: {
+                _id: 0,
+                user_id: "$_id",
+                total_hours: toHours("$duration"),
+                total_entries: 1,
+                avg_activity: average("$activity_sum", "$total_entries"),
+                projects: 1,
+                projects_count: { $size: "$projects" },
+              },
+            },
+          ],
+          // Daily productivity
+          daily: [
+            {
+              $group: {
+                _id: "$day",
+                duration: { $sum: "$duration" },
+                activity_sum: { $sum: "$activity_sum" },
+                entries: { $sum: "$entries" },
+                active_users: { $addToSet: "$user_id" },
+              },
+            },
+            { $sort: { _id: 1 } },
+            {
+              $project: {
+                _id: 0,
+                date: "$_id",
+                total_hours: toHours("$duration"),
+                avg_activity: average("$activity_sum", "$entries"),
+                active_users: { $size: "$active_users" },
+              },
+            },
+          ],
+          // Project statistics - FIXED: Organization-scoped
+          projects: [
+            {
+              $group: {
+                _id: "$project_id",
+                duration: { $sum: "$duration" },
+                contributors: { $addToSet: "$user_id" },
+              },
+            },
+            { $sort: { duration: -1 } },
+            {
+              $project: {
+                _id: 0,
+                project_id: "$_id",
+                total_hours: toHours("$duration"),
+                contributors: { $size: "$contributors" },
+              },
+            },
+          ],
+        },
+      },
+    ]);
 
-    Object.values(projectStats).forEach((project) => {
-      project.contributors = project.contributors.size;
-    });
+    const totals = summarizeTotals(result.totals);
 
     // Summary statistics
     const summary = {
-      total_hours:
-        entries.reduce((sum, entry) => sum + entry.duration, 0) / 3600,
-      total_entries: entries.length,
-      active_users: Object.keys(teamStats).length,
-      active_projects: Object.keys(projectStats).length,
-      avg_activity:
-        entries.length > 0
-          ? entries.reduce((sum, entry) => sum + entry.activity_level, 0) /
-            entries.length
-          : 0,
+      total_hours: totals.duration / 3600,
+      total_entries: totals.entries,
+      active_users: result.users.length,
+      active_projects: result.projects.length,
+      avg_activity: totals.activity,
     };
 
-    console.log(
+    logger.debug(
       `Team analytics for organization ${req.user.organizationId}: ${summary.active_users} users, ${summary.active_projects} projects`
     );
 
     res.json({
-      team_stats: Object.values(teamStats),
-      daily_productivity: Object.values(dailyProductivity).sort(
-        (a, b) => new Date(a.date) - new Date(b.date)
-      ),
-      project_stats: Object.values(projectStats),
+      team_stats: result.users,
+      daily_productivity: result.daily,
+      project_stats: result.projects,
       summary,
       period,
     });
@@ -251,36 +281,13 @@ router.get("/team", authMiddleware, requireManager, async (req, res) => {
 });
 
 // Get productivity analytics - FIXED: Organization-scoped
-router.get("/productivity", authMiddleware, async (req, res) => {
+router.get("/productivity", authMiddleware, cacheForUser, async (req, res) => {
   try {
     const { period = "week", user_id } = req.query;
 
-    // Calculate date range
-    const endDate = new Date();
-    let startDate = new Date();
-
-    switch (period) {
-      case "day":
-        startDate.setDate(endDate.getDate() - 1);
-        break;
-      case "week":
-        startDate.setDate(endDate.getDate() - 7);
-        break;
-      case "month":
-        startDate.setMonth(endDate.getMonth() - 1);
-        break;
-      case "year":
-        startDate.setFullYear(endDate.getFullYear() - 1);
-        break;
-      default:
-        startDate.setDate(endDate.getDate() - 7);
-    }
-
     // Query filter - FIXED: Always include organization filter
-    const query = {
+    const filter = {
       organizationId: req.user.organizationId, // CRITICAL FIX
-      start_time: { $gte: startDate, $lte: endDate },
-      end_time: { $ne: null },
     };
 
     // If user_id is provided and user is manager/admin, filter by user
@@ -297,44 +304,68 @@ router.get("/productivity", authMiddleware, async (req, res) => {
           .json({ error: "User not found in your organization" });
       }
 
-      query.user_id = user_id;
+      filter.user_id = user_id;
     } else {
-      query.user_id = req.user.id;
+      filter.user_id = req.user.id;
     }
 
-    const entries = await TimeEntry.find(query);
-
-    // Productivity chart data (hourly breakdown)
-    const hourlyData = {};
-    entries.forEach((entry) => {
-      const hour = entry.start_time.getHours();
-      if (!hourlyData[hour]) {
-        hourlyData[hour] = {
-          hour,
-          total_duration: 0,
-          avg_activity: 0,
-          entries_count: 0,
-        };
+    const match = rollupMatch(filter, period);
+    const [[result], sampledHours] = await Promise.all([
+      TimeRollup.aggregate([
+        match,
+        {
+          $facet: {
+            totals: totalsFacet,
+            // Productivity chart data (hourly breakdown)
+            hourly: [
+              {
+                $group: {
+                  _id: { $hour: { date: "$hour", timezone: SERVER_TIMEZONE } },
+                  total_duration: { $sum: "$duration" },
+                  activity_sum: { $sum: "$activity_sum" },
+                  entries_count: { $sum: "$entries" },
+                },
+              },
+              { $sort: { _id: 1 } },
+              {
+                $project: {
+                  _id: 0,
+                  hour: "$_id",
+                  total_duration: 1,
+                  avg_activity: average("$activity_sum", "$entries_count"),
+                  entries_count: 1,
+                },
+              },
+            ],
+          },
+        },
+      ]),
+      // Samples weigh activity by the seconds actually measured rather than
+      // averaging one level per entry, so they win where they exist
+      activitySamples.activityByHour({
+        organizationId: filter.organizationId,
+        user_id: filter.user_id,
+        startDate: match.$match.hour.$gte,
+        endDate: match.$match.hour.$lte,
+        timezone: SERVER_TIMEZONE,
+      }),
+    ]);
+
+    const sampled = new Map(sampledHours.map((hour) => [hour._id, hour]));
+    for (const hour of result.hourly) {
+      const samples = sampled.get(hour.hour);
+      if (samples && samples.sampled_seconds > 0) {
+        hour.avg_activity = (samples.active_seconds / samples.sampled_seconds) * 100;
       }
-      hourlyData[hour].total_duration += entry.duration;
-      hourlyData[hour].avg_activity += entry.activity_level;
-      hourlyData[hour].entries_count += 1;
-    });
-
-    // Calculate averages
-    Object.values(hourlyData).forEach((hour) => {
-      hour.avg_activity =
-        hour.entries_count > 0 ? hour.avg_activity / hour.entries_count : 0;
-    });
+    }
 
     // Overall productivity metrics
-    const totalHours =
-      entries.reduce((sum, entry) => sum + entry.duration, 0) / 3600;
+    const totals = summarizeTotals(result.totals);
+    const totalHours = totals.duration / 3600;
+    const sampledSeconds = sampledHours.reduce((sum, hour) => sum + hour.sampled_seconds, 0);
+    const activeSeconds = sampledHours.reduce((sum, hour) => sum + hour.active_seconds, 0);
     const avgActivity =
-      entries.length > 0
-        ? entries.reduce((sum, entry) => sum + entry.activity_level, 0) /
-          entries.length
-        : 0;
+      sampledSeconds > 0 ? (activeSeconds / sampledSeconds) * 100 : totals.activity;
 
     // Productivity score calculation (based on activity level and hours worked)
     const targetHours =
@@ -350,12 +381,11 @@ router.get("/productivity", authMiddleware, async (req, res) => {
     const productivityScore = hoursScore + activityScore;
 
     res.json({
-      productivity_chart: Object.values(hourlyData).sort(
-        (a, b) => a.hour - b.hour
-      ),
+      productivity_chart: result.hourly,
       productivity_score: Math.round(productivityScore * 100) / 100,
       total_hours: Math.round(totalHours * 100) / 100,
       avg_activity: Math.round(avgActivity * 100) / 100,
+      activity_source: sampledSeconds > 0 ? "samples" : "entries",
       period,
     });
   } catch (error) {
@@ -365,113 +395,130 @@ router.get("/productivity", authMiddleware, async (req, res) => {
 });
 
 // Generate custom report - FIXED: Organization-scoped
+// format "json" (default) returns aggregate metrics; "csv" and "ndjson" stream
+// every matching entry as a download (gzip when the client accepts it).
 router.post(
   "/reports/custom",
   authMiddleware,
   requireManager,
   async (req, res) => {
     try {
-      const {
-        start_date,
-        end_date,
-        user_ids = [],
-        project_ids = [],
-        metrics = ["hours", "activity", "projects"],
-      } = req.body;
-
-      if (!start_date || !end_date) {
-        return res
-          .status(400)
-          .json({ error: "Start date and end date are required" });
-      }
+      const { format = "json" } = req.body;
 
-      const startDate = new Date(start_date);
-      const endDate = new Date(end_date);
+      if (format !== "json" && !reportExport.FORMATS[format]) {
+        return res.status(400).json({
+          error: `Unsupported format. Use json, ${Object.keys(
+            reportExport.FORMATS
+          ).join(" or ")}`,
+        });
+      }
 
-      // FIXED: Always filter by organization
-      const query = {
-        organizationId: req.user.organizationId, // CRITICAL FIX
-        start_time: { $gte: startDate, $lte: endDate },
-        end_time: { $ne: null },
-      };
+      const params = customReport.normalizeParams(req.body);
 
-      // Filter by users - FIXED: Ensure users belong to same organization
-      if (user_ids.length > 0) {
-        const orgUsers = await User.find({
-          id: { $in: user_ids },
+      if (format !== "json") {
+        const query = await customReport.buildQuery(
+          req.user.organizationId,
+          params
+        );
+        const rows = await reportExport.streamEntries(res, {
           organizationId: req.user.organizationId,
-        }).select("id");
-
-        const validUserIds = orgUsers.map((u) => u.id);
-        query.user_id = { $in: validUserIds };
+          query,
+          format,
+          filename: `time-report-${params.startDate.toISOString().split("T")[0]}-${
+            params.endDate.toISOString().split("T")[0]
+          }`,
+        });
+        logger.debug(
+          `Custom report exported for organization ${req.user.organizationId}: ${rows} ${format} rows`
+        );
+        return;
       }
 
-      // Filter by projects - FIXED: Ensure projects belong to same organization
-      if (project_ids.length > 0) {
-        const orgProjects = await Project.find({
-          id: { $in: project_ids },
-          organizationId: req.user.organizationId,
-        }).select("id");
+      const report = await customReport.buildReport(
+        req.user.organizationId,
+        params
+      );
 
-        const validProjectIds = orgProjects.map((p) => p.id);
-        query.project_id = { $in: validProjectIds };
+      logger.debug(
+        `Custom report generated for organization ${req.user.organizationId}`
+      );
+
+      res.json(report);
+    } catch (error) {
+      if (error.status === 400) {
+        return res.status(400).json({ error: error.message });
       }
+      console.error("Generate custom report error:", error);
+      // A streamed export may already have sent its headers
+      if (res.headersSent) {
+        res.destroy(error);
+        return;
+      }
+      res.status(500).json({ error: "Internal server error" });
+    }
+  }
+);
 
-      const entries = await TimeEntry.find(query);
+// POST /api/analytics/reports/jobs - Queue a custom report (same body as /reports/custom)
+router.post("/reports/jobs", authMiddleware, requireManager, (req, res) => {
+  try {
+    const job = reportJobs.submit(
+      req.user.organizationId,
+      req.user.id,
+      req.body
+    );
 
-      const report = {
-        date_range: {
-          start: start_date,
-          end: end_date,
-        },
-        filters: {
-          users: user_ids,
-          projects: project_ids,
-          organization: req.user.organizationId,
-        },
-        metrics: {},
-      };
-
-      // Calculate requested metrics
-      if (metrics.includes("hours")) {
-        report.metrics.total_hours =
-          entries.reduce((sum, entry) => sum + entry.duration, 0) / 3600;
-        report.metrics.avg_daily_hours =
-          report.metrics.total_hours /
-          Math.ceil((endDate - startDate) / (1000 * 60 * 60 * 24));
-      }
+    res.status(job.status === "completed" ? 200 : 202).json({
+      job: reportJobs.publicJob(job),
+      status_url: `/api/analytics/reports/jobs/${job.id}`,
+      result_url: `/api/analytics/reports/jobs/${job.id}/result`,
+    });
+  } catch (error) {
+    if (error.status === 400 || error.status === 503) {
+      return res.status(error.status).json({ error: error.message });
+    }
+    console.error("Submit report job error:", error);
+    res.status(500).json({ error: "Internal server error" });
+  }
+});
 
-      if (metrics.includes("activity")) {
-        report.metrics.avg_activity =
-          entries.length > 0
-            ? entries.reduce((sum, entry) => sum + entry.activity_level, 0) /
-              entries.length
-            : 0;
-      }
+// GET /api/analytics/reports/jobs/:jobId - Job status and progress
+router.get("/reports/jobs/:jobId", authMiddleware, requireManager, async (req, res) => {
+  try {
+    const job = await reportJobs.findJob(req.user.organizationId, req.params.jobId);
+    if (!job) {
+      return res.status(404).json({ error: "Report job not found" });
+    }
+    res.json({ job: reportJobs.publicJob(job) });
+  } catch (error) {
+    console.error("Report job status error:", error);
+    res.status(500).json({ error: "Internal server error" });
+  }
+});
 
-      if (metrics.includes("projects")) {
-        const projectsWorked = new Set(
-          entries.map((entry) => entry.project_id)
-        );
-        report.metrics.projects_worked = projectsWorked.size;
-        report.metrics.project_distribution = {};
-
-        entries.forEach((entry) => {
-          if (!report.metrics.project_distribution[entry.project_id]) {
-            report.metrics.project_distribution[entry.project_id] = 0;
-          }
-          report.metrics.project_distribution[entry.project_id] +=
-            entry.duration / 3600;
+// GET /api/analytics/reports/jobs/:jobId/result - Finished report
+router.get(
+  "/reports/jobs/:jobId/result",
+  authMiddleware,
+  requireManager,
+  async (req, res) => {
+    try {
+      const job = await reportJobs.findJob(req.user.organizationId, req.params.jobId);
+      if (!job) {
+        return res.status(404).json({ error: "Report job not found" });
+      }
+      if (job.status !== "completed") {
+        return res.status(409).json({
+          error:
+            job.status === "failed"
+              ? job.error
+              : "Report is not ready yet",
+          job: reportJobs.publicJob(job),
         });
       }
-
-      console.log(
-        `Custom report generated for organization ${req.user.organizationId}`
-      );
-
-      res.json(report);
+      res.json(job.result);
     } catch (error) {
-      console.error("Generate custom report error:", error);
+      console.error("Report job result error:", error);
       res.status(500).json({ error: "Internal server error" });
     }
   }
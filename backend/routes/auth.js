@@ -8,6 +8,8 @@ const User = require("../models/User");
 const Organization = require("../models/Organization");
 const Invitation = require("../models/Invitation");
 const { authMiddleware } = require("../middleware/auth");
+const organizationStats = require("../services/organizationStats");
+const dataVersion = require("../services/dataVersion");
 
 const router = express.Router();
 
@@ -319,8 +321,11 @@ router.post(
         );
       }
 
-      // Update organization stats
-      await organization.updateStats();
+      // New organizations start with the admin counted; joiners add themselves
+      if (invitation) {
+        await organizationStats.userAdded(user);
+        dataVersion.bump(organization.id);
+      }
 
       // Generate JWT token - FIXED: Ensure proper token generation
       const token = jwt.sign(
@@ -648,7 +653,8 @@ router.post(
       await invitation.save();
 
       // Update organization stats
-      await organization.updateStats();
+      await organizationStats.userAdded(user);
+      dataVersion.bump(organization.id);
 
       // Generate JWT token
       const jwtToken = jwt.sign(
@@ -5,17 +5,20 @@ const Project = require("../models/Project");
 const Task = require("../models/Task");
 const User = require("../models/User");
 const TimeEntry = require("../models/TimeEntry");
+const organizationStats = require("../services/organizationStats");
 const {
   authMiddleware,
   requireManager,
   requireProjectAccess,
   logOrganizationActivity,
 } = require("../middleware/auth");
+const { cacheResponse, bumpOnWrite } = require("../middleware/responseCache");
 
 const router = express.Router();
 
 // Apply auth middleware to all routes
 router.use(authMiddleware);
+router.use(bumpOnWrite);
 
 // GET /api/projects - Get organization's projects
 router.get("/", async (req, res) => {
@@ -49,7 +52,7 @@ router.get("/", async (req, res) => {
 });
 
 // GET /api/projects/stats/dashboard - Get project statistics
-router.get("/stats/dashboard", async (req, res) => {
+router.get("/stats/dashboard", cacheResponse(), async (req, res) => {
   try {
     const stats = await Project.getOrgStats(req.user.organizationId);
 
@@ -134,6 +137,7 @@ router.post("/", requireManager, async (req, res) => {
     });
 
     await project.save();
+    await organizationStats.projectAdded(req.user.organizationId);
 
     res.status(201).json({
       message: "Project created successfully",
@@ -0,0 +1,220 @@
+// backend/routes/screenshots.js - Screenshot upload and retrieval
+const express = require("express");
+const multer = require("multer");
+const { v4: uuidv4 } = require("uuid");
+const Screenshot = require("../models/Screenshot");
+const TimeEntry = require("../models/TimeEntry");
+const screenshotStore = require("../services/screenshotStore");
+const thumbnailPool = require("../services/thumbnailPool");
+const { authMiddleware } = require("../middleware/auth");
+
+const router = express.Router();
+
+const upload = multer({
+  storage: screenshotStore.storage(),
+  limits: { fileSize: screenshotStore.MAX_BYTES, files: 1, fields: 4, fieldSize: 1024 },
+}).single("screenshot");
+
+const canSeeTeam = (user) => ["admin", "manager"].includes(user.role);
+
+const toJSON = (screenshot) => ({
+  id: screenshot.id,
+  entry_id: screenshot.entry_id,
+  user_id: screenshot.user_id,
+  project_id: screenshot.project_id,
+  hash: screenshot.hash,
+  size: screenshot.size,
+  mime_type: screenshot.mime_type,
+  width: screenshot.width,
+  height: screenshot.height,
+  taken_at: screenshot.taken_at,
+  activity_level: screenshot.activity_level,
+  image_url: `/api/screenshots/${screenshot.id}/image`,
+  thumbnail_url: `/api/screenshots/${screenshot.id}/thumbnail`,
+});
+
+// Members see their own screenshots; admins and managers the organization's
+const findScreenshot = (user, id) => {
+  const filter = { id, organizationId: user.organizationId };
+  if (!canSeeTeam(user)) filter.user_id = user.id;
+  return Screenshot.findOne(filter).lean();
+};
+
+const renderThumbnail = (screenshot) =>
+  thumbnailPool
+    .render(
+      screenshot.hash,
+      screenshotStore.objectPath(screenshot.hash),
+      screenshotStore.thumbnailPath(screenshot.hash)
+    )
+    .then(async (dimensions) => {
+      if (!dimensions) return false;
+      await Screenshot.updateMany(
+        { hash: screenshot.hash, width: null },
+        { $set: { width: dimensions.width, height: dimensions.height } }
+      );
+      return true;
+    });
+
+const parseUploadFields = (body) => {
+  const takenAt = body.taken_at ? new Date(body.taken_at) : new Date();
+  if (isNaN(takenAt.getTime())) {
+    return { error: "taken_at must be an ISO date" };
+  }
+  let activityLevel = null;
+  if (body.activity_level !== undefined && body.activity_level !== "") {
+    activityLevel = Number(body.activity_level);
+    if (!Number.isFinite(activityLevel) || activityLevel < 0 || activityLevel > 100) {
+      return { error: "activity_level must be between 0 and 100" };
+    }
+  }
+  return { takenAt, activityLevel };
+};
+
+router.use(authMiddleware);
+
+// POST /api/screenshots/entries/:entryId - Upload one screenshot (multipart)
+// Form fields: screenshot (PNG, JPEG or WebP file), taken_at?, activity_level?
+// Uploading the same image to the same entry again returns the first upload
+// with 200; identical images on other entries share the stored file.
+router.post("/entries/:entryId", async (req, res) => {
+  // Refuse before reading the body when this process is saturated
+  const release = screenshotStore.acquire();
+  if (!release) {
+    return res.status(429).json({
+      error: "Too many screenshot uploads, retry shortly",
+      retryAfter: 1,
+    });
+  }
+  res.on("close", release);
+
+  try {
+    const entry = await TimeEntry.findOne({
+      id: req.params.entryId,
+      organizationId: req.user.organizationId,
+      user_id: req.user.id,
+    })
+      .select("id organizationId user_id project_id")
+      .lean();
+    if (!entry) {
+      return res.status(404).json({ error: "Time entry not found" });
+    }
+
+    await new Promise((resolve, reject) =>
+      upload(req, res, (error) => (error ? reject(error) : resolve()))
+    );
+    if (!req.file) {
+      return res.status(400).json({ error: "A screenshot file is required" });
+    }
+    const { takenAt, activityLevel, error } = parseUploadFields(req.body);
+    if (error) {
+      return res.status(400).json({ error });
+    }
+
+    let screenshot;
+    let created = true;
+    try {
+      screenshot = await Screenshot.create({
+        id: uuidv4(),
+        organizationId: entry.organizationId,
+        user_id: entry.user_id,
+        entry_id: entry.id,
+        project_id: entry.project_id,
+        hash: req.file.hash,
+        size: req.file.size,
+        mime_type: req.file.mime_type,
+        taken_at: takenAt,
+        activity_level: activityLevel,
+      });
+    } catch (createError) {
+      if (createError.code !== 11000) throw createError;
+      created = false;
+      screenshot = await Screenshot.findOne({
+        organizationId: entry.organizationId,
+        entry_id: entry.id,
+        hash: req.file.hash,
+      });
+    }
+    // A reference, not the image: the entry document stays small
+    await TimeEntry.updateOne(
+      { id: entry.id, organizationId: entry.organizationId },
+      { $addToSet: { screenshots: screenshot.id } }
+    );
+
+    if (!(await screenshotStore.exists(screenshotStore.thumbnailPath(screenshot.hash)))) {
+      renderThumbnail(screenshot).catch((renderError) =>
+        console.warn("Screenshot thumbnail failed:", renderError.message)
+      );
+    }
+
+    res.status(created ? 201 : 200).json({
+      screenshot: toJSON(screenshot),
+      deduplicated: req.file.deduplicated,
+    });
+  } catch (error) {
+    if (error instanceof multer.MulterError) {
+      const status = error.code === "LIMIT_FILE_SIZE" ? 413 : 400;
+      return res.status(status).json({ error: error.message });
+    }
+    if (error.status) {
+      return res.status(error.status).json({ error: error.message });
+    }
+    console.error("❌ Screenshot upload error:", error);
+    res.status(500).json({ error: "Failed to upload screenshot" });
+  }
+});
+
+// GET /api/screenshots/entries/:entryId - Screenshots of a time entry
+router.get("/entries/:entryId", async (req, res) => {
+  try {
+    const filter = { organizationId: req.user.organizationId, entry_id: req.params.entryId };
+    if (!canSeeTeam(req.user)) filter.user_id = req.user.id;
+    const screenshots = await Screenshot.find(filter).sort({ taken_at: 1 }).lean();
+    res.json({ screenshots: screenshots.map(toJSON) });
+  } catch (error) {
+    console.error("Get screenshots error:", error);
+    res.status(500).json({ error: "Failed to fetch screenshots" });
+  }
+});
+
+// Images never change under an id, so clients may cache them for good
+const IMAGE_HEADERS = { "Cache-Control": "private, max-age=31536000, immutable" };
+
+// GET /api/screenshots/:id/image - The uploaded image
+router.get("/:id/image", async (req, res) => {
+  try {
+    const screenshot = await findScreenshot(req.user, req.params.id);
+    if (!screenshot) {
+      return res.status(404).json({ error: "Screenshot not found" });
+    }
+    res.type(screenshot.mime_type);
+    res.sendFile(screenshotStore.objectPath(screenshot.hash), { headers: IMAGE_HEADERS });
+  } catch (error) {
+    console.error("Get screenshot image error:", error);
+    res.status(500).json({ error: "Failed to fetch screenshot" });
+  }
+});
+
+// GET /api/screenshots/:id/thumbnail - JPEG thumbnail, rendered now if missing
+router.get("/:id/thumbnail", async (req, res) => {
+  try {
+    const screenshot = await findScreenshot(req.user, req.params.id);
+    if (!screenshot) {
+      return res.status(404).json({ error: "Screenshot not found" });
+    }
+    const file = screenshotStore.thumbnailPath(screenshot.hash);
+    if (!(await screenshotStore.exists(file)) && !(await renderThumbnail(screenshot))) {
+      return res.status(404).json({ error: "Thumbnails are not available" });
+    }
+    res.type("image/jpeg");
+    res.sendFile(file, { headers: IMAGE_HEADERS });
+  } catch (error) {
+    if (error.status) {
+      return res.status(error.status).json({ error: error.message });
+    }
+    console.error("Get screenshot thumbnail error:", error);
+    res.status(500).json({ error: "Failed to render thumbnail" });
+  }
+});
+
+module.exports = router;
@@ -0,0 +1,27 @@
+// backend/routes/sync.js - Delta sync for desktop and mobile clients
+const express = require("express");
+const changeSync = require("../services/changeSync");
+const { authMiddleware } = require("../middleware/auth");
+
+const router = express.Router();
+
+router.use(authMiddleware);
+
+// GET /api/sync/changes - Time entries, projects and tasks changed since a cursor
+// Without a cursor every record is returned as "created"; keep pulling with
+// the returned cursor while has_more is true, then store it for next time.
+router.get("/changes", async (req, res) => {
+  try {
+    const { cursor, limit } = req.query;
+    const result = await changeSync.changesSince(req.user, cursor || null, limit);
+    res.json(result);
+  } catch (error) {
+    if (error.status) {
+      return res.status(error.status).json({ error: error.message });
+    }
+    console.error("Get sync changes error:", error);
+    res.status(500).json({ error: "Failed to fetch changes" });
+  }
+});
+
+module.exports = router;
@@ -5,12 +5,113 @@ const TimeEntry = require("../models/TimeEntry");
 const Task = require("../models/Task");
 const Project = require("../models/Project");
 const User = require("../models/User");
+const Screenshot = require("../models/Screenshot");
 const { authMiddleware } = require("../middleware/auth");
+const { cacheResponse, bumpOnWrite } = require("../middleware/responseCache");
+const timeRollup = require("../services/timeRollup");
+const entryCounters = require("../services/entryCounters");
+const entryIngest = require("../services/entryIngest");
+const activeTimers = require("../services/activeTimers");
+const { logger } = require("../services/logger");
 
 const router = express.Router();
 
+const MAX_ENTRIES_PAGE = 100;
+
+// Opaque keyset cursor for GET /entries: the (start_time, id) of the last entry
+const encodeEntriesCursor = (entry) =>
+  Buffer.from(
+    JSON.stringify({ t: entry.start_time.toISOString(), id: entry.id })
+  ).toString("base64url");
+
+const decodeEntriesCursor = (cursor) => {
+  try {
+    const { t, id } = JSON.parse(Buffer.from(cursor, "base64url").toString());
+    const startTime = new Date(t);
+    if (typeof id !== "string" || isNaN(startTime.getTime())) {
+      return null;
+    }
+    return { start_time: startTime, id };
+  } catch (error) {
+    return null;
+  }
+};
+
+// Rollup failures must not fail the write; `npm run rollups:rebuild` repairs drift
+const syncRollup = async (update) => {
+  try {
+    await update();
+  } catch (error) {
+    console.warn("Failed to update time rollup:", error);
+  }
+};
+
+// Same for project/task counters; the periodic reconciliation repairs drift
+const syncCounters = async (update) => {
+  try {
+    await update();
+  } catch (error) {
+    console.warn("Failed to update project/task counters:", error);
+  }
+};
+
+// Same for the active timer registry and its Socket.IO pushes; a restart
+// reloads the registry from the open entries
+const syncActiveTimer = async (update) => {
+  try {
+    await update();
+  } catch (error) {
+    console.warn("Failed to update active timer registry:", error);
+  }
+};
+
+// Same for the screenshot records of a deleted entry; records left behind only
+// stop `npm run screenshots:gc` from collecting their images
+const syncScreenshots = async (update) => {
+  try {
+    await update();
+  } catch (error) {
+    console.warn("Failed to delete entry screenshots:", error);
+  }
+};
+
+// The user's running timer from the registry, or from MongoDB while the
+// registry is still loading (or unreachable)
+const findActiveTimer = async (user) => {
+  try {
+    const timer = await activeTimers.get(user.organizationId, user.id);
+    if (timer !== undefined) return timer;
+  } catch (error) {
+    console.warn("Active timer registry lookup failed:", error);
+  }
+
+  const activeEntry = await TimeEntry.findOne({
+    organizationId: user.organizationId,
+    user_id: user.id,
+    end_time: null,
+  }).sort({ start_time: -1 });
+  if (!activeEntry) return null;
+
+  const [project, task] = await Promise.all([
+    Project.findOne({ id: activeEntry.project_id, organizationId: user.organizationId }),
+    activeEntry.task_id
+      ? Task.findOne({ id: activeEntry.task_id, organizationId: user.organizationId })
+      : null,
+  ]);
+  return {
+    id: activeEntry.id,
+    project_id: activeEntry.project_id,
+    task_id: activeEntry.task_id,
+    description: activeEntry.description,
+    start_time: activeEntry.start_time,
+    project_name: project?.name,
+    task_title: task?.title,
+  };
+};
+
 // Apply auth middleware to all routes
 router.use(authMiddleware);
+router.use(bumpOnWrite);
 
 // DIAGNOSTIC ROUTE - Add this after router.use(authMiddleware);
 router.post("/diagnose", async (req, res) => {
@@ -116,7 +217,7 @@ router.post("/start", async (req, res) => {
   try {
     const { project_id, task_id, description } = req.body;
 
-    console.log("🚀 Starting time tracking:", {
+    logger.debug("Starting time tracking", {
       user: req.user.id,
       project_id,
       task_id,
@@ -127,7 +228,7 @@ router.post("/start", async (req, res) => {
     // Get default project if none provided
     let actualProjectId = project_id;
     if (!actualProjectId) {
-      console.log("🔍 No project provided, finding default project...");
+      logger.debug("No project provided, finding default project");
       const defaultProject = await Project.findOne({
         organizationId: req.user.organizationId,
         status: "active"
@@ -135,7 +236,7 @@ router.post("/start", async (req, res) => {
       
       if (defaultProject) {
         actualProjectId = defaultProject.id;
-        console.log(`🎯 Using default project: ${defaultProject.name} (${actualProjectId})`);
+        logger.debug(`Using default project: ${defaultProject.name} (${actualProjectId})`);
       } else {
         return res.status(400).json({
           error: "No active projects found. Please create a project first.",
@@ -199,11 +300,7 @@ router.post("/start", async (req, res) => {
     }
 
     // Check if user already has an active entry
-    const activeEntry = await TimeEntry.findOne({
-      organizationId: req.user.organizationId,
-      user_id: req.user.id,
-      end_time: null,
-    });
+    const activeEntry = await findActiveTimer(req.user);
 
     if (activeEntry) {
       return res.status(400).json({
@@ -237,7 +334,7 @@ router.post("/start", async (req, res) => {
       task.status = "in_progress";
       task.startedAt = new Date();
       await task.save();
-      console.log(`📝 Task status updated to in_progress: ${task.title}`);
+      logger.debug(`Task status updated to in_progress: ${task.title}`);
     }
 
     // Update task time tracking info
@@ -248,7 +345,9 @@ router.post("/start", async (req, res) => {
       await task.save();
     }
 
-    console.log("✅ Time tracking started successfully:", {
+    await syncActiveTimer(() => activeTimers.started(timeEntry, { project, task }));
+
+    logger.debug("Time tracking started", {
       entryId: timeEntry.id,
       project: project.name,
       task: task?.title,
@@ -290,78 +389,66 @@ router.post("/stop/:entryId", async (req, res) => {
   try {
     const { entryId } = req.params;
 
-    console.log("🛑 Stopping time tracking:", {
+    logger.debug("Stopping time tracking", {
       entryId,
       user: req.user.id,
       organizationId: req.user.organizationId,
     });
 
     // Find the active time entry
-    const timeEntry = await TimeEntry.findOne({
+    const activeFilter = {
       id: entryId,
       organizationId: req.user.organizationId,
       user_id: req.user.id,
       end_time: null,
-    });
+    };
+    const activeEntry = await TimeEntry.findOne(activeFilter)
+      .select("start_time hourly_rate billable")
+      .lean();
 
-    if (!timeEntry) {
+    if (!activeEntry) {
       return res.status(404).json({
         error: "Active time entry not found",
       });
     }
 
-    // Calculate duration and stop the entry
+    // Calculate duration and stop the entry (same rules as the save hooks)
     const endTime = new Date();
-    const duration = Math.round((endTime - timeEntry.start_time) / 1000); // in seconds
-    const totalAmount = (duration / 3600) * (timeEntry.hourly_rate || 0);
-
-    timeEntry.end_time = endTime;
-    timeEntry.duration = duration;
-    timeEntry.total_amount = totalAmount;
-
-    await timeEntry.save();
+    const duration = Math.round((endTime - activeEntry.start_time) / 1000); // in seconds
+    const totalAmount =
+      activeEntry.billable && activeEntry.hourly_rate > 0
+        ? (duration / 3600) * activeEntry.hourly_rate
+        : 0;
+
+    // Only the request that flips end_time applies the deltas below; a
+    // concurrent or retried stop finds nothing to update
+    const timeEntry = await TimeEntry.findOneAndUpdate(
+      activeFilter,
+      {
+        $set: {
+          end_time: endTime,
+          duration,
+          total_amount: totalAmount,
+          updatedAt: endTime,
+        },
+      },
+      { new: true }
+    );
 
-    // Update task time tracking info if applicable
-    if (timeEntry.task_id) {
-      const task = await Task.findOne({
-        id: timeEntry.task_id,
-        organizationId: req.user.organizationId,
+    if (!timeEntry) {
+      return res.status(404).json({
+        error: "Active time entry not found",
       });
-
-      if (task) {
-        task.timeTracking.isActive = false;
-        task.timeTracking.activeEntryId = null;
-        task.timeTracking.totalTracked += duration;
-
-        // Update actual hours if task has updateTimeTracking method
-        if (task.updateTimeTracking) {
-          await task.updateTimeTracking();
-        }
-
-        await task.save();
-
-        console.log(
-          `📝 Task time tracking updated: ${task.title} (+${Math.round(
-            duration / 60
-          )} minutes)`
-        );
-      }
     }
 
-    // Update project stats if project has updateStats method
-    try {
-      const project = await Project.findOne({
-        id: timeEntry.project_id,
-        organizationId: req.user.organizationId,
-      });
-      if (project && project.updateStats) {
-        await project.updateStats();
-      }
-    } catch (projectError) {
-      console.warn("Failed to update project stats:", projectError);
-    }
+    await Promise.all([
+      syncRollup(() => timeRollup.recordEntry(timeEntry)),
+      // Adds the duration to project/task totals and clears the task's active flag
+      syncCounters(() => entryCounters.recordEntry(timeEntry, { stopped: true })),
+      syncActiveTimer(() => activeTimers.stopped(timeEntry)),
+    ]);
 
-    console.log("✅ Time tracking stopped successfully:", {
+    logger.debug("Time tracking stopped", {
       entryId: timeEntry.id,
       duration: `${Math.round(duration / 60)} minutes`,
       totalAmount: `$${totalAmount.toFixed(2)}`,
@@ -386,40 +473,24 @@ router.post("/stop/:entryId", async (req, res) => {
 });
 
 // GET /api/time-tracking/active - Get active time entry
+// Served from the active timer registry; clients listening for
+// time-started / time-stopped on Socket.IO need not poll it at all
 router.get("/active", async (req, res) => {
   try {
-    const activeEntry = await TimeEntry.findOne({
-      organizationId: req.user.organizationId,
-      user_id: req.user.id,
-      end_time: null,
-    }).sort({ start_time: -1 });
+    const activeEntry = await findActiveTimer(req.user);
 
     if (!activeEntry) {
       return res.json(null);
     }
 
-    // Get project and task info
-    const [project, task] = await Promise.all([
-      Project.findOne({
-        id: activeEntry.project_id,
-        organizationId: req.user.organizationId,
-      }),
-      activeEntry.task_id
-        ? Task.findOne({
-            id: activeEntry.task_id,
-            organizationId: req.user.organizationId,
-          })
-        : null,
-    ]);
-
     res.json({
       id: activeEntry.id,
       project_id: activeEntry.project_id,
       task_id: activeEntry.task_id,
       description: activeEntry.description,
       start_time: activeEntry.start_time,
-      project_name: project?.name,
-      task_title: task?.title,
+      project_name: activeEntry.project_name,
+      task_title: activeEntry.task_title,
     });
   } catch (error) {
     console.error("❌ Get active entry error:", error);
@@ -434,14 +505,16 @@ router.get("/entries", async (req, res) => {
   try {
     const {
       limit = 20,
-      page = 1,
+      page,
+      cursor,
+      include_total,
       project_id,
       task_id,
       start_date,
       end_date,
     } = req.query;
 
-    const skip = (page - 1) * limit;
+    const pageSize = Math.min(Math.max(parseInt(limit) || 20, 1), MAX_ENTRIES_PAGE);
     const query = {
       organizationId: req.user.organizationId,
       user_id: req.user.id,
@@ -460,47 +533,92 @@ router.get("/entries", async (req, res) => {
       };
     }
 
+    // Legacy offset paging, kept for clients that still send ?page=
+    const offsetPaging = page !== undefined && !cursor;
+    const pageNumber = Math.max(parseInt(page) || 1, 1);
+    const withTotal = offsetPaging || include_total === "true";
+
+    // Keyset paging: continue strictly after the last (start_time, id) seen
+    const pageQuery = { ...query };
+    if (cursor) {
+      const position = decodeEntriesCursor(cursor);
+      if (!position) {
+        return res.status(400).json({ error: "Invalid cursor" });
+      }
+      pageQuery.$or = [
+        { start_time: { $lt: position.start_time } },
+        { start_time: position.start_time, id: { $lt: position.id } },
+      ];
+    }
+
+    let entriesQuery = TimeEntry.find(pageQuery)
+      .sort({ start_time: -1, id: -1 })
+      .limit(pageSize + 1);
+    if (offsetPaging) {
+      entriesQuery = entriesQuery.skip((pageNumber - 1) * pageSize);
+    }
+
     const [entries, total] = await Promise.all([
-      TimeEntry.find(query)
-        .sort({ start_time: -1 })
-        .limit(parseInt(limit))
-        .skip(skip),
-      TimeEntry.countDocuments(query),
+      entriesQuery,
+      withTotal ? TimeEntry.countDocuments(query) : null,
     ]);
 
-    // Get project and task details for each entry
-    const enrichedEntries = await Promise.all(
-      entries.map(async (entry) => {
-        const [project, task] = await Promise.all([
-          Project.findOne({
-            id: entry.project_id,
+    const hasMore = entries.length > pageSize;
+    if (hasMore) entries.pop();
+
+    // Resolve projects and tasks for the whole page in two queries
+    const projectIds = [...new Set(entries.map((entry) => entry.project_id))];
+    const taskIds = [
+      ...new Set(entries.map((entry) => entry.task_id).filter(Boolean)),
+    ];
+    const [projects, tasks] = await Promise.all([
+      projectIds.length
+        ? Project.find({
+            id: { $in: projectIds },
             organizationId: req.user.organizationId,
-          }),
-          entry.task_id
-            ? Task.findOne({
-                id: entry.task_id,
-                organizationId: req.user.organizationId,
-              })
-            : null,
-        ]);
-
-        return {
-          ...entry.toJSON(),
-          project_name: project?.name,
-          project_client: project?.client,
-          task_title: task?.title,
-        };
-      })
-    );
+          })
+            .select("id name client")
+            .lean()
+        : [],
+      taskIds.length
+        ? Task.find({
+            id: { $in: taskIds },
+            organizationId: req.user.organizationId,
+          })
+            .select("id title")
+            .lean()
+        : [],
+    ]);
+    const projectsById = new Map(projects.map((project) => [project.id, project]));
+    const tasksById = new Map(tasks.map((task) => [task.id, task]));
+
+    const enrichedEntries = entries.map((entry) => {
+      const project = projectsById.get(entry.project_id);
+      const task = entry.task_id ? tasksById.get(entry.task_id) : null;
+
+      return {
+        ...entry.toJSON(),
+        project_name: project?.name,
+        project_client: project?.client,
+        task_title: task?.title,
+      };
+    });
+
+    const lastEntry = entries[entries.length - 1];
+    const pagination = {
+      limit: pageSize,
+      has_more: hasMore,
+      next_cursor: hasMore ? encodeEntriesCursor(lastEntry) : null,
+    };
+    if (withTotal) pagination.total = total;
+    if (offsetPaging) {
+      pagination.page = pageNumber;
+      pagination.pages = Math.ceil(total / pageSize);
+    }
 
     res.json({
       entries: enrichedEntries,
-      pagination: {
-        total,
-        page: parseInt(page),
-        limit: parseInt(limit),
-        pages: Math.ceil(total / limit),
-      },
+      pagination,
     });
   } catch (error) {
     console.error("❌ Get entries error:", error);
@@ -587,6 +705,10 @@ router.post("/manual", async (req, res) => {
     });
 
     await timeEntry.save();
+    await Promise.all([
+      syncRollup(() => timeRollup.recordEntry(timeEntry)),
+      syncCounters(() => entryCounters.recordEntry(timeEntry)),
+    ]);
 
     res.status(201).json({
       message: "Manual time entry created successfully",
@@ -600,30 +722,67 @@ router.post("/manual", async (req, res) => {
   }
 });
 
+// POST /api/time-tracking/bulk - Upload many completed entries at once
+// Offline desktop clients send up to TIME_ENTRY_BULK_MAX entries; each item
+// is reported as created, duplicate (client_id already uploaded) or error.
+router.post("/bulk", async (req, res) => {
+  const { entries } = req.body;
+  if (!Array.isArray(entries) || entries.length === 0) {
+    return res.status(400).json({ error: "entries must be a non-empty array" });
+  }
+  if (entries.length > entryIngest.MAX_ENTRIES) {
+    return res.status(400).json({
+      error: `At most ${entryIngest.MAX_ENTRIES} entries per request`,
+    });
+  }
+
+  try {
+    const { results, inserted } = await entryIngest.ingest(req.user, entries);
+    await Promise.all([
+      syncRollup(() => timeRollup.recordEntries(inserted)),
+      syncCounters(() => entryCounters.recordEntries(inserted)),
+    ]);
+
+    const summary = entryIngest.summarize(results);
+    logger.debug("Bulk time entries ingested", { user: req.user.id, ...summary });
+    res.json({ results, summary });
+  } catch (error) {
+    console.error("❌ Bulk time entry ingest error:", error);
+    res.status(500).json({
+      error: "Failed to ingest time entries",
+    });
+  }
+});
+
 // PUT /api/time-tracking/entries/:entryId - Update time entry
 router.put("/entries/:entryId", async (req, res) => {
   try {
     const { entryId } = req.params;
     const { description, billable, start_time, end_time } = req.body;
 
-    const timeEntry = await TimeEntry.findOne({
+    const entryFilter = {
       id: entryId,
       organizationId: req.user.organizationId,
       user_id: req.user.id,
-    });
+    };
+    const current = await TimeEntry.findOne(entryFilter);
 
-    if (!timeEntry) {
+    if (!current) {
       return res.status(404).json({
         error: "Time entry not found",
       });
     }
 
+    const rollupBefore = timeRollup.snapshot(current);
+    const countersBefore = entryCounters.snapshot(current);
+
     // Update allowed fields
-    if (description !== undefined) timeEntry.description = description;
-    if (billable !== undefined) timeEntry.billable = billable;
+    const changes = { updatedAt: new Date() };
+    if (description !== undefined) changes.description = description;
+    if (billable !== undefined) changes.billable = TimeEntry.castObject({ billable }).billable;
 
     // Handle time changes for completed entries
-    if (timeEntry.end_time && start_time && end_time) {
+    if (current.end_time && start_time && end_time) {
       const newStart = new Date(start_time);
       const newEnd = new Date(end_time);
 
@@ -633,14 +792,43 @@ router.put("/entries/:entryId", async (req, res) => {
         });
       }
 
-      timeEntry.start_time = newStart;
-      timeEntry.end_time = newEnd;
-      timeEntry.duration = Math.round((newEnd - newStart) / 1000);
-      timeEntry.total_amount =
-        (timeEntry.duration / 3600) * (timeEntry.hourly_rate || 0);
+      changes.start_time = newStart;
+      changes.end_time = newEnd;
+      changes.duration = Math.round((newEnd - newStart) / 1000);
     }
 
-    await timeEntry.save();
+    // Same rules as the save hooks
+    const duration = changes.duration ?? current.duration;
+    const isBillable = changes.billable ?? current.billable;
+    changes.total_amount =
+      isBillable && duration > 0 && current.hourly_rate > 0
+        ? (duration / 3600) * current.hourly_rate
+        : 0;
+
+    // The deltas below are taken against `current`, so the write only lands if
+    // the fields they depend on are unchanged; a concurrent edit gets a 409
+    const timeEntry = await TimeEntry.findOneAndUpdate(
+      {
+        ...entryFilter,
+        start_time: current.start_time,
+        end_time: current.end_time,
+        billable: current.billable ? true : { $ne: true },
+      },
+      { $set: changes },
+      { new: true }
+    );
+
+    if (!timeEntry) {
+      return res.status(409).json({
+        error: "Time entry was changed by another request, reload it and try again",
+      });
+    }
+
+    await Promise.all([
+      syncRollup(() => timeRollup.replaceEntry(rollupBefore, timeEntry)),
+      syncCounters(() => entryCounters.replaceEntry(countersBefore, timeEntry)),
+      syncActiveTimer(() => activeTimers.updated(timeEntry)),
+    ]);
 
     res.json({
       message: "Time entry updated successfully",
@@ -678,7 +866,26 @@ router.delete("/entries/:entryId", async (req, res) => {
       });
     }
 
-    await TimeEntry.deleteOne({ id: entryId });
+    const { deletedCount } = await TimeEntry.deleteOne({
+      id: entryId,
+      organizationId: req.user.organizationId,
+    });
+    // A concurrent or repeated delete already removed it and its contribution
+    if (deletedCount !== 1) {
+      return res.status(404).json({
+        error: "Time entry not found",
+      });
+    }
+
+    await Promise.all([
+      syncRollup(() => timeRollup.removeEntry(timeEntry)),
+      syncCounters(() => entryCounters.removeEntry(timeEntry)),
+      syncActiveTimer(() => activeTimers.removed(timeEntry)),
+      // Their files are deleted by `npm run screenshots:gc` once unreferenced
+      syncScreenshots(() =>
+        Screenshot.deleteMany({ organizationId: timeEntry.organizationId, entry_id: entryId })
+      ),
+    ]);
 
     res.json({
       message: "Time entry deleted successfully",
@@ -692,7 +899,7 @@ router.delete("/entries/:entryId", async (req, res) => {
 });
 
 // GET /api/time-tracking/stats - Get time tracking statistics
-router.get("/stats", async (req, res) => {
+router.get("/stats", cacheResponse({ scope: "user" }), async (req, res) => {
   try {
     const { period = "week" } = req.query;
     const now = new Date();
@@ -718,7 +925,7 @@ router.get("/stats", async (req, res) => {
           organizationId: req.user.organizationId,
           user_id: req.user.id,
           start_time: { $gte: startDate },
-          end_time: { $ne: null },
+          end_time: { $type: "date" },
         },
       },
       {
@@ -3,14 +3,22 @@ const express = require("express");
 const { body, validationResult } = require("express-validator");
 const bcrypt = require("bcryptjs");
 const User = require("../models/User");
+const principalCache = require("../services/principalCache");
+const organizationStats = require("../services/organizationStats");
+const { logger } = require("../services/logger");
 const {
   authMiddleware,
   requireAdmin,
   requireManager,
 } = require("../middleware/auth");
+const { cacheResponse, bumpOnWrite } = require("../middleware/responseCache");
 
 const router = express.Router();
 
+// Runs before each route's authMiddleware, but only reads req.user once the
+// response is written
+router.use(bumpOnWrite);
+
 // Get all users (admin/manager only) - FIXED: Organization-scoped
 router.get("/", authMiddleware, requireManager, async (req, res) => {
   try {
@@ -45,7 +53,7 @@ router.get("/", authMiddleware, requireManager, async (req, res) => {
 
     const total = await User.countDocuments(query);
 
-    console.log(
+    logger.debug(
       `Users fetched for organization ${req.user.organizationId}: ${users.length}`
     );
 
@@ -140,6 +148,7 @@ router.put(
         updateData,
         { new: true }
       );
+      principalCache.invalidateUser(req.user.id, req.user.organizationId);
 
       res.json({
         message: "Profile updated successfully",
@@ -187,22 +196,37 @@ router.put(
       if (typeof isActive === "boolean") updateData.isActive = isActive;
 
       // FIXED: Update with organization filter
-      const user = await User.findOneAndUpdate(
-        {
-          id,
-          organizationId: req.user.organizationId,
-        },
-        updateData,
-        {
-          new: true,
-        }
-      );
+      const filter = { id, organizationId: req.user.organizationId };
+
+      // activeUsers only moves for the request whose write flipped isActive
+      let user = null;
+      let activityChanged = false;
+      if ("isActive" in updateData) {
+        user = await User.findOneAndUpdate(
+          { ...filter, isActive: { $ne: updateData.isActive } },
+          updateData,
+          { new: true }
+        );
+        activityChanged = Boolean(user);
+      }
+      if (!user) {
+        user = await User.findOneAndUpdate(filter, updateData, { new: true });
+      }
 
       if (!user) {
         return res
           .status(404)
           .json({ error: "User not found in your organization" });
       }
+      // Role and isActive changes must apply to the user's next request
+      principalCache.invalidateUser(id, req.user.organizationId);
+      if (activityChanged) {
+        await organizationStats.userActivityChanged(
+          req.user.organizationId,
+          !user.isActive,
+          user.isActive
+        );
+      }
 
       res.json({
         message: "User updated successfully",
@@ -263,6 +287,7 @@ router.put(
         },
         { password: hashedPassword }
       );
+      principalCache.invalidateUser(req.user.id, req.user.organizationId);
 
       res.json({ message: "Password updated successfully" });
     } catch (error) {
@@ -293,6 +318,8 @@ router.delete("/:id", authMiddleware, requireAdmin, async (req, res) => {
         .status(404)
         .json({ error: "User not found in your organization" });
     }
+    principalCache.invalidateUser(id, req.user.organizationId);
+    await organizationStats.userRemoved(user);
 
     console.log(
       `User deleted: ${user.email} from organization ${req.user.organizationId}`
@@ -306,7 +333,7 @@ router.delete("/:id", authMiddleware, requireAdmin, async (req, res) => {
 });
 
 // Get team stats - FIXED: Organization-scoped
-router.get("/team/stats", authMiddleware, requireManager, async (req, res) => {
+router.get("/team/stats", authMiddleware, requireManager, cacheResponse(), async (req, res) => {
   try {
     // FIXED: Filter by organization
     const orgQuery = { organizationId: req.user.organizationId };
@@ -327,7 +354,7 @@ router.get("/team/stats", authMiddleware, requireManager, async (req, res) => {
       .limit(5)
       .select("id name email role createdAt");
 
-    console.log(
+    logger.debug(
       `Team stats for organization ${req.user.organizationId}: ${totalUsers} total users`
     );
 
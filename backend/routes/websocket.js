@@ -13,8 +13,10 @@ router.get('/info', authMiddleware, async (req, res) => {
         connection: 'Client connects to WebSocket',
         disconnect: 'Client disconnects from WebSocket',
         'join-team': 'Join a team room for real-time updates',
-        'time-started': 'Broadcast when user starts time tracking',
-        'time-stopped': 'Broadcast when user stops time tracking',
+        'time-started': 'Sent to user-<id> when the user starts time tracking',
+        'time-stopped': 'Sent to user-<id> when the user stops time tracking',
+        'time-updated': 'Sent to user-<id> when the running entry is edited',
+        'active-timer': 'Running timer (or null) sent on connect with auth: { token }',
         'project-updated': 'Broadcast when project is updated',
         'task-assigned': 'Broadcast when task is assigned',
         'team-notification': 'Send notification to team members'
@@ -116,15 +118,23 @@ router.get('/connections', authMiddleware, async (req, res) => {
       return res.status(500).json({ error: 'WebSocket not available' });
     }
     
+    // With a pub/sub adapter attached this includes sockets on every node
     const sockets = await io.fetchSockets();
-    const connections = sockets.map(socket => ({
-      id: socket.id,
-      connected: socket.connected,
-      rooms: Array.from(socket.rooms)
-    }));
+    const nodes = {};
+    const connections = sockets.map(socket => {
+      const node = socket.data.node || 'unknown';
+      nodes[node] = (nodes[node] || 0) + 1;
+      return {
+        id: socket.id,
+        node,
+        connected: socket.connected !== false,
+        rooms: Array.from(socket.rooms)
+      };
+    });
     
     res.json({
       total_connections: connections.length,
+      nodes,
       connections
     });
   } catch (error) {
@@ -0,0 +1,42 @@
+// backend/scripts/backfill-sync.js - Give existing records a delta sync change number
+// Usage: npm run sync:backfill [-- --org <organizationId>]
+// Records written before delta sync existed are invisible to /api/sync/changes
+// until they have one. Safe to run repeatedly.
+const mongoose = require("mongoose");
+require("dotenv").config();
+
+const changeSync = require("../services/changeSync");
+
+const parseOrganizationId = (argv) => {
+  const index = argv.indexOf("--org");
+  return index !== -1 ? argv[index + 1] : null;
+};
+
+const main = async () => {
+  const mongoURL = process.env.MONGO_URL;
+  if (!mongoURL) {
+    throw new Error("MONGO_URL environment variable is not defined");
+  }
+
+  const organizationId = parseOrganizationId(process.argv.slice(2));
+  await mongoose.connect(mongoURL, { serverSelectionTimeoutMS: 30000 });
+
+  const started = Date.now();
+  console.log(
+    `🔄 Backfilling sync change numbers for ${
+      organizationId ? `organization ${organizationId}` : "all organizations"
+    }...`
+  );
+  const totals = await changeSync.backfill(organizationId);
+  console.log(
+    `✅ Stamped ${totals.time_entries} time entries, ${totals.projects} projects ` +
+      `and ${totals.tasks} tasks in ${Date.now() - started}ms`
+  );
+};
+
+main()
+  .catch((error) => {
+    console.error("❌ Sync backfill failed:", error);
+    process.exitCode = 1;
+  })
+  .finally(() => mongoose.disconnect());
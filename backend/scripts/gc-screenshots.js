@@ -0,0 +1,42 @@
+// backend/scripts/gc-screenshots.js - Delete stored screenshot files nothing references
+// Usage: npm run screenshots:gc [-- --dry-run] [-- --grace-minutes 60]
+// Removes images whose screenshots were all deleted (with their entries),
+// their thumbnails, and temporary files of interrupted uploads. Files newer
+// than the grace period are kept, as an upload may still be recording them.
+const mongoose = require("mongoose");
+require("dotenv").config();
+
+const screenshotStore = require("../services/screenshotStore");
+
+const parseArgs = (argv) => {
+  const index = argv.indexOf("--grace-minutes");
+  return {
+    dryRun: argv.includes("--dry-run"),
+    graceMs: index !== -1 ? parseFloat(argv[index + 1]) * 60 * 1000 : undefined,
+  };
+};
+
+const main = async () => {
+  const mongoURL = process.env.MONGO_URL;
+  if (!mongoURL) {
+    throw new Error("MONGO_URL environment variable is not defined");
+  }
+
+  const args = parseArgs(process.argv.slice(2));
+  await mongoose.connect(mongoURL, { serverSelectionTimeoutMS: 30000 });
+
+  console.log(`🧹 Collecting unreferenced screenshots in ${screenshotStore.stats().root}...`);
+  const result = await screenshotStore.collectGarbage({ ...args, log: console.log });
+  console.log(
+    `✅ ${args.dryRun ? "Would remove" : "Removed"} ${result.objects} image(s), ` +
+      `${result.thumbnails} thumbnail(s) and ${result.tmp} temporary file(s), ` +
+      `${(result.bytes / 1024 / 1024).toFixed(1)}MB`
+  );
+};
+
+main()
+  .catch((error) => {
+    console.error("❌ Screenshot garbage collection failed:", error);
+    process.exitCode = 1;
+  })
+  .finally(() => mongoose.disconnect());
@@ -0,0 +1,103 @@
+// backend/scripts/index-advisor.js - Propose indexes from a query profile
+// Usage: npm run indexes:advise -- --report <profile.json> [--live] [--json]
+// The report is the body of GET /api/health/query-profile captured while the
+// profiler was on (QUERY_PROFILE=true, or the Python suite's
+// --query-profile-report). Proposals are checked against the indexes the
+// models declare, or with --live against the ones in MONGO_URL's database.
+// Nothing is changed; add the ones worth keeping as a migration.
+const fs = require("fs");
+const path = require("path");
+const mongoose = require("mongoose");
+require("dotenv").config();
+
+const indexAdvisor = require("../services/indexAdvisor");
+
+const MODELS_DIR = path.join(__dirname, "..", "models");
+
+const parseArgs = (argv) => {
+  const index = argv.indexOf("--report");
+  return {
+    report: index !== -1 ? argv[index + 1] : null,
+    live: argv.includes("--live"),
+    json: argv.includes("--json"),
+  };
+};
+
+const loadModels = () => {
+  for (const file of fs.readdirSync(MODELS_DIR)) {
+    if (file.endsWith(".js")) require(path.join(MODELS_DIR, file));
+  }
+  return mongoose.models;
+};
+
+const indexesOf = async (model, live) => {
+  if (!live) {
+    return [{ name: "_id_", key: { _id: 1 } }, ...indexAdvisor.fromSchema(model.schema)];
+  }
+  return model.collection.indexes().catch(() => []);
+};
+
+const formatKey = (key) =>
+  `{ ${Object.entries(key)
+    .map(([field, direction]) => `${field}: ${direction}`)
+    .join(", ")} }`;
+
+const print = (advice) => {
+  if (!advice.proposals.length) {
+    console.log("✅ Every profiled query shape is served by an existing index");
+  }
+  for (const proposal of advice.proposals) {
+    console.log(`\n➕ ${proposal.model} ${formatKey(proposal.key)}`);
+    if (proposal.options.partialFilterExpression) {
+      console.log(`   partial: ${JSON.stringify(proposal.options.partialFilterExpression)}`);
+    }
+    if (proposal.covering) console.log("   covering: yes");
+    console.log(`   ${proposal.queries} queries, ${proposal.total_ms}ms total`);
+    console.log(`   routes: ${proposal.routes.join(", ")}`);
+    for (const name of proposal.replaces) console.log(`   replaces: ${name}`);
+    for (const rewrite of proposal.rewrites) console.log(`   rewrite queries: ${rewrite}`);
+  }
+  for (const index of advice.redundant) {
+    console.log(`\n➖ ${index.model} ${index.name} (${index.reason})`);
+  }
+  for (const query of advice.unscoped) {
+    console.log(`\n⚠️  ${query.model} query without organizationId from ${query.route}`);
+    console.log(`   ${query.shape}`);
+  }
+  console.log(`\n${advice.served} shape(s) already served by an index`);
+};
+
+const main = async () => {
+  const args = parseArgs(process.argv.slice(2));
+  if (!args.report) {
+    throw new Error("Pass the saved query profile with --report <file>");
+  }
+  const report = JSON.parse(fs.readFileSync(args.report, "utf8"));
+
+  if (args.live) {
+    const mongoURL = process.env.MONGO_URL;
+    if (!mongoURL) {
+      throw new Error("MONGO_URL environment variable is not defined");
+    }
+    await mongoose.connect(mongoURL, { serverSelectionTimeoutMS: 30000 });
+  }
+
+  const models = {};
+  for (const [name, model] of Object.entries(loadModels())) {
+    models[name] = {
+      indexes: await indexesOf(model, args.live),
+      types: indexAdvisor.typesOf(model.schema),
+    };
+  }
+
+  const advice = indexAdvisor.advise(report, models);
+  if (args.json) console.log(JSON.stringify(advice, null, 2));
+  else print(advice);
+};
+
+main()
+  .catch((error) => {
+    console.error("❌ Index advice failed:", error);
+    process.exitCode = 1;
+  })
+  .finally(() => mongoose.disconnect());
@@ -0,0 +1,329 @@
+// backend/scripts/index-benchmark.js - Time entry query latency before and after migration 001
+// Usage: npm run indexes:benchmark [-- --entries 200000 --runs 25 --db <name> --keep --json]
+// Seeds a scratch database on MONGO_URL's server (dropped first and again at
+// the end unless --keep is passed) with the TimeEntry indexes as they were
+// before migration 001, times the analytics and /entries query shapes, then
+// applies the migration and times them again. Query shapes are issued the
+// way the code of each version issues them ($ne: null before, $type after).
+const mongoose = require("mongoose");
+const crypto = require("crypto");
+require("dotenv").config();
+
+const { summarizePlan } = require("../services/queryProfiler");
+const migration = require("../migrations/001-time-entry-query-indexes");
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+const ORGANIZATIONS = 5;
+const USERS_PER_ORGANIZATION = 25;
+const PROJECTS_PER_ORGANIZATION = 20;
+const TASKS_PER_PROJECT = 5;
+const BATCH_SIZE = 5000;
+const WARMUP_RUNS = 3;
+
+// TimeEntry indexes before migration 001
+const BASELINE_INDEXES = [
+  { key: { id: 1 }, unique: true },
+  { key: { organizationId: 1, user_id: 1 } },
+  { key: { organizationId: 1, project_id: 1 } },
+  { key: { organizationId: 1, task_id: 1 } },
+  { key: { organizationId: 1, start_time: -1 } },
+  { key: { organizationId: 1, user_id: 1, start_time: -1, id: -1 } },
+  { key: { organizationId: 1, user_id: 1, end_time: 1 } },
+  {
+    key: { organizationId: 1, user_id: 1, client_id: 1 },
+    unique: true,
+    partialFilterExpression: { client_id: { $type: "string" } },
+  },
+];
+
+const parseArgs = (argv) => {
+  const value = (flag, fallback) => {
+    const index = argv.indexOf(flag);
+    return index !== -1 ? argv[index + 1] : fallback;
+  };
+  return {
+    entries: parseInt(value("--entries", "200000")),
+    runs: parseInt(value("--runs", "25")),
+    db: value("--db", "timetrack_index_benchmark"),
+    keep: argv.includes("--keep"),
+    json: argv.includes("--json"),
+  };
+};
+
+// Deterministic so runs are comparable
+const random = (() => {
+  let state = 0x5eed;
+  return () => {
+    state = (state + 0x6d2b79f5) | 0;
+    let t = Math.imul(state ^ (state >>> 15), 1 | state);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+})();
+const pick = (items) => items[Math.floor(random() * items.length)];
+
+const seed = async (collection, count) => {
+  const now = Date.now();
+  const organizations = Array.from({ length: ORGANIZATIONS }, (_, o) => ({
+    id: `org-${o}`,
+    users: Array.from({ length: USERS_PER_ORGANIZATION }, (_, u) => `org-${o}-user-${u}`),
+    projects: Array.from({ length: PROJECTS_PER_ORGANIZATION }, (_, p) => ({
+      id: `org-${o}-project-${p}`,
+      tasks: Array.from({ length: TASKS_PER_PROJECT }, (_, t) => `org-${o}-project-${p}-task-${t}`),
+    })),
+  }));
+
+  let batch = [];
+  const flush = async () => {
+    if (batch.length) await collection.insertMany(batch, { ordered: false });
+    batch = [];
+  };
+
+  for (let i = 0; i < count; i++) {
+    const organization = pick(organizations);
+    const project = pick(organization.projects);
+    const start = new Date(now - Math.floor(random() * 365 * DAY_MS));
+    const duration = 300 + Math.floor(random() * 4 * 3600);
+    batch.push({
+      id: crypto.randomUUID(),
+      organizationId: organization.id,
+      user_id: pick(organization.users),
+      project_id: project.id,
+      task_id: random() < 0.7 ? pick(project.tasks) : null,
+      description: "Benchmark entry",
+      start_time: start,
+      end_time: new Date(start.getTime() + duration * 1000),
+      duration,
+      is_billable: true,
+      hourly_rate: 50,
+      total_amount: Math.round((duration / 3600) * 50 * 100) / 100,
+      createdAt: start,
+      updatedAt: start,
+    });
+    if (batch.length === BATCH_SIZE) await flush();
+  }
+
+  // One running timer for every fifth user
+  for (const organization of organizations) {
+    organization.users.forEach((user, index) => {
+      if (index % 5) return;
+      batch.push({
+        id: crypto.randomUUID(),
+        organizationId: organization.id,
+        user_id: user,
+        project_id: organization.projects[0].id,
+        task_id: null,
+        start_time: new Date(now - 3600 * 1000),
+        end_time: null,
+        duration: 0,
+        createdAt: new Date(now - 3600 * 1000),
+        updatedAt: new Date(now - 3600 * 1000),
+      });
+    });
+  }
+  await flush();
+  return organizations[0];
+};
+
+// The query shapes the analytics and time-tracking routes issue
+const shapes = (organization) => {
+  const organizationId = organization.id;
+  const user_id = organization.users[1];
+  const project = organization.projects[3];
+  const monthAgo = new Date(Date.now() - 30 * DAY_MS);
+  const weekAgo = new Date(Date.now() - 7 * DAY_MS);
+
+  return [
+    {
+      name: "analytics: organization, last 30 days",
+      aggregate: (completed) => [
+        { $match: { organizationId, start_time: { $gte: monthAgo }, end_time: completed } },
+        { $group: { _id: "$user_id", duration: { $sum: "$duration" } } },
+      ],
+    },
+    {
+      name: "custom report: 3 users, last 30 days",
+      find: (completed) => ({
+        filter: {
+          organizationId,
+          start_time: { $gte: monthAgo, $lte: new Date() },
+          end_time: completed,
+          user_id: { $in: organization.users.slice(0, 3) },
+        },
+      }),
+    },
+    {
+      name: "dashboard: user, last 7 days",
+      aggregate: (completed) => [
+        {
+          $match: { organizationId, user_id, start_time: { $gte: weekAgo }, end_time: completed },
+        },
+        { $group: { _id: null, duration: { $sum: "$duration" } } },
+      ],
+    },
+    {
+      name: "/entries?project_id, first page",
+      find: () => ({
+        filter: { organizationId, user_id, project_id: project.id },
+        sort: { start_time: -1, id: -1 },
+        limit: 51,
+      }),
+    },
+    {
+      name: "/entries?task_id, first page",
+      find: () => ({
+        filter: { organizationId, user_id, task_id: project.tasks[0] },
+        sort: { start_time: -1, id: -1 },
+        limit: 51,
+      }),
+    },
+    {
+      name: "/entries, first page",
+      find: () => ({
+        filter: { organizationId, user_id },
+        sort: { start_time: -1, id: -1 },
+        limit: 51,
+      }),
+    },
+    {
+      name: "/active",
+      find: () => ({ filter: { organizationId, user_id, end_time: null }, limit: 1 }),
+    },
+  ];
+};
+
+const cursorFor = (collection, shape, completed) => {
+  if (shape.aggregate) return collection.aggregate(shape.aggregate(completed));
+  const { filter, sort, limit } = shape.find(completed);
+  let cursor = collection.find(filter);
+  if (sort) cursor = cursor.sort(sort);
+  if (limit) cursor = cursor.limit(limit);
+  return cursor;
+};
+
+// executionStats sits at the top for find and inside $cursor for aggregates
+const executionStatsOf = (explained) => {
+  if (!explained || typeof explained !== "object") return null;
+  if (explained.executionStats) return explained.executionStats;
+  for (const child of Object.values(explained)) {
+    const found = executionStatsOf(child);
+    if (found) return found;
+  }
+  return null;
+};
+
+const percentile = (sorted, p) =>
+  sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+
+const measure = async (collection, organization, completed, runs) => {
+  const results = [];
+  for (const shape of shapes(organization)) {
+    for (let i = 0; i < WARMUP_RUNS; i++) await cursorFor(collection, shape, completed).toArray();
+    const timings = [];
+    let returned = 0;
+    for (let i = 0; i < runs; i++) {
+      const started = process.hrtime.bigint();
+      returned = (await cursorFor(collection, shape, completed).toArray()).length;
+      timings.push(Number(process.hrtime.bigint() - started) / 1e6);
+    }
+    timings.sort((a, b) => a - b);
+
+    const explained = await cursorFor(collection, shape, completed).explain("executionStats");
+    const stats = executionStatsOf(explained) || {};
+    results.push({
+      name: shape.name,
+      p50_ms: Math.round(percentile(timings, 0.5) * 100) / 100,
+      p95_ms: Math.round(percentile(timings, 0.95) * 100) / 100,
+      returned,
+      keys_examined: stats.totalKeysExamined ?? null,
+      docs_examined: stats.totalDocsExamined ?? null,
+      plan: summarizePlan(explained).label,
+    });
+  }
+  return results;
+};
+
+const indexSizes = async (collection) => {
+  const [stats] = await collection.aggregate([{ $collStats: { storageStats: {} } }]).toArray();
+  return {
+    total_bytes: stats.storageStats.totalIndexSize,
+    indexes: stats.storageStats.indexSizes,
+  };
+};
+
+const print = (result) => {
+  console.log(`\n${result.entries} entries, ${result.runs} runs per shape\n`);
+  result.before.queries.forEach((before, index) => {
+    const after = result.after.queries[index];
+    console.log(before.name);
+    for (const [label, run] of [
+      ["before", before],
+      ["after ", after],
+    ]) {
+      console.log(
+        `  ${label} p50 ${run.p50_ms}ms  p95 ${run.p95_ms}ms  keys ${run.keys_examined}  ` +
+          `docs ${run.docs_examined}  ${run.plan}`
+      );
+    }
+  });
+  const mb = (bytes) => `${(bytes / 1024 / 1024).toFixed(1)}MB`;
+  console.log(
+    `\nIndex size: ${mb(result.before.index_size.total_bytes)} before, ` +
+      `${mb(result.after.index_size.total_bytes)} after`
+  );
+  for (const [name, bytes] of Object.entries(result.after.index_size.indexes)) {
+    console.log(`  ${name.padEnd(62)} ${mb(bytes)}`);
+  }
+};
+
+const main = async () => {
+  const mongoURL = process.env.MONGO_URL;
+  if (!mongoURL) {
+    throw new Error("MONGO_URL environment variable is not defined");
+  }
+  const args = parseArgs(process.argv.slice(2));
+  // The database is dropped; never point this at real data
+  if (!args.db.includes("benchmark")) {
+    throw new Error("--db must name a scratch database containing 'benchmark'");
+  }
+
+  await mongoose.connect(mongoURL, { dbName: args.db, serverSelectionTimeoutMS: 30000 });
+  const db = mongoose.connection.db;
+  await db.dropDatabase();
+  const collection = db.collection("timeentries");
+
+  const log = args.json ? () => {} : console.log;
+  log(`🌱 Seeding ${args.entries} time entries into ${args.db}...`);
+  const organization = await seed(collection, args.entries);
+  for (const { key, ...options } of BASELINE_INDEXES) {
+    await collection.createIndex(key, options);
+  }
+
+  log("⏱️  Measuring with the current indexes...");
+  const before = {
+    queries: await measure(collection, organization, { $ne: null }, args.runs),
+    index_size: await indexSizes(collection),
+  };
+
+  log(`🔧 Applying migration ${migration.version} ${migration.name}...`);
+  await migration.up(db, { log: () => {} });
+
+  log("⏱️  Measuring with the migrated indexes...");
+  const after = {
+    queries: await measure(collection, organization, { $type: "date" }, args.runs),
+    index_size: await indexSizes(collection),
+  };
+
+  const result = { entries: args.entries, runs: args.runs, before, after };
+  if (args.json) console.log(JSON.stringify(result, null, 2));
+  else print(result);
+
+  if (!args.keep) await db.dropDatabase();
+};
+
+main()
+  .catch((error) => {
+    console.error("❌ Index benchmark failed:", error);
+    process.exitCode = 1;
+  })
+  .finally(() => mongoose.disconnect());
@@ -0,0 +1,53 @@
+// backend/scripts/migrate.js - Apply pending database migrations
+// Usage: npm run migrate [-- --status] [-- --to <version>]
+// Run before starting a new version; already applied migrations are skipped.
+const mongoose = require("mongoose");
+require("dotenv").config();
+
+const migrations = require("../services/migrations");
+
+const parseArgs = (argv) => {
+  const index = argv.indexOf("--to");
+  return {
+    status: argv.includes("--status"),
+    to: index !== -1 ? parseInt(argv[index + 1]) : Infinity,
+  };
+};
+
+const main = async () => {
+  const mongoURL = process.env.MONGO_URL;
+  if (!mongoURL) {
+    throw new Error("MONGO_URL environment variable is not defined");
+  }
+
+  const args = parseArgs(process.argv.slice(2));
+  await mongoose.connect(mongoURL, { serverSelectionTimeoutMS: 30000 });
+  const db = mongoose.connection.db;
+
+  if (args.status) {
+    for (const { version, name, applied_at } of await migrations.status(db)) {
+      console.log(
+        `${String(version).padStart(3, "0")} ${name.padEnd(40)} ${
+          applied_at ? applied_at.toISOString() : "pending"
+        }`
+      );
+    }
+    return;
+  }
+
+  const started = Date.now();
+  console.log("🔄 Applying pending migrations...");
+  const ran = await migrations.migrate(db, { to: args.to });
+  console.log(
+    ran.length
+      ? `✅ Applied ${ran.length} migration(s) in ${Date.now() - started}ms`
+      : "✅ Database is up to date"
+  );
+};
+
+main()
+  .catch((error) => {
+    console.error("❌ Migration failed:", error);
+    process.exitCode = 1;
+  })
+  .finally(() => mongoose.disconnect());
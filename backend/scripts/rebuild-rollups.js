@@ -0,0 +1,37 @@
+// backend/scripts/rebuild-rollups.js - Rebuild or backfill the TimeRollup collection
+// Usage: npm run rollups:rebuild [-- --org <organizationId>]
+const mongoose = require("mongoose");
+require("dotenv").config();
+
+const timeRollup = require("../services/timeRollup");
+
+const parseOrganizationId = (argv) => {
+  const index = argv.indexOf("--org");
+  return index !== -1 ? argv[index + 1] : null;
+};
+
+const main = async () => {
+  const mongoURL = process.env.MONGO_URL;
+  if (!mongoURL) {
+    throw new Error("MONGO_URL environment variable is not defined");
+  }
+
+  const organizationId = parseOrganizationId(process.argv.slice(2));
+  await mongoose.connect(mongoURL, { serverSelectionTimeoutMS: 30000 });
+
+  const started = Date.now();
+  console.log(
+    `🔄 Rebuilding time rollups for ${
+      organizationId ? `organization ${organizationId}` : "all organizations"
+    }...`
+  );
+  const count = await timeRollup.rebuild(organizationId);
+  console.log(`✅ ${count} rollup rows written in ${Date.now() - started}ms`);
+};
+
+main()
+  .catch((error) => {
+    console.error("❌ Rollup rebuild failed:", error);
+    process.exitCode = 1;
+  })
+  .finally(() => mongoose.disconnect());
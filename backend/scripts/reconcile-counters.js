@@ -0,0 +1,45 @@
+// backend/scripts/reconcile-counters.js - Recompute Project.stats and Task time counters
+// Usage: npm run counters:reconcile [-- --org <organizationId>]
+const mongoose = require("mongoose");
+require("dotenv").config();
+
+const entryCounters = require("../services/entryCounters");
+
+const parseOrganizationId = (argv) => {
+  const index = argv.indexOf("--org");
+  return index !== -1 ? argv[index + 1] : null;
+};
+
+const main = async () => {
+  const mongoURL = process.env.MONGO_URL;
+  if (!mongoURL) {
+    throw new Error("MONGO_URL environment variable is not defined");
+  }
+
+  const organizationId = parseOrganizationId(process.argv.slice(2));
+  await mongoose.connect(mongoURL, { serverSelectionTimeoutMS: 30000 });
+
+  const started = Date.now();
+  console.log(
+    `🔄 Reconciling project and task counters for ${
+      organizationId ? `organization ${organizationId}` : "all organizations"
+    }...`
+  );
+  const { projects, tasks } = await entryCounters.reconcile(organizationId);
+  console.log(
+    `✅ Projects: ${projects.corrected}/${projects.checked} corrected, ` +
+      `tasks: ${tasks.corrected}/${tasks.checked} corrected in ${
+        Date.now() - started
+      }ms` +
+      (projects.skipped || tasks.skipped
+        ? ` (${projects.skipped + tasks.skipped} changed meanwhile, left for the next run)`
+        : "")
+  );
+};
+
+main()
+  .catch((error) => {
+    console.error("❌ Counter reconciliation failed:", error);
+    process.exitCode = 1;
+  })
+  .finally(() => mongoose.disconnect());
@@ -3,12 +3,11 @@ const express = require("express");
 const cors = require("cors");
 const helmet = require("helmet");
 const compression = require("compression");
-const morgan = require("morgan");
 const mongoose = require("mongoose");
 const rateLimit = require("express-rate-limit");
-const winston = require("winston");
 const http = require("http");
 const socketIo = require("socket.io");
+const { monitorEventLoopDelay } = require("perf_hooks");
 
 // Load environment variables
 require("dotenv").config();
@@ -22,6 +21,27 @@ const analyticsRoutes = require("./routes/analytics");
 const integrationRoutes = require("./routes/integrations");
 const websocketRoutes = require("./routes/websocket");
 const invitationRoutes = require("./routes/invitations");
+const syncRoutes = require("./routes/sync");
+const activityRoutes = require("./routes/activity");
+const screenshotRoutes = require("./routes/screenshots");
+const principalCache = require("./services/principalCache");
+const timeRollup = require("./services/timeRollup");
+const entryCounters = require("./services/entryCounters");
+const organizationStats = require("./services/organizationStats");
+const reportJobs = require("./services/reportJobs");
+const responseCache = require("./middleware/responseCache");
+const socketAdapter = require("./services/socketAdapter");
+const clusterBus = require("./services/clusterBus");
+const clusterWorker = require("./services/clusterWorker");
+const { logger, setLevel } = require("./services/logger");
+const requestLog = require("./middleware/requestLog");
+const metrics = require("./services/metrics");
+const queryProfiler = require("./services/queryProfiler");
+const activeTimers = require("./services/activeTimers");
+const activitySamples = require("./services/activitySamples");
+const screenshotStore = require("./services/screenshotStore");
+const thumbnailPool = require("./services/thumbnailPool");
+const { authMiddleware, authenticateToken, requireAdmin } = require("./middleware/auth");
 
 // Create Express app
 const app = express();
@@ -44,29 +64,12 @@ const io = socketIo(server, {
   },
 });
 
+metrics.observeSocketIO(io);
+activeTimers.attach(io);
+
 // Make sure WebSocket is running on the same port as your API
 //console.log(`WebSocket server running on port ${PORT}`);
 
-// Configure logging
-const logger = winston.createLogger({
-  level: "info",
-  format: winston.format.combine(
-    winston.format.timestamp(),
-    winston.format.errors({ stack: true }),
-    winston.format.json()
-  ),
-  transports: [
-    new winston.transports.File({ filename: "error.log", level: "error" }),
-    new winston.transports.File({ filename: "combined.log" }),
-    new winston.transports.Console({
-      format: winston.format.combine(
-        winston.format.colorize(),
-        winston.format.simple()
-      ),
-    }),
-  ],
-});
-
 // Enhanced rate limiting with different rules for different endpoints
 const createRateLimit = (windowMs, max, message) => {
   return rateLimit({
@@ -86,26 +89,33 @@ const createRateLimit = (windowMs, max, message) => {
 };
 
 // Different rate limits for different endpoint types
+// Limits can be raised through the environment for load testing
 const authLimiter = createRateLimit(
   15 * 60 * 1000, // 15 minutes
-  100, // 100 auth attempts per 15 minutes (increased for testing)
+  parseInt(process.env.RATE_LIMIT_AUTH_MAX) || 100, // 100 auth attempts per 15 minutes (increased for testing)
   "Too many authentication attempts, please try again later"
 );
 
 const generalLimiter = createRateLimit(
   1 * 60 * 1000, // 1 minute
-  1000, // 1000 requests per minute (increased for testing)
+  parseInt(process.env.RATE_LIMIT_GENERAL_MAX) || 1000, // 1000 requests per minute (increased for testing)
   "Too many requests, please try again later"
 );
 
 // Middleware
+// One sampled, buffered line per request; see middleware/requestLog
+app.use(requestLog.requestLog);
+// Per-route latency and status counts for GET /api/metrics
+app.use(metrics.trackRequests);
+// Attributes queries to routes while the query profiler is on
+app.use(queryProfiler.trackRoutes);
 app.use(
   helmet({
     crossOriginResourcePolicy: { policy: "cross-origin" },
   })
 );
+app.use(clusterWorker.trackRequests);
 app.use(compression());
-app.use(morgan("combined"));
 
 // CORS configuration - APPLY BEFORE RATE LIMITING
 app.use(
@@ -151,18 +161,10 @@ app.options("*", (req, res) => {
 app.use("/api/auth", authLimiter);
 app.use("/api", generalLimiter);
 
-app.use(express.json({ limit: "50mb" }));
-app.use(express.urlencoded({ extended: true, limit: "50mb" }));
-
-// Debug middleware
-app.use((req, res, next) => {
-  logger.info(`${req.method} ${req.path}`, {
-    origin: req.get("origin"),
-    userAgent: req.get("user-agent"),
-    timestamp: new Date().toISOString(),
-  });
-  next();
-});
+// Bodies are buffered whole; files go through the streaming multipart routes
+const BODY_LIMIT = process.env.JSON_BODY_LIMIT || "5mb";
+app.use(express.json({ limit: BODY_LIMIT }));
+app.use(express.urlencoded({ extended: true, limit: BODY_LIMIT }));
 
 // Enhanced database connection for MongoDB Atlas
 const connectDB = async () => {
@@ -189,6 +191,28 @@ const connectDB = async () => {
 
     await mongoose.connect(mongoURL, options);
     logger.info("MongoDB Atlas connected successfully");
+
+    // Every worker loads its own copy unless the registry is in Redis
+    activeTimers
+      .boot()
+      .then((count) => logger.info(`Active timer registry loaded: ${count} running`))
+      .catch((error) => logger.error("Active timer registry failed to load:", error));
+
+    // In cluster mode only worker 0 runs the background jobs
+    if (clusterWorker.runsBackgroundJobs) {
+      // Backfill analytics rollups in the background on first deploy
+      timeRollup
+        .ensureBuilt()
+        .then((rows) => {
+          if (rows !== null) logger.info(`Time rollups backfilled: ${rows} rows`);
+        })
+        .catch((error) => logger.error("Time rollup backfill failed:", error));
+
+      scheduleCounterReconciliation();
+      if (process.env.ORG_STATS_RECONCILE_DISABLED !== "true") {
+        orgStatsScheduler.start();
+      }
+    }
   } catch (error) {
     logger.error("MongoDB Atlas connection error:", {
       message: error.message,
@@ -222,6 +246,42 @@ const connectDB = async () => {
   }
 };
 
+// Project/task counters are maintained incrementally; periodically correct drift
+const COUNTER_RECONCILE_INTERVAL_MS =
+  parseInt(process.env.COUNTER_RECONCILE_INTERVAL_MS) || 6 * 60 * 60 * 1000;
+let counterReconcileTimer = null;
+
+const scheduleCounterReconciliation = () => {
+  if (counterReconcileTimer || process.env.COUNTER_RECONCILE_DISABLED === "true") {
+    return;
+  }
+
+  let running = false;
+  counterReconcileTimer = setInterval(async () => {
+    if (running) return;
+    running = true;
+    try {
+      const { projects, tasks } = await entryCounters.reconcile();
+      if (projects.corrected || tasks.corrected) {
+        logger.warn("Counter reconciliation corrected drift", { projects, tasks });
+      }
+    } catch (error) {
+      logger.error("Counter reconciliation failed:", error);
+    } finally {
+      running = false;
+    }
+  }, COUNTER_RECONCILE_INTERVAL_MS);
+  counterReconcileTimer.unref();
+};
+
+// Organization.stats is kept current by deltas; recount a few orgs at a time
+const orgStatsScheduler = new organizationStats.ReconciliationScheduler({
+  intervalMs: parseInt(process.env.ORG_STATS_RECONCILE_INTERVAL_MS) || 60 * 1000,
+  batchSize: parseInt(process.env.ORG_STATS_RECONCILE_BATCH_SIZE) || 50,
+  concurrency: parseInt(process.env.ORG_STATS_RECONCILE_CONCURRENCY) || 4,
+  logger,
+});
+
 // Add connection event listeners
 mongoose.connection.on("connected", () => {
   logger.info("Mongoose connected to MongoDB Atlas");
@@ -245,27 +305,53 @@ mongoose.connection.on("error", (err) => {
 });
 
 // Connect to database
-connectDB();
+const databaseReady = connectDB();
 
 // Socket.IO middleware and connection handling
-io.use((socket, next) => {
-  logger.info("Socket.IO connection attempt:", {
+io.use(async (socket, next) => {
+  logger.debug("Socket.IO connection attempt:", {
     id: socket.id,
     origin: socket.handshake.headers.origin,
   });
-  next();
+
+  // Clients that connect with { auth: { token } } get their own user room for
+  // timer events; anonymous sockets can still join team rooms
+  const token = socket.handshake.auth?.token;
+  if (!token) return next();
+  try {
+    const user = await authenticateToken(token);
+    if (!user) return next(new Error("Invalid token"));
+    socket.data.user_id = user.id;
+    socket.data.organizationId = user.organizationId;
+    next();
+  } catch (error) {
+    next(error);
+  }
 });
 
 io.on("connection", (socket) => {
-  logger.info("New client connected:", socket.id);
+  logger.debug("New client connected:", socket.id);
+  // Lets /api/websocket/connections attribute remote sockets to their node
+  socket.data.node = socketAdapter.NODE_ID;
+
+  if (socket.data.user_id) {
+    socket.join(`user-${socket.data.user_id}`);
+    // Current state on every (re)connect, so clients never need to poll /active
+    activeTimers
+      .get(socket.data.organizationId, socket.data.user_id)
+      .then((timer) => {
+        if (timer !== undefined) socket.emit("active-timer", timer);
+      })
+      .catch((error) => logger.warn("Active timer lookup failed:", error));
+  }
 
   socket.on("join-team", (teamId) => {
     socket.join(`team-${teamId}`);
-    logger.info(`Socket ${socket.id} joined team ${teamId}`);
+    logger.debug(`Socket ${socket.id} joined team ${teamId}`);
   });
 
   socket.on("disconnect", () => {
-    logger.info("Client disconnected:", socket.id);
+    logger.debug("Client disconnected:", socket.id);
   });
 
   socket.on("error", (error) => {
@@ -285,6 +371,9 @@ app.use("/api/analytics", analyticsRoutes);
 app.use("/api/integrations", integrationRoutes);
 app.use("/api/websocket", websocketRoutes);
 app.use("/api/invitations", invitationRoutes);
+app.use("/api/sync", syncRoutes);
+app.use("/api/activity", activityRoutes);
+app.use("/api/screenshots", screenshotRoutes);
 // Add after app.use("/api/invitations", invitationRoutes);
 console.log("Invitation routes loaded successfully");
 // Health check endpoint
@@ -299,6 +388,149 @@ app.get("/api/health", (req, res) => {
   });
 });
 
+// Scrapers and test harnesses; set METRICS_TOKEN to require a bearer token
+const requireMetricsToken = (req, res, next) => {
+  const token = process.env.METRICS_TOKEN;
+  if (token && req.headers.authorization !== `Bearer ${token}`) {
+    return res.status(401).json({ error: "Invalid metrics token" });
+  }
+  next();
+};
+
+// Event loop delay over the last complete window. Only the timer resets this
+// histogram, so polling the runtime endpoint has no side effects.
+const LAG_WINDOW_MS = 10000;
+const toMs = (ns) => Math.round((ns / 1e6) * 100) / 100;
+const eventLoopDelay = monitorEventLoopDelay({ resolution: 20 });
+eventLoopDelay.enable();
+let eventLoopLag = null;
+const lagWindow = setInterval(() => {
+  eventLoopLag = {
+    window_s: LAG_WINDOW_MS / 1000,
+    mean_ms: toMs(eventLoopDelay.mean || 0),
+    p50_ms: toMs(eventLoopDelay.percentile(50)),
+    p99_ms: toMs(eventLoopDelay.percentile(99)),
+    max_ms: toMs(eventLoopDelay.max),
+  };
+  eventLoopDelay.reset();
+}, LAG_WINDOW_MS);
+lagWindow.unref();
+
+// Runtime resource usage for soak testing (soak_test.py polls this)
+app.get("/api/health/runtime", requireMetricsToken, (req, res) => {
+  server.getConnections((error, openSockets) => {
+    const memory = process.memoryUsage();
+
+    res.json({
+      timestamp: new Date().toISOString(),
+      uptime: process.uptime(),
+      pid: process.pid,
+      memory: {
+        rss: memory.rss,
+        heap_total: memory.heapTotal,
+        heap_used: memory.heapUsed,
+        external: memory.external,
+        array_buffers: memory.arrayBuffers,
+      },
+      event_loop_lag: eventLoopLag,
+      open_sockets: error ? null : openSockets,
+      active_resources: process.getActiveResourcesInfo
+        ? process.getActiveResourcesInfo().length
+        : null,
+      socketio: {
+        node: socketAdapter.NODE_ID,
+        clients: io.engine.clientsCount,
+        rooms: io.sockets.adapter.rooms.size,
+      },
+      mongoose: {
+        ready_state: mongoose.connection.readyState,
+        connections: mongoose.connections.length,
+      },
+      logger_transports: logger.transports.length,
+      log_level: logger.level,
+      request_log: requestLog.stats(),
+      principal_cache: principalCache.stats(),
+      org_stats_reconciliation: orgStatsScheduler.stats(),
+      report_jobs: reportJobs.stats(),
+      response_cache: responseCache.stats(),
+      active_timers: activeTimers.stats(),
+      activity_ingest: activitySamples.stats(),
+      screenshot_uploads: screenshotStore.stats(),
+      thumbnails: thumbnailPool.stats(),
+      cluster: clusterWorker.stats(),
+    });
+  });
+});
+
+// Prometheus scrape target
+app.get("/api/metrics", requireMetricsToken, async (req, res) => {
+  try {
+    res.type(metrics.CONTENT_TYPE).send(await metrics.exposition());
+  } catch (error) {
+    logger.error("Metrics exposition failed:", error);
+    res.status(500).json({ error: "Failed to collect metrics" });
+  }
+});
+
+// Log level and request sampling, changeable without a restart
+const loggingSettings = () => ({
+  level: logger.level,
+  sample_rates: requestLog.sampleRates(),
+  request_log: requestLog.stats(),
+});
+
+app.get("/api/health/logging", authMiddleware, requireAdmin, (req, res) => {
+  res.json(loggingSettings());
+});
+
+app.put("/api/health/logging", authMiddleware, requireAdmin, (req, res) => {
+  const { level, sample_rates } = req.body;
+  try {
+    if (level !== undefined) setLevel(level);
+    if (sample_rates !== undefined) requestLog.setSampleRates(String(sample_rates));
+  } catch (error) {
+    return res.status(error.status || 500).json({ error: error.message });
+  }
+  logger.info("Logging settings changed", { level, sample_rates, by: req.user.id });
+  res.json(loggingSettings());
+});
+
+// Slow query profiler: per-route index usage and collection scans
+app.get("/api/health/query-profile", authMiddleware, requireAdmin, async (req, res) => {
+  try {
+    res.json(await queryProfiler.report());
+  } catch (error) {
+    logger.error("Query profile report failed:", error);
+    res.status(500).json({ error: "Failed to collect query profile" });
+  }
+});
+
+app.put("/api/health/query-profile", authMiddleware, requireAdmin, async (req, res) => {
+  const { enabled, slow_ms, reset } = req.body;
+  try {
+    queryProfiler.configure({ enabled, slow_ms });
+  } catch (error) {
+    return res.status(error.status || 500).json({ error: error.message });
+  }
+  if (reset) queryProfiler.reset();
+  logger.info("Query profiler settings changed", { enabled, slow_ms, reset, by: req.user.id });
+  res.json(queryProfiler.settings());
+});
+
+// Per-worker health from the cluster primary (cluster.js); a single process
+// reports itself as the only worker
+app.get("/api/health/cluster", requireMetricsToken, async (req, res) => {
+  if (!clusterWorker.enabled) {
+    return res.json({ clustered: false, workers: [clusterWorker.snapshot()] });
+  }
+
+  const health = await clusterBus.request("cluster:health");
+  if (!health) {
+    return res.status(503).json({ error: "Cluster primary did not respond" });
+  }
+  res.json({ clustered: true, served_by: clusterWorker.index, ...health });
+});
+
 // Root endpoint
 app.get("/", (req, res) => {
   res.json({
@@ -316,7 +548,10 @@ app.get("/", (req, res) => {
       integrations: "/api/integrations",
       websocket: "/api/websocket",
       invitations: "/api/invitations",
+      activity: "/api/activity",
+      screenshots: "/api/screenshots",
       health: "/api/health",
+      metrics: "/api/metrics",
     },
   });
 });
@@ -350,16 +585,41 @@ app.use("*", (req, res) => {
   });
 });
 
-// Graceful shutdown
-const gracefulShutdown = (signal) => {
+// Graceful shutdown: stop taking work, let in-flight requests finish, then
+// release connections. Also how a cluster worker retires on reload.
+const SHUTDOWN_TIMEOUT_MS = parseInt(process.env.SHUTDOWN_TIMEOUT_MS) || 30 * 1000;
+let socketAdapterHandle = null;
+let shuttingDown = false;
+const gracefulShutdown = async (signal) => {
+  if (shuttingDown) return;
+  shuttingDown = true;
   logger.info(`${signal} received, shutting down gracefully`);
-  server.close(() => {
-    logger.info("HTTP server closed");
-    mongoose.connection.close(() => {
-      logger.info("MongoDB connection closed");
-      process.exit(0);
-    });
-  });
+  setTimeout(() => {
+    logger.error("Shutdown timed out, exiting");
+    process.exit(1);
+  }, SHUTDOWN_TIMEOUT_MS).unref();
+
+  clusterWorker.startDraining();
+  // Clients reconnect, through the cluster primary if there is one, elsewhere
+  io.local.disconnectSockets(true);
+  const closed = server.listening
+    ? new Promise((resolve) => server.close(resolve))
+    : Promise.resolve();
+  if (server.closeIdleConnections) server.closeIdleConnections();
+  await Promise.all([closed, clusterWorker.waitForIdle(SHUTDOWN_TIMEOUT_MS)]);
+  logger.info("HTTP server closed");
+
+  if (socketAdapterHandle) {
+    await socketAdapterHandle.close().catch(() => {});
+  }
+  await activeTimers.close().catch(() => {});
+  // Queued activity samples need the connection that is about to close
+  await activitySamples.close().catch(() => {});
+  await thumbnailPool.close().catch(() => {});
+  await mongoose.connection.close();
+  logger.info("MongoDB connection closed");
+  await requestLog.close();
+  process.exit(0);
 };
 
 process.on("SIGTERM", () => gracefulShutdown("SIGTERM"));
@@ -376,12 +636,28 @@ process.on("unhandledRejection", (reason, promise) => {
   process.exit(1);
 });
 
-// Start server
+// Start server once broadcasts can reach the other nodes
 const PORT = process.env.PORT || 8001;
-server.listen(PORT, "0.0.0.0", () => {
-  logger.info(`Server running on port ${PORT}`);
-  logger.info(`Environment: ${process.env.NODE_ENV || "development"}`);
-  logger.info(`Allowed origins: ${allowedOrigins.join(", ")}`);
-});
+socketAdapter
+  .attach(io, { logger })
+  .then((handle) => {
+    socketAdapterHandle = handle;
+    clusterWorker.setup({ server, io, logger, onShutdown: gracefulShutdown });
+    if (clusterWorker.enabled) {
+      // The primary owns PORT and starts routing here once we report ready
+      databaseReady.then(() => clusterWorker.markReady());
+      return;
+    }
+
+    server.listen(PORT, "0.0.0.0", () => {
+      logger.info(`Server running on port ${PORT}`);
+      logger.info(`Environment: ${process.env.NODE_ENV || "development"}`);
+      logger.info(`Allowed origins: ${allowedOrigins.join(", ")}`);
+    });
+  })
+  .catch((error) => {
+    logger.error("Failed to attach Socket.IO adapter:", error);
+    process.exit(1);
+  });
 
 module.exports = app;
@@ -0,0 +1,301 @@
+// backend/services/activeTimers.js - Registry of each user's running timer
+// GET /active and POST /start used to ask MongoDB for the user's open entry
+// on every call. The registry is loaded from the open entries at boot and
+// kept current by the start, stop, edit and delete routes, which also push
+// time-started / time-stopped / time-updated to the user's Socket.IO room
+// (user-<id>) so clients can drop polling. Where it is kept:
+//   ACTIVE_TIMER_BACKEND=memory   this process (default; single node)
+//   ACTIVE_TIMER_BACKEND=cluster  a copy per cluster.js worker, changes relayed
+//                                 over the cluster bus (default there)
+//   ACTIVE_TIMER_BACKEND=redis    a hash in REDIS_URL shared by every node
+//                                 (default with SOCKET_ADAPTER=redis)
+// Changes are recorded from the moment the backend exists, but until the
+// open entries have loaded, callers fall back to querying MongoDB.
+
+const TimeEntry = require("../models/TimeEntry");
+const Project = require("../models/Project");
+const Task = require("../models/Task");
+const clusterBus = require("./clusterBus");
+
+const CHANGE_CHANNEL = "active-timers:change";
+const STOPPED_TTL_MS = 5 * 60 * 1000;
+const REDIS_KEY = process.env.ACTIVE_TIMER_REDIS_KEY || "hubstaff:active-timers";
+
+const keyOf = (organizationId, userId) => `${organizationId}:${userId}`;
+
+// Timers in a Map; the cluster variant applies its peers' changes too. A
+// set for an entry already stopped here (messages from two workers can
+// cross) is ignored.
+class LocalBackend {
+  constructor(bus = null) {
+    this.timers = new Map();
+    this.stopped = new Map(); // entry id -> stopped at
+    this.bus = bus;
+    if (bus) bus.subscribe(CHANGE_CHANNEL, (change) => this.apply(change));
+  }
+
+  apply({ op, key, timer, entryId }) {
+    if (op === "set") {
+      if (!this.stopped.has(timer.id)) this.timers.set(key, timer);
+      return;
+    }
+    this.stopped.set(entryId, Date.now());
+    if (this.timers.get(key)?.id === entryId) this.timers.delete(key);
+    for (const [id, at] of this.stopped) {
+      if (Date.now() - at < STOPPED_TTL_MS) break;
+      this.stopped.delete(id);
+    }
+  }
+
+  change(change) {
+    this.apply(change);
+    if (this.bus) this.bus.publish(CHANGE_CHANNEL, change);
+  }
+
+  async get(key) {
+    return this.timers.get(key) || null;
+  }
+
+  async set(key, timer) {
+    this.change({ op: "set", key, timer });
+  }
+
+  async delete(key, entryId) {
+    this.change({ op: "delete", key, entryId });
+  }
+
+  // Boot load; whatever the routes changed meanwhile wins
+  async load(timers) {
+    for (const [key, timer] of timers) {
+      if (!this.timers.has(key)) this.apply({ op: "set", key, timer });
+    }
+  }
+
+  size() {
+    return this.timers.size;
+  }
+
+  async close() {}
+}
+
+// Deletes a user's field only if it still holds the stopped entry
+const DELETE_IF_ENTRY = `
+local value = redis.call("HGET", KEYS[1], ARGV[1])
+if value and cjson.decode(value).id == ARGV[2] then
+  return redis.call("HDEL", KEYS[1], ARGV[1])
+end
+return 0`;
+
+class RedisBackend {
+  constructor(client) {
+    this.client = client;
+  }
+
+  async get(key) {
+    const value = await this.client.hGet(REDIS_KEY, key);
+    return value ? JSON.parse(value) : null;
+  }
+
+  async set(key, timer) {
+    await this.client.hSet(REDIS_KEY, key, JSON.stringify(timer));
+  }
+
+  async delete(key, entryId) {
+    await this.client.eval(DELETE_IF_ENTRY, {
+      keys: [REDIS_KEY],
+      arguments: [key, entryId],
+    });
+  }
+
+  // Fills in missing timers and drops the ones whose entry was closed while
+  // no node was running (e.g. a crash between the write and the update here)
+  async load(timers, loadedAt) {
+    const open = new Set([...timers.values()].map((timer) => timer.id));
+    const stored = await this.client.hGetAll(REDIS_KEY);
+    const multi = this.client.multi();
+    for (const [key, timer] of timers) {
+      if (!stored[key]) multi.hSetNX(REDIS_KEY, key, JSON.stringify(timer));
+    }
+    for (const [key, value] of Object.entries(stored)) {
+      const timer = JSON.parse(value);
+      if (open.has(timer.id) || new Date(timer.start_time) >= loadedAt) continue;
+      if (timers.has(key)) multi.hSet(REDIS_KEY, key, JSON.stringify(timers.get(key)));
+      else multi.hDel(REDIS_KEY, key);
+    }
+    await multi.exec();
+  }
+
+  async close() {
+    await this.client.quit();
+  }
+}
+
+const createRedisBackend = async () => {
+  let createClient;
+  try {
+    ({ createClient } = require("redis"));
+  } catch (error) {
+    throw new Error("ACTIVE_TIMER_BACKEND=redis requires the redis package");
+  }
+  const client = createClient({ url: process.env.REDIS_URL || "redis://localhost:6379" });
+  client.on("error", (error) => console.warn("Active timer Redis error:", error.message));
+  await client.connect();
+  return new RedisBackend(client);
+};
+
+const backendType = () => {
+  if (process.env.ACTIVE_TIMER_BACKEND) return process.env.ACTIVE_TIMER_BACKEND;
+  if (process.env.SOCKET_ADAPTER === "redis") return "redis";
+  return clusterBus.enabled ? "cluster" : "memory";
+};
+
+let backend = null;
+let ready = false;
+let io = null;
+
+// The JSON /active returns; project and task names are as of the start
+const toTimer = (entry, { project = null, task = null } = {}) => ({
+  id: entry.id,
+  user_id: entry.user_id,
+  project_id: entry.project_id,
+  task_id: entry.task_id || null,
+  description: entry.description,
+  start_time: new Date(entry.start_time).toISOString(),
+  project_name: project?.name,
+  task_title: task?.title,
+});
+
+const emit = (userId, event, payload) => {
+  if (io) io.to(`user-${userId}`).emit(event, payload);
+};
+
+// Creates the backend and loads every open entry; resolves with the count
+const boot = async () => {
+  const type = backendType();
+  if (type === "redis") backend = await createRedisBackend();
+  else if (type === "cluster" || type === "memory") {
+    backend = new LocalBackend(type === "cluster" ? clusterBus : null);
+  } else {
+    throw new Error(
+      `Unknown ACTIVE_TIMER_BACKEND "${type}" (expected memory, cluster or redis)`
+    );
+  }
+
+  const loadedAt = new Date();
+  const entries = await TimeEntry.find({ end_time: { $type: "null" } })
+    .select("id organizationId user_id project_id task_id description start_time")
+    .lean();
+  // One clause per organization, so a project or task id only resolves
+  // inside the organization of the entry that refers to it
+  const byOrganization = (field) => {
+    const ids = new Map();
+    for (const entry of entries) {
+      if (!entry[field]) continue;
+      if (!ids.has(entry.organizationId)) ids.set(entry.organizationId, new Set());
+      ids.get(entry.organizationId).add(entry[field]);
+    }
+    return [...ids].map(([organizationId, set]) => ({ organizationId, id: { $in: [...set] } }));
+  };
+  const lookup = (Model, field, fields) => {
+    const clauses = byOrganization(field);
+    if (!clauses.length) return [];
+    return Model.find({ $or: clauses }).select(`organizationId ${fields}`).lean();
+  };
+  const [projects, tasks] = await Promise.all([
+    lookup(Project, "project_id", "id name"),
+    lookup(Task, "task_id", "id title"),
+  ]);
+  const projectsById = new Map(
+    projects.map((project) => [keyOf(project.organizationId, project.id), project])
+  );
+  const tasksById = new Map(tasks.map((task) => [keyOf(task.organizationId, task.id), task]));
+
+  const timers = new Map();
+  for (const entry of entries) {
+    const key = keyOf(entry.organizationId, entry.user_id);
+    const timer = toTimer(entry, {
+      project: projectsById.get(keyOf(entry.organizationId, entry.project_id)),
+      task: tasksById.get(keyOf(entry.organizationId, entry.task_id)),
+    });
+    // Older data may have several open entries; /active showed the latest
+    if (!timers.has(key) || timers.get(key).start_time < timer.start_time) {
+      timers.set(key, timer);
+    }
+  }
+  await backend.load(timers, loadedAt);
+  ready = true;
+  return timers.size;
+};
+
+// Lets started/stopped/updated push to the user's room on every node
+const attach = (socketServer) => {
+  io = socketServer;
+};
+
+const isReady = () => ready;
+
+// The user's running timer or null; undefined until the registry is loaded
+const get = async (organizationId, userId) => {
+  if (!ready) return undefined;
+  return backend.get(keyOf(organizationId, userId));
+};
+
+const started = async (entry, names) => {
+  const timer = toTimer(entry, names);
+  if (backend) await backend.set(keyOf(entry.organizationId, entry.user_id), timer);
+  emit(entry.user_id, "time-started", timer);
+};
+
+const stopped = async (entry) => {
+  if (backend) await backend.delete(keyOf(entry.organizationId, entry.user_id), entry.id);
+  emit(entry.user_id, "time-stopped", {
+    id: entry.id,
+    end_time: entry.end_time,
+    duration: entry.duration,
+    total_amount: entry.total_amount,
+  });
+};
+
+// An edited running entry keeps the names it was started with
+const updated = async (entry) => {
+  if (entry.end_time) return;
+  const key = keyOf(entry.organizationId, entry.user_id);
+  const current = backend ? await backend.get(key) : null;
+  const timer = {
+    ...toTimer(entry),
+    project_name: current?.project_name,
+    task_title: current?.task_title,
+  };
+  if (backend) await backend.set(key, timer);
+  emit(entry.user_id, "time-updated", timer);
+};
+
+// Only completed entries can be deleted today; a no-op unless that changes
+const removed = async (entry) => {
+  if (backend) await backend.delete(keyOf(entry.organizationId, entry.user_id), entry.id);
+};
+
+// Timer count is only known locally without a round trip to Redis
+const stats = () => ({
+  backend: backendType(),
+  ready,
+  timers: ready && backend instanceof LocalBackend ? backend.size() : null,
+});
+
+const close = async () => {
+  if (backend) await backend.close();
+};
+
+module.exports = {
+  LocalBackend,
+  boot,
+  attach,
+  isReady,
+  get,
+  started,
+  stopped,
+  updated,
+  removed,
+  stats,
+  close,
+};
@@ -0,0 +1,251 @@
+// backend/services/activitySamples.js - Buffered ingest of per-minute activity samples
+// Desktop trackers post a batch of samples every few minutes. Batches are
+// validated against their entry's window and queued in memory; a flush writes
+// the queue to the ActivitySample time-series collection with one unordered
+// insertMany and adds each entry's active and sampled seconds to its counters,
+// recomputing activity_level from them in the same update, so the entry
+// document never grows. Samples for an already completed entry move its
+// hourly rollup too. A flush runs every ACTIVITY_FLUSH_INTERVAL_MS, or as soon
+// as ACTIVITY_FLUSH_SIZE samples are waiting; whatever is queued when the
+// process stops cleanly is flushed by close().
+
+const ActivitySample = require("../models/ActivitySample");
+const TimeEntry = require("../models/TimeEntry");
+const timeRollup = require("./timeRollup");
+const dataVersion = require("./dataVersion");
+
+const MAX_SAMPLES = parseInt(process.env.ACTIVITY_BATCH_MAX) || 600;
+const FLUSH_SIZE = parseInt(process.env.ACTIVITY_FLUSH_SIZE) || 5000;
+const FLUSH_INTERVAL_MS = parseInt(process.env.ACTIVITY_FLUSH_INTERVAL_MS) || 2000;
+const BUFFER_MAX = parseInt(process.env.ACTIVITY_BUFFER_MAX) || 50000;
+const MINUTE_MS = 60 * 1000;
+
+let queue = [];
+let flushing = null;
+let timer = null;
+const counts = { accepted: 0, written: 0, dropped: 0, flushes: 0, failed_flushes: 0 };
+
+const minuteStart = (date) => new Date(Math.floor(date.getTime() / MINUTE_MS) * MINUTE_MS);
+
+const isCount = (value, max = Infinity) =>
+  typeof value === "number" && Number.isFinite(value) && value >= 0 && value <= max;
+
+// Validates one batch against the entry it belongs to. Samples must fall in
+// the entry's window (to the minute); a running entry's window is open.
+const normalize = (entry, samples) => {
+  const accepted = [];
+  const rejected = [];
+  const from = minuteStart(new Date(entry.start_time)).getTime();
+  const to = entry.end_time ? new Date(entry.end_time).getTime() : Date.now() + MINUTE_MS;
+  const meta = {
+    organizationId: entry.organizationId,
+    user_id: entry.user_id,
+    entry_id: entry.id,
+    project_id: entry.project_id,
+  };
+
+  samples.forEach((sample, index) => {
+    const reject = (error) => rejected.push({ index, error });
+    if (!sample || typeof sample !== "object") return reject("Sample must be an object");
+
+    const timestamp = new Date(sample.timestamp);
+    if (!sample.timestamp || isNaN(timestamp.getTime())) {
+      return reject("timestamp must be an ISO date");
+    }
+    const minute = minuteStart(timestamp);
+    if (minute.getTime() < from || minute.getTime() > to) {
+      return reject("timestamp is outside the time entry");
+    }
+
+    const seconds = sample.seconds ?? 60;
+    if (!isCount(seconds, 60) || seconds < 1) {
+      return reject("seconds must be between 1 and 60");
+    }
+    if (!isCount(sample.active_seconds, seconds)) {
+      return reject("active_seconds must be between 0 and seconds");
+    }
+    for (const field of ["keyboard", "mouse"]) {
+      if (sample[field] !== undefined && !isCount(sample[field])) {
+        return reject(`${field} must be a non-negative number`);
+      }
+    }
+
+    accepted.push({
+      minute,
+      meta,
+      seconds,
+      active_seconds: sample.active_seconds,
+      keyboard: sample.keyboard || 0,
+      mouse: sample.mouse || 0,
+    });
+  });
+
+  return { accepted, rejected };
+};
+
+// activity_level = active / sampled seconds, both kept on the entry so a
+// late batch updates the level without reading the samples back
+const applyToEntries = async (docs) => {
+  const totals = new Map();
+  for (const doc of docs) {
+    const total = totals.get(doc.meta.entry_id) || {
+      organizationId: doc.meta.organizationId,
+      active: 0,
+      sampled: 0,
+    };
+    total.active += doc.active_seconds;
+    total.sampled += doc.seconds;
+    totals.set(doc.meta.entry_id, total);
+  }
+
+  const organizations = new Set();
+  for (const [id, total] of totals) {
+    const active = { $add: [{ $ifNull: ["$activity_active_seconds", 0] }, total.active] };
+    const sampled = { $add: [{ $ifNull: ["$activity_sampled_seconds", 0] }, total.sampled] };
+    const before = await TimeEntry.findOneAndUpdate(
+      { id, organizationId: total.organizationId },
+      [
+        {
+          $set: {
+            activity_active_seconds: active,
+            activity_sampled_seconds: sampled,
+            activity_level: {
+              $round: [{ $multiply: [{ $divide: [active, sampled] }, 100] }, 0],
+            },
+          },
+        },
+      ],
+      { new: false }
+    ).lean();
+    if (!before) continue; // deleted since the batch was accepted
+
+    organizations.add(total.organizationId);
+    if (before.end_time) {
+      const activeSeconds = (before.activity_active_seconds || 0) + total.active;
+      const sampledSeconds = (before.activity_sampled_seconds || 0) + total.sampled;
+      try {
+        await timeRollup.replaceEntry(timeRollup.snapshot(before), {
+          ...before,
+          activity_level: Math.round((activeSeconds / sampledSeconds) * 100),
+        });
+      } catch (error) {
+        console.warn("Time rollup update failed:", error.message);
+      }
+    }
+  }
+  organizations.forEach((organizationId) => dataVersion.bump(organizationId));
+};
+
+// Puts samples back at the head of the queue, dropping what does not fit
+const requeue = (docs) => {
+  const room = Math.max(0, BUFFER_MAX - queue.length);
+  counts.dropped += Math.max(0, docs.length - room);
+  queue = docs.slice(0, room).concat(queue);
+};
+
+const writeQueue = async () => {
+  let stop = false;
+  while (queue.length) {
+    let docs = queue.splice(0, FLUSH_SIZE);
+    try {
+      await ActivitySample.insertMany(docs, { ordered: false, lean: true });
+    } catch (error) {
+      counts.failed_flushes++;
+      console.warn("Activity sample flush failed:", error.message);
+      // An unordered insert reports the documents it could not write; only
+      // those are retried, so the written ones are not stored twice
+      const failed = new Set((error.writeErrors || []).map((writeError) => writeError.index));
+      requeue(failed.size ? docs.filter((doc, index) => failed.has(index)) : docs);
+      docs = failed.size ? docs.filter((doc, index) => !failed.has(index)) : [];
+      stop = true;
+    }
+    counts.written += docs.length;
+    try {
+      if (docs.length) await applyToEntries(docs);
+    } catch (error) {
+      console.warn("Activity level update failed:", error.message);
+    }
+    // The rest waits for the next flush rather than failing again now
+    if (stop) return;
+  }
+};
+
+// One flush at a time; a call during a flush waits for it and flushes again
+const flush = async () => {
+  while (flushing) await flushing;
+  if (!queue.length) return;
+  counts.flushes++;
+  flushing = writeQueue().finally(() => {
+    flushing = null;
+  });
+  await flushing;
+};
+
+const schedule = () => {
+  if (timer) return;
+  timer = setInterval(() => flush().catch(() => {}), FLUSH_INTERVAL_MS);
+  timer.unref();
+};
+
+// Queues a batch for an entry the caller has checked belongs to the user
+const ingest = (entry, samples) => {
+  if (!Array.isArray(samples) || !samples.length) {
+    throw Object.assign(new Error("samples must be a non-empty array"), { status: 400 });
+  }
+  if (samples.length > MAX_SAMPLES) {
+    throw Object.assign(new Error(`A batch may contain at most ${MAX_SAMPLES} samples`), {
+      status: 413,
+    });
+  }
+  if (queue.length + samples.length > BUFFER_MAX) {
+    throw Object.assign(new Error("Activity ingest is busy, retry shortly"), { status: 503 });
+  }
+
+  const { accepted, rejected } = normalize(entry, samples);
+  queue.push(...accepted);
+  counts.accepted += accepted.length;
+  schedule();
+  if (queue.length >= FLUSH_SIZE && !flushing) flush().catch(() => {});
+  return { accepted: accepted.length, rejected };
+};
+
+// Active and sampled seconds per hour of day in the given timezone
+const activityByHour = ({ organizationId, user_id, startDate, endDate, timezone = "UTC" }) => {
+  const match = {
+    "meta.organizationId": organizationId,
+    minute: { $gte: startDate, $lte: endDate },
+  };
+  if (user_id) match["meta.user_id"] = user_id;
+  return ActivitySample.aggregate([
+    { $match: match },
+    {
+      $group: {
+        _id: { $hour: { date: "$minute", timezone } },
+        active_seconds: { $sum: "$active_seconds" },
+        sampled_seconds: { $sum: "$seconds" },
+      },
+    },
+  ]);
+};
+
+const stats = () => ({
+  queued: queue.length,
+  flushing: Boolean(flushing),
+  ...counts,
+});
+
+const close = async () => {
+  if (timer) clearInterval(timer);
+  timer = null;
+  await flush();
+};
+
+module.exports = {
+  MAX_SAMPLES,
+  normalize,
+  ingest,
+  flush,
+  activityByHour,
+  stats,
+  close,
+};
@@ -0,0 +1,382 @@
+// backend/services/changeSync.js - Change sequence and delta sync for clients
+// Every save, insert or query update of a time entry, project or task takes
+// the next number from its organization's change sequence
+// (Organization.syncSequence), and every delete leaves a SyncTombstone with
+// one. changesSince() returns what a client has not seen yet in sequence
+// order, so desktop and mobile clients refresh with small incremental pulls
+// instead of re-fetching whole lists. Writes that only touch derived counters
+// (project stats, task tracked time) are not changes.
+
+const Organization = require("../models/Organization");
+const SyncTombstone = require("../models/SyncTombstone");
+
+const MAX_PAGE = 1000;
+// Sequence numbers are taken before the write commits, so a lower number can
+// become visible after a higher one. The cursor only moves past changes older
+// than this, on the assumption that no write takes longer to commit; newer
+// changes are returned but delivered again on the next pull.
+const SETTLE_MS = parseInt(process.env.SYNC_SETTLE_MS) || 3000;
+const CURSOR_TTL_MS = SyncTombstone.TOMBSTONE_TTL_DAYS * 24 * 3600 * 1000;
+
+// Each process reserves numbers from the organization document in blocks, so
+// most writes take their number without a round trip to that (shared, hot)
+// document. A block is only handed out for a third of SETTLE_MS after it was
+// reserved: another process's higher numbers were reserved later, so by the
+// time a cursor can move past them every number of this block has been used
+// and committed. Numbers left when the lease ends are skipped.
+const BLOCK_SIZE = parseInt(process.env.SYNC_SEQUENCE_BLOCK) || 100;
+const LEASE_MS = Math.floor(SETTLE_MS / 3);
+const blocks = new Map(); // organizationId -> { next, end, expiresAt } or its reservation
+
+const reserve = async (organizationId, size) => {
+  const expiresAt = Date.now() + LEASE_MS;
+  const organization = await Organization.findOneAndUpdate(
+    { id: organizationId },
+    { $inc: { syncSequence: size } },
+    { new: true, projection: { syncSequence: 1 } }
+  ).lean();
+  if (!organization) {
+    throw new Error(`Organization ${organizationId} not found`);
+  }
+  const end = organization.syncSequence + 1;
+  return { next: end - size, end, expiresAt };
+};
+
+// Take `count` consecutive sequence numbers; resolves with the first one
+const allocate = async (organizationId, count = 1) => {
+  for (;;) {
+    const block = blocks.get(organizationId);
+    if (block instanceof Promise) {
+      await block.catch(() => {});
+      continue;
+    }
+    if (block && block.expiresAt > Date.now() && block.end - block.next >= count) {
+      const first = block.next;
+      block.next += count;
+      return first;
+    }
+
+    const reservation = reserve(organizationId, Math.max(count, BLOCK_SIZE));
+    blocks.set(organizationId, reservation);
+    try {
+      blocks.set(organizationId, await reservation);
+    } catch (error) {
+      blocks.delete(organizationId);
+      throw error;
+    }
+  }
+};
+
+// Stamp documents with consecutive numbers from their organization's sequence
+const stamp = async (docs) => {
+  const byOrganization = new Map();
+  for (const doc of docs) {
+    const group = byOrganization.get(doc.organizationId) || [];
+    group.push(doc);
+    byOrganization.set(doc.organizationId, group);
+  }
+
+  const at = new Date();
+  await Promise.all(
+    [...byOrganization].map(async ([organizationId, group]) => {
+      const first = await allocate(organizationId, group.length);
+      group.forEach((doc, offset) => {
+        if (typeof doc.set === "function") {
+          doc.set("sync", { seq: first + offset, at });
+        } else {
+          doc.sync = { seq: first + offset, at };
+        }
+      });
+    })
+  );
+};
+
+// Paths an update writes, for operator updates and update pipelines alike
+const updatedPaths = (update) => {
+  if (Array.isArray(update)) {
+    return update.flatMap((stage) => [
+      ...Object.keys(stage.$set || stage.$addFields || {}),
+      ...[].concat(stage.$unset || []),
+    ]);
+  }
+  return Object.entries(update).flatMap(([key, value]) =>
+    key.startsWith("$") ? Object.keys(value || {}) : [key]
+  );
+};
+
+const withSync = (update, sync) => {
+  const fields = { "sync.seq": sync.seq, "sync.at": sync.at };
+  if (Array.isArray(update)) return [...update, { $set: fields }];
+  return { ...update, $set: { ...(update.$set || {}), ...fields } };
+};
+
+// Schema plugin for the synced models. `ignore` lists derived paths whose
+// changes alone do not make a save a change; `userField` scopes the records
+// to their owner.
+const plugin = (schema, { type, ignore = [], userField = null }) => {
+  schema.add({
+    sync: {
+      seq: { type: Number, select: false },
+      at: { type: Date, select: false },
+    },
+  });
+  schema.index(
+    userField
+      ? { organizationId: 1, [userField]: 1, "sync.seq": 1 }
+      : { organizationId: 1, "sync.seq": 1 }
+  );
+
+  const ignored = ["updatedAt", "sync", ...ignore];
+  const isDerived = (path) =>
+    ignored.some((prefix) => path === prefix || path.startsWith(`${prefix}.`));
+
+  schema.pre("save", async function () {
+    if (this.isNew || this.directModifiedPaths().some((path) => !isDerived(path))) {
+      await stamp([this]);
+    }
+  });
+
+  schema.pre("insertMany", function (next, docs) {
+    stamp(Array.isArray(docs) ? docs : [docs]).then(() => next(), next);
+  });
+
+  // Query updates (counters, activity levels, screenshot ids) bypass the save
+  // hook. A single-document update gets the next number in the same write.
+  schema.pre(
+    ["updateOne", "findOneAndUpdate"],
+    { document: false, query: true },
+    async function () {
+      const update = this.getUpdate();
+      if (!update || !updatedPaths(update).some((path) => !isDerived(path))) return;
+
+      let organizationId = this.getFilter().organizationId;
+      if (typeof organizationId !== "string") {
+        const record = await this.model.findOne(this.getFilter()).select("organizationId").lean();
+        if (!record) return;
+        organizationId = record.organizationId;
+      }
+      const sync = { seq: await allocate(organizationId), at: new Date() };
+      this.setUpdate(withSync(update, sync));
+    }
+  );
+
+  // updateMany cannot give each document its own number in one write, so
+  // the matched documents are stamped one by one after it
+  schema.pre("updateMany", { document: false, query: true }, async function () {
+    const update = this.getUpdate();
+    if (!update || !updatedPaths(update).some((path) => !isDerived(path))) return;
+    this._syncUpdated = await this.model.find(this.getFilter()).select("id organizationId").lean();
+  });
+
+  schema.post("updateMany", { document: false, query: true }, async function (result) {
+    const updated = this._syncUpdated || [];
+    if (updated.length === 0 || result?.matchedCount === 0) return;
+
+    try {
+      await stamp(updated);
+      await this.model.collection.bulkWrite(
+        updated.map((record) => ({
+          updateOne: { filter: { _id: record._id }, update: { $set: { sync: record.sync } } },
+        })),
+        { ordered: false }
+      );
+    } catch (error) {
+      console.warn(`Failed to record ${type} update for sync:`, error);
+    }
+  });
+
+  // Remember what a delete removes so the post hook can leave tombstones
+  schema.pre(
+    ["deleteOne", "deleteMany"],
+    { document: false, query: true },
+    async function () {
+      const fields = ["id", "organizationId", userField].filter(Boolean).join(" ");
+      const query = this.model.find(this.getFilter()).select(fields).lean();
+      this._syncDeleted = await (this.op === "deleteOne" ? query.limit(1) : query);
+    }
+  );
+
+  schema.post(
+    ["deleteOne", "deleteMany"],
+    { document: false, query: true },
+    async function (result) {
+      const deleted = this._syncDeleted || [];
+      if (deleted.length === 0 || result?.deletedCount === 0) return;
+
+      try {
+        const tombstones = deleted.map((record) => ({
+          organizationId: record.organizationId,
+          type,
+          record_id: record.id,
+          user_id: userField ? record[userField] : null,
+        }));
+        await stamp(tombstones);
+        await SyncTombstone.insertMany(
+          tombstones.map(({ sync, ...tombstone }) => ({
+            ...tombstone,
+            seq: sync.seq,
+            deleted_at: sync.at,
+          }))
+        );
+      } catch (error) {
+        console.warn(`Failed to record ${type} deletion for sync:`, error);
+      }
+    }
+  );
+};
+
+const encodeCursor = (seq, issuedAt = Date.now()) =>
+  Buffer.from(JSON.stringify({ s: seq, t: issuedAt })).toString("base64url");
+
+const decodeCursor = (cursor) => {
+  try {
+    const { s, t } = JSON.parse(Buffer.from(cursor, "base64url").toString());
+    if (!Number.isInteger(s) || s < 0 || !Number.isFinite(t)) return null;
+    return { seq: s, issuedAt: t };
+  } catch (error) {
+    return null;
+  }
+};
+
+const recordJSON = (doc) => {
+  const { sync, _id, __v, ...record } = doc.toJSON();
+  return record;
+};
+
+// Changes the user can see after `cursor` (from a previous pull, or null for
+// a full sync), oldest first. Throws a 400 for a malformed cursor and a 410
+// once its tombstones may have expired.
+const changesSince = async (user, cursor, limit = 500) => {
+  // Lazy requires: these models load this module for the plugin
+  const TimeEntry = require("../models/TimeEntry");
+  const Project = require("../models/Project");
+  const Task = require("../models/Task");
+
+  let since = 0;
+  let issuedAt = null;
+  if (cursor) {
+    const position = decodeCursor(cursor);
+    if (!position) {
+      const error = new Error("Invalid cursor");
+      error.status = 400;
+      throw error;
+    }
+    if (Date.now() - position.issuedAt > CURSOR_TTL_MS) {
+      const error = new Error("Sync cursor expired, start a full sync");
+      error.status = 410;
+      throw error;
+    }
+    ({ seq: since, issuedAt } = position);
+  }
+
+  const pageSize = Math.min(Math.max(parseInt(limit) || 500, 1), MAX_PAGE);
+  const { organizationId } = user;
+  const after = { organizationId, "sync.seq": { $gt: since } };
+  const page = (model, filter) =>
+    model
+      .find(filter)
+      .select("+sync.seq +sync.at")
+      .sort({ "sync.seq": 1 })
+      .limit(pageSize + 1);
+
+  const [entries, projects, tasks, tombstones] = await Promise.all([
+    page(TimeEntry, { ...after, user_id: user.id }),
+    page(Project, after),
+    page(Task, after),
+    // A full sync has nothing to delete
+    cursor
+      ? SyncTombstone.find({
+          organizationId,
+          seq: { $gt: since },
+          user_id: { $in: [null, user.id] },
+        })
+          .sort({ seq: 1 })
+          .limit(pageSize + 1)
+          .lean()
+      : [],
+  ]);
+
+  // A record the client last saw before it existed is new to it
+  const upserts = (type, docs) =>
+    docs.map((doc) => ({
+      seq: doc.sync.seq,
+      at: doc.sync.at,
+      type,
+      op: issuedAt === null || doc.createdAt > issuedAt ? "created" : "updated",
+      id: doc.id,
+      record: recordJSON(doc),
+    }));
+  const merged = [
+    ...upserts("time_entry", entries),
+    ...upserts("project", projects),
+    ...upserts("task", tasks),
+    ...tombstones.map((tombstone) => ({
+      seq: tombstone.seq,
+      at: tombstone.deleted_at,
+      type: tombstone.type,
+      op: "deleted",
+      id: tombstone.record_id,
+      record: null,
+    })),
+  ].sort((a, b) => a.seq - b.seq);
+
+  const changes = merged.slice(0, pageSize);
+  const settled = Date.now() - SETTLE_MS;
+  let next = since;
+  for (const change of changes) {
+    if (change.at > settled) break;
+    next = change.seq;
+  }
+
+  return {
+    changes: changes.map(({ at, ...change }) => change),
+    cursor: encodeCursor(next),
+    // Unsettled changes hold the cursor back; pull again after a moment
+    has_more: merged.length > pageSize && next > since,
+  };
+};
+
+// Give records written before delta sync existed a sequence number
+const backfill = async (organizationId = null) => {
+  const TimeEntry = require("../models/TimeEntry");
+  const Project = require("../models/Project");
+  const Task = require("../models/Task");
+
+  const totals = {};
+  for (const [name, model] of Object.entries({
+    time_entries: TimeEntry,
+    projects: Project,
+    tasks: Task,
+  })) {
+    const filter = { "sync.seq": { $exists: false } };
+    if (organizationId) filter.organizationId = organizationId;
+    totals[name] = 0;
+
+    let batch;
+    do {
+      batch = await model.find(filter).select("_id organizationId").limit(500).lean();
+      await stamp(batch);
+      if (batch.length > 0) {
+        await model.bulkWrite(
+          batch.map(({ _id, sync }) => ({
+            updateOne: {
+              filter: { _id, "sync.seq": { $exists: false } },
+              update: { $set: { sync } },
+            },
+          })),
+          { ordered: false }
+        );
+      }
+      totals[name] += batch.length;
+    } while (batch.length === 500);
+  }
+  return totals;
+};
+
+module.exports = {
+  MAX_PAGE,
+  plugin,
+  allocate,
+  changesSince,
+  backfill,
+};
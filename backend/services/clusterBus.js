@@ -0,0 +1,123 @@
+// backend/services/clusterBus.js - Message bus between cluster workers
+// Under cluster.js every worker keeps its own caches, report jobs and
+// Socket.IO state. Workers publish over their IPC channel and the primary
+// relays each message to every other worker; request() asks the peers (or
+// the primary itself) and resolves with the first non-null answer, gather()
+// with every peer's answer. Outside cluster mode there are no peers: publish
+// is a no-op, request() resolves with null and gather() with [].
+
+const cluster = require("cluster");
+const { EventEmitter } = require("events");
+const { v4: uuidv4 } = require("uuid");
+
+const enabled = cluster.isWorker && typeof process.send === "function";
+const DEFAULT_REQUEST_TIMEOUT_MS = 5000;
+
+const channels = new EventEmitter();
+channels.setMaxListeners(0);
+const responders = new Map(); // channel -> handler(payload)
+const pending = new Map(); // request id -> { resolve, timer }
+let published = 0;
+let received = 0;
+let requests = 0;
+let timeouts = 0;
+
+// A closed IPC channel (primary gone, worker exiting) must not throw
+const send = (message) => {
+  if (!enabled || !process.connected) return;
+  process.send(message, (error) => {
+    if (error) console.warn("Cluster bus send failed:", error.message);
+  });
+};
+
+const publish = (channel, message) => {
+  if (!enabled) return;
+  published++;
+  send({ type: "bus:publish", channel, message });
+};
+
+const subscribe = (channel, handler) => {
+  channels.on(channel, handler);
+  return () => channels.off(channel, handler);
+};
+
+const respond = (channel, handler) => {
+  responders.set(channel, handler);
+};
+
+const ask = (channel, payload, timeoutMs, gather) => {
+  requests++;
+  const id = uuidv4();
+  return new Promise((resolve) => {
+    const timer = setTimeout(() => {
+      pending.delete(id);
+      timeouts++;
+      resolve(gather ? [] : null);
+    }, timeoutMs);
+    timer.unref();
+    pending.set(id, { resolve, timer });
+    send({ type: "bus:request", id, channel, payload, gather });
+  });
+};
+
+// Resolves with the first non-null answer from a peer, or null once every
+// peer has answered null or the timeout passes
+const request = (channel, payload, { timeoutMs = DEFAULT_REQUEST_TIMEOUT_MS } = {}) =>
+  enabled ? ask(channel, payload, timeoutMs, false) : Promise.resolve(null);
+
+// Resolves with the non-null answers of every peer that replied before the
+// primary's timeout
+const gather = (channel, payload, { timeoutMs = DEFAULT_REQUEST_TIMEOUT_MS } = {}) =>
+  enabled ? ask(channel, payload, timeoutMs, true) : Promise.resolve([]);
+
+const answer = async ({ id, channel, payload }) => {
+  const handler = responders.get(channel);
+  let result = null;
+  if (handler) {
+    try {
+      result = (await handler(payload)) ?? null;
+    } catch (error) {
+      console.warn(`Cluster bus responder for ${channel} failed:`, error);
+    }
+  }
+  send({ type: "bus:reply", id, result });
+};
+
+if (enabled) {
+  process.on("message", (message) => {
+    if (!message || typeof message.type !== "string") return;
+
+    if (message.type === "bus:publish") {
+      received++;
+      channels.emit(message.channel, message.message);
+    } else if (message.type === "bus:request") {
+      answer(message);
+    } else if (message.type === "bus:response") {
+      const request = pending.get(message.id);
+      if (request) {
+        pending.delete(message.id);
+        clearTimeout(request.timer);
+        request.resolve(message.result ?? null);
+      }
+    }
+  });
+}
+
+const stats = () => ({
+  enabled,
+  published,
+  received,
+  requests,
+  timeouts,
+  pending: pending.size,
+});
+
+module.exports = {
+  enabled,
+  publish,
+  subscribe,
+  respond,
+  request,
+  gather,
+  stats,
+};
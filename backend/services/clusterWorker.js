@@ -0,0 +1,167 @@
+// backend/services/clusterWorker.js - Worker side of cluster mode
+// Under cluster.js the primary owns PORT and hands each accepted connection
+// to a worker over IPC, together with the bytes it read to route it. Workers
+// report their Socket.IO sessions back for sticky routing, send a health
+// snapshot every few seconds, and drain in-flight requests when the primary
+// retires them during a rolling restart.
+
+const { monitorEventLoopDelay } = require("perf_hooks");
+const clusterBus = require("./clusterBus");
+
+const enabled = clusterBus.enabled;
+const index = enabled ? parseInt(process.env.CLUSTER_WORKER_INDEX) || 0 : 0;
+const HEALTH_INTERVAL_MS = parseInt(process.env.CLUSTER_HEALTH_INTERVAL_MS) || 5000;
+const SID_PATTERN = /[?&]sid=[\w-]+/; // as cluster.js matches it in the request line
+
+// Background schedulers run on one worker rather than once per core
+const runsBackgroundJobs = !enabled || index === 0;
+
+const eventLoopDelay = monitorEventLoopDelay({ resolution: 20 });
+let io = null;
+let ready = false;
+let draining = false;
+let inFlight = 0;
+let served = 0;
+
+const send = (message) => {
+  if (enabled && process.connected) {
+    process.send(message, () => {});
+  }
+};
+
+// Count requests so health reports load and shutdown can wait for them
+const trackRequests = (req, res, next) => {
+  inFlight++;
+  served++;
+  // Keep-alive clients reconnect through the primary to a live worker
+  if (draining) res.setHeader("Connection", "close");
+
+  let finished = false;
+  const done = () => {
+    if (finished) return;
+    finished = true;
+    inFlight--;
+  };
+  res.on("finish", done);
+  res.on("close", done);
+  next();
+};
+
+const toMs = (ns) => Math.round((ns / 1e6) * 100) / 100;
+
+const snapshot = () => {
+  const memory = process.memoryUsage();
+  const lag = {
+    mean_ms: toMs(eventLoopDelay.mean || 0),
+    p99_ms: toMs(eventLoopDelay.percentile(99)),
+    max_ms: toMs(eventLoopDelay.max),
+  };
+  eventLoopDelay.reset();
+
+  return {
+    index,
+    pid: process.pid,
+    ready,
+    draining,
+    uptime: process.uptime(),
+    memory: { rss: memory.rss, heap_used: memory.heapUsed },
+    event_loop_lag: lag,
+    in_flight: inFlight,
+    requests_served: served,
+    socketio_clients: io ? io.engine.clientsCount : 0,
+    reported_at: new Date().toISOString(),
+  };
+};
+
+const reportHealth = () => send({ type: "health", health: snapshot() });
+
+// Wire the worker into the primary; a no-op outside cluster mode
+const setup = ({ server, io: socketServer, logger, onShutdown }) => {
+  io = socketServer;
+  eventLoopDelay.enable();
+  if (!enabled) return;
+
+  process.on("message", (message, connection) => {
+    if (!message || typeof message.type !== "string") return;
+
+    if (message.type === "sticky:connection" && connection) {
+      // Replay the bytes the primary read while choosing this worker
+      server.emit("connection", connection);
+      connection.unshift(Buffer.from(message.data, "base64"));
+      connection.resume();
+    } else if (message.type === "shutdown") {
+      onShutdown("cluster shutdown");
+    }
+  });
+
+  // Without the primary there is nobody to route connections here
+  process.on("disconnect", () => {
+    if (!draining) onShutdown("primary disconnected");
+  });
+
+  io.engine.on("connection", (socket) => {
+    send({ type: "sticky:register", sid: socket.id });
+    socket.once("close", () => send({ type: "sticky:unregister", sid: socket.id }));
+  });
+
+  // The primary routes per connection, by the sid of the first request. An
+  // engine.io poll must not leave its connection open for a poll of another
+  // session, which may live on another worker; other requests keep their
+  // keep-alive connection. Registered on the HTTP server because /socket.io/
+  // responses never reach express; upgrades never pass through "request".
+  const pollPrefix = `${io.path()}/`;
+  server.prependListener("request", (req, res) => {
+    if (req.url.startsWith(pollPrefix) && SID_PATTERN.test(req.url)) {
+      res.setHeader("Connection", "close");
+    }
+  });
+
+  const timer = setInterval(reportHealth, HEALTH_INTERVAL_MS);
+  timer.unref();
+  logger.info(`Cluster worker ${index} (pid ${process.pid}) started`);
+};
+
+const markReady = () => {
+  ready = true;
+  send({ type: "ready" });
+  reportHealth();
+};
+
+const startDraining = () => {
+  draining = true;
+  reportHealth();
+};
+
+// Resolves once in-flight requests finish, or after timeoutMs
+const waitForIdle = (timeoutMs) =>
+  new Promise((resolve) => {
+    const deadline = Date.now() + timeoutMs;
+    const check = () => {
+      if (inFlight === 0 || Date.now() >= deadline) return resolve(inFlight);
+      setTimeout(check, 50);
+    };
+    check();
+  });
+
+const stats = () => ({
+  enabled,
+  index,
+  ready,
+  draining,
+  in_flight: inFlight,
+  requests_served: served,
+  bus: clusterBus.stats(),
+});
+
+module.exports = {
+  enabled,
+  index,
+  runsBackgroundJobs,
+  trackRequests,
+  setup,
+  markReady,
+  startDraining,
+  waitForIdle,
+  snapshot,
+  stats,
+};
@@ -0,0 +1,183 @@
+// backend/services/customReport.js - Custom report query and metrics
+// Shared by POST /reports/custom (inline) and the report job queue. Metrics
+// are aggregated in date-range chunks so long ranges report progress and no
+// single aggregation has to cover a whole year.
+
+const TimeEntry = require("../models/TimeEntry");
+const Project = require("../models/Project");
+const User = require("../models/User");
+
+const DEFAULT_METRICS = ["hours", "activity", "projects"];
+const CHUNK_MS =
+  (parseInt(process.env.REPORT_CHUNK_DAYS) || 31) * 24 * 60 * 60 * 1000;
+
+// Normalized report parameters; throws a 400-style error for invalid input
+const normalizeParams = (body = {}) => {
+  const {
+    start_date,
+    end_date,
+    user_ids = [],
+    project_ids = [],
+    metrics = DEFAULT_METRICS,
+  } = body;
+
+  if (!start_date || !end_date) {
+    const error = new Error("Start date and end date are required");
+    error.status = 400;
+    throw error;
+  }
+
+  const startDate = new Date(start_date);
+  const endDate = new Date(end_date);
+  if (isNaN(startDate.getTime()) || isNaN(endDate.getTime())) {
+    const error = new Error("Invalid start or end date");
+    error.status = 400;
+    throw error;
+  }
+
+  return {
+    start_date,
+    end_date,
+    startDate,
+    endDate,
+    user_ids: Array.isArray(user_ids) ? user_ids : [],
+    project_ids: Array.isArray(project_ids) ? project_ids : [],
+    metrics: Array.isArray(metrics) ? metrics : DEFAULT_METRICS,
+  };
+};
+
+// FIXED: Always filter by organization, and only by users/projects inside it
+const buildQuery = async (organizationId, params) => {
+  const query = {
+    organizationId, // CRITICAL FIX
+    start_time: { $gte: params.startDate, $lte: params.endDate },
+    end_time: { $type: "date" },
+  };
+
+  if (params.user_ids.length > 0) {
+    const orgUsers = await User.find({
+      id: { $in: params.user_ids },
+      organizationId,
+    }).select("id");
+    query.user_id = { $in: orgUsers.map((u) => u.id) };
+  }
+
+  if (params.project_ids.length > 0) {
+    const orgProjects = await Project.find({
+      id: { $in: params.project_ids },
+      organizationId,
+    }).select("id");
+    query.project_id = { $in: orgProjects.map((p) => p.id) };
+  }
+
+  return query;
+};
+
+const aggregateChunk = async (query) => {
+  const [result] = await TimeEntry.aggregate([
+    { $match: query },
+    {
+      $facet: {
+        totals: [
+          {
+            $group: {
+              _id: null,
+              entries: { $sum: 1 },
+              duration: { $sum: { $ifNull: ["$duration", 0] } },
+              activity: { $sum: { $ifNull: ["$activity_level", 0] } },
+            },
+          },
+        ],
+        projects: [
+          {
+            $group: {
+              _id: "$project_id",
+              duration: { $sum: { $ifNull: ["$duration", 0] } },
+            },
+          },
+        ],
+      },
+    },
+  ]).allowDiskUse(true);
+  return result;
+};
+
+// Build the report. onProgress(fraction) is called after every chunk.
+const buildReport = async (organizationId, params, { onProgress } = {}) => {
+  const query = await buildQuery(organizationId, params);
+
+  const totals = { entries: 0, duration: 0, activity: 0 };
+  const projectDurations = new Map();
+  const rangeStart = params.startDate.getTime();
+  const rangeEnd = params.endDate.getTime();
+  const chunks = Math.max(1, Math.ceil((rangeEnd - rangeStart) / CHUNK_MS));
+
+  for (let index = 0; index < chunks; index++) {
+    const chunkStart = new Date(rangeStart + index * CHUNK_MS);
+    const last = index === chunks - 1;
+    const chunkEnd = last ? params.endDate : new Date(rangeStart + (index + 1) * CHUNK_MS);
+    const result = await aggregateChunk({
+      ...query,
+      start_time: last
+        ? { $gte: chunkStart, $lte: chunkEnd }
+        : { $gte: chunkStart, $lt: chunkEnd },
+    });
+
+    const chunkTotals = result.totals[0];
+    if (chunkTotals) {
+      totals.entries += chunkTotals.entries;
+      totals.duration += chunkTotals.duration;
+      totals.activity += chunkTotals.activity;
+    }
+    for (const project of result.projects) {
+      projectDurations.set(
+        project._id,
+        (projectDurations.get(project._id) || 0) + project.duration
+      );
+    }
+    if (onProgress) onProgress((index + 1) / chunks);
+  }
+
+  const report = {
+    date_range: {
+      start: params.start_date,
+      end: params.end_date,
+    },
+    filters: {
+      users: params.user_ids,
+      projects: params.project_ids,
+      organization: organizationId,
+    },
+    entry_count: totals.entries,
+    metrics: {},
+  };
+
+  // Calculate requested metrics
+  if (params.metrics.includes("hours")) {
+    report.metrics.total_hours = totals.duration / 3600;
+    report.metrics.avg_daily_hours =
+      report.metrics.total_hours /
+      Math.ceil((params.endDate - params.startDate) / (1000 * 60 * 60 * 24));
+  }
+
+  if (params.metrics.includes("activity")) {
+    report.metrics.avg_activity =
+      totals.entries > 0 ? totals.activity / totals.entries : 0;
+  }
+
+  if (params.metrics.includes("projects")) {
+    report.metrics.projects_worked = projectDurations.size;
+    report.metrics.project_distribution = {};
+    for (const [projectId, duration] of projectDurations) {
+      report.metrics.project_distribution[projectId] = duration / 3600;
+    }
+  }
+
+  return report;
+};
+
+module.exports = {
+  normalizeParams,
+  buildQuery,
+  buildReport,
+};
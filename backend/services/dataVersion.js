@@ -0,0 +1,63 @@
+// backend/services/dataVersion.js - Per-organization data version
+// Every write that can change an organization's reports bumps its version.
+// Cached responses are keyed by the version, so a bump makes every cached
+// response for that organization unreachable without scanning the cache.
+// Cluster workers cache independently, so bumps are replayed on every worker,
+// and with SOCKET_ADAPTER=redis on every other node too (see relayThrough).
+
+const clusterBus = require("./clusterBus");
+
+const BUMP_CHANNEL = "data-version:bump";
+const versions = new Map();
+let bumps = 0;
+let remote = null;
+
+const get = (organizationId) => versions.get(organizationId) || 0;
+
+const increment = (organizationId) => {
+  versions.set(organizationId, get(organizationId) + 1);
+  bumps++;
+};
+
+clusterBus.subscribe(BUMP_CHANNEL, increment);
+
+const bump = (organizationId) => {
+  if (!organizationId) return;
+  increment(organizationId);
+  clusterBus.publish(BUMP_CHANNEL, organizationId);
+  if (remote) remote(organizationId);
+};
+
+// Relay bumps to and from other nodes over a pub/sub transport; a node
+// ignores its own messages. Resolves with a function that stops relaying.
+const relayThrough = async ({ origin, publish, subscribe }) => {
+  await subscribe((message) => {
+    try {
+      const { from, organizationId } = JSON.parse(message);
+      if (from !== origin && organizationId) increment(organizationId);
+    } catch (error) {
+      console.warn("Ignoring malformed data version bump:", error.message);
+    }
+  });
+  const relay = (organizationId) =>
+    Promise.resolve(publish(JSON.stringify({ from: origin, organizationId }))).catch(
+      (error) => console.warn("Failed to relay data version bump:", error.message)
+    );
+  remote = relay;
+  return () => {
+    if (remote === relay) remote = null;
+  };
+};
+
+const stats = () => ({
+  organizations: versions.size,
+  bumps,
+  relayed: Boolean(remote),
+});
+
+module.exports = {
+  get,
+  bump,
+  relayThrough,
+  stats,
+};
@@ -0,0 +1,374 @@
+// backend/services/entryCounters.js - Incremental Project.stats and Task.timeTracking counters
+// Completing, editing or deleting an entry applies its contribution to the
+// project, task and organization counters as one atomic update each, so timer
+// stop no longer re-runs aggregations over the whole project history.
+// reconcile() recomputes the counters from TimeEntry and Task and corrects
+// any drift.
+
+const Project = require("../models/Project");
+const Task = require("../models/Task");
+const TimeEntry = require("../models/TimeEntry");
+const organizationStats = require("./organizationStats");
+
+// The parts of an entry the counters depend on, or null for running timers
+const snapshot = (entry) => {
+  if (!entry || !entry.end_time) {
+    return null;
+  }
+
+  const duration = entry.duration || 0;
+  return {
+    organizationId: entry.organizationId,
+    project_id: entry.project_id,
+    task_id: entry.task_id || null,
+    duration,
+    billable_duration: entry.billable ? duration : 0,
+    earnings: entry.total_amount || 0,
+  };
+};
+
+const sameSnapshot = (a, b) =>
+  a === b ||
+  (a !== null &&
+    b !== null &&
+    a.duration === b.duration &&
+    a.billable_duration === b.billable_duration &&
+    a.earnings === b.earnings);
+
+// Task.totalAmount is derived from billableHours in a pre-save hook, so the
+// task side is an update pipeline that increments and re-derives it atomically
+const taskUpdate = (duration, billableDuration, taskSet) => {
+  const add = (field, delta) => ({ $add: [{ $ifNull: [field, 0] }, delta] });
+  return [
+    {
+      $set: {
+        "timeTracking.totalTracked": add("$timeTracking.totalTracked", duration),
+        actualHours: add("$actualHours", duration / 3600),
+        billableHours: add("$billableHours", billableDuration / 3600),
+        ...taskSet,
+      },
+    },
+    {
+      $set: {
+        totalAmount: {
+          $multiply: ["$billableHours", { $ifNull: ["$hourlyRate", 0] }],
+        },
+      },
+    },
+  ];
+};
+
+const apply = async (contribution, sign, taskSet = {}) => {
+  const { organizationId, project_id, task_id } = contribution;
+  const duration = sign * contribution.duration;
+
+  await Promise.all([
+    Project.updateOne(
+      { id: project_id, organizationId },
+      {
+        $inc: {
+          "stats.totalTimeTracked": duration,
+          "stats.totalEarnings": sign * contribution.earnings,
+        },
+        $set: { "stats.lastActivity": new Date() },
+      }
+    ),
+    task_id
+      ? Task.updateOne(
+          { id: task_id, organizationId },
+          taskUpdate(duration, sign * contribution.billable_duration, taskSet)
+        )
+      : null,
+    organizationStats.timeTracked(organizationId, duration),
+  ]);
+};
+
+// Add a completed entry. A stopped timer also clears the task's active flag.
+// The deltas are not idempotent: call this (and removeEntry) only from the
+// write that actually completed or deleted the entry, as the conditional
+// stop and delete in routes/time-tracking do.
+const recordEntry = async (entry, { stopped = false } = {}) => {
+  const contribution = snapshot(entry);
+  if (!contribution) {
+    return;
+  }
+
+  const taskSet = stopped
+    ? { "timeTracking.isActive": false, "timeTracking.activeEntryId": null }
+    : {};
+  await apply(contribution, 1, taskSet);
+};
+
+// Add many completed entries (bulk ingest): contributions are summed per
+// project, task and organization and written with one bulkWrite each
+const recordEntries = async (entries) => {
+  const projects = new Map();
+  const tasks = new Map();
+  const organizations = new Map();
+  const add = (map, key, contribution) => {
+    const totals = map.get(key) || {
+      contribution,
+      duration: 0,
+      billable_duration: 0,
+      earnings: 0,
+    };
+    totals.duration += contribution.duration;
+    totals.billable_duration += contribution.billable_duration;
+    totals.earnings += contribution.earnings;
+    map.set(key, totals);
+  };
+
+  for (const entry of entries) {
+    const contribution = snapshot(entry);
+    if (!contribution) continue;
+    const { organizationId, project_id, task_id } = contribution;
+    add(projects, `${organizationId}|${project_id}`, contribution);
+    if (task_id) add(tasks, `${organizationId}|${task_id}`, contribution);
+    organizations.set(
+      organizationId,
+      (organizations.get(organizationId) || 0) + contribution.duration
+    );
+  }
+
+  await Promise.all([
+    projects.size
+      ? Project.bulkWrite(
+          [...projects.values()].map(({ contribution, duration, earnings }) => ({
+            updateOne: {
+              filter: {
+                id: contribution.project_id,
+                organizationId: contribution.organizationId,
+              },
+              update: {
+                $inc: {
+                  "stats.totalTimeTracked": duration,
+                  "stats.totalEarnings": earnings,
+                },
+                $set: { "stats.lastActivity": new Date() },
+              },
+            },
+          })),
+          { ordered: false }
+        )
+      : null,
+    tasks.size
+      ? Task.bulkWrite(
+          [...tasks.values()].map(({ contribution, duration, billable_duration }) => ({
+            updateOne: {
+              filter: {
+                id: contribution.task_id,
+                organizationId: contribution.organizationId,
+              },
+              update: taskUpdate(duration, billable_duration, {}),
+            },
+          })),
+          { ordered: false }
+        )
+      : null,
+    ...[...organizations].map(([organizationId, duration]) =>
+      organizationStats.timeTracked(organizationId, duration)
+    ),
+  ]);
+};
+
+// Remove a deleted entry
+const removeEntry = async (entry) => {
+  const contribution = snapshot(entry);
+  if (contribution) {
+    await apply(contribution, -1);
+  }
+};
+
+// Adjust for an edited entry; `before` is snapshot(entry) taken prior to the edit
+const replaceEntry = async (before, entry) => {
+  const after = snapshot(entry);
+  if (sameSnapshot(before, after)) {
+    return;
+  }
+  if (before) {
+    await apply(before, -1);
+  }
+  if (after) {
+    await apply(after, 1);
+  }
+};
+
+const round = (value) => Math.round(value * 1e6) / 1e6;
+
+const efficiency = (completedTasks, totalTimeTracked, current) =>
+  totalTimeTracked > 0 && completedTasks > 0
+    ? Math.round((completedTasks / (totalTimeTracked / 3600)) * 100)
+    : current || 0;
+
+// Stats are read before the totals are aggregated, and each correction only
+// matches while the stats still hold the values read. A delta applied in
+// between makes it miss; that document is skipped until the next run rather
+// than overwritten with a total that predates the delta.
+const readAll = async (query) => {
+  const documents = [];
+  for await (const document of query.lean().cursor()) {
+    documents.push(document);
+  }
+  return documents;
+};
+
+const writeCorrections = async (Model, operations) => {
+  if (!operations.length) {
+    return { corrected: 0, skipped: 0 };
+  }
+  const { matchedCount } = await Model.bulkWrite(operations, { ordered: false });
+  return { corrected: matchedCount, skipped: operations.length - matchedCount };
+};
+
+const PROJECT_FIELDS = [
+  "totalTimeTracked",
+  "totalEarnings",
+  "totalTasks",
+  "completedTasks",
+  "efficiency",
+];
+
+const reconcileProjects = async (scope) => {
+  const projects = await readAll(Project.find(scope).select("id stats"));
+  const [timeTotals, taskTotals] = await Promise.all([
+    TimeEntry.aggregate([
+      { $match: { ...scope, end_time: { $type: "date" } } },
+      {
+        $group: {
+          _id: "$project_id",
+          totalTime: { $sum: { $ifNull: ["$duration", 0] } },
+          totalEarnings: { $sum: { $ifNull: ["$total_amount", 0] } },
+        },
+      },
+    ]).allowDiskUse(true),
+    Task.aggregate([
+      { $match: scope },
+      {
+        $group: {
+          _id: "$project_id",
+          total: { $sum: 1 },
+          completed: {
+            $sum: { $cond: [{ $eq: ["$status", "completed"] }, 1, 0] },
+          },
+        },
+      },
+    ]),
+  ]);
+
+  const timeByProject = new Map(timeTotals.map((row) => [row._id, row]));
+  const tasksByProject = new Map(taskTotals.map((row) => [row._id, row]));
+  const operations = [];
+
+  for (const project of projects) {
+    const stats = project.stats || {};
+    const time = timeByProject.get(project.id);
+    const tasks = tasksByProject.get(project.id);
+    const expected = {
+      totalTimeTracked: time?.totalTime || 0,
+      totalEarnings: round(time?.totalEarnings || 0),
+      totalTasks: tasks?.total || 0,
+      completedTasks: tasks?.completed || 0,
+    };
+    expected.efficiency = efficiency(
+      expected.completedTasks,
+      expected.totalTimeTracked,
+      stats.efficiency
+    );
+
+    const drifted = Object.keys(expected).some((field) =>
+      field === "totalEarnings"
+        ? round(stats[field] || 0) !== expected[field]
+        : (stats[field] || 0) !== expected[field]
+    );
+    if (drifted) {
+      const filter = { _id: project._id };
+      const $set = {};
+      for (const field of PROJECT_FIELDS) {
+        filter[`stats.${field}`] = stats[field] ?? null;
+        $set[`stats.${field}`] = expected[field];
+      }
+      operations.push({ updateOne: { filter, update: { $set } } });
+    }
+  }
+
+  return { checked: projects.length, ...(await writeCorrections(Project, operations)) };
+};
+
+const reconcileTasks = async (scope) => {
+  const tasks = await readAll(
+    Task.find(scope).select(
+      "id timeTracking.totalTracked actualHours billableHours hourlyRate totalAmount"
+    )
+  );
+  const timeTotals = await TimeEntry.aggregate([
+    { $match: { ...scope, task_id: { $ne: null }, end_time: { $type: "date" } } },
+    {
+      $group: {
+        _id: "$task_id",
+        totalTime: { $sum: { $ifNull: ["$duration", 0] } },
+        billableTime: {
+          $sum: { $cond: ["$billable", { $ifNull: ["$duration", 0] }, 0] },
+        },
+      },
+    },
+  ]).allowDiskUse(true);
+
+  const timeByTask = new Map(timeTotals.map((row) => [row._id, row]));
+  const operations = [];
+
+  for (const task of tasks) {
+    const time = timeByTask.get(task.id);
+    const totalTracked = time?.totalTime || 0;
+    const actualHours = round(totalTracked / 3600);
+    const billableHours = round((time?.billableTime || 0) / 3600);
+    const totalAmount = round(billableHours * (task.hourlyRate || 0));
+
+    if (
+      (task.timeTracking?.totalTracked || 0) !== totalTracked ||
+      round(task.actualHours || 0) !== actualHours ||
+      round(task.billableHours || 0) !== billableHours ||
+      round(task.totalAmount || 0) !== totalAmount
+    ) {
+      operations.push({
+        updateOne: {
+          filter: {
+            _id: task._id,
+            "timeTracking.totalTracked": task.timeTracking?.totalTracked ?? null,
+            actualHours: task.actualHours ?? null,
+            billableHours: task.billableHours ?? null,
+            totalAmount: task.totalAmount ?? null,
+          },
+          update: {
+            $set: {
+              "timeTracking.totalTracked": totalTracked,
+              actualHours,
+              billableHours,
+              totalAmount,
+            },
+          },
+        },
+      });
+    }
+  }
+
+  return { checked: tasks.length, ...(await writeCorrections(Task, operations)) };
+};
+
+// Recompute counters for one organization, or all of them
+const reconcile = async (organizationId = null) => {
+  const scope = organizationId ? { organizationId } : {};
+  const [projects, tasks] = await Promise.all([
+    reconcileProjects(scope),
+    reconcileTasks(scope),
+  ]);
+  return { projects, tasks };
+};
+
+module.exports = {
+  snapshot,
+  recordEntry,
+  recordEntries,
+  removeEntry,
+  replaceEntry,
+  reconcile,
+};
@@ -0,0 +1,241 @@
+// backend/services/entryIngest.js - Bulk time entry ingest for offline clients
+// A desktop tracker that was offline uploads its completed entries in one
+// request. Project and task access is checked with one query each for the
+// whole batch, entries go in with an unordered insertMany, and every item
+// gets its own result. Entries carrying a client_id are idempotent: a retried
+// upload reports them as duplicates instead of inserting them twice.
+
+const { v4: uuidv4 } = require("uuid");
+const TimeEntry = require("../models/TimeEntry");
+const Project = require("../models/Project");
+const Task = require("../models/Task");
+
+const MAX_ENTRIES = parseInt(process.env.TIME_ENTRY_BULK_MAX) || 500;
+
+const created = (index, clientId, id) => ({
+  index,
+  client_id: clientId,
+  status: "created",
+  id,
+});
+const duplicate = (index, clientId, id) => ({
+  index,
+  client_id: clientId,
+  status: "duplicate",
+  id,
+});
+const failed = (index, clientId, error) => ({
+  index,
+  client_id: clientId ?? null,
+  status: "error",
+  error,
+});
+
+// Entry fields from one uploaded item, or { error } when it is unusable
+const normalize = (item) => {
+  if (!item || typeof item !== "object") {
+    return { error: "Entry must be an object" };
+  }
+
+  const {
+    client_id,
+    project_id,
+    task_id,
+    description,
+    start_time,
+    end_time,
+    billable = true,
+  } = item;
+  if (
+    client_id !== undefined &&
+    client_id !== null &&
+    (typeof client_id !== "string" || !client_id.trim() || client_id.length > 100)
+  ) {
+    return { error: "client_id must be a non-empty string of at most 100 characters" };
+  }
+  if (!project_id || !start_time || !end_time) {
+    return { error: "Project ID, start time, and end time are required" };
+  }
+
+  const startDate = new Date(start_time);
+  const endDate = new Date(end_time);
+  if (isNaN(startDate.getTime()) || isNaN(endDate.getTime())) {
+    return { error: "Invalid start or end time" };
+  }
+  if (endDate <= startDate) {
+    return { error: "End time must be after start time" };
+  }
+
+  return {
+    fields: {
+      client_id: client_id ? client_id.trim() : undefined,
+      project_id: String(project_id),
+      task_id: task_id ? String(task_id) : null,
+      description:
+        typeof description === "string" && description.trim()
+          ? description.trim()
+          : "Manual time entry",
+      start_time: startDate,
+      end_time: endDate,
+      billable: Boolean(billable),
+    },
+  };
+};
+
+// client_id -> entry id for the user's entries that already exist
+const findByClientIds = async (organizationId, userId, clientIds) => {
+  if (clientIds.length === 0) return new Map();
+  const entries = await TimeEntry.find({
+    organizationId,
+    user_id: userId,
+    client_id: { $in: clientIds },
+  })
+    .select("id client_id")
+    .lean();
+  return new Map(entries.map((entry) => [entry.client_id, entry.id]));
+};
+
+// Insert the user's entries; resolves with per-item results (in input order)
+// and the inserted documents for the rollup and counter updates
+const ingest = async (user, items) => {
+  const { organizationId } = user;
+  const hourlyRate = user.billing?.hourlyRate || 0;
+  const results = new Array(items.length);
+  const candidates = [];
+
+  items.forEach((item, index) => {
+    const { fields, error } = normalize(item);
+    if (error) {
+      results[index] = failed(index, item?.client_id, error);
+    } else {
+      candidates.push({ index, fields });
+    }
+  });
+
+  // One lookup each for every project, task and client id in the batch
+  const distinct = (field) => [
+    ...new Set(candidates.map(({ fields }) => fields[field]).filter(Boolean)),
+  ];
+  const [projects, tasks, existing] = await Promise.all([
+    Project.find({ id: { $in: distinct("project_id") }, organizationId })
+      .select("id")
+      .lean(),
+    Task.find({ id: { $in: distinct("task_id") }, organizationId })
+      .select("id project_id")
+      .lean(),
+    findByClientIds(organizationId, user.id, distinct("client_id")),
+  ]);
+  const projectIds = new Set(projects.map((project) => project.id));
+  const taskProjects = new Map(tasks.map((task) => [task.id, task.project_id]));
+
+  const pending = []; // { index, doc } in insertMany order
+  const firstByClientId = new Map(); // client_id -> index of its first item
+  const repeats = []; // [index, first index] for client ids repeated in the batch
+
+  for (const { index, fields } of candidates) {
+    const clientId = fields.client_id;
+    if (clientId && existing.has(clientId)) {
+      results[index] = duplicate(index, clientId, existing.get(clientId));
+      continue;
+    }
+    if (clientId && firstByClientId.has(clientId)) {
+      repeats.push([index, firstByClientId.get(clientId)]);
+      continue;
+    }
+    if (!projectIds.has(fields.project_id)) {
+      results[index] = failed(index, clientId, "Project not found");
+      continue;
+    }
+    if (fields.task_id && taskProjects.get(fields.task_id) !== fields.project_id) {
+      results[index] = failed(index, clientId, "Task not found");
+      continue;
+    }
+
+    const duration = Math.round((fields.end_time - fields.start_time) / 1000);
+    const doc = new TimeEntry({
+      id: uuidv4(),
+      organizationId,
+      user_id: user.id,
+      ...fields,
+      duration,
+      hourly_rate: hourlyRate,
+      // insertMany skips the save hooks; this is what they would compute
+      total_amount: fields.billable && hourlyRate > 0 ? (duration / 3600) * hourlyRate : 0,
+      is_manual: true,
+    });
+    const invalid = doc.validateSync();
+    if (invalid) {
+      results[index] = failed(index, clientId, Object.values(invalid.errors)[0].message);
+      continue;
+    }
+
+    if (clientId) firstByClientId.set(clientId, index);
+    pending.push({ index, doc });
+  }
+
+  const rejected = new Set();
+  const raced = [];
+  if (pending.length > 0) {
+    try {
+      await TimeEntry.insertMany(
+        pending.map(({ doc }) => doc),
+        { ordered: false }
+      );
+    } catch (error) {
+      if (!error.writeErrors) throw error;
+      for (const writeError of error.writeErrors) {
+        const { index, doc } = pending[writeError.index];
+        rejected.add(writeError.index);
+        // A concurrent retry of the same upload inserted it first
+        if (writeError.code === 11000 && doc.client_id) {
+          raced.push({ index, clientId: doc.client_id });
+        } else {
+          console.warn("Bulk time entry insert failed:", writeError.errmsg);
+          results[index] = failed(index, doc.client_id, "Failed to save time entry");
+        }
+      }
+    }
+  }
+
+  if (raced.length > 0) {
+    const winners = await findByClientIds(
+      organizationId,
+      user.id,
+      raced.map(({ clientId }) => clientId)
+    );
+    for (const { index, clientId } of raced) {
+      results[index] = winners.has(clientId)
+        ? duplicate(index, clientId, winners.get(clientId))
+        : failed(index, clientId, "Failed to save time entry");
+    }
+  }
+
+  const inserted = [];
+  pending.forEach(({ index, doc }, position) => {
+    if (rejected.has(position)) return;
+    results[index] = created(index, doc.client_id ?? null, doc.id);
+    inserted.push(doc);
+  });
+
+  for (const [index, firstIndex] of repeats) {
+    const first = results[firstIndex];
+    results[index] =
+      first.status === "error"
+        ? failed(index, first.client_id, first.error)
+        : duplicate(index, first.client_id, first.id);
+  }
+
+  return { results, inserted };
+};
+
+const summarize = (results) => {
+  const summary = { created: 0, duplicate: 0, error: 0 };
+  for (const result of results) summary[result.status]++;
+  return summary;
+};
+
+module.exports = {
+  MAX_ENTRIES,
+  ingest,
+  summarize,
+};
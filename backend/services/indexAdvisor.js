@@ -0,0 +1,355 @@
+// backend/services/indexAdvisor.js - Index proposals from profiled query shapes
+// Reads a query profiler report (GET /api/health/query-profile) and the
+// indexes a model has, and proposes compound indexes for the shapes no index
+// serves: equality fields first (organizationId leading), then the sort, then
+// range fields. A "$ne: null" style predicate becomes a partial filter so
+// running timers and other incomplete rows stay out of the index, and a
+// narrow projection is folded in to make the index covering. A proposal
+// names the existing index it supersedes, and indexes that are a prefix of
+// another are listed as redundant. Nothing is applied here; indexes change
+// through backend/migrations.
+
+const RANGE_OPERATORS = new Set(["$gt", "$gte", "$lt", "$lte"]);
+const EQUALITY_OPERATORS = new Set(["$eq", "$in"]);
+const PRESENCE_OPERATORS = new Set(["$ne", "$exists", "$type"]);
+const MAX_COVERING_EXTRA_FIELDS = 2;
+
+const BSON_TYPES = {
+  Date: "date",
+  String: "string",
+  Number: "number",
+  Boolean: "bool",
+  ObjectId: "objectId",
+};
+
+const parse = (json) => {
+  if (!json || json === "null") return null;
+  return typeof json === "string" ? JSON.parse(json) : json;
+};
+
+const isOperatorObject = (value) =>
+  value !== null &&
+  typeof value === "object" &&
+  !Array.isArray(value) &&
+  Object.keys(value).length > 0 &&
+  Object.keys(value).every((key) => key.startsWith("$"));
+
+// Splits a filter shape into equality, range and presence fields. Fields
+// under $or (keyset paging conditions, mostly) count as ranges.
+const classify = (shape, result = { equality: [], range: [], presence: {}, unsupported: [] }) => {
+  for (const [field, value] of Object.entries(shape || {})) {
+    if (field === "$and") {
+      value.forEach((part) => classify(part, result));
+    } else if (field === "$or") {
+      for (const part of value) {
+        const nested = classify(part);
+        for (const name of [...nested.equality, ...nested.range]) {
+          if (!result.range.includes(name)) result.range.push(name);
+        }
+      }
+    } else if (field.startsWith("$")) {
+      result.unsupported.push(field);
+    } else if (!isOperatorObject(value)) {
+      result.equality.push(field);
+    } else {
+      const operators = Object.keys(value);
+      if (operators.every((op) => EQUALITY_OPERATORS.has(op))) result.equality.push(field);
+      else if (operators.every((op) => RANGE_OPERATORS.has(op))) result.range.push(field);
+      else if (operators.every((op) => PRESENCE_OPERATORS.has(op))) {
+        result.presence[field] = value;
+      } else result.unsupported.push(field);
+    }
+  }
+  return result;
+};
+
+// The partial filter a presence predicate can use, if the field's type is known.
+// { $ne: null } is rewritten to { $type } because the planner only picks a
+// partial index when the query repeats its filter.
+const partialFor = (presence, types) => {
+  const filter = {};
+  const rewrites = [];
+  for (const [field, predicate] of Object.entries(presence)) {
+    const bsonType = types[field];
+    if (!bsonType) continue;
+    filter[field] = { $type: bsonType };
+    if (!("$type" in predicate)) {
+      const shown = JSON.stringify(predicate)
+        .replace(/"(\$\w+)":/g, "$1: ")
+        .replace(/"null"/g, "null");
+      rewrites.push(`${field}: ${shown} -> { $type: "${bsonType}" }`);
+    }
+  }
+  return Object.keys(filter).length ? { filter, rewrites } : null;
+};
+
+const indexName = (key, partialFilterExpression) => {
+  const name = Object.entries(key)
+    .map(([field, direction]) => `${field}_${direction}`)
+    .join("_");
+  return partialFilterExpression ? `${name}_partial` : name;
+};
+
+// Index key for one query shape, or null when the shape cannot use one
+const candidateFor = (entry, types) => {
+  const shape = parse(entry.shape);
+  const sort = parse(entry.sort) || {};
+  const fields = parse(entry.fields);
+  const { equality, range, presence } = classify(shape);
+
+  const ordered = [...equality].sort((a, b) => {
+    if (a === "organizationId") return -1;
+    if (b === "organizationId") return 1;
+    return 0;
+  });
+  const key = {};
+  for (const field of ordered) key[field] = 1;
+  for (const [field, direction] of Object.entries(sort)) {
+    if (!(field in key)) key[field] = direction === -1 || direction === "desc" ? -1 : 1;
+  }
+  for (const field of range) if (!(field in key)) key[field] = 1;
+  if (!Object.keys(key).length) return null;
+
+  const partial = partialFor(presence, types);
+  let covering = false;
+  if (fields && !fields.includes("_id")) {
+    const extra = fields.filter(
+      (field) => !(field in key) && !(partial && field in partial.filter)
+    );
+    if (extra.length <= MAX_COVERING_EXTRA_FIELDS) {
+      for (const field of extra) key[field] = 1;
+      covering = true;
+    }
+  }
+
+  return {
+    key,
+    equality: new Set(ordered),
+    ordered: Object.keys(key).slice(ordered.length),
+    sortFields: Object.keys(sort),
+    partialFilterExpression: partial ? partial.filter : null,
+    rewrites: partial ? partial.rewrites : [],
+    presence: Object.keys(presence),
+    covering,
+  };
+};
+
+// How much of a candidate an index (existing or proposed) serves: the index
+// must lead with some of the candidate's equality fields, in any order. Once
+// it has all of them, the candidate's sort and range fields are matched in
+// order, reading the sort one way. Returns null for an index the planner
+// cannot use for the shape (a partial index also needs its filter repeated),
+// otherwise { leading, matched, sorted, complete }.
+const coverage = (index, candidate) => {
+  const partial = index.partialFilterExpression;
+  if (partial && !Object.keys(partial).every((field) => candidate.presence.includes(field))) {
+    return null;
+  }
+
+  const keys = Object.keys(index.key);
+  let leading = 0;
+  while (leading < keys.length && candidate.equality.has(keys[leading])) leading++;
+  if (!leading) return null;
+  // A unique index on equality fields alone finds the one document
+  if (index.unique && leading === keys.length) {
+    return { leading, matched: candidate.ordered.length, sorted: true, complete: true };
+  }
+
+  let matched = 0;
+  if (leading === candidate.equality.size) {
+    let flip = null;
+    for (const field of candidate.ordered) {
+      if (keys[leading + matched] !== field) break;
+      if (candidate.sortFields.includes(field)) {
+        const same = index.key[field] === candidate.key[field];
+        if (flip === null) flip = same;
+        else if (flip !== same) break;
+      }
+      matched++;
+    }
+  }
+  return {
+    leading,
+    matched,
+    sorted: !candidate.sortFields.length || matched >= candidate.sortFields.length,
+    complete: leading === candidate.equality.size && matched === candidate.ordered.length,
+  };
+};
+
+// The existing index that serves a candidate best: every key field used,
+// then the most equality and ordered fields matched
+const bestIndex = (indexes, candidate) => {
+  let best = null;
+  for (const index of indexes) {
+    const result = coverage(index, candidate);
+    if (!result || !result.sorted) continue;
+    const score = (result.complete ? 1000 : 0) + result.leading * 10 + result.matched;
+    if (!best || score > best.score) best = { index, score, ...result };
+  }
+  return best;
+};
+
+const isPrefix = (shorter, longer) => {
+  const a = Object.entries(shorter);
+  const b = Object.entries(longer);
+  return (
+    a.length < b.length &&
+    a.every(([field, direction], i) => b[i][0] === field && b[i][1] === direction)
+  );
+};
+
+// Same fields in the same order, directions aside
+const startsWithFields = (shorter, longer) => {
+  const fields = Object.keys(longer);
+  return Object.keys(shorter).every((field, i) => fields[i] === field);
+};
+
+const samePartial = (a, b) => JSON.stringify(a || null) === JSON.stringify(b || null);
+
+// Indexes as listIndexes returns them, from [fields, options] schema pairs
+const fromSchema = (schema) =>
+  schema.indexes().map(([key, options = {}]) => ({
+    name: options.name || indexName(key),
+    key,
+    ...options,
+  }));
+
+// Field -> BSON type alias for the schema paths a partial filter may use
+const typesOf = (schema) => {
+  const types = {};
+  schema.eachPath((path, type) => {
+    if (BSON_TYPES[type.instance]) types[path] = BSON_TYPES[type.instance];
+  });
+  return types;
+};
+
+// report: the profiler report; models: { TimeEntry: { indexes, types } }
+const advise = (report, models) => {
+  const proposals = new Map();
+  const usage = new Map(); // model|index name -> number of queries it serves
+  const unscoped = [];
+  let served = 0;
+
+  for (const entry of report.queries || []) {
+    const model = models[entry.model];
+    if (!model) continue;
+    const candidate = candidateFor(entry, model.types || {});
+    if (!candidate) continue;
+    if (!candidate.equality.has("organizationId") && !candidate.equality.has("id")) {
+      unscoped.push({ model: entry.model, route: entry.route, shape: entry.shape });
+    }
+
+    const best = bestIndex(model.indexes, candidate);
+    const existing = best && best.index;
+    if (existing) {
+      served++;
+      const key = `${entry.model}|${existing.name}`;
+      usage.set(key, (usage.get(key) || 0) + entry.count);
+      // A shape some index already serves is only worth a new one that
+      // leaves incomplete rows out or answers it from the index alone
+      const filtered = samePartial(
+        existing.partialFilterExpression,
+        candidate.partialFilterExpression
+      );
+      const wanted = candidate.partialFilterExpression || candidate.covering;
+      if ((best.complete && filtered) || !wanted) continue;
+      // Range fields can go either way; keep the direction already in use
+      for (const field of Object.keys(candidate.key)) {
+        if (field in existing.key && !candidate.sortFields.includes(field)) {
+          candidate.key[field] = existing.key[field];
+        }
+      }
+    }
+
+    const id = `${entry.model}|${JSON.stringify(candidate.key)}|${JSON.stringify(
+      candidate.partialFilterExpression
+    )}`;
+    const proposal = proposals.get(id) || {
+      model: entry.model,
+      name: indexName(candidate.key, candidate.partialFilterExpression),
+      key: candidate.key,
+      options: candidate.partialFilterExpression
+        ? { partialFilterExpression: candidate.partialFilterExpression }
+        : {},
+      covering: candidate.covering,
+      replaces: existing && startsWithFields(existing.key, candidate.key) ? [existing.name] : [],
+      rewrites: [],
+      routes: [],
+      queries: 0,
+      total_ms: 0,
+    };
+    proposal.queries += entry.count;
+    proposal.total_ms += entry.total_ms;
+    if (!proposal.routes.includes(entry.route)) proposal.routes.push(entry.route);
+    for (const rewrite of candidate.rewrites) {
+      if (!proposal.rewrites.includes(rewrite)) proposal.rewrites.push(rewrite);
+    }
+    proposals.set(id, proposal);
+  }
+
+  // A proposal whose key starts another's (same partial filter) is served by it
+  const merged = [...proposals.values()];
+  for (const proposal of [...merged]) {
+    const wider = merged.find(
+      (other) =>
+        other !== proposal &&
+        samePartial(
+          other.options.partialFilterExpression,
+          proposal.options.partialFilterExpression
+        ) &&
+        isPrefix(proposal.key, other.key)
+    );
+    if (!wider) continue;
+    wider.queries += proposal.queries;
+    wider.total_ms += proposal.total_ms;
+    wider.covering = wider.covering && proposal.covering;
+    for (const field of ["routes", "rewrites", "replaces"]) {
+      for (const value of proposal[field]) {
+        if (!wider[field].includes(value)) wider[field].push(value);
+      }
+    }
+    merged.splice(merged.indexOf(proposal), 1);
+  }
+
+  const redundant = [];
+  for (const [modelName, model] of Object.entries(models)) {
+    for (const index of model.indexes) {
+      if (index.name === "_id_" || index.unique || index.expireAfterSeconds !== undefined) continue;
+      if (index.partialFilterExpression) continue;
+      const wider = model.indexes.find(
+        (other) =>
+          other !== index && !other.partialFilterExpression && isPrefix(index.key, other.key)
+      );
+      if (wider) {
+        redundant.push({
+          model: modelName,
+          name: index.name,
+          key: index.key,
+          reason: `prefix of ${wider.name}`,
+        });
+      }
+    }
+  }
+
+  return {
+    proposals: merged
+      .map((proposal) => ({
+        ...proposal,
+        total_ms: Math.round(proposal.total_ms * 100) / 100,
+      }))
+      .sort((a, b) => b.total_ms - a.total_ms),
+    redundant,
+    usage: Object.fromEntries(usage),
+    unscoped,
+    served,
+  };
+};
+
+module.exports = {
+  classify,
+  candidateFor,
+  coverage,
+  fromSchema,
+  typesOf,
+  advise,
+};
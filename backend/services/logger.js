@@ -0,0 +1,51 @@
+// backend/services/logger.js - Application logger with a runtime log level
+// The winston logger shared by server.js, routes and services. LOG_LEVEL sets
+// the starting level and setLevel() changes it while running (PUT
+// /api/health/logging), on every worker in cluster mode. Per-request detail
+// is logged at debug, so with the default level it costs one level check.
+
+const winston = require("winston");
+const clusterBus = require("./clusterBus");
+
+const LEVELS = Object.keys(winston.config.npm.levels);
+const LEVEL_CHANNEL = "logger:level";
+
+// Colors only help a human watching a terminal
+const consoleFormat = process.stdout.isTTY
+  ? winston.format.combine(winston.format.colorize(), winston.format.simple())
+  : winston.format.json();
+
+const logger = winston.createLogger({
+  level: LEVELS.includes(process.env.LOG_LEVEL) ? process.env.LOG_LEVEL : "info",
+  format: winston.format.combine(
+    winston.format.timestamp(),
+    winston.format.errors({ stack: true }),
+    winston.format.json()
+  ),
+  transports: [
+    new winston.transports.File({ filename: "error.log", level: "error" }),
+    new winston.transports.File({ filename: "combined.log" }),
+    new winston.transports.Console({ format: consoleFormat }),
+  ],
+});
+
+clusterBus.subscribe(LEVEL_CHANNEL, (level) => {
+  logger.level = level;
+});
+
+// Throws a 400-style error for unknown levels
+const setLevel = (level) => {
+  if (!LEVELS.includes(level)) {
+    const error = new Error(`Unknown log level "${level}" (expected ${LEVELS.join(", ")})`);
+    error.status = 400;
+    throw error;
+  }
+  logger.level = level;
+  clusterBus.publish(LEVEL_CHANNEL, level);
+};
+
+module.exports = {
+  logger,
+  LEVELS,
+  setLevel,
+};
@@ -0,0 +1,382 @@
+// backend/services/metrics.js - Prometheus metrics for requests, MongoDB and Socket.IO
+// Counters, gauges and histograms live in this process and are rendered in
+// the Prometheus text format by GET /api/metrics. Routes are labelled with
+// their template ("/stop/:entryId") so a regression shows up per endpoint
+// after a deploy. Under cluster.js a scrape reaches one worker, which gathers
+// every other worker's samples over the cluster bus and adds them up;
+// per-process gauges keep a worker label instead.
+
+const { monitorEventLoopDelay } = require("perf_hooks");
+const clusterBus = require("./clusterBus");
+const clusterWorker = require("./clusterWorker");
+
+const SNAPSHOT_CHANNEL = "metrics:snapshot";
+const HTTP_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10];
+const DB_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5];
+const LAG_WINDOW_MS = 10000;
+const WORKER = String(clusterWorker.index);
+
+class Metric {
+  constructor(type, name, help, labelNames = [], buckets = null) {
+    this.type = type;
+    this.name = name;
+    this.help = help;
+    this.labelNames = labelNames;
+    this.buckets = buckets;
+    this.samples = new Map(); // label values joined -> sample
+  }
+
+  sample(labels) {
+    const values = this.labelNames.map((name) => String(labels[name] ?? ""));
+    const key = values.join("\u0001");
+    let sample = this.samples.get(key);
+    if (!sample) {
+      sample = this.buckets
+        ? { labels: values, counts: this.buckets.map(() => 0), sum: 0, count: 0 }
+        : { labels: values, value: 0 };
+      this.samples.set(key, sample);
+    }
+    return sample;
+  }
+
+  inc(labels = {}, amount = 1) {
+    this.sample(labels).value += amount;
+  }
+
+  dec(labels = {}, amount = 1) {
+    this.sample(labels).value -= amount;
+  }
+
+  set(labels, value) {
+    this.sample(labels).value = value;
+  }
+
+  observe(labels, seconds) {
+    const sample = this.sample(labels);
+    const bucket = this.buckets.findIndex((bound) => seconds <= bound);
+    if (bucket !== -1) sample.counts[bucket]++;
+    sample.sum += seconds;
+    sample.count++;
+  }
+}
+
+const registry = new Map();
+const collectors = []; // refresh gauges right before a snapshot
+
+const define = (type, name, help, labelNames, buckets) => {
+  const metric = new Metric(type, name, help, labelNames, buckets);
+  registry.set(name, metric);
+  return metric;
+};
+
+const http = {
+  requests: define("counter", "http_requests_total", "HTTP requests by route and status", [
+    "method",
+    "route",
+    "status",
+  ]),
+  duration: define(
+    "histogram",
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route"],
+    HTTP_BUCKETS
+  ),
+  inFlight: define("gauge", "http_requests_in_flight", "HTTP requests being served"),
+};
+
+const db = {
+  operations: define("counter", "mongodb_operations_total", "MongoDB operations by model", [
+    "model",
+    "operation",
+  ]),
+  errors: define("counter", "mongodb_operation_errors_total", "Failed MongoDB operations", [
+    "model",
+    "operation",
+  ]),
+  duration: define(
+    "histogram",
+    "mongodb_operation_duration_seconds",
+    "MongoDB operation latency by model",
+    ["model", "operation"],
+    DB_BUCKETS
+  ),
+};
+
+const socket = {
+  connections: define("gauge", "socketio_connections", "Connected Socket.IO clients"),
+  connects: define("counter", "socketio_connects_total", "Socket.IO connections accepted"),
+  rooms: define("gauge", "socketio_rooms", "Socket.IO rooms on this worker", ["worker"]),
+};
+
+const runtime = {
+  lag: define(
+    "gauge",
+    "nodejs_eventloop_lag_seconds",
+    `Event loop delay over the last ${LAG_WINDOW_MS / 1000}s`,
+    ["worker", "quantile"]
+  ),
+  lagMax: define(
+    "gauge",
+    "nodejs_eventloop_lag_max_seconds",
+    `Longest event loop delay over the last ${LAG_WINDOW_MS / 1000}s`,
+    ["worker"]
+  ),
+  memory: define("gauge", "process_resident_memory_bytes", "Resident memory", ["worker"]),
+  heap: define("gauge", "nodejs_heap_used_bytes", "V8 heap in use", ["worker"]),
+};
+
+// ---- HTTP ----------------------------------------------------------------
+
+const trackRequests = (req, res, next) => {
+  const started = process.hrtime.bigint();
+  http.inFlight.inc();
+  let done = false;
+
+  const finish = () => {
+    if (done) return;
+    done = true;
+    http.inFlight.dec();
+    // Unmatched paths share one label so 404 scans cannot explode the series
+    const route = req.route ? `${req.baseUrl}${req.route.path}` : "unmatched";
+    const status = res.writableFinished ? res.statusCode : 499;
+    http.requests.inc({ method: req.method, route, status });
+    http.duration.observe(
+      { method: req.method, route },
+      Number(process.hrtime.bigint() - started) / 1e9
+    );
+  };
+
+  res.once("finish", finish);
+  res.once("close", finish);
+  next();
+};
+
+// ---- MongoDB -------------------------------------------------------------
+
+const QUERY_OPERATIONS = [
+  "find",
+  "findOne",
+  "countDocuments",
+  "estimatedDocumentCount",
+  "distinct",
+  "findOneAndUpdate",
+  "findOneAndDelete",
+  "findOneAndReplace",
+  "updateOne",
+  "updateMany",
+  "replaceOne",
+  "deleteOne",
+  "deleteMany",
+];
+
+const observers = []; // e.g. the query profiler
+
+// `source` is the Query or Aggregate for reads and updates
+const record = (model, operation, started, failed, source = null) => {
+  if (started === undefined) return;
+  const labels = { model, operation };
+  const seconds = Number(process.hrtime.bigint() - started) / 1e9;
+  db.operations.inc(labels);
+  if (failed) db.errors.inc(labels);
+  db.duration.observe(labels, seconds);
+  for (const observer of observers) {
+    observer({ model, operation, seconds, failed, source });
+  }
+};
+
+const observeOperations = (observer) => {
+  observers.push(observer);
+};
+
+// Schema plugin timing every query, aggregate, save and insertMany of a
+// model. Register it last so the other hooks are not counted as DB time.
+const mongoosePlugin = (schema, { model }) => {
+  const saves = new WeakMap();
+  const inserts = []; // insertMany hooks get no per-call context; FIFO order
+
+  schema.pre(QUERY_OPERATIONS, function () {
+    this._metricsStarted = process.hrtime.bigint();
+  });
+  schema.post(QUERY_OPERATIONS, function () {
+    record(model, this.op, this._metricsStarted, false, this);
+  });
+  schema.post(QUERY_OPERATIONS, function (error, result, next) {
+    record(model, this.op, this._metricsStarted, true, this);
+    next(error);
+  });
+
+  schema.pre("aggregate", function () {
+    this._metricsStarted = process.hrtime.bigint();
+  });
+  schema.post("aggregate", function () {
+    record(model, "aggregate", this._metricsStarted, false, this);
+  });
+  schema.post("aggregate", function (error, result, next) {
+    record(model, "aggregate", this._metricsStarted, true, this);
+    next(error);
+  });
+
+  schema.pre("save", function () {
+    saves.set(this, process.hrtime.bigint());
+  });
+  schema.post("save", function () {
+    record(model, "save", saves.get(this), false);
+    saves.delete(this);
+  });
+  schema.post("save", function (error, doc, next) {
+    record(model, "save", saves.get(this), true);
+    saves.delete(this);
+    next(error);
+  });
+
+  schema.pre("insertMany", function (next) {
+    inserts.push(process.hrtime.bigint());
+    next();
+  });
+  schema.post("insertMany", function () {
+    record(model, "insertMany", inserts.shift(), false);
+  });
+  schema.post("insertMany", function (error, docs, next) {
+    record(model, "insertMany", inserts.shift(), true);
+    next(error);
+  });
+};
+
+// ---- Socket.IO -----------------------------------------------------------
+
+const observeSocketIO = (io) => {
+  io.on("connection", () => socket.connects.inc());
+  collectors.push(() => {
+    const { rooms, sids } = io.of("/").adapter;
+    socket.connections.set({}, io.engine.clientsCount);
+    // Every socket also sits in a room named after its id
+    let named = 0;
+    for (const room of rooms.keys()) if (!sids.has(room)) named++;
+    socket.rooms.set({ worker: WORKER }, named);
+  });
+};
+
+// ---- Runtime -------------------------------------------------------------
+
+const eventLoopDelay = monitorEventLoopDelay({ resolution: 10 });
+eventLoopDelay.enable();
+const lagWindow = setInterval(() => {
+  for (const quantile of [0.5, 0.9, 0.99]) {
+    runtime.lag.set(
+      { worker: WORKER, quantile },
+      eventLoopDelay.percentile(quantile * 100) / 1e9
+    );
+  }
+  runtime.lagMax.set({ worker: WORKER }, eventLoopDelay.max / 1e9);
+  eventLoopDelay.reset();
+}, LAG_WINDOW_MS);
+lagWindow.unref();
+
+collectors.push(() => {
+  const memory = process.memoryUsage();
+  runtime.memory.set({ worker: WORKER }, memory.rss);
+  runtime.heap.set({ worker: WORKER }, memory.heapUsed);
+});
+
+// ---- Exposition ----------------------------------------------------------
+
+const snapshot = () => {
+  for (const collect of collectors) collect();
+  return [...registry.values()].map(({ type, name, help, labelNames, buckets, samples }) => ({
+    type,
+    name,
+    help,
+    labelNames,
+    buckets,
+    samples: [...samples.values()],
+  }));
+};
+
+clusterBus.respond(SNAPSHOT_CHANNEL, snapshot);
+
+// Add up samples with the same labels across workers
+const merge = (snapshots) => {
+  const merged = new Map();
+  for (const metrics of snapshots) {
+    for (const metric of metrics) {
+      let target = merged.get(metric.name);
+      if (!target) {
+        target = { ...metric, samples: new Map() };
+        merged.set(metric.name, target);
+      }
+      for (const sample of metric.samples) {
+        const key = sample.labels.join("\u0001");
+        const existing = target.samples.get(key);
+        if (!existing) {
+          target.samples.set(key, {
+            ...sample,
+            counts: sample.counts && [...sample.counts],
+          });
+        } else if (existing.counts) {
+          sample.counts.forEach((count, index) => {
+            existing.counts[index] += count;
+          });
+          existing.sum += sample.sum;
+          existing.count += sample.count;
+        } else {
+          existing.value += sample.value;
+        }
+      }
+    }
+  }
+  return [...merged.values()];
+};
+
+const escapeLabel = (value) =>
+  value.replace(/\\/g, "\\\\").replace(/"/g, '\\"').replace(/\n/g, "\\n");
+
+const formatLabels = (names, values, extra = "") => {
+  const pairs = names.map((name, index) => `${name}="${escapeLabel(values[index])}"`);
+  if (extra) pairs.push(extra);
+  return pairs.length ? `{${pairs.join(",")}}` : "";
+};
+
+const render = (metrics) => {
+  const lines = [];
+  for (const { type, name, help, labelNames, buckets, samples } of metrics) {
+    lines.push(`# HELP ${name} ${help}`, `# TYPE ${name} ${type}`);
+    for (const sample of samples.values()) {
+      if (!buckets) {
+        lines.push(`${name}${formatLabels(labelNames, sample.labels)} ${sample.value}`);
+        continue;
+      }
+      let cumulative = 0;
+      buckets.forEach((bound, index) => {
+        cumulative += sample.counts[index];
+        lines.push(
+          `${name}_bucket${formatLabels(labelNames, sample.labels, `le="${bound}"`)} ${cumulative}`
+        );
+      });
+      lines.push(
+        `${name}_bucket${formatLabels(labelNames, sample.labels, 'le="+Inf"')} ${sample.count}`,
+        `${name}_sum${formatLabels(labelNames, sample.labels)} ${sample.sum}`,
+        `${name}_count${formatLabels(labelNames, sample.labels)} ${sample.count}`
+      );
+    }
+  }
+  return `${lines.join("\n")}\n`;
+};
+
+// Text exposition for the whole cluster, or this process when not clustered
+const exposition = async () => {
+  const peers = await clusterBus.gather(SNAPSHOT_CHANNEL, null, { timeoutMs: 6000 });
+  return render(merge([snapshot(), ...peers]));
+};
+
+module.exports = {
+  CONTENT_TYPE: "text/plain; version=0.0.4; charset=utf-8",
+  trackRequests,
+  mongoosePlugin,
+  observeOperations,
+  observeSocketIO,
+  snapshot,
+  merge,
+  render,
+  exposition,
+};
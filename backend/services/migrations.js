@@ -0,0 +1,153 @@
+// backend/services/migrations.js - Versioned database migrations
+// Each file in backend/migrations is named NNN-description.js and exports
+// { version, name, up(db) } where db is the driver's Db. Applied versions are
+// recorded in the schema_migrations collection, so `npm run migrate` only
+// runs what is new; a lock document keeps two deploys from migrating at once.
+// Migrations must be idempotent themselves (the helpers below are), because a
+// run that dies half way is repeated from the start of that migration.
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+
+const MIGRATIONS_DIR = path.join(__dirname, "..", "migrations");
+const COLLECTION = "schema_migrations";
+const LOCK_ID = "lock";
+const LOCK_STALE_MS = 30 * 60 * 1000; // a crashed run's lock is taken over after this
+
+const load = () => {
+  const migrations = fs
+    .readdirSync(MIGRATIONS_DIR)
+    .filter((file) => /^\d+-[\w-]+\.js$/.test(file))
+    .map((file) => ({ file, ...require(path.join(MIGRATIONS_DIR, file)) }))
+    .sort((a, b) => a.version - b.version);
+
+  const seen = new Set();
+  for (const migration of migrations) {
+    if (!Number.isInteger(migration.version) || typeof migration.up !== "function") {
+      throw new Error(`Migration ${migration.file} must export a numeric version and up()`);
+    }
+    if (seen.has(migration.version)) {
+      throw new Error(`Duplicate migration version ${migration.version}`);
+    }
+    seen.add(migration.version);
+  }
+  return migrations;
+};
+
+const acquireLock = async (collection) => {
+  const now = new Date();
+  const holder = `${os.hostname()}:${process.pid}`;
+  try {
+    await collection.updateOne(
+      {
+        _id: LOCK_ID,
+        $or: [{ locked: false }, { locked_at: { $lt: new Date(now - LOCK_STALE_MS) } }],
+      },
+      { $set: { locked: true, locked_at: now, holder } },
+      { upsert: true }
+    );
+  } catch (error) {
+    // The upsert collides with a lock document that is held
+    if (error.code === 11000) {
+      const lock = await collection.findOne({ _id: LOCK_ID });
+      throw new Error(
+        `Migrations are locked by ${lock?.holder} since ${lock?.locked_at?.toISOString()}`
+      );
+    }
+    throw error;
+  }
+  return holder;
+};
+
+const releaseLock = (collection, holder) =>
+  collection.updateOne({ _id: LOCK_ID, holder }, { $set: { locked: false } });
+
+// Every known migration with when it was applied (null if pending)
+const status = async (db) => {
+  const applied = await db
+    .collection(COLLECTION)
+    .find({ _id: { $ne: LOCK_ID } })
+    .toArray();
+  const byVersion = new Map(applied.map((record) => [record.version, record]));
+  return load().map(({ version, name }) => ({
+    version,
+    name,
+    applied_at: byVersion.get(version)?.applied_at || null,
+  }));
+};
+
+// Applies pending migrations in order, up to `to` when given
+const migrate = async (db, { to = Infinity, log = console.log } = {}) => {
+  const collection = db.collection(COLLECTION);
+  const holder = await acquireLock(collection);
+  const ran = [];
+  try {
+    const pending = (await status(db)).filter(
+      (migration) => !migration.applied_at && migration.version <= to
+    );
+    const migrations = new Map(load().map((migration) => [migration.version, migration]));
+
+    for (const { version, name } of pending) {
+      const started = Date.now();
+      log(`⏳ ${String(version).padStart(3, "0")} ${name}`);
+      await migrations.get(version).up(db, { log });
+      const duration_ms = Date.now() - started;
+      await collection.updateOne(
+        { _id: `v${version}` },
+        { $set: { version, name, applied_at: new Date(), duration_ms } },
+        { upsert: true }
+      );
+      ran.push({ version, name, duration_ms });
+    }
+  } finally {
+    await releaseLock(collection, holder);
+  }
+  return ran;
+};
+
+// ---- Helpers for migrations ------------------------------------------------
+
+const sameIndex = (index, key, options) =>
+  JSON.stringify(index.key) === JSON.stringify(key) &&
+  JSON.stringify(index.partialFilterExpression || null) ===
+    JSON.stringify(options.partialFilterExpression || null) &&
+  Boolean(index.unique) === Boolean(options.unique);
+
+// Creates a named index, replacing one of that name with another definition
+const ensureIndex = async (collection, key, options, { log = console.log } = {}) => {
+  const indexes = await collection.indexes().catch((error) => {
+    if (error.codeName === "NamespaceNotFound") return [];
+    throw error;
+  });
+  const existing = indexes.find((index) => index.name === options.name);
+  if (existing && sameIndex(existing, key, options)) return "exists";
+  if (existing) {
+    log(`   dropping ${options.name} (definition changed)`);
+    await collection.dropIndex(options.name);
+  }
+  log(`   creating ${options.name}`);
+  await collection.createIndex(key, options);
+  return existing ? "replaced" : "created";
+};
+
+const dropIndexIfExists = async (collection, name, { log = console.log } = {}) => {
+  try {
+    await collection.dropIndex(name);
+    log(`   dropped ${name}`);
+    return true;
+  } catch (error) {
+    if (error.codeName === "IndexNotFound" || error.codeName === "NamespaceNotFound") {
+      return false;
+    }
+    throw error;
+  }
+};
+
+module.exports = {
+  COLLECTION,
+  load,
+  status,
+  migrate,
+  ensureIndex,
+  dropIndexIfExists,
+};
@@ -0,0 +1,232 @@
+// backend/services/organizationStats.js - Event-driven Organization.stats maintenance
+// User, project and time-entry writes adjust the organization's counters with
+// an atomic $inc, so nothing has to count whole collections to show them. A
+// background scheduler recomputes organizations in small batches, oldest
+// reconciliation first, to correct any drift.
+
+const Organization = require("../models/Organization");
+const User = require("../models/User");
+const Project = require("../models/Project");
+const TimeEntry = require("../models/TimeEntry");
+
+// Stats must never fail the write that triggered them; the scheduler repairs drift
+const adjust = async (organizationId, deltas = {}) => {
+  const $inc = {};
+  for (const [field, delta] of Object.entries(deltas)) {
+    if (delta) $inc[`stats.${field}`] = delta;
+  }
+
+  const update = { $set: { "stats.lastActivity": new Date() } };
+  if (Object.keys($inc).length) update.$inc = $inc;
+  try {
+    await Organization.updateOne({ id: organizationId }, update);
+  } catch (error) {
+    console.warn("Failed to update organization stats:", error);
+  }
+};
+
+const userAdded = (user) =>
+  adjust(user.organizationId, {
+    totalUsers: 1,
+    activeUsers: user.isActive === false ? 0 : 1,
+  });
+
+const userRemoved = (user) =>
+  adjust(user.organizationId, {
+    totalUsers: -1,
+    activeUsers: user.isActive === false ? 0 : -1,
+  });
+
+const userActivityChanged = (organizationId, wasActive, isActive) =>
+  wasActive === isActive
+    ? null
+    : adjust(organizationId, { activeUsers: isActive ? 1 : -1 });
+
+const projectAdded = (organizationId) =>
+  adjust(organizationId, { totalProjects: 1 });
+
+const timeTracked = (organizationId, seconds) =>
+  adjust(organizationId, { totalTimeTracked: seconds });
+
+// Counters recomputed from the source collections
+const compute = async (organizationId) => {
+  const [totalUsers, activeUsers, totalProjects, totalTime] = await Promise.all([
+    User.countDocuments({ organizationId }),
+    User.countDocuments({ organizationId, isActive: true }),
+    Project.countDocuments({ organizationId }),
+    TimeEntry.aggregate([
+      { $match: { organizationId, end_time: { $type: "date" } } },
+      { $group: { _id: null, total: { $sum: { $ifNull: ["$duration", 0] } } } },
+    ]).allowDiskUse(true),
+  ]);
+
+  return {
+    totalUsers,
+    activeUsers,
+    totalProjects,
+    totalTimeTracked: totalTime[0]?.total || 0,
+  };
+};
+
+const COUNTERS = ["totalUsers", "activeUsers", "totalProjects", "totalTimeTracked"];
+
+// Recompute one organization. The write only lands if no delta touched the
+// organization while counting (every delta bumps lastActivity); otherwise it
+// is reported as skipped. A skipped organization still moves to the back of
+// the queue, or a busy one would head every batch and starve the rest.
+const reconcile = async (organizationId) => {
+  const organization = await Organization.findOne({ id: organizationId })
+    .select("id stats")
+    .lean();
+  if (!organization) {
+    return { status: "missing" };
+  }
+
+  const stats = organization.stats || {};
+  const expected = await compute(organizationId);
+  const drifted = COUNTERS.some((field) => (stats[field] || 0) !== expected[field]);
+
+  const $set = { statsReconciledAt: new Date() };
+  if (drifted) {
+    for (const field of COUNTERS) $set[`stats.${field}`] = expected[field];
+  }
+
+  const result = await Organization.updateOne(
+    { id: organizationId, "stats.lastActivity": stats.lastActivity ?? null },
+    { $set }
+  );
+  if (!result.matchedCount) {
+    await Organization.updateOne(
+      { id: organizationId },
+      { $set: { statsReconciledAt: $set.statsReconciledAt } }
+    );
+    return { status: "skipped", stats: expected };
+  }
+  return { status: drifted ? "corrected" : "ok", stats: expected };
+};
+
+// Run fn over items with at most `concurrency` in flight
+const mapLimit = async (items, concurrency, fn) => {
+  const results = new Array(items.length);
+  let next = 0;
+  const worker = async () => {
+    while (next < items.length) {
+      const index = next++;
+      results[index] = await fn(items[index]);
+    }
+  };
+  await Promise.all(
+    Array.from({ length: Math.min(concurrency, items.length) }, worker)
+  );
+  return results;
+};
+
+class ReconciliationScheduler {
+  constructor({ intervalMs, batchSize, concurrency, logger = console }) {
+    this.intervalMs = intervalMs;
+    this.batchSize = batchSize;
+    this.concurrency = concurrency;
+    this.logger = logger;
+    this.timer = null;
+    this.running = false;
+    this.totals = { reconciled: 0, corrected: 0, skipped: 0, failed: 0 };
+    this.lastRun = null;
+    this.lagMs = null;
+  }
+
+  start() {
+    if (this.timer) return;
+    this.timer = setInterval(() => this.runBatch(), this.intervalMs);
+    this.timer.unref();
+  }
+
+  stop() {
+    clearInterval(this.timer);
+    this.timer = null;
+  }
+
+  // Reconcile the batch of organizations that have waited longest
+  async runBatch() {
+    if (this.running) return null;
+    this.running = true;
+    const started = Date.now();
+
+    try {
+      const organizations = await Organization.find({ isActive: true })
+        .select("id statsReconciledAt")
+        .sort({ statsReconciledAt: 1 })
+        .limit(this.batchSize)
+        .lean();
+
+      const outcomes = await mapLimit(
+        organizations,
+        this.concurrency,
+        async ({ id }) => {
+          try {
+            return (await reconcile(id)).status;
+          } catch (error) {
+            this.logger.error(`Organization stats reconcile failed for ${id}:`, error);
+            return "failed";
+          }
+        }
+      );
+
+      const batch = { reconciled: 0, corrected: 0, skipped: 0, failed: 0 };
+      for (const status of outcomes) {
+        if (status === "ok" || status === "corrected") batch.reconciled++;
+        if (status === "corrected") batch.corrected++;
+        if (status === "skipped") batch.skipped++;
+        if (status === "failed") batch.failed++;
+      }
+      for (const key of Object.keys(batch)) this.totals[key] += batch[key];
+
+      // Lag: how long the least recently reconciled organization has waited
+      const oldest = await Organization.findOne({ isActive: true })
+        .select("createdAt statsReconciledAt")
+        .sort({ statsReconciledAt: 1 })
+        .lean();
+      const oldestAt = oldest?.statsReconciledAt || oldest?.createdAt;
+      this.lagMs = oldestAt ? Date.now() - new Date(oldestAt).getTime() : 0;
+
+      this.lastRun = {
+        at: new Date(started),
+        durationMs: Date.now() - started,
+        organizations: organizations.length,
+        ...batch,
+      };
+      if (batch.corrected || batch.failed) {
+        this.logger.warn("Organization stats reconciliation", this.lastRun);
+      }
+      return this.lastRun;
+    } catch (error) {
+      this.logger.error("Organization stats reconciliation failed:", error);
+      return null;
+    } finally {
+      this.running = false;
+    }
+  }
+
+  stats() {
+    return {
+      enabled: Boolean(this.timer),
+      intervalMs: this.intervalMs,
+      batchSize: this.batchSize,
+      concurrency: this.concurrency,
+      lagMs: this.lagMs,
+      lastRun: this.lastRun,
+      totals: this.totals,
+    };
+  }
+}
+
+module.exports = {
+  adjust,
+  userAdded,
+  userRemoved,
+  userActivityChanged,
+  projectAdded,
+  timeTracked,
+  compute,
+  reconcile,
+  ReconciliationScheduler,
+};
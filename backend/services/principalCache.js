@@ -0,0 +1,170 @@
+// backend/services/principalCache.js - In-process cache of authenticated users and organizations
+// authMiddleware resolves a user and an organization on every request. Both
+// change rarely, so plain copies are kept here with a TTL and LRU eviction and
+// dropped explicitly whenever a user is updated or an organization deactivated.
+
+const clusterBus = require("./clusterBus");
+
+const DEFAULT_TTL_MS = 30 * 1000;
+const DEFAULT_MAX_ENTRIES = 10000;
+
+class LRUCache {
+  constructor({ ttlMs, maxEntries }) {
+    this.ttlMs = ttlMs;
+    this.maxEntries = maxEntries;
+    this.entries = new Map();
+    this.hits = 0;
+    this.misses = 0;
+    this.evictions = 0;
+    this.invalidations = 0;
+  }
+
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      this.misses++;
+      return null;
+    }
+
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      this.misses++;
+      return null;
+    }
+
+    // Map keeps insertion order, so re-inserting marks the key most recent
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.hits++;
+    return entry.value;
+  }
+
+  set(key, value) {
+    this.entries.delete(key);
+    this.entries.set(key, { value, expiresAt: Date.now() + this.ttlMs });
+
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+      this.evictions++;
+    }
+  }
+
+  delete(key) {
+    if (this.entries.delete(key)) {
+      this.invalidations++;
+    }
+  }
+
+  deleteWhere(predicate) {
+    for (const key of this.entries.keys()) {
+      if (predicate(key)) {
+        this.delete(key);
+      }
+    }
+  }
+
+  clear() {
+    this.invalidations += this.entries.size;
+    this.entries.clear();
+  }
+
+  stats() {
+    const lookups = this.hits + this.misses;
+    return {
+      size: this.entries.size,
+      hits: this.hits,
+      misses: this.misses,
+      hitRate: lookups ? Math.round((this.hits / lookups) * 10000) / 10000 : 0,
+      evictions: this.evictions,
+      invalidations: this.invalidations,
+    };
+  }
+}
+
+const options = {
+  ttlMs: parseInt(process.env.PRINCIPAL_CACHE_TTL_MS) || DEFAULT_TTL_MS,
+  maxEntries: parseInt(process.env.PRINCIPAL_CACHE_MAX_ENTRIES) || DEFAULT_MAX_ENTRIES,
+};
+const enabled = process.env.PRINCIPAL_CACHE_DISABLED !== "true";
+
+const users = new LRUCache(options);
+const organizations = new LRUCache(options);
+
+const userKey = (organizationId, userId) => `${organizationId}:${userId}`;
+
+const getUser = (organizationId, userId) =>
+  enabled ? users.get(userKey(organizationId, userId)) : null;
+
+const setUser = (organizationId, userId, user) => {
+  if (enabled) users.set(userKey(organizationId, userId), user);
+};
+
+const getOrganization = (organizationId) =>
+  enabled ? organizations.get(organizationId) : null;
+
+const setOrganization = (organizationId, organization) => {
+  if (enabled) organizations.set(organizationId, organization);
+};
+
+// Invalidations are applied here and replayed on the other cluster workers
+const INVALIDATION_CHANNEL = "principal-cache:invalidate";
+
+const dropUser = (userId, organizationId) => {
+  if (organizationId) {
+    users.delete(userKey(organizationId, userId));
+  } else {
+    users.deleteWhere((key) => key.endsWith(`:${userId}`));
+  }
+};
+
+const dropOrganization = (organizationId) => {
+  organizations.delete(organizationId);
+  users.deleteWhere((key) => key.startsWith(`${organizationId}:`));
+};
+
+const dropAll = () => {
+  users.clear();
+  organizations.clear();
+};
+
+clusterBus.subscribe(INVALIDATION_CHANNEL, ({ kind, userId, organizationId }) => {
+  if (kind === "user") dropUser(userId, organizationId);
+  else if (kind === "organization") dropOrganization(organizationId);
+  else dropAll();
+});
+
+// organizationId is optional: without it the user is dropped from every org
+const invalidateUser = (userId, organizationId) => {
+  dropUser(userId, organizationId);
+  clusterBus.publish(INVALIDATION_CHANNEL, { kind: "user", userId, organizationId });
+};
+
+const invalidateOrganization = (organizationId) => {
+  dropOrganization(organizationId);
+  clusterBus.publish(INVALIDATION_CHANNEL, { kind: "organization", organizationId });
+};
+
+const clear = () => {
+  dropAll();
+  clusterBus.publish(INVALIDATION_CHANNEL, { kind: "all" });
+};
+
+const stats = () => ({
+  enabled,
+  ttlMs: options.ttlMs,
+  maxEntries: options.maxEntries,
+  users: users.stats(),
+  organizations: organizations.stats(),
+});
+
+module.exports = {
+  LRUCache,
+  getUser,
+  setUser,
+  getOrganization,
+  setOrganization,
+  invalidateUser,
+  invalidateOrganization,
+  clear,
+  stats,
+};
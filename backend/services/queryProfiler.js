@@ -0,0 +1,381 @@
+// backend/services/queryProfiler.js - Slow query profiler with explain plans
+// When enabled (QUERY_PROFILE=true or PUT /api/health/query-profile), every
+// Mongoose query and aggregate timed by the metrics plugin is attributed to
+// the route that issued it and grouped by query shape: the filter with its
+// values replaced by their types, plus the sort. Queries slower than slow_ms
+// are explained (queryPlanner only, nothing is executed twice), and the plan's
+// index or COLLSCAN is counted against the route. Set slow_ms to 0 to explain
+// every shape, which is what the Python suite's --assert-no-collscan mode does.
+// services/indexAdvisor turns a report into index proposals.
+
+const { AsyncLocalStorage } = require("async_hooks");
+const clusterBus = require("./clusterBus");
+const metrics = require("./metrics");
+
+const SETTINGS_CHANNEL = "query-profile:settings";
+const REPORT_CHANNEL = "query-profile:report";
+const RESET_CHANNEL = "query-profile:reset";
+const MAX_ENTRIES = parseInt(process.env.QUERY_PROFILE_MAX_ENTRIES) || 2000;
+const PLAN_TTL_MS = 60 * 1000; // re-explain a shape at most once a minute
+const MAX_EXPLAINS_IN_FLIGHT = 4;
+const SINGLE_DOCUMENT = new Set([
+  "findOne",
+  "findOneAndUpdate",
+  "findOneAndDelete",
+  "findOneAndReplace",
+  "updateOne",
+  "replaceOne",
+  "deleteOne",
+]);
+
+const slowMsFromEnv = parseInt(process.env.QUERY_PROFILE_SLOW_MS);
+const settings = {
+  enabled: process.env.QUERY_PROFILE === "true",
+  slowMs: Number.isNaN(slowMsFromEnv) ? 100 : slowMsFromEnv,
+};
+
+const context = new AsyncLocalStorage();
+const entries = new Map(); // route|model|operation|shape|sort -> entry
+const plans = new Map(); // model|operation|shape|sort -> { plan, at } or { pending }
+let since = new Date();
+let dropped = 0;
+let explainsInFlight = 0;
+let explainFailures = 0;
+
+// The filter with every value replaced by its type: { user_id: "string",
+// end_time: { $ne: "null" }, id: { $in: ["string"] } }
+const shapeOf = (value) => {
+  if (value === null || value === undefined) return "null";
+  if (Array.isArray(value)) return value.length ? [shapeOf(value[0])] : [];
+  if (value instanceof Date) return "date";
+  if (value instanceof RegExp) return "regex";
+  if (typeof value !== "object") return typeof value;
+  if (value._bsontype) return value._bsontype.toLowerCase();
+  const shape = {};
+  for (const key of Object.keys(value).sort()) shape[key] = shapeOf(value[key]);
+  return shape;
+};
+
+// Winning plan stages and indexes, wherever the server nests them
+const summarizePlan = (explained) => {
+  const stages = [];
+  const indexes = new Set();
+  const visit = (node) => {
+    if (!node || typeof node !== "object") return;
+    if (Array.isArray(node)) return node.forEach(visit);
+    if (typeof node.stage === "string") stages.push(node.stage);
+    if (typeof node.indexName === "string") indexes.add(node.indexName);
+    for (const [key, child] of Object.entries(node)) {
+      // Rejected plans would report indexes the query does not use
+      if (key !== "rejectedPlans") visit(child);
+    }
+  };
+  visit(explained);
+
+  const collscan = stages.includes("COLLSCAN");
+  const label = collscan
+    ? "COLLSCAN"
+    : indexes.size
+      ? `IXSCAN ${[...indexes].join("+")}`
+      : stages[stages.length - 1] || "UNKNOWN";
+  return { label, collscan, indexes: [...indexes], stages };
+};
+
+// queryPlanner explain through the driver, so the profiler's own commands
+// never come back through the Mongoose hooks
+const explain = (operation, source) => {
+  const isAggregate = typeof source.pipeline === "function";
+  const model = isAggregate ? source._model : source.model;
+  const collection = model.collection.collectionName;
+  let command;
+  if (isAggregate) {
+    command = { aggregate: collection, pipeline: source.pipeline(), cursor: {} };
+  } else if (operation === "distinct") {
+    command = { distinct: collection, key: source._distinct, query: source.getFilter() };
+  } else if (operation === "countDocuments") {
+    command = { count: collection, query: source.getFilter() };
+  } else {
+    // Updates and deletes pick their plan the way a find with the filter does
+    const { sort, limit, skip } = source.getOptions();
+    command = { find: collection, filter: source.getFilter() };
+    if (sort) command.sort = sort;
+    if (SINGLE_DOCUMENT.has(operation)) command.limit = 1;
+    else if (limit) command.limit = limit;
+    if (skip) command.skip = skip;
+  }
+  return model.db.db.command({ explain: command, verbosity: "queryPlanner" });
+};
+
+// Fields an inclusion projection returns, _id included unless turned off;
+// null for no projection or an exclusion one (every other field comes back)
+const projectedFields = (projection) => {
+  if (!projection || !Object.keys(projection).length) return null;
+  const fields = [];
+  for (const [field, value] of Object.entries(projection)) {
+    if (field === "_id") continue;
+    if (!value || value === "0") return null;
+    fields.push(field);
+  }
+  if (!fields.length) return null;
+  return projection._id === 0 || projection._id === false ? fields : ["_id", ...fields];
+};
+
+// Filter, sort and returned fields of a Query, or of an Aggregate's leading
+// $match / $sort / $project stages (the part an index can serve)
+const partsOf = (source) => {
+  if (typeof source.pipeline !== "function") {
+    return {
+      filter: source.getFilter(),
+      sort: source.getOptions().sort || null,
+      fields: projectedFields(source._fields),
+    };
+  }
+
+  const parts = { filter: {}, sort: null, fields: null };
+  for (const stage of source.pipeline()) {
+    if (stage.$match && !parts.sort) parts.filter = { ...parts.filter, ...stage.$match };
+    else if (stage.$sort && !parts.sort) parts.sort = stage.$sort;
+    else if (stage.$project) {
+      parts.fields = projectedFields(stage.$project);
+      break;
+    } else break;
+  }
+  return parts;
+};
+
+// Resolves with the plan summary for a shape, explaining it if needed
+const planFor = (key, operation, source) => {
+  const cached = plans.get(key);
+  if (cached?.pending) return cached.pending;
+  if (cached && Date.now() - cached.at < PLAN_TTL_MS) return Promise.resolve(cached.plan);
+  if (explainsInFlight >= MAX_EXPLAINS_IN_FLIGHT) {
+    return Promise.resolve(cached ? cached.plan : null);
+  }
+
+  explainsInFlight++;
+  const pending = explain(operation, source)
+    .then((explained) => {
+      const plan = summarizePlan(explained);
+      plans.set(key, { plan, at: Date.now() });
+      return plan;
+    })
+    .catch((error) => {
+      explainFailures++;
+      plans.delete(key);
+      console.warn(`Query profiler explain failed for ${key}:`, error.message);
+      return null;
+    })
+    .finally(() => {
+      explainsInFlight--;
+    });
+  plans.set(key, { pending });
+  return pending;
+};
+
+const entryFor = (route, observation) => {
+  const { model, operation, shape, sort } = observation;
+  const key = `${route}|${model}|${operation}|${shape}|${sort}`;
+  let entry = entries.get(key);
+  if (!entry) {
+    if (entries.size >= MAX_ENTRIES) {
+      dropped++;
+      return null;
+    }
+    entry = {
+      route,
+      model,
+      operation,
+      shape,
+      sort,
+      fields: observation.fields,
+      count: 0,
+      slow: 0,
+      errors: 0,
+      total_ms: 0,
+      max_ms: 0,
+      plans: {},
+      collscans: 0,
+    };
+    entries.set(key, entry);
+  }
+  return entry;
+};
+
+const aggregate = (route, observation) => {
+  const entry = entryFor(route, observation);
+  if (!entry) return;
+  entry.count++;
+  entry.total_ms += observation.ms;
+  entry.max_ms = Math.max(entry.max_ms, observation.ms);
+  if (observation.slow) entry.slow++;
+  if (observation.failed) entry.errors++;
+  if (observation.plan) {
+    observation.plan.then((plan) => {
+      if (!plan) return;
+      entry.plans[plan.label] = (entry.plans[plan.label] || 0) + 1;
+      if (plan.collscan) entry.collscans++;
+    });
+  }
+};
+
+const routeOf = (req) =>
+  req.route ? `${req.method} ${req.baseUrl}${req.route.path}` : null;
+
+// Queries run by middleware (auth, rate limits) happen before the route is
+// known; they are attributed once the response finishes
+const observe = ({ model, operation, seconds, failed, source }) => {
+  if (!settings.enabled || !source) return;
+
+  const ms = seconds * 1000;
+  const { filter, sort, fields } = partsOf(source);
+  const shape = JSON.stringify(shapeOf(filter));
+  const sortKey = JSON.stringify(sort);
+  const slow = ms >= settings.slowMs;
+  const observation = {
+    model,
+    operation,
+    shape,
+    sort: sortKey,
+    fields,
+    ms,
+    slow,
+    failed,
+    plan: slow ? planFor(`${model}|${operation}|${shape}|${sortKey}`, operation, source) : null,
+  };
+
+  const store = context.getStore();
+  if (!store) return aggregate("background", observation);
+  const route = routeOf(store.req);
+  if (route) aggregate(route, observation);
+  else store.deferred.push(observation);
+};
+
+metrics.observeOperations(observe);
+
+// Runs the rest of the request inside a context the hooks can read
+const trackRoutes = (req, res, next) => {
+  if (!settings.enabled) return next();
+  const store = { req, deferred: [] };
+  res.once("finish", () => {
+    const route = routeOf(req) || `${req.method} unmatched`;
+    for (const observation of store.deferred) aggregate(route, observation);
+    store.deferred = [];
+  });
+  context.run(store, next);
+};
+
+// ---- Settings and report -------------------------------------------------
+
+const applySettings = ({ enabled, slow_ms }) => {
+  if (enabled !== undefined) settings.enabled = Boolean(enabled);
+  if (slow_ms !== undefined) settings.slowMs = slow_ms;
+};
+
+const resetLocal = () => {
+  entries.clear();
+  plans.clear();
+  dropped = 0;
+  explainFailures = 0;
+  since = new Date();
+};
+
+clusterBus.subscribe(SETTINGS_CHANNEL, applySettings);
+clusterBus.subscribe(RESET_CHANNEL, resetLocal);
+
+// Throws a 400-style error for a bad threshold
+const configure = ({ enabled, slow_ms }) => {
+  if (slow_ms !== undefined && !(Number.isFinite(slow_ms) && slow_ms >= 0)) {
+    const error = new Error("slow_ms must be a number of milliseconds >= 0");
+    error.status = 400;
+    throw error;
+  }
+  const changes = { enabled, slow_ms };
+  applySettings(changes);
+  clusterBus.publish(SETTINGS_CHANNEL, changes);
+};
+
+const reset = () => {
+  resetLocal();
+  clusterBus.publish(RESET_CHANNEL, true);
+};
+
+const localReport = () => ({
+  since: since.toISOString(),
+  dropped,
+  explain_failures: explainFailures,
+  queries: [...entries.values()],
+});
+
+clusterBus.respond(REPORT_CHANNEL, localReport);
+
+// Query entries from every worker added up, plus a per-route summary
+const report = async () => {
+  const peers = await clusterBus.gather(REPORT_CHANNEL, null);
+  const merged = new Map();
+  for (const part of [localReport(), ...peers]) {
+    for (const entry of part.queries) {
+      const key = `${entry.route}|${entry.model}|${entry.operation}|${entry.shape}|${entry.sort}`;
+      const existing = merged.get(key);
+      if (!existing) {
+        merged.set(key, { ...entry, plans: { ...entry.plans } });
+        continue;
+      }
+      for (const field of ["count", "slow", "errors", "total_ms", "collscans"]) {
+        existing[field] += entry[field];
+      }
+      existing.max_ms = Math.max(existing.max_ms, entry.max_ms);
+      for (const [label, count] of Object.entries(entry.plans)) {
+        existing.plans[label] = (existing.plans[label] || 0) + count;
+      }
+    }
+  }
+
+  const queries = [...merged.values()]
+    .map((entry) => ({
+      ...entry,
+      total_ms: Math.round(entry.total_ms * 100) / 100,
+      max_ms: Math.round(entry.max_ms * 100) / 100,
+      avg_ms: Math.round((entry.total_ms / entry.count) * 100) / 100,
+    }))
+    .sort((a, b) => b.total_ms - a.total_ms);
+
+  const routes = new Map();
+  for (const entry of queries) {
+    const route = routes.get(entry.route) || {
+      route: entry.route,
+      queries: 0,
+      total_ms: 0,
+      collscans: 0,
+      indexes: {},
+    };
+    route.queries += entry.count;
+    route.total_ms = Math.round((route.total_ms + entry.total_ms) * 100) / 100;
+    route.collscans += entry.collscans;
+    for (const [label, count] of Object.entries(entry.plans)) {
+      route.indexes[label] = (route.indexes[label] || 0) + count;
+    }
+    routes.set(entry.route, route);
+  }
+
+  return {
+    enabled: settings.enabled,
+    slow_ms: settings.slowMs,
+    since: since.toISOString(),
+    dropped: dropped + peers.reduce((sum, part) => sum + part.dropped, 0),
+    explain_failures:
+      explainFailures + peers.reduce((sum, part) => sum + part.explain_failures, 0),
+    routes: [...routes.values()].sort((a, b) => b.total_ms - a.total_ms),
+    collscans: queries.filter((entry) => entry.collscans > 0),
+    queries,
+  };
+};
+
+module.exports = {
+  shapeOf,
+  summarizePlan,
+  trackRoutes,
+  configure,
+  reset,
+  report,
+  settings: () => ({ enabled: settings.enabled, slow_ms: settings.slowMs }),
+};
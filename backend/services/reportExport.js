@@ -0,0 +1,142 @@
+// backend/services/reportExport.js - Streaming CSV/NDJSON export of time entries
+// Rows come from a lean Mongo cursor and pass through a Transform into the
+// response with stream.pipeline, so memory stays flat however large the range
+// is and a slow client pauses the cursor instead of buffering rows.
+
+const { Transform, pipeline } = require("stream");
+const TimeEntry = require("../models/TimeEntry");
+const Project = require("../models/Project");
+const User = require("../models/User");
+
+const FORMATS = {
+  csv: { contentType: "text/csv; charset=utf-8", extension: "csv" },
+  ndjson: { contentType: "application/x-ndjson; charset=utf-8", extension: "ndjson" },
+};
+
+const COLUMNS = [
+  "id",
+  "user_id",
+  "user_name",
+  "project_id",
+  "project_name",
+  "task_id",
+  "description",
+  "start_time",
+  "end_time",
+  "duration",
+  "activity_level",
+  "billable",
+  "hourly_rate",
+  "total_amount",
+  "is_manual",
+];
+
+const PROJECTION = {
+  _id: 0,
+  id: 1,
+  user_id: 1,
+  project_id: 1,
+  task_id: 1,
+  description: 1,
+  start_time: 1,
+  end_time: 1,
+  duration: 1,
+  activity_level: 1,
+  billable: 1,
+  hourly_rate: 1,
+  total_amount: 1,
+  is_manual: 1,
+};
+
+const CURSOR_BATCH_SIZE = 1000;
+
+const csvValue = (value) => {
+  if (value === null || value === undefined) return "";
+  let text = value instanceof Date ? value.toISOString() : String(value);
+  // Keep spreadsheet apps from evaluating user-entered text as formulas
+  if (/^[=+\-@\t\r]/.test(text) && typeof value === "string") {
+    text = `'${text}`;
+  }
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+};
+
+const toRow = (entry, userNames, projectNames) => ({
+  ...entry,
+  user_name: userNames.get(entry.user_id) ?? null,
+  project_name: projectNames.get(entry.project_id) ?? null,
+  task_id: entry.task_id ?? null,
+});
+
+const formatter = (format, userNames, projectNames) => {
+  let headerWritten = false;
+  return new Transform({
+    writableObjectMode: true,
+    transform(entry, _encoding, callback) {
+      const row = toRow(entry, userNames, projectNames);
+      if (format === "ndjson") {
+        callback(null, `${JSON.stringify(row, COLUMNS)}\n`);
+        return;
+      }
+
+      const line = `${COLUMNS.map((column) => csvValue(row[column])).join(",")}\r\n`;
+      if (!headerWritten) {
+        headerWritten = true;
+        callback(null, `${COLUMNS.join(",")}\r\n${line}`);
+        return;
+      }
+      callback(null, line);
+    },
+    flush(callback) {
+      // An empty CSV export still gets its header row
+      callback(null, format === "csv" && !headerWritten ? `${COLUMNS.join(",")}\r\n` : "");
+    },
+  });
+};
+
+// Stream every entry matching `query` to `res`; resolves with the row count
+const streamEntries = async (res, { organizationId, query, format, filename }) => {
+  // Name lookups are bounded by the org's users and projects, not the range
+  const [users, projects] = await Promise.all([
+    User.find({ organizationId }).select("id name").lean(),
+    Project.find({ organizationId }).select("id name").lean(),
+  ]);
+  const userNames = new Map(users.map((user) => [user.id, user.name]));
+  const projectNames = new Map(projects.map((project) => [project.id, project.name]));
+
+  const { contentType, extension } = FORMATS[format];
+  res.status(200);
+  res.setHeader("Content-Type", contentType);
+  res.setHeader(
+    "Content-Disposition",
+    `attachment; filename="${filename}.${extension}"`
+  );
+  res.setHeader("Cache-Control", "no-store");
+
+  const cursor = TimeEntry.find(query)
+    .select(PROJECTION)
+    .sort({ start_time: 1 })
+    .lean()
+    .cursor({ batchSize: CURSOR_BATCH_SIZE });
+
+  let rows = 0;
+  const counter = new Transform({
+    objectMode: true,
+    transform(entry, _encoding, callback) {
+      rows++;
+      callback(null, entry);
+    },
+  });
+
+  await new Promise((resolve, reject) => {
+    pipeline(cursor, counter, formatter(format, userNames, projectNames), res, (error) =>
+      error ? reject(error) : resolve()
+    );
+  });
+  return rows;
+};
+
+module.exports = {
+  FORMATS,
+  COLUMNS,
+  streamEntries,
+};
@@ -0,0 +1,216 @@
+// backend/services/reportJobs.js - Background custom report jobs
+// Submitting a report returns a job immediately; a bounded pool of workers
+// builds reports off the request path and records progress. Finished reports
+// are cached by a hash of their inputs, and identical submissions while a job
+// is still queued or running attach to that job, so each distinct report is
+// computed once however many managers ask for it.
+// Jobs live on the worker that accepted them; in cluster mode status and
+// result requests that land on another worker ask the owner over the bus.
+
+const crypto = require("crypto");
+const { v4: uuidv4 } = require("uuid");
+const { LRUCache } = require("./principalCache");
+const customReport = require("./customReport");
+const clusterBus = require("./clusterBus");
+const dataVersion = require("./dataVersion");
+
+const options = {
+  concurrency: parseInt(process.env.REPORT_JOB_CONCURRENCY) || 2,
+  queueLimit: parseInt(process.env.REPORT_JOB_QUEUE_LIMIT) || 100,
+  cacheTtlMs: parseInt(process.env.REPORT_CACHE_TTL_MS) || 10 * 60 * 1000,
+  cacheMaxEntries: parseInt(process.env.REPORT_CACHE_MAX_ENTRIES) || 500,
+  jobRetentionMs: parseInt(process.env.REPORT_JOB_RETENTION_MS) || 60 * 60 * 1000,
+};
+
+const results = new LRUCache({
+  ttlMs: options.cacheTtlMs,
+  maxEntries: options.cacheMaxEntries,
+});
+const jobs = new Map(); // id -> job
+const pendingByKey = new Map(); // cache key -> queued or running job
+const queue = [];
+let running = 0;
+let completed = 0;
+let failed = 0;
+
+const sorted = (values) => [...values].map(String).sort();
+
+// Identical inputs hash to the same key regardless of list order. The
+// organization's data version is part of it, so a write makes earlier
+// results unreachable, as in responseCache.
+const cacheKey = (organizationId, params) =>
+  crypto
+    .createHash("sha256")
+    .update(
+      JSON.stringify([
+        organizationId,
+        dataVersion.get(organizationId),
+        params.startDate.toISOString(),
+        params.endDate.toISOString(),
+        sorted(params.user_ids),
+        sorted(params.project_ids),
+        sorted(params.metrics),
+      ])
+    )
+    .digest("hex");
+
+const publicJob = (job) => ({
+  id: job.id,
+  status: job.status,
+  progress: Math.round(job.progress * 100),
+  cached: job.cached,
+  created_at: job.createdAt,
+  started_at: job.startedAt,
+  completed_at: job.completedAt,
+  error: job.error,
+});
+
+const pruneJobs = () => {
+  const cutoff = Date.now() - options.jobRetentionMs;
+  for (const [id, job] of jobs) {
+    if (job.completedAt && job.completedAt.getTime() < cutoff) {
+      jobs.delete(id);
+    }
+  }
+};
+
+const runJob = async (job) => {
+  running++;
+  job.status = "running";
+  job.startedAt = new Date();
+
+  try {
+    const report = await customReport.buildReport(job.organizationId, job.params, {
+      onProgress: (fraction) => {
+        job.progress = fraction;
+      },
+    });
+    results.set(job.key, report);
+    job.result = report;
+    job.status = "completed";
+    job.progress = 1;
+    completed++;
+  } catch (error) {
+    console.error(`Report job ${job.id} failed:`, error);
+    job.status = "failed";
+    job.error = "Report generation failed";
+    failed++;
+  } finally {
+    job.completedAt = new Date();
+    pendingByKey.delete(job.key);
+    running--;
+    drain();
+  }
+};
+
+const drain = () => {
+  while (running < options.concurrency && queue.length > 0) {
+    runJob(queue.shift());
+  }
+};
+
+// Submit a report; returns the job that will (or already did) produce it
+const submit = (organizationId, userId, body) => {
+  pruneJobs();
+  const params = customReport.normalizeParams(body);
+  const key = cacheKey(organizationId, params);
+
+  const pending = pendingByKey.get(key);
+  if (pending) {
+    return pending;
+  }
+
+  const job = {
+    id: uuidv4(),
+    key,
+    organizationId,
+    requestedBy: userId,
+    params,
+    status: "queued",
+    progress: 0,
+    cached: false,
+    createdAt: new Date(),
+    startedAt: null,
+    completedAt: null,
+    error: null,
+    result: null,
+  };
+
+  const cached = results.get(key);
+  if (cached) {
+    Object.assign(job, {
+      status: "completed",
+      progress: 1,
+      cached: true,
+      startedAt: job.createdAt,
+      completedAt: job.createdAt,
+      result: cached,
+    });
+    jobs.set(job.id, job);
+    return job;
+  }
+
+  if (queue.length >= options.queueLimit) {
+    const error = new Error("Report queue is full, try again later");
+    error.status = 503;
+    throw error;
+  }
+
+  jobs.set(job.id, job);
+  pendingByKey.set(key, job);
+  queue.push(job);
+  drain();
+  return job;
+};
+
+// Jobs are visible to the organization that submitted them
+const getJob = (organizationId, jobId) => {
+  const job = jobs.get(jobId);
+  return job && job.organizationId === organizationId ? job : null;
+};
+
+const LOOKUP_CHANNEL = "report-jobs:get";
+
+clusterBus.respond(LOOKUP_CHANNEL, ({ organizationId, jobId }) => {
+  const job = getJob(organizationId, jobId);
+  return job ? { ...publicJob(job), result: job.result } : null;
+});
+
+// Like getJob, but also finds jobs held by other cluster workers. Remote jobs
+// come back as a copy with publicJob fields plus result.
+const findJob = async (organizationId, jobId) => {
+  const job = getJob(organizationId, jobId);
+  if (job || !clusterBus.enabled) return job;
+
+  const remote = await clusterBus.request(LOOKUP_CHANNEL, { organizationId, jobId });
+  if (!remote) return null;
+  return {
+    id: remote.id,
+    status: remote.status,
+    progress: remote.progress / 100,
+    cached: remote.cached,
+    createdAt: remote.created_at,
+    startedAt: remote.started_at,
+    completedAt: remote.completed_at,
+    error: remote.error,
+    result: remote.result,
+  };
+};
+
+const stats = () => ({
+  concurrency: options.concurrency,
+  running,
+  queued: queue.length,
+  jobs: jobs.size,
+  completed,
+  failed,
+  cache: results.stats(),
+});
+
+module.exports = {
+  submit,
+  getJob,
+  findJob,
+  publicJob,
+  stats,
+};
@@ -0,0 +1,217 @@
+// backend/services/screenshotStore.js - Content-addressed screenshot storage
+// Uploads stream through multer into a temporary file while being hashed, and
+// are then renamed to objects/<first two hex>/<sha256>. An image that is
+// already stored (a tracker retrying, or an idle screen captured twice) is
+// kept once: the temporary copy is discarded and the existing object reused.
+// Nothing is buffered beyond the stream's chunks, and at most
+// SCREENSHOT_UPLOAD_CONCURRENCY uploads are read at once per process; the
+// rest are told to retry before their body is read, so a fleet of trackers
+// uploading at the same moment costs disk bandwidth, not memory.
+// Objects are only ever deleted by collectGarbage(), once no Screenshot
+// references them (`npm run screenshots:gc`).
+
+const crypto = require("crypto");
+const fs = require("fs");
+const path = require("path");
+const { Transform } = require("stream");
+const { pipeline } = require("stream/promises");
+const Screenshot = require("../models/Screenshot");
+
+const ROOT =
+  process.env.SCREENSHOT_STORAGE_DIR || path.join(__dirname, "..", "uploads", "screenshots");
+const OBJECTS_DIR = path.join(ROOT, "objects");
+const THUMBNAILS_DIR = path.join(ROOT, "thumbnails");
+const TMP_DIR = path.join(ROOT, "tmp");
+const MAX_BYTES = parseInt(process.env.SCREENSHOT_MAX_BYTES) || 10 * 1024 * 1024;
+const UPLOAD_CONCURRENCY = parseInt(process.env.SCREENSHOT_UPLOAD_CONCURRENCY) || 32;
+// Unreferenced objects younger than this may belong to an upload in progress
+const GC_GRACE_MS = 60 * 60 * 1000;
+
+const PNG_SIGNATURE = Buffer.from("89504e470d0a1a0a", "hex");
+const SIGNATURES = [
+  { mime: "image/png", test: (head) => head.subarray(0, 8).equals(PNG_SIGNATURE) },
+  { mime: "image/jpeg", test: (head) => head[0] === 0xff && head[1] === 0xd8 && head[2] === 0xff },
+  {
+    mime: "image/webp",
+    test: (head) =>
+      head.toString("ascii", 0, 4) === "RIFF" && head.toString("ascii", 8, 12) === "WEBP",
+  },
+];
+const SNIFF_BYTES = 12;
+
+let uploading = 0;
+const counts = { uploads: 0, stored: 0, deduplicated: 0, rejected_busy: 0, bytes_written: 0 };
+
+const objectPath = (hash) => path.join(OBJECTS_DIR, hash.slice(0, 2), hash);
+const thumbnailPath = (hash) => path.join(THUMBNAILS_DIR, hash.slice(0, 2), `${hash}.jpg`);
+
+const statusError = (message, status) => Object.assign(new Error(message), { status });
+
+const exists = (file) =>
+  fs.promises.stat(file).then(
+    () => true,
+    (error) => {
+      if (error.code === "ENOENT") return false;
+      throw error;
+    }
+  );
+
+// An upload slot, or null when UPLOAD_CONCURRENCY uploads are being read
+const acquire = () => {
+  if (uploading >= UPLOAD_CONCURRENCY) {
+    counts.rejected_busy++;
+    return null;
+  }
+  uploading++;
+  let released = false;
+  return () => {
+    if (released) return;
+    released = true;
+    uploading--;
+  };
+};
+
+// Hashes, sizes and type-checks the bytes on their way to disk; the image
+// type comes from its signature, not the client's Content-Type
+const inspector = (info) =>
+  new Transform({
+    transform(chunk, encoding, done) {
+      if (!info.mime_type) {
+        info.head = info.head ? Buffer.concat([info.head, chunk]) : chunk;
+        if (info.head.length >= SNIFF_BYTES) {
+          const signature = SIGNATURES.find(({ test }) => test(info.head));
+          if (!signature) return done(statusError("Screenshots must be PNG, JPEG or WebP", 415));
+          info.mime_type = signature.mime;
+          info.head = null;
+        }
+      }
+      info.hash.update(chunk);
+      info.size += chunk.length;
+      done(null, chunk);
+    },
+    flush(done) {
+      done(info.mime_type ? null : statusError("Screenshots must be PNG, JPEG or WebP", 415));
+    },
+  });
+
+// multer storage engine; the file gets { hash, size, mime_type, path, deduplicated }
+class ContentAddressedStorage {
+  _handleFile(req, file, cb) {
+    // busboy signals a file cut at the size limit with "limit"; listen
+    // before anything asynchronous so it cannot be missed
+    const limit = { hit: false };
+    file.stream.once("limit", () => {
+      limit.hit = true;
+    });
+    this.store(file, limit).then((stored) => cb(null, stored), cb);
+  }
+
+  async store(file, limit) {
+    await fs.promises.mkdir(TMP_DIR, { recursive: true });
+    const tmp = path.join(TMP_DIR, crypto.randomUUID());
+    const info = { hash: crypto.createHash("sha256"), size: 0, mime_type: null, head: null };
+
+    try {
+      await pipeline(file.stream, inspector(info), fs.createWriteStream(tmp, { flags: "wx" }));
+      if (limit.hit) {
+        throw statusError(`Screenshots may be at most ${MAX_BYTES} bytes`, 413);
+      }
+
+      const hash = info.hash.digest("hex");
+      const target = objectPath(hash);
+      const deduplicated = await exists(target);
+      if (deduplicated) {
+        await fs.promises.unlink(tmp);
+        // Fresh mtime keeps garbage collection off an object being referenced again
+        const now = new Date();
+        await fs.promises.utimes(target, now, now);
+      } else {
+        await fs.promises.mkdir(path.dirname(target), { recursive: true });
+        await fs.promises.rename(tmp, target);
+        counts.bytes_written += info.size;
+      }
+      counts.uploads++;
+      counts[deduplicated ? "deduplicated" : "stored"]++;
+      return { hash, size: info.size, mime_type: info.mime_type, path: target, deduplicated };
+    } catch (error) {
+      await fs.promises.unlink(tmp).catch(() => {});
+      throw error;
+    }
+  }
+
+  // Stored objects may be shared with other screenshots; unreferenced ones
+  // are left to collectGarbage()
+  _removeFile(req, file, cb) {
+    cb(null);
+  }
+}
+
+const storage = () => new ContentAddressedStorage();
+
+const listFiles = async (dir) => {
+  const entries = await fs.promises.readdir(dir, { withFileTypes: true }).catch((error) => {
+    if (error.code === "ENOENT") return [];
+    throw error;
+  });
+  const files = [];
+  for (const entry of entries) {
+    const full = path.join(dir, entry.name);
+    if (entry.isDirectory()) files.push(...(await listFiles(full)));
+    else files.push(full);
+  }
+  return files;
+};
+
+const olderThan = async (file, cutoff) => {
+  const stat = await fs.promises.stat(file).catch(() => null);
+  return stat !== null && stat.mtimeMs < cutoff;
+};
+
+// Deletes objects (and their thumbnails) no Screenshot references, and
+// temporary files left by interrupted uploads
+const collectGarbage = async ({ graceMs = GC_GRACE_MS, dryRun = false, log = () => {} } = {}) => {
+  const cutoff = Date.now() - graceMs;
+  const result = { objects: 0, thumbnails: 0, tmp: 0, bytes: 0 };
+  const remove = async (file, kind) => {
+    const stat = await fs.promises.stat(file).catch(() => null);
+    if (!stat) return;
+    log(`   ${dryRun ? "would remove" : "removing"} ${path.relative(ROOT, file)}`);
+    if (!dryRun) await fs.promises.unlink(file).catch(() => {});
+    result[kind]++;
+    result.bytes += stat.size;
+  };
+
+  for (const file of await listFiles(TMP_DIR)) {
+    if (await olderThan(file, cutoff)) await remove(file, "tmp");
+  }
+  for (const file of await listFiles(OBJECTS_DIR)) {
+    const hash = path.basename(file);
+    if (!(await olderThan(file, cutoff)) || (await Screenshot.exists({ hash }))) continue;
+    // Checked again: an upload may have reused it while we looked it up
+    if (!(await olderThan(file, cutoff))) continue;
+    await remove(file, "objects");
+    await remove(thumbnailPath(hash), "thumbnails");
+  }
+  for (const file of await listFiles(THUMBNAILS_DIR)) {
+    if (!(await exists(objectPath(path.basename(file, ".jpg"))))) await remove(file, "thumbnails");
+  }
+  return result;
+};
+
+const stats = () => ({
+  root: ROOT,
+  uploading,
+  concurrency: UPLOAD_CONCURRENCY,
+  ...counts,
+});
+
+module.exports = {
+  MAX_BYTES,
+  objectPath,
+  thumbnailPath,
+  exists,
+  acquire,
+  storage,
+  collectGarbage,
+  stats,
+};
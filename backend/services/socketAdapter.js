@@ -0,0 +1,139 @@
+// backend/services/socketAdapter.js - Pub/sub adapters for Socket.IO broadcasts
+// Socket.IO's default adapter only reaches sockets connected to this process.
+// With an adapter attached, io.to(room).emit(...) and io.fetchSockets() span
+// every backend node:
+//   SOCKET_ADAPTER=redis    @socket.io/redis-adapter over REDIS_URL
+//   SOCKET_ADAPTER=cluster  IPC between cluster.js workers (default there)
+//   SOCKET_ADAPTER=memory   an in-process bus (default; single node and tests)
+const os = require("os");
+const { EventEmitter } = require("events");
+const { ClusterAdapterWithHeartbeat } = require("socket.io-adapter");
+const clusterBus = require("./clusterBus");
+const dataVersion = require("./dataVersion");
+
+const NODE_ID = process.env.NODE_ID || `${os.hostname()}-${process.pid}`;
+
+// Minimal publish/subscribe transport for BusAdapter. Several Socket.IO
+// servers created in one process (as in tests) share the same instance.
+class MemoryBus extends EventEmitter {
+  constructor() {
+    super();
+    this.setMaxListeners(0);
+  }
+
+  publish(channel, message) {
+    // Deliver asynchronously, like a network transport would
+    setImmediate(() => this.emit(channel, message));
+  }
+
+  subscribe(channel, handler) {
+    this.on(channel, handler);
+    return () => this.off(channel, handler);
+  }
+}
+
+// Cluster adapter that relays Socket.IO's inter-node messages over a bus
+class BusAdapter extends ClusterAdapterWithHeartbeat {
+  constructor(nsp, bus, opts = {}) {
+    super(nsp, opts);
+    this.bus = bus;
+    this.channel = `socket.io#${nsp.name}`;
+    this.responseChannel = `${this.channel}#${this.uid}`;
+    this.unsubscribe = [
+      bus.subscribe(this.channel, (message) => this.onMessage(message)),
+      bus.subscribe(this.responseChannel, (response) => this.onResponse(response)),
+    ];
+  }
+
+  doPublish(message) {
+    this.bus.publish(this.channel, message);
+    return Promise.resolve("");
+  }
+
+  doPublishResponse(requesterUid, response) {
+    this.bus.publish(`${this.channel}#${requesterUid}`, response);
+    return Promise.resolve();
+  }
+
+  close() {
+    this.unsubscribe.forEach((unsubscribe) => unsubscribe());
+    return super.close();
+  }
+}
+
+const memoryBus = new MemoryBus();
+
+const attachRedis = async (io, logger) => {
+  let createAdapter;
+  let createClient;
+  try {
+    ({ createAdapter } = require("@socket.io/redis-adapter"));
+    ({ createClient } = require("redis"));
+  } catch (error) {
+    throw new Error(
+      "SOCKET_ADAPTER=redis requires the @socket.io/redis-adapter and redis packages"
+    );
+  }
+
+  const url = process.env.REDIS_URL || "redis://localhost:6379";
+  const pubClient = createClient({ url });
+  const subClient = pubClient.duplicate();
+  for (const client of [pubClient, subClient]) {
+    client.on("error", (error) => logger.error("Socket.IO Redis error:", error));
+  }
+  await Promise.all([pubClient.connect(), subClient.connect()]);
+
+  const key = process.env.SOCKET_ADAPTER_KEY || "hubstaff-socket.io";
+  io.adapter(createAdapter(pubClient, subClient, { key }));
+
+  // Cached responses on other nodes must see this node's writes too
+  const channel = `${key}#data-version`;
+  const stopRelay = await dataVersion.relayThrough({
+    origin: NODE_ID,
+    publish: (message) => pubClient.publish(channel, message),
+    subscribe: (handler) => subClient.subscribe(channel, handler),
+  });
+  return {
+    close: () => {
+      stopRelay();
+      return Promise.all([pubClient.quit(), subClient.quit()]);
+    },
+  };
+};
+
+// Attach the configured adapter; resolves with a handle whose close()
+// releases its connections
+const attach = async (io, { logger = console, bus } = {}) => {
+  const type = process.env.SOCKET_ADAPTER || (clusterBus.enabled ? "cluster" : "memory");
+
+  if (type === "redis") {
+    const handle = await attachRedis(io, logger);
+    logger.info(`Socket.IO adapter: redis (node ${NODE_ID})`);
+    return { type, ...handle };
+  }
+
+  if (type !== "memory" && type !== "cluster") {
+    throw new Error(
+      `Unknown SOCKET_ADAPTER "${type}" (expected redis, cluster or memory)`
+    );
+  }
+
+  const transport = bus || (type === "cluster" ? clusterBus : memoryBus);
+  // Socket.IO instantiates the adapter with `new`, so bind the bus in a subclass
+  io.adapter(
+    class extends BusAdapter {
+      constructor(nsp) {
+        super(nsp, transport);
+      }
+    }
+  );
+  logger.info(`Socket.IO adapter: ${type} (node ${NODE_ID})`);
+  return { type, close: async () => {} };
+};
+
+module.exports = {
+  NODE_ID,
+  MemoryBus,
+  BusAdapter,
+  attach,
+};
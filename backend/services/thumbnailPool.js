@@ -0,0 +1,147 @@
+// backend/services/thumbnailPool.js - Worker threads that render screenshot thumbnails
+// Decoding and resizing a full screen capture takes tens of milliseconds of
+// CPU, which on the event loop would stall every request in the process.
+// Jobs queue here (at most SCREENSHOT_THUMBNAIL_QUEUE_MAX) and run on
+// SCREENSHOT_THUMBNAIL_WORKERS threads executing thumbnailWorker.js; only
+// file paths and the result's dimensions cross the thread boundary. Jobs for
+// an image already queued or rendering share its result. A thread that dies
+// fails its job and is replaced. Rendering needs sharp, an optional
+// dependency; where it did not install no thumbnails are made.
+
+const os = require("os");
+const path = require("path");
+const { Worker } = require("worker_threads");
+
+const options = {
+  workers:
+    parseInt(process.env.SCREENSHOT_THUMBNAIL_WORKERS) ||
+    Math.max(1, Math.min(2, os.cpus().length - 1)),
+  queueLimit: parseInt(process.env.SCREENSHOT_THUMBNAIL_QUEUE_MAX) || 500,
+  width: parseInt(process.env.SCREENSHOT_THUMBNAIL_WIDTH) || 320,
+};
+const WORKER_SCRIPT = path.join(__dirname, "thumbnailWorker.js");
+
+let available = null;
+let closing = false;
+const slots = [];
+const queue = [];
+const pending = new Map(); // image hash -> job
+const counts = { rendered: 0, failed: 0, rejected: 0, restarts: 0 };
+
+// sharp has to be loaded by the main thread before any worker loads it
+const isAvailable = () => {
+  if (available === null) {
+    try {
+      require("sharp");
+      available = true;
+    } catch (error) {
+      available = false;
+      console.warn("Screenshot thumbnails are disabled: the sharp package is not installed");
+    }
+  }
+  return available;
+};
+
+const finish = (slot, error, result) => {
+  const job = slot.job;
+  slot.job = null;
+  if (job) {
+    pending.delete(job.hash);
+    if (error || result.error) {
+      counts.failed++;
+      job.reject(error || new Error(result.error));
+    } else {
+      counts.rendered++;
+      job.resolve(result);
+    }
+  }
+  drain();
+};
+
+// A worker that raised an error is on its way out; it leaves the pool before
+// its job is failed so drain() hands no more work to it
+const retire = (slot) => {
+  const index = slots.indexOf(slot);
+  if (index !== -1) slots.splice(index, 1);
+};
+
+const spawn = () => {
+  const slot = { worker: new Worker(WORKER_SCRIPT), job: null };
+  slot.worker.on("message", (result) => finish(slot, null, result));
+  slot.worker.on("error", (error) => {
+    retire(slot);
+    finish(slot, error);
+  });
+  slot.worker.on("exit", () => {
+    retire(slot);
+    if (slot.job) finish(slot, new Error("Thumbnail worker exited"));
+    if (!closing) {
+      counts.restarts++;
+      drain();
+    }
+  });
+  slot.worker.unref();
+  slots.push(slot);
+  return slot;
+};
+
+const drain = () => {
+  while (queue.length && !closing) {
+    let slot = slots.find((candidate) => !candidate.job);
+    if (!slot && slots.length < options.workers) slot = spawn();
+    if (!slot) return;
+    slot.job = queue.shift();
+    slot.worker.postMessage({
+      source: slot.job.source,
+      target: slot.job.target,
+      width: options.width,
+    });
+  }
+};
+
+// Renders `source` to `target`; resolves with { width, height } of the
+// source, or null when thumbnails are disabled
+const render = (hash, source, target) => {
+  if (!isAvailable()) return Promise.resolve(null);
+  if (pending.has(hash)) return pending.get(hash).promise;
+  if (closing || queue.length >= options.queueLimit) {
+    counts.rejected++;
+    const error = new Error("Thumbnail queue is full, try again later");
+    error.status = 503;
+    return Promise.reject(error);
+  }
+
+  const job = { hash, source, target };
+  job.promise = new Promise((resolve, reject) => {
+    job.resolve = resolve;
+    job.reject = reject;
+  });
+  pending.set(hash, job);
+  queue.push(job);
+  drain();
+  return job.promise;
+};
+
+const stats = () => ({
+  available,
+  workers: slots.length,
+  busy: slots.filter((slot) => slot.job).length,
+  queued: queue.length,
+  ...counts,
+});
+
+// Queued jobs are failed; the images can be rendered again on request
+const close = async () => {
+  closing = true;
+  for (const job of queue.splice(0)) {
+    pending.delete(job.hash);
+    job.reject(new Error("Thumbnail pool closed"));
+  }
+  await Promise.all(slots.map((slot) => slot.worker.terminate()));
+};
+
+module.exports = {
+  render,
+  stats,
+  close,
+};
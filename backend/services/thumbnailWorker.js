@@ -0,0 +1,32 @@
+// backend/services/thumbnailWorker.js - Renders one thumbnail per message; run by thumbnailPool
+const { parentPort, threadId } = require("worker_threads");
+const fs = require("fs");
+const path = require("path");
+const sharp = require("sharp");
+
+// The pool decides how many images are decoded at once
+sharp.concurrency(1);
+sharp.cache(false);
+
+parentPort.on("message", async ({ source, target, width }) => {
+  const tmp = `${target}.${process.pid}.${threadId}.tmp`;
+  try {
+    const image = sharp(source);
+    const metadata = await image.metadata();
+    await fs.promises.mkdir(path.dirname(target), { recursive: true });
+    const rendered = await image
+      .rotate()
+      .resize({ width, withoutEnlargement: true })
+      .jpeg({ quality: 70 })
+      .toFile(tmp);
+    await fs.promises.rename(tmp, target);
+    parentPort.postMessage({
+      width: metadata.width,
+      height: metadata.height,
+      thumbnail_bytes: rendered.size,
+    });
+  } catch (error) {
+    await fs.promises.unlink(tmp).catch(() => {});
+    parentPort.postMessage({ error: error.message });
+  }
+});
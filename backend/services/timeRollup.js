@@ -0,0 +1,249 @@
+// backend/services/timeRollup.js - Incremental maintenance of the TimeRollup collection
+// Analytics read hourly totals from TimeRollup instead of scanning TimeEntry.
+// Every write path that completes, changes or removes an entry applies the
+// entry's contribution here; rebuild() recomputes everything from TimeEntry.
+
+const TimeEntry = require("../models/TimeEntry");
+const TimeRollup = require("../models/TimeRollup");
+
+const hourStart = (date) => {
+  const hour = new Date(date);
+  hour.setUTCMinutes(0, 0, 0);
+  return hour;
+};
+
+// The parts of an entry the rollup depends on, or null for running timers
+const snapshot = (entry) => {
+  if (!entry || !entry.end_time) {
+    return null;
+  }
+
+  return {
+    organizationId: entry.organizationId,
+    user_id: entry.user_id,
+    project_id: entry.project_id,
+    hour: hourStart(entry.start_time),
+    duration: entry.duration || 0,
+    activity_level: entry.activity_level || 0,
+    billable_amount: entry.billable ? entry.total_amount || 0 : 0,
+  };
+};
+
+const sameSnapshot = (a, b) =>
+  a === b ||
+  (a !== null &&
+    b !== null &&
+    a.organizationId === b.organizationId &&
+    a.user_id === b.user_id &&
+    a.project_id === b.project_id &&
+    a.hour.getTime() === b.hour.getTime() &&
+    a.duration === b.duration &&
+    a.activity_level === b.activity_level &&
+    a.billable_amount === b.billable_amount);
+
+const apply = async (contribution, sign) => {
+  const key = {
+    organizationId: contribution.organizationId,
+    user_id: contribution.user_id,
+    project_id: contribution.project_id,
+    hour: contribution.hour,
+  };
+  const update = {
+    $inc: {
+      duration: sign * contribution.duration,
+      entries: sign,
+      activity_sum: sign * contribution.activity_level,
+      billable_amount: sign * contribution.billable_amount,
+    },
+    $set: { updatedAt: new Date() },
+    $setOnInsert: { day: key.hour.toISOString().split("T")[0] },
+  };
+
+  try {
+    await TimeRollup.updateOne(key, update, { upsert: true });
+  } catch (error) {
+    // Two concurrent upserts of a new bucket: the loser retries as an update
+    if (error.code !== 11000) throw error;
+    await TimeRollup.updateOne(key, update, { upsert: true });
+  }
+
+  if (sign < 0) {
+    await TimeRollup.deleteOne({ ...key, entries: { $lte: 0 } });
+  }
+};
+
+// Add a completed entry (timer stopped or manual entry created)
+const recordEntry = async (entry) => {
+  const contribution = snapshot(entry);
+  if (contribution) {
+    await apply(contribution, 1);
+  }
+};
+
+// Add many completed entries (bulk ingest) with one bulkWrite: entries that
+// share an hour bucket are summed into a single upsert
+const recordEntries = async (entries) => {
+  const buckets = new Map();
+  for (const entry of entries) {
+    const contribution = snapshot(entry);
+    if (!contribution) continue;
+    const key = [
+      contribution.organizationId,
+      contribution.user_id,
+      contribution.project_id,
+      contribution.hour.getTime(),
+    ].join("|");
+    const bucket = buckets.get(key);
+    if (bucket) {
+      bucket.entries++;
+      bucket.duration += contribution.duration;
+      bucket.activity_sum += contribution.activity_level;
+      bucket.billable_amount += contribution.billable_amount;
+    } else {
+      buckets.set(key, {
+        contribution,
+        entries: 1,
+        duration: contribution.duration,
+        activity_sum: contribution.activity_level,
+        billable_amount: contribution.billable_amount,
+      });
+    }
+  }
+  if (buckets.size === 0) return;
+
+  const operations = [...buckets.values()].map((bucket) => ({
+    updateOne: {
+      filter: {
+        organizationId: bucket.contribution.organizationId,
+        user_id: bucket.contribution.user_id,
+        project_id: bucket.contribution.project_id,
+        hour: bucket.contribution.hour,
+      },
+      update: {
+        $inc: {
+          duration: bucket.duration,
+          entries: bucket.entries,
+          activity_sum: bucket.activity_sum,
+          billable_amount: bucket.billable_amount,
+        },
+        $set: { updatedAt: new Date() },
+        $setOnInsert: { day: bucket.contribution.hour.toISOString().split("T")[0] },
+      },
+      upsert: true,
+    },
+  }));
+
+  try {
+    await TimeRollup.bulkWrite(operations, { ordered: false });
+  } catch (error) {
+    // Upserts that raced another writer for a new bucket retry as updates
+    const raced = (error.writeErrors || []).filter((writeError) => writeError.code === 11000);
+    if (!raced.length || raced.length !== error.writeErrors.length) throw error;
+    await TimeRollup.bulkWrite(
+      raced.map((writeError) => operations[writeError.index]),
+      { ordered: false }
+    );
+  }
+};
+
+// Remove a deleted entry
+const removeEntry = async (entry) => {
+  const contribution = snapshot(entry);
+  if (contribution) {
+    await apply(contribution, -1);
+  }
+};
+
+// Move an edited entry; `before` is snapshot(entry) taken prior to the edit
+const replaceEntry = async (before, entry) => {
+  const after = snapshot(entry);
+  if (sameSnapshot(before, after)) {
+    return;
+  }
+  if (before) {
+    await apply(before, -1);
+  }
+  if (after) {
+    await apply(after, 1);
+  }
+};
+
+// Recompute rollups from TimeEntry for one organization, or all of them
+const rebuild = async (organizationId = null) => {
+  const scope = organizationId ? { organizationId } : {};
+
+  await TimeRollup.deleteMany(scope);
+  await TimeEntry.aggregate([
+    { $match: { ...scope, end_time: { $type: "date" } } },
+    {
+      $group: {
+        _id: {
+          organizationId: "$organizationId",
+          user_id: "$user_id",
+          project_id: "$project_id",
+          hour: {
+            $dateFromParts: {
+              year: { $year: "$start_time" },
+              month: { $month: "$start_time" },
+              day: { $dayOfMonth: "$start_time" },
+              hour: { $hour: "$start_time" },
+            },
+          },
+        },
+        duration: { $sum: { $ifNull: ["$duration", 0] } },
+        entries: { $sum: 1 },
+        activity_sum: { $sum: { $ifNull: ["$activity_level", 0] } },
+        billable_amount: {
+          $sum: { $cond: ["$billable", { $ifNull: ["$total_amount", 0] }, 0] },
+        },
+      },
+    },
+    {
+      $project: {
+        _id: 0,
+        organizationId: "$_id.organizationId",
+        user_id: "$_id.user_id",
+        project_id: "$_id.project_id",
+        day: { $dateToString: { format: "%Y-%m-%d", date: "$_id.hour" } },
+        hour: "$_id.hour",
+        duration: 1,
+        entries: 1,
+        activity_sum: 1,
+        billable_amount: 1,
+        updatedAt: "$$NOW",
+      },
+    },
+    {
+      $merge: {
+        into: TimeRollup.collection.name,
+        on: ["organizationId", "user_id", "project_id", "hour"],
+        whenMatched: "replace",
+        whenNotMatched: "insert",
+      },
+    },
+  ]).allowDiskUse(true);
+
+  return TimeRollup.countDocuments(scope);
+};
+
+// Backfill once when rollups are introduced on a database that already has entries
+const ensureBuilt = async () => {
+  const [hasRollups, hasEntries] = await Promise.all([
+    TimeRollup.exists({}),
+    TimeEntry.exists({ end_time: { $type: "date" } }),
+  ]);
+  if (hasRollups || !hasEntries) {
+    return null;
+  }
+  return rebuild();
+};
+
+module.exports = {
+  snapshot,
+  recordEntry,
+  recordEntries,
+  removeEntry,
+  replaceEntry,
+  rebuild,
+  ensureBuilt,
+};
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Cluster Scaling Benchmark
+Starts backend/cluster.js with 1, 2, 4, ... workers, drives the time tracking
+start -> active -> stop -> entries loop from load_test.py with no hold or
+think time, and reports time-tracking throughput, speedup over one worker and
+scaling efficiency (speedup / workers) for every worker count.
+
+The backend reads MONGO_URL from the environment or backend/.env. Use a
+database that is not itself the bottleneck, otherwise every worker count
+measures MongoDB instead of the API.
+
+Usage:
+    python cluster_benchmark.py --workers 1,2,4,8 --users 100 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from load_test import MAX_USERS_PER_ORG, LoadTest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+
+
+def start_cluster(workers, port, log):
+    """Launch the cluster primary; the per-IP rate limits are lifted"""
+    env = dict(
+        os.environ,
+        CLUSTER_WORKERS=str(workers),
+        PORT=str(port),
+        RATE_LIMIT_GENERAL_MAX="100000000",
+        RATE_LIMIT_AUTH_MAX="100000000",
+    )
+    return subprocess.Popen(
+        ["node", "cluster.js"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def wait_for_workers(api_url, workers, process, timeout):
+    """Poll /health/cluster until every worker reports ready"""
+    token = os.environ.get("METRICS_TOKEN")
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"cluster.js exited with code {process.returncode}")
+        try:
+            response = httpx.get(f"{api_url}/health/cluster", headers=headers, timeout=2)
+            if response.status_code == 200:
+                states = [worker["state"] for worker in response.json()["workers"]]
+                if states.count("ready") >= workers:
+                    return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{workers} workers were not ready after {timeout}s")
+
+
+def stop_cluster(process, timeout=45):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def time_tracking_totals(load):
+    """Requests per second and errors summed over the time tracking endpoints"""
+    rows = [stats for endpoint, stats in load.items() if "/time-tracking" in endpoint]
+    return (
+        round(sum(stats["throughput_rps"] for stats in rows), 2),
+        sum(stats["errors"] for stats in rows),
+    )
+
+
+def run_benchmark(args):
+    api_url = f"http://127.0.0.1:{args.port}/api"
+    orgs = args.orgs or math.ceil(args.users / MAX_USERS_PER_ORG)
+    results = []
+
+    with open(args.log, "w") as log:
+        for workers in args.workers:
+            print(f"\n🧩 Starting cluster with {workers} worker(s)...")
+            process = start_cluster(workers, args.port, log)
+            try:
+                wait_for_workers(api_url, workers, process, args.startup_timeout)
+                load_test = LoadTest(
+                    api_url,
+                    users=args.users,
+                    orgs=orgs,
+                    duration=args.duration,
+                    hold=0,
+                    think=0,
+                    ramp_up=args.ramp_up,
+                    timeout=args.timeout,
+                )
+                report = asyncio.run(load_test.run())
+            finally:
+                stop_cluster(process)
+
+            rps, errors = time_tracking_totals(report["load"])
+            results.append({"workers": workers, "throughput_rps": rps, "errors": errors})
+
+    baseline = results[0]["throughput_rps"] / results[0]["workers"] or 1.0
+    for row in results:
+        row["speedup"] = round(row["throughput_rps"] / baseline, 2)
+        row["efficiency"] = round(row["speedup"] / row["workers"], 3)
+    return results
+
+
+def print_results(results):
+    print("\n" + "=" * 60)
+    print("📈 CLUSTER SCALING (time tracking endpoints)")
+    print("=" * 60)
+    print(f"{'Workers':>8}{'RPS':>12}{'Errors':>9}{'Speedup':>10}{'Efficiency':>12}")
+    for row in results:
+        print(
+            f"{row['workers']:>8}{row['throughput_rps']:>12.1f}{row['errors']:>9}"
+            f"{row['speedup']:>10.2f}{row['efficiency']:>12.1%}"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cluster mode throughput scaling benchmark")
+    parser.add_argument(
+        "--workers",
+        default="1,2,4",
+        type=lambda value: [int(count) for count in value.split(",")],
+        help="Comma separated worker counts, first one is the baseline",
+    )
+    parser.add_argument("--port", type=int, default=8011, help="Port the cluster listens on")
+    parser.add_argument("--users", type=int, default=100, help="Number of virtual users")
+    parser.add_argument("--orgs", type=int, help="Organizations (default users / 5)")
+    parser.add_argument("--duration", type=float, default=30, help="Load phase per worker count")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument(
+        "--startup-timeout", type=float, default=90, help="Seconds to wait for workers"
+    )
+    parser.add_argument(
+        "--min-efficiency",
+        type=float,
+        default=0.75,
+        help="Exit non-zero if any worker count scales below this efficiency",
+    )
+    parser.add_argument("--log", default="cluster_benchmark.log", help="Backend output file")
+    parser.add_argument("--json", dest="json_path", help="Write the results as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cores = os.cpu_count() or 1
+    if max(args.workers) > cores:
+        print(f"⚠️ {max(args.workers)} workers on {cores} cores; expect efficiency to drop")
+
+    results = run_benchmark(args)
+    print_results(results)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json_path}")
+
+    below = [row for row in results if row["efficiency"] < args.min_efficiency]
+    if below:
+        print(f"\n❌ Scaling efficiency below {args.min_efficiency:.0%} at {below[0]['workers']} workers")
+    sys.exit(1 if below or any(row["errors"] for row in results) else 0)
@@ -0,0 +1,29 @@
+"""
+Python client for the Hubstaff clone REST API.
+
+Both clients keep a pooled keep-alive connection per host, cache the JWT,
+refresh it through /api/auth/refresh before it expires, and back off on 429
+responses using the retryAfter hint the rate limiter returns.
+"""
+from .async_client import AsyncHubstaffClient
+from .base import RetryPolicy, TokenCache, resolve_api_url, with_client_ids
+from .client import HubstaffClient
+from .exceptions import (
+    APIError,
+    AuthenticationError,
+    RateLimitError,
+    TransportError,
+)
+
+__all__ = [
+    "HubstaffClient",
+    "AsyncHubstaffClient",
+    "RetryPolicy",
+    "TokenCache",
+    "resolve_api_url",
+    "with_client_ids",
+    "APIError",
+    "AuthenticationError",
+    "RateLimitError",
+    "TransportError",
+]
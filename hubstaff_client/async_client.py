@@ -0,0 +1,191 @@
+"""asyncio client backed by a pooled keep-alive httpx.AsyncClient"""
+import asyncio
+
+import httpx
+
+from .base import ClientBase, Endpoints, merge_bulk_results, with_client_ids
+from .exceptions import AuthenticationError, TransportError
+
+
+class AsyncHubstaffClient(ClientBase, Endpoints):
+    """asyncio API client; every endpoint method returns a coroutine
+
+    Usage:
+        async with AsyncHubstaffClient(token=token) as client:
+            entries = await client.list_entries(limit=50)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._auth_lock = asyncio.Lock()
+        self._http = httpx.AsyncClient(
+            base_url=self.api_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self._http.aclose()
+
+    async def request(
+        self,
+        method,
+        path,
+        json=None,
+        params=None,
+        files=None,
+        data=None,
+        auth=True,
+        idempotent=False,
+    ):
+        """Send a request with token refresh and retry handling"""
+        method = method.upper()
+        if auth:
+            await self._ensure_token()
+
+        attempt = 0
+        reauthenticated = False
+        while True:
+            try:
+                response = await self._http.request(
+                    method,
+                    path,
+                    json=json,
+                    params=params,
+                    files=files,
+                    data=data,
+                    headers=self._headers(auth),
+                )
+            except httpx.TransportError as error:
+                delay = self.retry.delay_for_error(method, attempt, idempotent)
+                if delay is None:
+                    raise TransportError(f"{method} {path} failed: {error}") from error
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            delay = self.retry.delay_for_response(method, response, attempt, idempotent)
+            if delay is not None:
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code == 401 and auth and not reauthenticated and self._can_login():
+                # Token revoked or expired between checks: log in again once
+                reauthenticated = True
+                await self.login()
+                continue
+
+            return self._handle(response)
+
+    async def _ensure_token(self):
+        async with self._auth_lock:
+            if self.token is None:
+                cached = self._cached_token()
+                if cached:
+                    self._set_token(cached)
+                elif self._can_login():
+                    await self._login_locked()
+                return
+            if self._token_needs_refresh():
+                if self._token_expired():
+                    if self._can_login():
+                        await self._login_locked()
+                    return
+                try:
+                    await self._refresh_locked()
+                except AuthenticationError:
+                    if not self._can_login():
+                        raise
+                    await self._login_locked()
+
+    async def _login_locked(self):
+        response = await self._http.post(
+            "/auth/login", json={"email": self.email, "password": self.password}
+        )
+        return self._remember_auth(self._handle(response))
+
+    async def _refresh_locked(self):
+        response = await self._http.post("/auth/refresh", headers=self._headers(True))
+        data = self._handle(response)
+        self._set_token(data["token"])
+        return data
+
+    async def login(self, email=None, password=None):
+        """Log in with the given or stored credentials and cache the token"""
+        async with self._auth_lock:
+            if email:
+                self.email = email.lower()
+            if password:
+                self.password = password
+            return await self._login_locked()
+
+    async def register(self, **payload):
+        data = await self.request("POST", "/auth/register", json=payload, auth=False)
+        return self._remember_auth(data, payload.get("email"), payload.get("password"))
+
+    async def refresh(self):
+        async with self._auth_lock:
+            return await self._refresh_locked()
+
+    async def upload_entries(self, entries, batch_size=200):
+        """Upload completed entries in batches through the bulk endpoint
+
+        Entries without a client_id get one, so batches can be retried safely;
+        pass the result of with_client_ids() to keep ids stable across calls.
+        Returns created/duplicate/error counts and per-entry results indexed
+        into `entries`.
+        """
+        entries = with_client_ids(entries)
+        upload = {"created": 0, "duplicate": 0, "error": 0, "results": []}
+        for offset in range(0, len(entries), batch_size):
+            response = await self.bulk_create_entries(entries[offset:offset + batch_size])
+            merge_bulk_results(upload, response, offset)
+        return upload
+
+    async def run_report_job(self, start_date, end_date, poll_interval=0.5, timeout=300, **filters):
+        """Submit a report job, poll until it finishes and return the report"""
+        job = (await self.submit_report_job(start_date, end_date, **filters))["job"]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while job["status"] in ("queued", "running"):
+            if loop.time() >= deadline:
+                raise TimeoutError(f"Report job {job['id']} still {job['status']} after {timeout}s")
+            await asyncio.sleep(poll_interval)
+            job = (await self.report_job(job["id"]))["job"]
+        return await self.report_job_result(job["id"])
+
+    async def iter_entries(self, page_size=100, **filters):
+        """Yield every matching time entry, following the keyset cursor"""
+        params = {**filters, "limit": page_size}
+        while True:
+            data = await self.list_entries(**params)
+            for entry in data["entries"]:
+                yield entry
+            cursor = data["pagination"].get("next_cursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
+    async def pull_changes(self, cursor=None, page_size=500):
+        """Every change since `cursor` (None for a full sync) in sequence order
+
+        Returns {"changes": [...], "cursor": ...}; store the cursor and pass it
+        to the next pull.
+        """
+        changes = []
+        while True:
+            data = await self.changes(cursor=cursor, limit=page_size)
+            changes.extend(data["changes"])
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                return {"changes": changes, "cursor": cursor}
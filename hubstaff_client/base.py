@@ -0,0 +1,424 @@
+"""Shared configuration, retry and token handling for the sync and async clients"""
+import base64
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from .exceptions import APIError, AuthenticationError, RateLimitError
+
+FRONTEND_ENV_PATH = "/app/frontend/.env"
+DEFAULT_BACKEND_URL = "http://localhost:8001"
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def resolve_api_url(base_url=None):
+    """Resolve the API URL from an explicit value, BACKEND_URL or the frontend .env file"""
+    base_url = base_url or os.environ.get("BACKEND_URL")
+
+    if not base_url and os.path.exists(FRONTEND_ENV_PATH):
+        with open(FRONTEND_ENV_PATH, "r") as f:
+            for line in f:
+                if line.startswith("REACT_APP_BACKEND_URL="):
+                    base_url = line.strip().split("=", 1)[1].strip("\"'")
+                    break
+
+    base_url = (base_url or DEFAULT_BACKEND_URL).rstrip("/")
+    return base_url if base_url.endswith("/api") else f"{base_url}/api"
+
+
+def token_expiry(token):
+    """Expiry timestamp from a JWT payload (signature is not checked here)"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter that honors the server's retryAfter hint
+
+    429 responses are always retried because the rate limiter rejects the
+    request before any handler runs. Gateway errors and connection failures
+    are only retried for idempotent methods so a timer is never started twice;
+    callers mark other requests that are safe to repeat with `idempotent`.
+    """
+
+    def __init__(
+        self,
+        max_retries=3,
+        backoff_factor=0.5,
+        max_backoff=30.0,
+        max_retry_after=60.0,
+        retry_statuses=(502, 503, 504),
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = set(retry_statuses)
+
+    def backoff(self, attempt):
+        delay = min(self.backoff_factor * (2**attempt), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def retry_after(response):
+        """Seconds to wait from the JSON body or the rate limit headers"""
+        try:
+            value = response.json().get("retryAfter")
+        except (ValueError, AttributeError):
+            value = None
+        if value is None:
+            value = response.headers.get("Retry-After") or response.headers.get(
+                "RateLimit-Reset"
+            )
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    def delay_for_response(self, method, response, attempt, idempotent=False):
+        """Seconds to sleep before retrying, or None to stop retrying"""
+        if attempt >= self.max_retries:
+            return None
+        if response.status_code == 429:
+            retry_after = self.retry_after(response)
+            if retry_after is None:
+                return self.backoff(attempt)
+            if retry_after > self.max_retry_after:
+                return None
+            # Small jitter so a fleet of agents does not retry in lockstep
+            return retry_after + random.uniform(0, self.backoff_factor)
+        if response.status_code in self.retry_statuses and (
+            idempotent or method in IDEMPOTENT_METHODS
+        ):
+            return self.backoff(attempt)
+        return None
+
+    def delay_for_error(self, method, attempt, idempotent=False):
+        if attempt >= self.max_retries or not (idempotent or method in IDEMPOTENT_METHODS):
+            return None
+        return self.backoff(attempt)
+
+
+class TokenCache:
+    """Tokens keyed by API URL and email, optionally persisted to a JSON file
+
+    Reusing a still-valid token skips the bcrypt-bound /auth/login round trip
+    when a sync agent or reporting job restarts.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._tokens = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._tokens = json.load(f)
+            except (OSError, ValueError):
+                self._tokens = {}
+
+    @staticmethod
+    def key(api_url, email):
+        return f"{api_url}|{email.lower()}"
+
+    def get(self, api_url, email, margin=0):
+        token = self._tokens.get(self.key(api_url, email))
+        expires_at = token_expiry(token) if token else None
+        if token and (expires_at is None or expires_at - margin > time.time()):
+            return token
+        return None
+
+    def set(self, api_url, email, token):
+        with self._lock:
+            self._tokens[self.key(api_url, email)] = token
+            if self.path:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._tokens, f)
+                os.replace(tmp_path, self.path)
+
+
+class ClientBase:
+    """State and response handling shared by HubstaffClient and AsyncHubstaffClient"""
+
+    def __init__(
+        self,
+        base_url=None,
+        token=None,
+        email=None,
+        password=None,
+        timeout=30.0,
+        max_connections=10,
+        retry=None,
+        refresh_margin=300,
+        token_cache=None,
+    ):
+        self.api_url = resolve_api_url(base_url)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.retry = retry or RetryPolicy()
+        self.refresh_margin = refresh_margin
+        self.token_cache = token_cache
+        self.email = email
+        self.password = password
+        self.user = None
+        self.token = None
+        if token:
+            self._set_token(token)
+
+    def _set_token(self, token):
+        self.token = token
+        self.token_expires_at = token_expiry(token)
+        if self.token_cache is not None and self.email:
+            self.token_cache.set(self.api_url, self.email, token)
+
+    def _cached_token(self):
+        if self.token_cache is None or not self.email:
+            return None
+        return self.token_cache.get(self.api_url, self.email, self.refresh_margin)
+
+    def _token_needs_refresh(self):
+        return (
+            self.token is not None
+            and self.token_expires_at is not None
+            and self.token_expires_at - self.refresh_margin <= time.time()
+        )
+
+    def _token_expired(self):
+        return self.token_expires_at is not None and self.token_expires_at <= time.time()
+
+    def _headers(self, auth):
+        if auth and self.token:
+            return {"Authorization": f"Bearer {self.token}"}
+        return {}
+
+    def _can_login(self):
+        return bool(self.email and self.password)
+
+    @staticmethod
+    def _parse(response):
+        if not response.content:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return response.text
+
+    def _handle(self, response):
+        """Return the decoded body or raise the matching APIError"""
+        payload = self._parse(response)
+        if response.status_code < 400:
+            return payload
+
+        message = payload.get("error") if isinstance(payload, dict) else payload
+        message = message or response.reason_phrase
+        if response.status_code == 401:
+            raise AuthenticationError(response.status_code, message, payload)
+        if response.status_code == 429:
+            raise RateLimitError(
+                response.status_code,
+                message,
+                payload,
+                retry_after=RetryPolicy.retry_after(response),
+            )
+        raise APIError(
+            response.status_code,
+            message,
+            payload if isinstance(payload, dict) else None,
+        )
+
+    def _remember_auth(self, data, email=None, password=None):
+        if email:
+            self.email = email.lower()
+        if password:
+            self.password = password
+        self.user = data.get("user", self.user)
+        self._set_token(data["token"])
+        return data
+
+
+def with_client_ids(entries):
+    """Copies of the entries, each with a client_id (a new uuid4 if missing)
+
+    Keep the returned list if an upload may be retried later: resending the
+    same client_ids is what makes the retry idempotent.
+    """
+    return [
+        entry if entry.get("client_id") else {**entry, "client_id": str(uuid.uuid4())}
+        for entry in entries
+    ]
+
+
+def merge_bulk_results(upload, response, offset):
+    """Fold one bulk response into the running upload summary"""
+    for result in response["results"]:
+        result = {**result, "index": result["index"] + offset}
+        upload["results"].append(result)
+        upload[result["status"]] += 1
+    return upload
+
+
+class Endpoints:
+    """REST endpoints; `request` is sync or async depending on the client"""
+
+    # Auth
+    def health(self):
+        return self.request("GET", "/health", auth=False)
+
+    def me(self):
+        return self.request("GET", "/auth/me")
+
+    def logout(self):
+        return self.request("POST", "/auth/logout")
+
+    # Projects and tasks
+    def list_projects(self, **params):
+        return self.request("GET", "/projects/", params=params)
+
+    def create_project(self, **project):
+        return self.request("POST", "/projects/", json=project)
+
+    def get_project(self, project_id):
+        return self.request("GET", f"/projects/{project_id}")
+
+    def list_tasks(self, project_id, **params):
+        return self.request("GET", f"/projects/{project_id}/tasks", params=params)
+
+    def create_task(self, project_id, **task):
+        return self.request("POST", f"/projects/{project_id}/tasks", json=task)
+
+    # Time tracking
+    def start_timer(self, project_id=None, task_id=None, description=None):
+        return self.request(
+            "POST",
+            "/time-tracking/start",
+            json={"project_id": project_id, "task_id": task_id, "description": description},
+        )
+
+    def stop_timer(self, entry_id):
+        return self.request("POST", f"/time-tracking/stop/{entry_id}")
+
+    def active_timer(self):
+        return self.request("GET", "/time-tracking/active")
+
+    def list_entries(self, **params):
+        return self.request("GET", "/time-tracking/entries", params=params)
+
+    def create_manual_entry(self, **entry):
+        return self.request("POST", "/time-tracking/manual", json=entry)
+
+    def bulk_create_entries(self, entries):
+        # Safe to retry when every entry carries a client_id
+        return self.request(
+            "POST",
+            "/time-tracking/bulk",
+            json={"entries": entries},
+            idempotent=all(entry.get("client_id") for entry in entries),
+        )
+
+    def update_entry(self, entry_id, **changes):
+        return self.request("PUT", f"/time-tracking/entries/{entry_id}", json=changes)
+
+    def delete_entry(self, entry_id):
+        return self.request("DELETE", f"/time-tracking/entries/{entry_id}")
+
+    def time_stats(self, period="week"):
+        return self.request("GET", "/time-tracking/stats", params={"period": period})
+
+    # Activity and screenshots
+    def upload_activity(self, entry_id, samples):
+        return self.request(
+            "POST", "/activity/samples", json={"entry_id": entry_id, "samples": samples}
+        )
+
+    def upload_screenshot(self, entry_id, image, taken_at=None, activity_level=None):
+        # `image` is PNG, JPEG or WebP bytes; safe to retry because the same
+        # image uploaded to the same entry again returns the first upload
+        fields = {"taken_at": taken_at, "activity_level": activity_level}
+        return self.request(
+            "POST",
+            f"/screenshots/entries/{entry_id}",
+            files={"screenshot": ("screenshot", image)},
+            data={key: str(value) for key, value in fields.items() if value is not None},
+            idempotent=True,
+        )
+
+    def list_screenshots(self, entry_id):
+        return self.request("GET", f"/screenshots/entries/{entry_id}")
+
+    # Delta sync
+    def changes(self, cursor=None, limit=None):
+        params = {"cursor": cursor, "limit": limit}
+        return self.request(
+            "GET",
+            "/sync/changes",
+            params={key: value for key, value in params.items() if value is not None},
+        )
+
+    # Analytics
+    def dashboard_analytics(self, period="week"):
+        return self.request("GET", "/analytics/dashboard", params={"period": period})
+
+    def team_analytics(self, period="week"):
+        return self.request("GET", "/analytics/team", params={"period": period})
+
+    def productivity_analytics(self, period="week", user_id=None):
+        params = {"period": period}
+        if user_id:
+            params["user_id"] = user_id
+        return self.request("GET", "/analytics/productivity", params=params)
+
+    def custom_report(self, start_date, end_date, **filters):
+        return self.request(
+            "POST",
+            "/analytics/reports/custom",
+            json={"start_date": start_date, "end_date": end_date, **filters},
+        )
+
+    def submit_report_job(self, start_date, end_date, **filters):
+        return self.request(
+            "POST",
+            "/analytics/reports/jobs",
+            json={"start_date": start_date, "end_date": end_date, **filters},
+        )
+
+    def report_job(self, job_id):
+        return self.request("GET", f"/analytics/reports/jobs/{job_id}")
+
+    def report_job_result(self, job_id):
+        return self.request("GET", f"/analytics/reports/jobs/{job_id}/result")
+
+    # Operations
+    def metrics(self):
+        """Prometheus text exposition; not JSON"""
+        return self.request("GET", "/metrics", auth=False)
+
+    def query_profile(self):
+        return self.request("GET", "/health/query-profile")
+
+    def update_query_profile(self, enabled=None, slow_ms=None, reset=None):
+        changes = {"enabled": enabled, "slow_ms": slow_ms, "reset": reset}
+        return self.request(
+            "PUT",
+            "/health/query-profile",
+            json={key: value for key, value in changes.items() if value is not None},
+        )
+
+    def logging_settings(self):
+        return self.request("GET", "/health/logging")
+
+    def update_logging(self, level=None, sample_rates=None):
+        changes = {"level": level, "sample_rates": sample_rates}
+        return self.request(
+            "PUT",
+            "/health/logging",
+            json={key: value for key, value in changes.items() if value is not None},
+        )
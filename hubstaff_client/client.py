@@ -0,0 +1,231 @@
+"""Blocking client backed by a pooled keep-alive httpx.Client"""
+import csv
+import json
+import threading
+import time
+
+import httpx
+
+from .base import ClientBase, Endpoints, merge_bulk_results, with_client_ids
+from .exceptions import AuthenticationError, TransportError
+
+
+def _lines(chunks):
+    """Re-split decoded text chunks into lines that keep their newline"""
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+class HubstaffClient(ClientBase, Endpoints):
+    """Thread-safe synchronous API client
+
+    Usage:
+        with HubstaffClient(email="me@example.com", password="secret") as client:
+            client.login()
+            entry = client.start_timer(project_id)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._auth_lock = threading.Lock()
+        self._http = httpx.Client(
+            base_url=self.api_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._http.close()
+
+    def request(
+        self,
+        method,
+        path,
+        json=None,
+        params=None,
+        files=None,
+        data=None,
+        auth=True,
+        idempotent=False,
+    ):
+        """Send a request with token refresh and retry handling"""
+        method = method.upper()
+        if auth:
+            self._ensure_token()
+
+        attempt = 0
+        reauthenticated = False
+        while True:
+            try:
+                response = self._http.request(
+                    method,
+                    path,
+                    json=json,
+                    params=params,
+                    files=files,
+                    data=data,
+                    headers=self._headers(auth),
+                )
+            except httpx.TransportError as error:
+                delay = self.retry.delay_for_error(method, attempt, idempotent)
+                if delay is None:
+                    raise TransportError(f"{method} {path} failed: {error}") from error
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            delay = self.retry.delay_for_response(method, response, attempt, idempotent)
+            if delay is not None:
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code == 401 and auth and not reauthenticated and self._can_login():
+                # Token revoked or expired between checks: log in again once
+                reauthenticated = True
+                self.login()
+                continue
+
+            return self._handle(response)
+
+    def _ensure_token(self):
+        with self._auth_lock:
+            if self.token is None:
+                cached = self._cached_token()
+                if cached:
+                    self._set_token(cached)
+                elif self._can_login():
+                    self._login_locked()
+                return
+            if self._token_needs_refresh():
+                if self._token_expired():
+                    if self._can_login():
+                        self._login_locked()
+                    return
+                try:
+                    self._refresh_locked()
+                except AuthenticationError:
+                    if not self._can_login():
+                        raise
+                    self._login_locked()
+
+    def _login_locked(self):
+        response = self._http.post(
+            "/auth/login", json={"email": self.email, "password": self.password}
+        )
+        return self._remember_auth(self._handle(response))
+
+    def _refresh_locked(self):
+        response = self._http.post("/auth/refresh", headers=self._headers(True))
+        data = self._handle(response)
+        self._set_token(data["token"])
+        return data
+
+    def login(self, email=None, password=None):
+        """Log in with the given or stored credentials and cache the token"""
+        with self._auth_lock:
+            if email:
+                self.email = email.lower()
+            if password:
+                self.password = password
+            return self._login_locked()
+
+    def register(self, **payload):
+        data = self.request("POST", "/auth/register", json=payload, auth=False)
+        return self._remember_auth(data, payload.get("email"), payload.get("password"))
+
+    def refresh(self):
+        with self._auth_lock:
+            return self._refresh_locked()
+
+    def iter_entries(self, page_size=100, **filters):
+        """Yield every matching time entry, following the keyset cursor"""
+        params = {**filters, "limit": page_size}
+        while True:
+            data = self.list_entries(**params)
+            yield from data["entries"]
+            cursor = data["pagination"].get("next_cursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
+    def pull_changes(self, cursor=None, page_size=500):
+        """Every change since `cursor` (None for a full sync) in sequence order
+
+        Returns {"changes": [...], "cursor": ...}; store the cursor and pass it
+        to the next pull.
+        """
+        changes = []
+        while True:
+            data = self.changes(cursor=cursor, limit=page_size)
+            changes.extend(data["changes"])
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                return {"changes": changes, "cursor": cursor}
+
+    def upload_entries(self, entries, batch_size=200):
+        """Upload completed entries in batches through the bulk endpoint
+
+        Entries without a client_id get one, so batches can be retried safely;
+        pass the result of with_client_ids() to keep ids stable across calls.
+        Returns created/duplicate/error counts and per-entry results indexed
+        into `entries`.
+        """
+        entries = with_client_ids(entries)
+        upload = {"created": 0, "duplicate": 0, "error": 0, "results": []}
+        for offset in range(0, len(entries), batch_size):
+            response = self.bulk_create_entries(entries[offset:offset + batch_size])
+            merge_bulk_results(upload, response, offset)
+        return upload
+
+    def run_report_job(self, start_date, end_date, poll_interval=0.5, timeout=300, **filters):
+        """Submit a report job, poll until it finishes and return the report"""
+        job = self.submit_report_job(start_date, end_date, **filters)["job"]
+        deadline = time.monotonic() + timeout
+        while job["status"] in ("queued", "running"):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Report job {job['id']} still {job['status']} after {timeout}s")
+            time.sleep(poll_interval)
+            job = self.report_job(job["id"])["job"]
+        return self.report_job_result(job["id"])
+
+    def export_report(self, start_date, end_date, format="ndjson", gzip=True, **filters):
+        """Stream a custom report export, yielding one dict per time entry
+
+        Rows are parsed as they arrive, so memory stays flat for any range. CSV
+        values are strings; NDJSON keeps JSON types. Not retried mid-stream.
+        """
+        self._ensure_token()
+        headers = self._headers(True)
+        headers["Accept-Encoding"] = "gzip" if gzip else "identity"
+        payload = {"start_date": start_date, "end_date": end_date, "format": format, **filters}
+
+        with self._http.stream(
+            "POST", "/analytics/reports/custom", json=payload, headers=headers
+        ) as response:
+            if response.status_code >= 400:
+                response.read()
+                self._handle(response)
+
+            lines = _lines(response.iter_text())
+            if format == "csv":
+                yield from csv.DictReader(lines)
+            else:
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
@@ -0,0 +1,27 @@
+"""Errors raised by the Hubstaff clone API client"""
+
+
+class APIError(Exception):
+    """The API answered with an error status"""
+
+    def __init__(self, status_code, message, payload=None):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.payload = payload or {}
+
+
+class AuthenticationError(APIError):
+    """The token is missing, invalid or expired and could not be renewed"""
+
+
+class RateLimitError(APIError):
+    """The rate limiter kept rejecting the request (429)"""
+
+    def __init__(self, status_code, message, payload=None, retry_after=None):
+        super().__init__(status_code, message, payload)
+        self.retry_after = retry_after
+
+
+class TransportError(Exception):
+    """The request never got a response (connection reset, timeout, DNS)"""
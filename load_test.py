@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Concurrent Time Tracking Load Test
+Replays the register -> project -> task -> start/stop flow from
+time_tracking_test.py with many asyncio virtual users spread across several
+organizations, and reports per-endpoint throughput and latency percentiles.
+
+Usage:
+    python load_test.py --users 200 --orgs 40 --duration 120
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+from hubstaff_client import resolve_api_url
+
+# Free-plan organizations are capped at 5 users (Organization.billing.maxUsers)
+MAX_USERS_PER_ORG = 5
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LatencyRecorder:
+    """Collects request latencies and status codes per endpoint label"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, endpoint, elapsed, status):
+        self.latencies[endpoint].append(elapsed)
+        self.statuses[endpoint][status] += 1
+        if status >= 400 or status == 0:
+            self.errors[endpoint] += 1
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def stop(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def wall_time(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at or time.perf_counter()
+        return end - self.started_at
+
+    def summary(self):
+        """Per-endpoint throughput and latency percentiles (milliseconds)"""
+        wall_time = self.wall_time or 1.0
+        report = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            report[endpoint] = {
+                "requests": len(ordered),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(ordered) / wall_time, 2),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+                "statuses": dict(self.statuses[endpoint]),
+            }
+        return report
+
+    def print_summary(self, title="LOAD TEST RESULTS"):
+        print("\n" + "=" * 100)
+        print(f"📊 {title} ({self.wall_time:.1f}s wall time)")
+        print("=" * 100)
+        print(
+            f"{'Endpoint':<42}{'Reqs':>8}{'Errs':>7}{'RPS':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+        for endpoint, stats in self.summary().items():
+            print(
+                f"{endpoint:<42}{stats['requests']:>8}{stats['errors']:>7}"
+                f"{stats['throughput_rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+                f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}"
+            )
+        rate_limited = sum(
+            codes.get(429, 0) for codes in self.statuses.values()
+        )
+        if rate_limited:
+            print(
+                f"\n⚠️ {rate_limited} requests were rate limited (429); raise "
+                "RATE_LIMIT_GENERAL_MAX / RATE_LIMIT_AUTH_MAX on the backend"
+            )
+
+
+async def timed_request(client, recorder, method, endpoint, url, **kwargs):
+    """Issue a request and record its latency under the endpoint label"""
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        recorder.record(endpoint, time.perf_counter() - started, 0)
+        return None
+    recorder.record(endpoint, time.perf_counter() - started, response.status_code)
+    return response
+
+
+def admin_payload(org_suffix):
+    return {
+        "name": "Load Test Admin",
+        "email": f"load_admin_{uuid.uuid4()}@example.com",
+        "password": "LoadTest@123456",
+        "organizationName": f"Load Test Org {org_suffix}",
+    }
+
+
+def member_payload(invitation_token, email):
+    return {
+        "name": "Load Test User",
+        "email": email,
+        "password": "LoadTest@123456",
+        "organizationName": "Load Test Member",
+        "invitationToken": invitation_token,
+    }
+
+
+def project_payload():
+    return {
+        "name": "Load Test Project",
+        "description": "A project for load testing time tracking",
+        "client": "Load Client",
+        "budget": 5000.0,
+        "startDate": datetime.utcnow().isoformat(),
+        "endDate": (datetime.utcnow() + timedelta(days=30)).isoformat(),
+        "members": [],
+    }
+
+
+def task_payload(assignee_id):
+    return {
+        "title": f"Load Test Task {uuid.uuid4().hex[:6]}",
+        "description": "A task for load testing time tracking",
+        "priority": "medium",
+        "estimatedHours": 10.0,
+        "dueDate": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+        "assignee_id": assignee_id,
+    }
+
+
+class VirtualUser:
+    """One tracker with its own token, project and task"""
+
+    def __init__(self, token, user_id, project_id=None, task_id=None):
+        self.token = token
+        self.user_id = user_id
+        self.project_id = project_id
+        self.task_id = task_id
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+class LoadTest:
+    def __init__(self, api_url, users, orgs, duration, hold, think, ramp_up, timeout):
+        self.api_url = api_url
+        self.users = users
+        self.orgs = max(1, min(orgs, users))
+        self.duration = duration
+        self.hold = hold
+        self.think = think
+        self.ramp_up = ramp_up
+        self.timeout = timeout
+        self.setup_recorder = LatencyRecorder()
+        self.recorder = LatencyRecorder()
+
+    async def setup_organization(self, client, org_index, user_count):
+        """Register an admin, invite members and give each one a task"""
+        rec = self.setup_recorder
+        response = await timed_request(
+            client, rec, "POST", "POST /auth/register",
+            f"{self.api_url}/auth/register",
+            json=admin_payload(f"{org_index}-{uuid.uuid4().hex[:8]}"),
+        )
+        if response is None or response.status_code != 201:
+            raise RuntimeError(f"Failed to register org admin: {response and response.text}")
+
+        data = response.json()
+        admin = VirtualUser(data["token"], data["user"]["id"])
+
+        response = await timed_request(
+            client, rec, "POST", "POST /projects",
+            f"{self.api_url}/projects/",
+            json=project_payload(), headers=admin.headers,
+        )
+        if response is None or response.status_code != 201:
+            raise RuntimeError(f"Failed to create project: {response and response.text}")
+        project_id = response.json()["project"]["id"]
+
+        members = [admin]
+        for _ in range(user_count - 1):
+            email = f"load_user_{uuid.uuid4()}@example.com"
+            response = await timed_request(
+                client, rec, "POST", "POST /invitations",
+                f"{self.api_url}/invitations/",
+                json={"email": email, "role": "user"}, headers=admin.headers,
+            )
+            if response is None or response.status_code != 201:
+                raise RuntimeError(f"Failed to invite member: {response and response.text}")
+            invitation_url = response.json()["invitationUrl"]
+            token = parse_qs(urlparse(invitation_url).query)["token"][0]
+
+            response = await timed_request(
+                client, rec, "POST", "POST /auth/register",
+                f"{self.api_url}/auth/register",
+                json=member_payload(token, email),
+            )
+            if response is None or response.status_code != 201:
+                raise RuntimeError(f"Failed to register member: {response and response.text}")
+            data = response.json()
+            member = VirtualUser(data["token"], data["user"]["id"])
+
+            await timed_request(
+                client, rec, "POST", "POST /projects/:id/members",
+                f"{self.api_url}/projects/{project_id}/members",
+                json={"userId": member.user_id}, headers=admin.headers,
+            )
+            members.append(member)
+
+        for member in members:
+            member.project_id = project_id
+            response = await timed_request(
+                client, rec, "POST", "POST /projects/:id/tasks",
+                f"{self.api_url}/projects/{project_id}/tasks",
+                json=task_payload(member.user_id), headers=admin.headers,
+            )
+            if response is not None and response.status_code == 201:
+                member.task_id = response.json()["task"]["id"]
+
+        return members
+
+    async def run_user(self, client, user, deadline, delay):
+        """Loop start -> active -> stop -> entries until the deadline"""
+        await asyncio.sleep(delay)
+        rec = self.recorder
+        while time.perf_counter() < deadline:
+            response = await timed_request(
+                client, rec, "POST", "POST /time-tracking/start",
+                f"{self.api_url}/time-tracking/start",
+                json={
+                    "project_id": user.project_id,
+                    "task_id": user.task_id,
+                    "description": "Load test timer",
+                },
+                headers=user.headers,
+            )
+            entry_id = None
+            if response is not None and response.status_code == 201:
+                entry_id = response.json()["id"]
+            elif response is not None and response.status_code == 400:
+                entry_id = (response.json().get("activeEntry") or {}).get("id")
+
+            await asyncio.sleep(self.hold * random.uniform(0.5, 1.5))
+            await timed_request(
+                client, rec, "GET", "GET /time-tracking/active",
+                f"{self.api_url}/time-tracking/active", headers=user.headers,
+            )
+
+            if entry_id:
+                await timed_request(
+                    client, rec, "POST", "POST /time-tracking/stop/:entryId",
+                    f"{self.api_url}/time-tracking/stop/{entry_id}",
+                    headers=user.headers,
+                )
+
+            await timed_request(
+                client, rec, "GET", "GET /time-tracking/entries",
+                f"{self.api_url}/time-tracking/entries", headers=user.headers,
+            )
+            await asyncio.sleep(self.think * random.uniform(0.5, 1.5))
+
+    def organization_sizes(self):
+        """Users per organization, within the free-plan member cap"""
+        per_org = math.ceil(self.users / self.orgs)
+        if per_org > MAX_USERS_PER_ORG:
+            raise ValueError(
+                f"{self.users} users across {self.orgs} orgs needs {per_org} users per org; "
+                f"free-plan orgs allow {MAX_USERS_PER_ORG}. Use --orgs >= "
+                f"{math.ceil(self.users / MAX_USERS_PER_ORG)}"
+            )
+        base, remainder = divmod(self.users, self.orgs)
+        sizes = [base + 1 if index < remainder else base for index in range(self.orgs)]
+        return [size for size in sizes if size > 0]
+
+    async def run(self):
+        sizes = self.organization_sizes()
+        limits = httpx.Limits(
+            max_connections=self.users, max_keepalive_connections=self.users
+        )
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            print(f"\n🔧 Setting up {self.users} virtual users in {self.orgs} organizations...")
+            self.setup_recorder.start()
+            org_users = await asyncio.gather(
+                *[
+                    self.setup_organization(client, index, size)
+                    for index, size in enumerate(sizes)
+                ]
+            )
+            self.setup_recorder.stop()
+            users = [user for members in org_users for user in members]
+            print(f"✅ {len(users)} virtual users ready")
+
+            print(f"\n🚀 Running load for {self.duration}s...")
+            self.recorder.start()
+            deadline = time.perf_counter() + self.duration
+            await asyncio.gather(
+                *[
+                    self.run_user(
+                        client, user, deadline, self.ramp_up * index / len(users)
+                    )
+                    for index, user in enumerate(users)
+                ]
+            )
+            self.recorder.stop()
+
+        self.setup_recorder.print_summary("SETUP RESULTS")
+        self.recorder.print_summary("LOAD TEST RESULTS")
+        return {
+            "config": {
+                "api_url": self.api_url,
+                "users": self.users,
+                "orgs": self.orgs,
+                "duration": self.duration,
+                "hold": self.hold,
+                "think": self.think,
+                "ramp_up": self.ramp_up,
+            },
+            "setup": self.setup_recorder.summary(),
+            "load": self.recorder.summary(),
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent time tracking load test")
+    parser.add_argument("--api-url", help="Backend URL (defaults to BACKEND_URL or frontend .env)")
+    parser.add_argument("--users", type=int, default=50, help="Number of virtual users")
+    parser.add_argument("--orgs", type=int, default=10, help="Number of organizations")
+    parser.add_argument("--duration", type=float, default=60, help="Load phase length in seconds")
+    parser.add_argument("--hold", type=float, default=1.0, help="Seconds a timer runs before stop")
+    parser.add_argument("--think", type=float, default=1.0, help="Pause between iterations in seconds")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="Write the report as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    api_url = resolve_api_url(args.api_url)
+    print(f"Load testing Time Tracking API at: {api_url}")
+
+    load_test = LoadTest(
+        api_url,
+        users=args.users,
+        orgs=args.orgs,
+        duration=args.duration,
+        hold=args.hold,
+        think=args.think,
+        ramp_up=args.ramp_up,
+        timeout=args.timeout,
+    )
+    report = asyncio.run(load_test.run())
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.json_path}")
+
+    total_errors = sum(stats["errors"] for stats in report["load"].values())
+    exit(0 if total_errors == 0 else 1)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Logging Overhead Benchmark
+Runs the same closed-loop time tracking workload (load_test.py with no hold
+or think time) against several running backends and compares throughput, so
+two logging setups can be measured side by side, e.g. the previous build
+with morgan + per-request winston lines and this one with the sampled,
+buffered request log:
+
+    git worktree add ../timetrack-before <previous commit>
+    (cd ../timetrack-before/backend && PORT=8001 npm start)
+    (cd backend && PORT=8002 npm start)
+    python logging_benchmark.py --target before=http://localhost:8001/api \\
+        --target after=http://localhost:8002/api --rounds 3
+
+Targets are run alternately for --rounds rounds so drift in the database
+or host affects all of them alike. Start every backend with high
+RATE_LIMIT_GENERAL_MAX / RATE_LIMIT_AUTH_MAX values.
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+from statistics import median
+
+from load_test import MAX_USERS_PER_ORG, LoadTest
+
+
+def parse_target(value):
+    label, separator, url = value.partition("=")
+    if not separator or not url:
+        raise argparse.ArgumentTypeError("targets look like label=http://host:port/api")
+    return label, url.rstrip("/")
+
+
+def run_round(label, api_url, args):
+    print(f"\n⏱️ {label}: {api_url}")
+    load_test = LoadTest(
+        api_url,
+        users=args.users,
+        orgs=args.orgs or math.ceil(args.users / MAX_USERS_PER_ORG),
+        duration=args.duration,
+        hold=0,
+        think=0,
+        ramp_up=args.ramp_up,
+        timeout=args.timeout,
+    )
+    load = asyncio.run(load_test.run())["load"]
+    return {
+        "throughput_rps": round(sum(stats["throughput_rps"] for stats in load.values()), 2),
+        "p95_ms": max((stats["p95_ms"] for stats in load.values()), default=0.0),
+        "errors": sum(stats["errors"] for stats in load.values()),
+    }
+
+
+def summarize(targets, rounds):
+    """Median of each target's rounds, with the gain over the first target"""
+    summary = []
+    for label, url in targets:
+        runs = rounds[label]
+        summary.append({
+            "target": label,
+            "api_url": url,
+            "throughput_rps": round(median(run["throughput_rps"] for run in runs), 2),
+            "worst_p95_ms": round(median(run["p95_ms"] for run in runs), 2),
+            "errors": sum(run["errors"] for run in runs),
+            "rounds": runs,
+        })
+    baseline = summary[0]["throughput_rps"] or 1.0
+    for row in summary:
+        row["gain_pct"] = round((row["throughput_rps"] / baseline - 1) * 100, 1)
+    return summary
+
+
+def print_summary(summary):
+    print("\n" + "=" * 70)
+    print("📊 LOGGING OVERHEAD (median of rounds)")
+    print("=" * 70)
+    print(f"{'Target':<20}{'RPS':>12}{'Gain':>10}{'p95 ms':>12}{'Errors':>10}")
+    for row in summary:
+        print(
+            f"{row['target']:<20}{row['throughput_rps']:>12.1f}{row['gain_pct']:>9.1f}%"
+            f"{row['worst_p95_ms']:>12.1f}{row['errors']:>10}"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare API throughput across logging setups")
+    parser.add_argument(
+        "--target",
+        dest="targets",
+        action="append",
+        type=parse_target,
+        required=True,
+        help="label=api_url; repeat for every backend, the first is the baseline",
+    )
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per target")
+    parser.add_argument("--users", type=int, default=50, help="Number of virtual users")
+    parser.add_argument("--orgs", type=int, help="Organizations (default users / 5)")
+    parser.add_argument("--duration", type=float, default=30, help="Load phase per run")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="Write the summary as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    rounds = {label: [] for label, _ in args.targets}
+    for _ in range(args.rounds):
+        for label, url in args.targets:
+            rounds[label].append(run_round(label, url, args))
+
+    summary = summarize(args.targets, rounds)
+    print_summary(summary)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Results written to {args.json_path}")
+
+    sys.exit(1 if any(row["errors"] for row in summary) else 0)
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Soak Test
+Runs a steady mix of start/stop/manual/entries/analytics calls for a long
+period while sampling backend RSS, heap, open sockets and event-loop lag from
+/api/health/runtime, then flags monotonic resource growth and latency drift.
+
+Entries created by the workload are deleted again unless --keep-entries is
+given, so the dataset stays flat and any drift points at the server itself.
+
+Usage:
+    python soak_test.py --duration 4h --users 20 --orgs 4 --json soak.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+
+from hubstaff_client import resolve_api_url
+from load_test import LatencyRecorder, LoadTest, percentile, timed_request
+
+# Relative weights of the actions each virtual user picks from
+WORKLOAD_MIX = {"timer": 3, "manual": 2, "entries": 3, "analytics": 2}
+
+# Runtime series checked for growth: label -> path into the runtime sample
+RESOURCE_SERIES = {
+    "rss_bytes": ("memory", "rss"),
+    "heap_used_bytes": ("memory", "heap_used"),
+    "external_bytes": ("memory", "external"),
+    "open_sockets": ("open_sockets",),
+    "active_resources": ("active_resources",),
+    "socketio_rooms": ("socketio", "rooms"),
+    "mongoose_connections": ("mongoose", "connections"),
+    "logger_transports": ("logger_transports",),
+    "event_loop_lag_p99_ms": ("event_loop_lag", "p99_ms"),
+}
+
+
+def parse_duration(value):
+    """Seconds from plain numbers or 30s / 45m / 4h style values"""
+    units = {"s": 1, "m": 60, "h": 3600}
+    value = str(value).strip().lower()
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def lookup(sample, path):
+    for key in path:
+        if not isinstance(sample, dict):
+            return None
+        sample = sample.get(key)
+    return sample
+
+
+def bucket_floors(points, buckets):
+    """Minimum value per equal-width time bucket
+
+    Using the floor rather than the mean filters out GC sawtooth: a leak
+    raises the level memory returns to, not just the peaks.
+    """
+    if len(points) < 2:
+        return []
+    start, end = points[0][0], points[-1][0]
+    width = (end - start) / buckets or 1.0
+    floors = [None] * buckets
+    for t, value in points:
+        index = min(int((t - start) / width), buckets - 1)
+        if floors[index] is None or value < floors[index]:
+            floors[index] = value
+    return [value for value in floors if value is not None]
+
+
+def slope_per_hour(points):
+    """Least-squares slope of (seconds, value) points, per hour"""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in points)
+    if var_t == 0:
+        return 0.0
+    cov = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    return cov / var_t * 3600
+
+
+def analyze_growth(points, buckets, threshold, min_rising):
+    """Flag a series whose bucket floors rise steadily by more than threshold"""
+    floors = bucket_floors(points, buckets)
+    if len(floors) < 3:
+        return {"samples": len(points), "flagged": False, "reason": "not enough samples"}
+
+    steps = list(zip(floors, floors[1:]))
+    rising = sum(1 for a, b in steps if b >= a) / len(steps)
+    first, last = floors[0], floors[-1]
+    growth = (last - first) / max(abs(first), 1)
+    flagged = growth > threshold and rising >= min_rising
+    return {
+        "samples": len(points),
+        "first_floor": first,
+        "last_floor": last,
+        "growth": round(growth, 4),
+        "rising_ratio": round(rising, 2),
+        "slope_per_hour": round(slope_per_hour(points), 2),
+        "flagged": flagged,
+    }
+
+
+def analyze_drift(windows, threshold, min_requests):
+    """Compare each endpoint's p95 in the first and last latency windows"""
+    report = {}
+    if len(windows) < 2:
+        return report
+    first, last = windows[0], windows[-1]
+    for endpoint in sorted(set(first.latencies) & set(last.latencies)):
+        before = sorted(first.latencies[endpoint])
+        after = sorted(last.latencies[endpoint])
+        if len(before) < min_requests or len(after) < min_requests:
+            continue
+        p95_before = percentile(before, 95)
+        p95_after = percentile(after, 95)
+        ratio = p95_after / p95_before if p95_before else 0.0
+        report[endpoint] = {
+            "first_p95_ms": round(p95_before * 1000, 2),
+            "last_p95_ms": round(p95_after * 1000, 2),
+            "ratio": round(ratio, 2),
+            "flagged": ratio > threshold,
+        }
+    return report
+
+
+class WindowedRecorder(LatencyRecorder):
+    """LatencyRecorder that also splits latencies into fixed time windows"""
+
+    def __init__(self, window, warmup=0.0):
+        super().__init__()
+        self.window = window
+        self.warmup = warmup
+        self.windows = defaultdict(LatencyRecorder)
+
+    def record(self, endpoint, elapsed, status):
+        super().record(endpoint, elapsed, status)
+        offset = time.perf_counter() - (self.started_at or time.perf_counter())
+        if offset >= self.warmup:
+            self.windows[int((offset - self.warmup) // self.window)].record(
+                endpoint, elapsed, status
+            )
+
+    def ordered_windows(self):
+        return [self.windows[index] for index in sorted(self.windows)]
+
+
+class RuntimeSampler:
+    """Polls /api/health/runtime at a fixed interval"""
+
+    def __init__(self, api_url, interval):
+        self.url = f"{api_url}/health/runtime"
+        token = os.environ.get("METRICS_TOKEN")
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.interval = interval
+        self.samples = []
+        self.failures = 0
+
+    async def run(self, client, deadline, started_at):
+        while True:
+            try:
+                response = await client.get(self.url, headers=self.headers)
+                response.raise_for_status()
+                self.samples.append((time.perf_counter() - started_at, response.json()))
+            except (httpx.HTTPError, ValueError):
+                self.failures += 1
+            if time.perf_counter() + self.interval > deadline:
+                return
+            await asyncio.sleep(self.interval)
+
+    def series(self, path, warmup):
+        return [
+            (t, value)
+            for t, sample in self.samples
+            if t >= warmup and (value := lookup(sample, path)) is not None
+        ]
+
+
+class SoakTest(LoadTest):
+    def __init__(
+        self,
+        api_url,
+        users,
+        orgs,
+        duration,
+        think,
+        hold,
+        timeout,
+        sample_interval,
+        window,
+        warmup,
+        buckets,
+        growth_threshold,
+        drift_threshold,
+        keep_entries,
+    ):
+        super().__init__(
+            api_url, users, orgs, duration, hold, think,
+            ramp_up=min(30.0, duration / 10), timeout=timeout,
+        )
+        self.recorder = WindowedRecorder(window, warmup)
+        self.sampler = RuntimeSampler(api_url, sample_interval)
+        self.warmup = warmup
+        self.buckets = buckets
+        self.growth_threshold = growth_threshold
+        self.drift_threshold = drift_threshold
+        self.keep_entries = keep_entries
+
+    async def delete_entry(self, client, user, entry_id):
+        if entry_id and not self.keep_entries:
+            await timed_request(
+                client, self.recorder, "DELETE", "DELETE /time-tracking/entries/:entryId",
+                f"{self.api_url}/time-tracking/entries/{entry_id}", headers=user.headers,
+            )
+
+    async def timer_cycle(self, client, user):
+        rec = self.recorder
+        response = await timed_request(
+            client, rec, "POST", "POST /time-tracking/start",
+            f"{self.api_url}/time-tracking/start",
+            json={
+                "project_id": user.project_id,
+                "task_id": user.task_id,
+                "description": "Soak test timer",
+            },
+            headers=user.headers,
+        )
+        entry_id = None
+        if response is not None and response.status_code == 201:
+            entry_id = response.json()["id"]
+        elif response is not None and response.status_code == 400:
+            entry_id = (response.json().get("activeEntry") or {}).get("id")
+
+        await asyncio.sleep(self.hold * random.uniform(0.5, 1.5))
+        await timed_request(
+            client, rec, "GET", "GET /time-tracking/active",
+            f"{self.api_url}/time-tracking/active", headers=user.headers,
+        )
+        if entry_id:
+            response = await timed_request(
+                client, rec, "POST", "POST /time-tracking/stop/:entryId",
+                f"{self.api_url}/time-tracking/stop/{entry_id}", headers=user.headers,
+            )
+            if response is not None and response.status_code == 200:
+                await self.delete_entry(client, user, entry_id)
+
+    async def manual_cycle(self, client, user):
+        end = datetime.utcnow() - timedelta(hours=random.randint(1, 72))
+        start = end - timedelta(minutes=random.randint(15, 240))
+        response = await timed_request(
+            client, self.recorder, "POST", "POST /time-tracking/manual",
+            f"{self.api_url}/time-tracking/manual",
+            json={
+                "project_id": user.project_id,
+                "task_id": user.task_id,
+                "description": "Soak test manual entry",
+                "start_time": start.isoformat(),
+                "end_time": end.isoformat(),
+            },
+            headers=user.headers,
+        )
+        if response is not None and response.status_code == 201:
+            await self.delete_entry(client, user, response.json()["entry"]["id"])
+
+    async def entries_cycle(self, client, user):
+        await timed_request(
+            client, self.recorder, "GET", "GET /time-tracking/entries",
+            f"{self.api_url}/time-tracking/entries", headers=user.headers,
+        )
+
+    async def analytics_cycle(self, client, user):
+        endpoint = random.choice(["dashboard", "productivity"])
+        await timed_request(
+            client, self.recorder, "GET", f"GET /analytics/{endpoint}",
+            f"{self.api_url}/analytics/{endpoint}",
+            params={"period": random.choice(["week", "month"])},
+            headers=user.headers,
+        )
+
+    async def run_user(self, client, user, deadline, delay):
+        """Pick actions from WORKLOAD_MIX until the deadline"""
+        actions = list(WORKLOAD_MIX)
+        weights = [WORKLOAD_MIX[action] for action in actions]
+        await asyncio.sleep(delay)
+        while time.perf_counter() < deadline:
+            action = random.choices(actions, weights)[0]
+            await getattr(self, f"{action}_cycle")(client, user)
+            await asyncio.sleep(self.think * random.uniform(0.5, 1.5))
+
+    def analyze(self):
+        resources = {
+            label: analyze_growth(
+                self.sampler.series(path, self.warmup),
+                self.buckets,
+                self.growth_threshold,
+                min_rising=0.75,
+            )
+            for label, path in RESOURCE_SERIES.items()
+        }
+        drift = analyze_drift(
+            self.recorder.ordered_windows(), self.drift_threshold, min_requests=20
+        )
+        return resources, drift
+
+    def print_report(self, resources, drift):
+        print("\n" + "=" * 100)
+        print("🧪 SOAK TEST RESOURCE TRENDS (after warm-up)")
+        print("=" * 100)
+        print(f"{'Series':<26}{'First floor':>16}{'Last floor':>16}{'Growth':>10}{'Rising':>9}  Verdict")
+        for label, stats in resources.items():
+            if "growth" not in stats:
+                print(f"{label:<26}{'-':>16}{'-':>16}{'-':>10}{'-':>9}  ⏭️ {stats['reason']}")
+                continue
+            verdict = "❌ growing" if stats["flagged"] else "✅ stable"
+            print(
+                f"{label:<26}{stats['first_floor']:>16,.0f}{stats['last_floor']:>16,.0f}"
+                f"{stats['growth']:>9.1%}{stats['rising_ratio']:>9.2f}  {verdict}"
+            )
+
+        print(f"\n⏱️ Latency drift, first vs last {self.recorder.window:.0f}s window (p95)")
+        if not drift:
+            print("   Not enough traffic in the first and last windows to compare")
+        for endpoint, stats in drift.items():
+            verdict = "❌ drifting" if stats["flagged"] else "✅ steady"
+            print(
+                f"   {endpoint:<42}{stats['first_p95_ms']:>9.1f} ms →"
+                f"{stats['last_p95_ms']:>9.1f} ms  x{stats['ratio']:<6} {verdict}"
+            )
+        if self.sampler.failures:
+            print(f"\n⚠️ {self.sampler.failures} runtime samples failed")
+
+    async def run(self):
+        sizes = self.organization_sizes()
+        limits = httpx.Limits(
+            max_connections=self.users + 1, max_keepalive_connections=self.users + 1
+        )
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            print(f"\n🔧 Setting up {self.users} virtual users in {self.orgs} organizations...")
+            org_users = await asyncio.gather(
+                *[
+                    self.setup_organization(client, index, size)
+                    for index, size in enumerate(sizes)
+                ]
+            )
+            users = [user for members in org_users for user in members]
+            print(f"✅ {len(users)} virtual users ready")
+
+            print(f"\n🚀 Soaking for {self.duration / 60:.1f} minutes...")
+            self.recorder.start()
+            deadline = time.perf_counter() + self.duration
+            await asyncio.gather(
+                self.sampler.run(client, deadline, self.recorder.started_at),
+                *[
+                    self.run_user(client, user, deadline, self.ramp_up * index / len(users))
+                    for index, user in enumerate(users)
+                ],
+            )
+            self.recorder.stop()
+
+        self.recorder.print_summary("SOAK TEST REQUEST RESULTS")
+        resources, drift = self.analyze()
+        self.print_report(resources, drift)
+        return {
+            "config": {
+                "api_url": self.api_url,
+                "users": self.users,
+                "orgs": self.orgs,
+                "duration": self.duration,
+                "warmup": self.warmup,
+                "window": self.recorder.window,
+                "sample_interval": self.sampler.interval,
+                "growth_threshold": self.growth_threshold,
+                "drift_threshold": self.drift_threshold,
+                "keep_entries": self.keep_entries,
+            },
+            "requests": self.recorder.summary(),
+            "resources": resources,
+            "latency_drift": drift,
+            "samples": [
+                {"elapsed": round(t, 1), **sample} for t, sample in self.sampler.samples
+            ],
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Long-running soak test with resource tracking")
+    parser.add_argument("--api-url", help="Backend URL (defaults to BACKEND_URL or frontend .env)")
+    parser.add_argument("--duration", type=parse_duration, default="1h", help="Soak length, e.g. 3600, 90m or 4h")
+    parser.add_argument("--users", type=int, default=10, help="Number of virtual users")
+    parser.add_argument("--orgs", type=int, default=2, help="Number of organizations")
+    parser.add_argument("--think", type=float, default=2.0, help="Pause between actions in seconds")
+    parser.add_argument("--hold", type=float, default=5.0, help="Seconds a timer runs before stop")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--sample-interval", type=parse_duration, default="15s", help="Runtime sampling interval")
+    parser.add_argument("--window", type=parse_duration, default="5m", help="Latency window used for drift")
+    parser.add_argument("--warmup", type=parse_duration, default="2m", help="Ignore samples before this offset")
+    parser.add_argument("--buckets", type=int, default=10, help="Time buckets used for growth detection")
+    parser.add_argument("--growth-threshold", type=float, default=0.2, help="Flag series whose floor grows by more than this fraction")
+    parser.add_argument("--drift-threshold", type=float, default=1.5, help="Flag endpoints whose p95 grows by more than this factor")
+    parser.add_argument("--keep-entries", action="store_true", help="Keep entries instead of deleting them")
+    parser.add_argument("--json", dest="json_path", help="Write the report and raw samples as JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    api_url = resolve_api_url(args.api_url)
+    print(f"Soak testing API at: {api_url}")
+
+    soak_test = SoakTest(
+        api_url,
+        users=args.users,
+        orgs=args.orgs,
+        duration=args.duration,
+        think=args.think,
+        hold=args.hold,
+        timeout=args.timeout,
+        sample_interval=args.sample_interval,
+        window=args.window,
+        warmup=args.warmup,
+        buckets=args.buckets,
+        growth_threshold=args.growth_threshold,
+        drift_threshold=args.drift_threshold,
+        keep_entries=args.keep_entries,
+    )
+    report = asyncio.run(soak_test.run())
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.json_path}")
+
+    flagged = [label for label, stats in report["resources"].items() if stats["flagged"]]
+    flagged += [endpoint for endpoint, stats in report["latency_drift"].items() if stats["flagged"]]
+    if flagged:
+        print(f"\n❌ Soak test flagged: {', '.join(flagged)}")
+    exit(1 if flagged else 0)
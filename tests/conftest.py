@@ -0,0 +1,264 @@
+"""
+Fixtures for running the API suite in parallel.
+
+Every test gets its own freshly registered organization, so tests share no
+state and can be spread over worker processes with pytest-xdist:
+
+    pytest -n auto --timing-report timings.json
+
+Per-test setup/call/teardown timings are summarized at the end of the run so
+slow endpoints stand out.
+
+With --assert-no-collscan the backend's query profiler explains every query
+shape for the duration of the run, and the session fails if a hot endpoint
+(HOT_ROUTES) ran a collection scan:
+
+    pytest -n auto --assert-no-collscan --query-profile-report profile.json
+"""
+import json
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from hubstaff_client import HubstaffClient, TransportError, resolve_api_url
+
+PASSWORD = "Fixture@123456"
+
+_timings = {}
+_query_profile = {}
+
+# Endpoints clients call constantly; a collection scan on any of them fails
+# the --assert-no-collscan run
+HOT_ROUTES = {
+    "POST /api/time-tracking/start",
+    "POST /api/time-tracking/stop/:entryId",
+    "GET /api/time-tracking/active",
+    "GET /api/time-tracking/entries",
+    "POST /api/time-tracking/bulk",
+    "GET /api/projects/",
+    "GET /api/projects/:id/tasks",
+    "GET /api/sync/changes",
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("hubstaff")
+    group.addoption("--api-url", help="Backend URL (defaults to BACKEND_URL or frontend .env)")
+    group.addoption("--timing-report", help="Write per-test timings as JSON to this path")
+    group.addoption(
+        "--slowest", type=int, default=15, help="Number of slowest tests to list"
+    )
+    group.addoption(
+        "--assert-no-collscan",
+        action="store_true",
+        help="Fail the run if a hot endpoint triggers a MongoDB collection scan",
+    )
+    group.addoption("--query-profile-report", help="Write the query profile as JSON to this path")
+
+
+class Organization:
+    """A freshly registered organization with clients for its members"""
+
+    def __init__(self, api_url):
+        self.api_url = api_url
+        self.clients = []
+        self.admin_payload = {
+            "name": "Fixture Admin",
+            "email": f"fixture_admin_{uuid.uuid4()}@example.com",
+            "password": PASSWORD,
+            "organizationName": f"Fixture Org {uuid.uuid4().hex[:12]}",
+        }
+        self.admin = self._client()
+        data = self.admin.register(**self.admin_payload)
+        self.id = data["user"]["organizationId"]
+        self.admin_id = data["user"]["id"]
+
+    def _client(self):
+        client = HubstaffClient(self.api_url)
+        self.clients.append(client)
+        return client
+
+    def add_member(self, role="user", name="Fixture Member"):
+        """Invite a member and register them through the invitation token"""
+        email = f"fixture_{role}_{uuid.uuid4()}@example.com"
+        invitation = self.admin.request(
+            "POST", "/invitations/", json={"email": email, "role": role}
+        )
+        token = parse_qs(urlparse(invitation["invitationUrl"]).query)["token"][0]
+
+        client = self._client()
+        client.register(
+            name=name,
+            email=email,
+            password=PASSWORD,
+            organizationName=self.admin_payload["organizationName"],
+            invitationToken=token,
+        )
+        return client
+
+    def create_project(self, **overrides):
+        project = {
+            "name": "Fixture Project",
+            "description": "A project created by the test fixtures",
+            "client": "Fixture Client",
+            "budget": 5000.0,
+            "startDate": datetime.utcnow().isoformat(),
+            "endDate": (datetime.utcnow() + timedelta(days=30)).isoformat(),
+            **overrides,
+        }
+        return self.admin.create_project(**project)["project"]
+
+    def add_to_project(self, project_id, member):
+        return self.admin.request(
+            "POST", f"/projects/{project_id}/members", json={"userId": member.user["id"]}
+        )
+
+    def create_task(self, project_id, assignee_id, **overrides):
+        task = {
+            "title": "Fixture Task",
+            "description": "A task created by the test fixtures",
+            "priority": "medium",
+            "estimatedHours": 10.0,
+            "dueDate": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "assignee_id": assignee_id,
+            **overrides,
+        }
+        return self.admin.create_task(project_id, **task)["task"]
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+
+
+@pytest.fixture(scope="session")
+def api_url(request):
+    url = resolve_api_url(request.config.getoption("--api-url"))
+    with HubstaffClient(url) as client:
+        try:
+            client.health()
+        except TransportError as error:
+            pytest.skip(f"Backend not reachable at {url}: {error}")
+    return url
+
+
+@pytest.fixture
+def org(api_url):
+    organization = Organization(api_url)
+    yield organization
+    organization.close()
+
+
+@pytest.fixture
+def admin(org):
+    return org.admin
+
+
+@pytest.fixture
+def manager(org):
+    return org.add_member("manager", name="Fixture Manager")
+
+
+@pytest.fixture
+def project(org):
+    return org.create_project()
+
+
+@pytest.fixture
+def member(org, project):
+    """A regular user who belongs to the fixture project"""
+    client = org.add_member("user")
+    org.add_to_project(project["id"], client)
+    return client
+
+
+@pytest.fixture
+def task(org, project, member):
+    return org.create_task(project["id"], member.user["id"])
+
+
+def pytest_runtest_logreport(report):
+    timing = _timings.setdefault(
+        report.nodeid, {"setup": 0.0, "call": 0.0, "teardown": 0.0, "outcome": "passed"}
+    )
+    timing[report.when] = report.duration
+    if report.outcome != "passed" and timing["outcome"] == "passed":
+        timing["outcome"] = report.outcome
+
+
+def _profiling(config):
+    return not hasattr(config, "workerinput") and (
+        config.getoption("--assert-no-collscan") or config.getoption("--query-profile-report")
+    )
+
+
+def pytest_sessionstart(session):
+    """Explain every query shape while the suite runs (controller only)"""
+    if not _profiling(session.config):
+        return
+    try:
+        organization = Organization(resolve_api_url(session.config.getoption("--api-url")))
+    except TransportError:
+        return  # the api_url fixture skips every test
+    previous = organization.admin.query_profile()
+    organization.admin.update_query_profile(enabled=True, slow_ms=0, reset=True)
+    _query_profile.update(organization=organization, previous=previous)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    organization = _query_profile.get("organization")
+    if organization is None:
+        return
+    report = organization.admin.query_profile()
+    previous = _query_profile["previous"]
+    organization.admin.update_query_profile(
+        enabled=previous["enabled"], slow_ms=previous["slow_ms"]
+    )
+    organization.close()
+
+    path = session.config.getoption("--query-profile-report")
+    if path:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    scans = [entry for entry in report["collscans"] if entry["route"] in HOT_ROUTES]
+    _query_profile["collscans"] = scans
+    if scans and session.config.getoption("--assert-no-collscan"):
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    scans = _query_profile.get("collscans")
+    if scans:
+        terminalreporter.section("collection scans on hot endpoints")
+        for entry in scans:
+            terminalreporter.write_line(
+                f"{entry['route']}: {entry['model']}.{entry['operation']} {entry['shape']} "
+                f"({entry['collscans']}/{entry['count']} scans)"
+            )
+
+    if hasattr(config, "workerinput") or not _timings:
+        return
+
+    rows = sorted(
+        (
+            {"test": nodeid, "total": sum(t[phase] for phase in ("setup", "call", "teardown")), **t}
+            for nodeid, t in _timings.items()
+        ),
+        key=lambda row: row["total"],
+        reverse=True,
+    )
+
+    terminalreporter.section("per-test timing (seconds)")
+    terminalreporter.write_line(f"{'total':>8}{'setup':>8}{'call':>8}  test")
+    for row in rows[: config.getoption("--slowest")]:
+        terminalreporter.write_line(
+            f"{row['total']:>8.2f}{row['setup']:>8.2f}{row['call']:>8.2f}  {row['test']}"
+        )
+
+    path = config.getoption("--timing-report")
+    if path:
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+        terminalreporter.write_line(f"Timing report written to {path}")
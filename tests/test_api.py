@@ -0,0 +1,592 @@
+"""
+Independent API tests.
+
+Unlike backend_test.py, which chains state through class attributes and must
+run in order, each test here builds what it needs from the fixtures in
+conftest.py and can run on any worker.
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from hubstaff_client import APIError, AuthenticationError, HubstaffClient, with_client_ids
+
+
+def test_health(api_url):
+    with HubstaffClient(api_url) as client:
+        data = client.health()
+    assert data["status"] == "healthy"
+    assert data["database"] == "connected"
+
+
+def test_register_and_me(org, admin):
+    assert admin.user["email"] == org.admin_payload["email"]
+    assert admin.user["role"] == "admin"
+
+    me = admin.me()
+    assert me["id"] == org.admin_id
+    assert me["organization"]["id"] == org.id
+
+
+def test_login(org, api_url):
+    with HubstaffClient(api_url) as client:
+        data = client.login(org.admin_payload["email"], org.admin_payload["password"])
+    assert data["token"]
+    assert data["user"]["id"] == org.admin_id
+
+
+def test_duplicate_registration_rejected(org, api_url):
+    with HubstaffClient(api_url) as client:
+        with pytest.raises(APIError) as excinfo:
+            client.register(**org.admin_payload)
+    assert excinfo.value.status_code == 400
+
+
+def test_invalid_login_rejected(api_url):
+    with HubstaffClient(api_url) as client:
+        with pytest.raises(AuthenticationError):
+            client.login(f"missing_{uuid.uuid4()}@example.com", "wrong-password")
+
+
+def test_unauthenticated_request_rejected(api_url):
+    with HubstaffClient(api_url) as client:
+        with pytest.raises(AuthenticationError):
+            client.me()
+
+
+def test_users_are_scoped_to_organization(org, admin):
+    member = org.add_member("user")
+    other = type(org)(org.api_url)
+    try:
+        data = admin.request("GET", "/users/")
+        ids = {user["id"] for user in data["users"]}
+        assert ids == {org.admin_id, member.user["id"]}
+        assert other.admin_id not in ids
+    finally:
+        other.close()
+
+
+def test_regular_user_cannot_list_users(org):
+    member = org.add_member("user")
+    with pytest.raises(APIError) as excinfo:
+        member.request("GET", "/users/")
+    assert excinfo.value.status_code == 403
+
+
+def test_update_profile(org, admin):
+    data = admin.request(
+        "PUT", f"/users/{org.admin_id}", json={"name": "Renamed Admin"}
+    )
+    assert data["user"]["name"] == "Renamed Admin"
+
+
+def test_update_user_returns_stored_document(org, admin):
+    member = org.add_member("user")
+    member_id = member.user["id"]
+    for _ in range(2):
+        data = admin.request(
+            "PUT", f"/users/{member_id}", json={"isActive": False, "department": "Ops"}
+        )
+        assert data["user"]["isActive"] is False
+        assert data["user"]["department"] == "Ops"
+        assert data["user"]["email"] == member.user["email"]
+
+
+def test_team_stats(admin):
+    data = admin.request("GET", "/users/team/stats")
+    assert isinstance(data, dict)
+
+
+def test_create_and_list_projects(admin, project):
+    assert project["name"] == "Fixture Project"
+
+    data = admin.list_projects()
+    assert [p["id"] for p in data["projects"]] == [project["id"]]
+    assert data["pagination"]["total"] == 1
+
+
+def test_get_and_update_project(admin, project):
+    assert admin.get_project(project["id"])["id"] == project["id"]
+
+    data = admin.request(
+        "PUT", f"/projects/{project['id']}", json={"name": "Updated Project"}
+    )
+    assert data["project"]["name"] == "Updated Project"
+
+
+def test_regular_user_cannot_create_project(member):
+    with pytest.raises(APIError) as excinfo:
+        member.create_project(name="Forbidden Project")
+    assert excinfo.value.status_code == 403
+
+
+def test_create_and_list_tasks(admin, member, project, task):
+    assert task["assignee_id"] == member.user["id"]
+    assert task["assignee"]["id"] == member.user["id"]
+
+    data = admin.list_tasks(project["id"])
+    assert [t["id"] for t in data["tasks"]] == [task["id"]]
+
+
+def test_start_active_stop(member, project, task):
+    assert member.active_timer() is None
+
+    started = member.start_timer(project["id"], task["id"], "Fixture work")
+    assert started["project_id"] == project["id"]
+    assert started["task_id"] == task["id"]
+
+    active = member.active_timer()
+    assert active["id"] == started["id"]
+    assert active["project_name"] == project["name"]
+
+    stopped = member.stop_timer(started["id"])
+    assert stopped["id"] == started["id"]
+    assert stopped["end_time"] is not None
+    assert member.active_timer() is None
+
+
+def test_active_timer_follows_edits(member, project, task):
+    started = member.start_timer(project["id"], task["id"], "Before edit")
+    try:
+        member.update_entry(started["id"], description="After edit")
+        active = member.active_timer()
+        assert active["id"] == started["id"]
+        assert active["description"] == "After edit"
+        assert active["task_title"] == task["title"]
+    finally:
+        member.stop_timer(started["id"])
+    assert member.active_timer() is None
+
+
+def test_activity_samples_set_activity_level(member, project, task):
+    start = (datetime.utcnow() - timedelta(hours=2)).replace(second=0, microsecond=0)
+    entry = member.create_manual_entry(
+        project_id=project["id"],
+        task_id=task["id"],
+        description="Sampled work",
+        start_time=start.isoformat(),
+        end_time=(start + timedelta(minutes=3)).isoformat(),
+    )["entry"]
+    samples = [
+        {"timestamp": (start + timedelta(minutes=i)).isoformat(), "active_seconds": active}
+        for i, active in enumerate([30, 60, 0])
+    ]
+    samples.append({"timestamp": (start - timedelta(hours=1)).isoformat(), "active_seconds": 5})
+
+    result = member.upload_activity(entry["id"], samples)
+    assert result["accepted"] == 3
+    assert [item["index"] for item in result["rejected"]] == [3]
+    for _ in range(50):  # samples are written in the background
+        listed = next(e for e in member.list_entries()["entries"] if e["id"] == entry["id"])
+        if listed["activity_level"]:
+            break
+        time.sleep(0.1)
+    assert listed["activity_level"] == 50
+
+    with pytest.raises(APIError) as excinfo:
+        member.upload_activity(str(uuid.uuid4()), samples[:1])
+    assert excinfo.value.status_code == 404
+
+
+def test_screenshot_upload_is_deduplicated(api_url, member, project):
+    end = datetime.utcnow() - timedelta(hours=1)
+    entries = [
+        member.create_manual_entry(
+            project_id=project["id"],
+            start_time=(end - timedelta(minutes=30 * (i + 1))).isoformat(),
+            end_time=(end - timedelta(minutes=30 * i)).isoformat(),
+        )["entry"]
+        for i in range(2)
+    ]
+    image = bytes.fromhex("89504e470d0a1a0a") + uuid.uuid4().bytes * 64
+
+    first = member.upload_screenshot(entries[0]["id"], image, activity_level=40)
+    assert first["deduplicated"] is False
+    assert first["screenshot"]["mime_type"] == "image/png"
+    retried = member.upload_screenshot(entries[0]["id"], image)
+    assert retried["screenshot"]["id"] == first["screenshot"]["id"]
+    other = member.upload_screenshot(entries[1]["id"], image)
+    assert other["deduplicated"] is True
+    assert other["screenshot"]["id"] != first["screenshot"]["id"]
+    assert other["screenshot"]["hash"] == first["screenshot"]["hash"]
+
+    listed = member.list_screenshots(entries[0]["id"])["screenshots"]
+    assert [shot["id"] for shot in listed] == [first["screenshot"]["id"]]
+    entry = next(e for e in member.list_entries()["entries"] if e["id"] == entries[0]["id"])
+    assert entry["screenshots"] == [first["screenshot"]["id"]]
+
+    response = httpx.get(
+        f"{api_url}/screenshots/{first['screenshot']['id']}/image",
+        headers={"Authorization": f"Bearer {member.token}"},
+    )
+    assert response.status_code == 200
+    assert response.content == image
+
+    with pytest.raises(APIError) as excinfo:
+        member.upload_screenshot(entries[0]["id"], b"not an image" * 4)
+    assert excinfo.value.status_code == 415
+
+
+def test_second_timer_rejected(member, project, task):
+    started = member.start_timer(project["id"], task["id"])
+    try:
+        with pytest.raises(APIError) as excinfo:
+            member.start_timer(project["id"], task["id"])
+        assert excinfo.value.status_code == 400
+    finally:
+        member.stop_timer(started["id"])
+
+
+def test_non_member_cannot_track_project(org, project):
+    outsider = org.add_member("user")
+    with pytest.raises(APIError) as excinfo:
+        outsider.start_timer(project["id"])
+    assert excinfo.value.status_code == 403
+
+
+def test_manual_entry_lifecycle(member, project, task):
+    end = datetime.utcnow() - timedelta(hours=1)
+    start = end - timedelta(hours=2)
+    entry = member.create_manual_entry(
+        project_id=project["id"],
+        task_id=task["id"],
+        description="Manual fixture work",
+        start_time=start.isoformat(),
+        end_time=end.isoformat(),
+    )["entry"]
+    assert entry["duration"] == 7200
+    assert entry["is_manual"] is True
+
+    entries = member.list_entries()
+    assert [e["id"] for e in entries["entries"]] == [entry["id"]]
+
+    updated = member.update_entry(entry["id"], description="Edited")["entry"]
+    assert updated["description"] == "Edited"
+
+    member.delete_entry(entry["id"])
+    assert member.list_entries()["entries"] == []
+
+
+def test_concurrent_entry_edits_count_once(admin, member, project):
+    end = datetime.utcnow() - timedelta(hours=6)
+    entry = member.create_manual_entry(
+        project_id=project["id"],
+        start_time=(end - timedelta(hours=1)).isoformat(),
+        end_time=end.isoformat(),
+    )["entry"]
+
+    def edit(hours):
+        try:
+            return member.update_entry(
+                entry["id"],
+                start_time=(end - timedelta(hours=hours)).isoformat(),
+                end_time=end.isoformat(),
+            )["entry"]
+        except APIError as error:
+            assert error.status_code == 409
+            return None
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(edit, [2, 3]))
+    assert any(results)
+
+    stored = next(e for e in member.list_entries()["entries"] if e["id"] == entry["id"])
+    assert stored["duration"] in (7200, 10800)
+    project_stats = admin.get_project(project["id"])["stats"]
+    assert project_stats["totalTimeTracked"] == stored["duration"]
+
+
+def test_entries_keyset_paging(member, project, task):
+    end = datetime.utcnow() - timedelta(hours=1)
+    created = []
+    for offset in range(5):
+        start = end - timedelta(hours=offset + 1)
+        created.append(
+            member.create_manual_entry(
+                project_id=project["id"],
+                task_id=task["id"],
+                start_time=start.isoformat(),
+                end_time=(start + timedelta(minutes=30)).isoformat(),
+            )["entry"]["id"]
+        )
+
+    first = member.list_entries(limit=2, include_total="true")
+    assert first["pagination"]["total"] == 5
+    assert first["pagination"]["has_more"] is True
+    assert [e["id"] for e in first["entries"]] == created[:2]
+    assert first["entries"][0]["project_name"] == project["name"]
+    assert first["entries"][0]["task_title"] == task["title"]
+
+    second = member.list_entries(limit=2, cursor=first["pagination"]["next_cursor"])
+    assert "total" not in second["pagination"]
+    assert [e["id"] for e in second["entries"]] == created[2:4]
+
+    assert [e["id"] for e in member.iter_entries(page_size=2)] == created
+
+
+def test_entries_invalid_cursor_rejected(member):
+    with pytest.raises(APIError) as excinfo:
+        member.list_entries(cursor="not-a-cursor")
+    assert excinfo.value.status_code == 400
+
+
+def test_manual_entry_requires_valid_range(member, project):
+    now = datetime.utcnow()
+    with pytest.raises(APIError) as excinfo:
+        member.create_manual_entry(
+            project_id=project["id"],
+            start_time=now.isoformat(),
+            end_time=(now - timedelta(hours=1)).isoformat(),
+        )
+    assert excinfo.value.status_code == 400
+
+
+def test_bulk_entry_upload_is_idempotent(member, project, task):
+    end = datetime.utcnow() - timedelta(hours=1)
+    entries = with_client_ids(
+        {
+            "project_id": project["id"],
+            "task_id": task["id"],
+            "start_time": (end - timedelta(hours=offset + 1)).isoformat(),
+            "end_time": (end - timedelta(hours=offset, minutes=30)).isoformat(),
+        }
+        for offset in range(5)
+    )
+    entries.append({**entries[0], "project_id": "missing", "client_id": "bad-project"})
+
+    first = member.upload_entries(entries, batch_size=2)
+    assert (first["created"], first["duplicate"], first["error"]) == (5, 0, 1)
+    assert first["results"][-1] == {
+        "index": 5,
+        "client_id": "bad-project",
+        "status": "error",
+        "error": "Project not found",
+    }
+
+    retry = member.upload_entries(entries[:5])
+    assert (retry["created"], retry["duplicate"]) == (0, 5)
+    assert [r["id"] for r in retry["results"]] == [r["id"] for r in first["results"][:5]]
+    assert len(list(member.iter_entries())) == 5
+
+
+def test_delta_sync_reports_changes_and_deletions(member, project, task):
+    full = member.pull_changes()
+    synced = {(change["type"], change["id"]) for change in full["changes"]}
+    assert {("project", project["id"]), ("task", task["id"])} <= synced
+    assert all(change["op"] == "created" for change in full["changes"])
+
+    start = datetime.utcnow() - timedelta(hours=2)
+    kept, removed = (
+        member.create_manual_entry(
+            project_id=project["id"],
+            start_time=(start + timedelta(minutes=offset)).isoformat(),
+            end_time=(start + timedelta(minutes=offset + 30)).isoformat(),
+        )["entry"]
+        for offset in (0, 45)
+    )
+    member.update_entry(kept["id"], description="Synced")
+    member.delete_entry(removed["id"])
+
+    delta = member.pull_changes(full["cursor"])
+    latest = {change["id"]: change for change in delta["changes"]}
+    assert latest[kept["id"]]["op"] == "created"
+    assert latest[kept["id"]]["record"]["description"] == "Synced"
+    assert latest[removed["id"]] == {
+        "seq": latest[removed["id"]]["seq"],
+        "type": "time_entry",
+        "op": "deleted",
+        "id": removed["id"],
+        "record": None,
+    }
+    seqs = [change["seq"] for change in delta["changes"]]
+    assert seqs == sorted(seqs)
+
+
+def test_time_stats(member):
+    assert isinstance(member.time_stats(), dict)
+
+
+def test_dashboard_analytics(admin):
+    data = admin.dashboard_analytics()
+    assert data["user_stats"]["total_entries"] == 0
+    assert data["period"] == "week"
+
+
+def test_team_analytics(admin):
+    data = admin.team_analytics()
+    assert {"team_stats", "daily_productivity", "project_stats", "summary"} <= set(data)
+
+
+def test_regular_user_cannot_view_team_analytics(member):
+    with pytest.raises(APIError) as excinfo:
+        member.team_analytics()
+    assert excinfo.value.status_code == 403
+
+
+def test_dashboard_revalidates_until_a_write(api_url, admin, project):
+    headers = {"Authorization": f"Bearer {admin.token}"}
+    url = f"{api_url}/analytics/dashboard"
+
+    first = httpx.get(url, headers=headers)
+    etag = first.headers["ETag"]
+    # Weak, as the gzip and identity bodies share it
+    assert first.status_code == 200 and etag.startswith("W/")
+
+    cached = httpx.get(url, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    identity = httpx.get(url, headers={**headers, "Accept-Encoding": "identity"})
+    assert identity.headers["ETag"] == etag
+    assert "Accept-Encoding" in identity.headers["Vary"]
+
+    start = datetime.utcnow() - timedelta(hours=2)
+    admin.create_manual_entry(
+        project_id=project["id"],
+        start_time=start.isoformat(),
+        end_time=(start + timedelta(hours=1)).isoformat(),
+    )
+    changed = httpx.get(url, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["user_stats"]["total_hours"] == pytest.approx(1)
+
+
+def test_productivity_analytics(admin):
+    data = admin.productivity_analytics()
+    assert data["total_hours"] == 0
+    assert "productivity_chart" in data
+
+
+@pytest.mark.parametrize("export_format", ["csv", "ndjson"])
+def test_custom_report_export_matches_totals(admin, project, export_format):
+    end = datetime.utcnow() - timedelta(hours=1)
+    for offset, description in enumerate(["Plain", 'Quoted "notes", with\nnewline']):
+        start = end - timedelta(hours=offset + 1)
+        admin.create_manual_entry(
+            project_id=project["id"],
+            description=description,
+            start_time=start.isoformat(),
+            end_time=(start + timedelta(minutes=45)).isoformat(),
+        )
+    window = {
+        "start_date": (end - timedelta(days=1)).isoformat(),
+        "end_date": datetime.utcnow().isoformat(),
+    }
+
+    report = admin.custom_report(**window)
+    rows = list(admin.export_report(format=export_format, **window))
+
+    assert len(rows) == report["entry_count"] == 2
+    assert sum(int(row["duration"]) for row in rows) / 3600 == pytest.approx(
+        report["metrics"]["total_hours"]
+    )
+    assert {row["description"] for row in rows} == {"Plain", 'Quoted "notes", with\nnewline'}
+    assert {row["project_name"] for row in rows} == {project["name"]}
+
+
+def test_report_job_matches_inline_report_and_is_cached(admin, project):
+    start = datetime.utcnow() - timedelta(hours=3)
+    admin.create_manual_entry(
+        project_id=project["id"],
+        start_time=start.isoformat(),
+        end_time=(start + timedelta(hours=1)).isoformat(),
+    )
+    window = {
+        "start_date": (start - timedelta(days=90)).isoformat(),
+        "end_date": datetime.utcnow().isoformat(),
+        "project_ids": [project["id"]],
+    }
+
+    report = admin.run_report_job(**window)
+    assert report == admin.custom_report(**window)
+    assert report["entry_count"] == 1
+
+    again = admin.submit_report_job(**window)["job"]
+    assert again["status"] == "completed"
+    assert again["cached"] is True
+    assert admin.report_job_result(again["id"]) == report
+
+    # A write makes the cached result unreachable
+    admin.create_manual_entry(
+        project_id=project["id"],
+        start_time=(start + timedelta(hours=1)).isoformat(),
+        end_time=(start + timedelta(hours=2)).isoformat(),
+    )
+    assert admin.run_report_job(**window)["entry_count"] == 2
+
+
+def test_report_job_status_requires_manager(admin, member):
+    window = {
+        "start_date": (datetime.utcnow() - timedelta(days=1)).isoformat(),
+        "end_date": datetime.utcnow().isoformat(),
+    }
+    job = admin.submit_report_job(**window)["job"]
+    with pytest.raises(APIError) as excinfo:
+        member.report_job(job["id"])
+    assert excinfo.value.status_code == 403
+
+
+def test_logging_settings_change_at_runtime(admin, member):
+    before = admin.logging_settings()
+    try:
+        changed = admin.update_logging(level="debug", sample_rates="*=0.5")
+        assert changed["level"] == "debug"
+        assert changed["sample_rates"] == "*=0.5"
+        assert admin.logging_settings()["level"] == "debug"
+    finally:
+        admin.update_logging(level=before["level"], sample_rates=before["sample_rates"])
+
+    with pytest.raises(APIError) as excinfo:
+        admin.update_logging(level="loud")
+    assert excinfo.value.status_code == 400
+    with pytest.raises(APIError) as excinfo:
+        member.update_logging(level="debug")
+    assert excinfo.value.status_code == 403
+
+
+def test_metrics_expose_route_latency_and_db_timing(member):
+    member.list_entries()
+    text = member.metrics()
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'route="/api/time-tracking/entries",le="+Inf"' in text
+    assert 'mongodb_operations_total{model="TimeEntry",operation="find"}' in text
+    assert "http_requests_in_flight " in text
+
+
+def test_query_profile_reports_index_usage(admin, member):
+    previous = admin.query_profile()
+    try:
+        admin.update_query_profile(enabled=True, slow_ms=0)
+        member.list_entries()
+        for _ in range(20):  # plans are explained in the background
+            routes = {row["route"]: row for row in admin.query_profile()["routes"]}
+            entries = routes.get("GET /api/time-tracking/entries")
+            if entries and entries["indexes"]:
+                break
+            time.sleep(0.1)
+        assert entries and entries["queries"] >= 1
+        assert entries["collscans"] == 0
+        assert any(label.startswith("IXSCAN") for label in entries["indexes"])
+    finally:
+        admin.update_query_profile(enabled=previous["enabled"], slow_ms=previous["slow_ms"])
+
+    with pytest.raises(APIError) as excinfo:
+        admin.update_query_profile(slow_ms=-1)
+    assert excinfo.value.status_code == 400
+
+
+def test_integrations(admin):
+    assert admin.request("GET", "/integrations/")
+
+
+def test_websocket_info(admin):
+    data = admin.request("GET", "/websocket/info")
+    assert data["endpoint"] == "/socket.io"
+
+
+def test_logout(admin):
+    assert admin.logout()